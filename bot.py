@@ -3,48 +3,48 @@
 
 import os
 from dotenv import load_dotenv, dotenv_values
-from deps.bot_singleton import BotSingleton
-from deps.mybot import MyBot
 from deps.log import print_log
 
-# Load .env file first
-load_dotenv()
 
-# Get ENV from environment (could be set by systemd or .env)
-ENV = os.getenv("ENV")
-
-# In production, ensure .env values take precedence over system environment variables
-if ENV == "prod":
-    # Load .env values directly and override specific environment variables
-    env_values = dotenv_values()
+def main() -> None:
+    """Load the environment and start the bot"""
+    # The render workers are spawned: they import this file again as __mp_main__. The bot is only built here so
+    # that import does not create the bot or migrate the database a second time
+    from deps.bot_singleton import BotSingleton  # pylint: disable=import-outside-toplevel
 
-    # Override key environment variables with .env values
-    for key in ['BOT_TOKEN', 'BOT_TOKEN_DEV', 'GEMINI_API_KEY', 'OPENAI_API_KEY', 'ENV']:
-        if key in env_values and env_values[key] is not None:
-            os.environ[key] = env_values[key]
+    # Load .env file first
+    load_dotenv()
 
-    # Re-read ENV in case it was overridden
-    ENV = os.getenv("ENV")
+    # Get ENV from environment (could be set by systemd or .env)
+    env = os.getenv("ENV")
 
-    print_log(f"Production mode: Using .env file values (ENV={ENV})")
+    # In production, ensure .env values take precedence over system environment variables
+    if env == "prod":
+        # Load .env values directly and override specific environment variables
+        env_values = dotenv_values()
 
-TOKEN = os.getenv("BOT_TOKEN_DEV") if ENV == "dev" else os.getenv("BOT_TOKEN")
+        # Override key environment variables with .env values
+        for key in ["BOT_TOKEN", "BOT_TOKEN_DEV", "GEMINI_API_KEY", "OPENAI_API_KEY", "ENV"]:
+            value = env_values.get(key)
+            if value is not None:
+                os.environ[key] = value
 
-if TOKEN is None:
-    print_log("BOT_TOKEN_DEV not found")
-    exit()
+        # Re-read ENV in case it was overridden
+        env = os.getenv("ENV")
 
-TOKEN_STR: str = str(TOKEN)
+        print_log(f"Production mode: Using .env file values (ENV={env})")
 
-bot: MyBot = BotSingleton().bot
+    token = os.getenv("BOT_TOKEN_DEV") if env == "dev" else os.getenv("BOT_TOKEN")
 
-print_log(f"Env: {ENV}")
-print_log(f"Token: {TOKEN}")
+    if token is None:
+        print_log("BOT_TOKEN_DEV not found")
+        return
 
+    bot = BotSingleton().bot
 
-def main() -> None:
-    """Start the bot"""
-    bot.run(TOKEN_STR)
+    print_log(f"Env: {env}")
+    print_log(f"Token: {token}")
+    bot.run(token)
 
 
 if __name__ == "__main__":
@@ -19,11 +19,14 @@ import discord
 from deps.ai.ai_bot_functions import split_message_at_paragraphs
 from deps.ai.ai_functions import BotAISingleton
 from deps.ai.graph_functions import GraphResponse
-from deps.cache import start_periodic_cache_cleanup
+from deps.cache import remove_negative_cache, start_periodic_cache_cleanup
 from deps.analytic_data_access import insert_user_activity
 from deps.analytic_data_access import fetch_user_info_by_user_id
+from deps.analytic_constants import KEY_USER_INFO
 from deps.data_access_data_class import UserInfo
+from deps.database_gateway import database_gateway
 from deps.system_database import EVENT_CONNECT, EVENT_DISCONNECT, database_manager
+from deps.voice_session_data_access import apply_voice_session_event
 from deps.bot_common_actions import (
     move_members_between_voice_channel,
     send_automatic_lfg_message,
@@ -34,14 +37,17 @@ from deps.data_access import (
     data_access_get_channel,
     data_access_get_custom_game_voice_channels,
     data_access_get_guild_active_private_channels,
+    data_access_get_guild_config,
     data_access_get_guild_schedule_text_channel_id,
     data_access_get_guild_voice_channel_ids,
     data_access_get_main_text_channel_id,
     data_access_get_new_user_text_channel_id,
     data_access_remove_guild_active_private_channel,
+    data_access_move_voice_user_list,
     data_access_remove_voice_user_list,
     data_access_update_voice_user_list,
     data_access_get_voice_user_list,
+    data_access_get_voice_user_list_version,
     data_access_get_pending_match_start_gif_message,
     data_access_clear_pending_match_start_gif_message,
     data_access_get_last_match_start_gif_time,
@@ -112,6 +118,8 @@ class MyEventsCog(commands.Cog):
         self.last_task_lock = asyncio.Lock()  # Protect concurrent access to last_task dictionary
         self.match_start_gif_locks: dict[str, asyncio.Lock] = {}
         self.match_start_gif_locks_creation_lock = asyncio.Lock()
+        # Voice roster version of the last complete evaluation, keyed by the debounced task key
+        self.evaluated_roster_versions: dict[str, int] = {}
         self.cleanup_task: asyncio.Task | None = None  # Store reference to prevent garbage collection
         self.synced_guild_ids: set[int] = set()
         # Track repeated private-channel deletion access failures to prune stale entries.
@@ -339,7 +347,7 @@ class MyEventsCog(commands.Cog):
         guild_id: int,
         move_time: datetime,
     ) -> None:
-        """Helper to log channel move in database (runs in thread pool)"""
+        """Helper to log channel move in database (runs on the database writer thread)"""
         with database_manager.data_access_transaction() as cursor:
             # Upsert user_info
             cursor.execute(
@@ -366,6 +374,7 @@ class MyEventsCog(commands.Cog):
                     "time": move_time.isoformat(),
                 },
             )
+            apply_voice_session_event(cursor, member_id, guild_id, old_channel_id, EVENT_DISCONNECT, move_time)
 
             # Insert CONNECT to new channel
             cursor.execute(
@@ -381,6 +390,8 @@ class MyEventsCog(commands.Cog):
                     "time": move_time.isoformat(),
                 },
             )
+            apply_voice_session_event(cursor, member_id, guild_id, new_channel_id, EVENT_CONNECT, move_time)
+        remove_negative_cache(True, f"{KEY_USER_INFO}:{member_id}")
 
     @staticmethod
     def _normalize_message_mentions(message: discord.Message) -> str:
@@ -470,6 +481,8 @@ class MyEventsCog(commands.Cog):
             print_log(f"Checking in guild: {guild.name} ({guild.id}) - Created the {guild.created_at}")
             print_log(f"\tGuild {guild.name} has {guild.member_count} members, setting the commands")
             guild_obj = discord.Object(id=guild.id)
+            # Presence and voice handlers read the guild settings from this snapshot
+            await data_access_get_guild_config(guild.id)
 
             # commands_reg = await bot.tree.fetch_commands(guild=guild_obj)
             # for command in commands_reg:
@@ -620,7 +633,8 @@ class MyEventsCog(commands.Cog):
                 # User joined a voice channel
                 if _is_loggable_voice_channel(after.channel):
                     channel_id = after.channel.id
-                    insert_user_activity(
+                    await database_gateway.write(
+                        insert_user_activity,
                         member.id,
                         member.display_name,
                         channel_id,
@@ -648,7 +662,7 @@ class MyEventsCog(commands.Cog):
                 # User left a voice channel
                 if _is_loggable_voice_channel(before.channel):
                     channel_id = before.channel.id
-                    await asyncio.to_thread(
+                    await database_gateway.write(
                         insert_user_activity,
                         member.id,
                         member.display_name,
@@ -672,7 +686,7 @@ class MyEventsCog(commands.Cog):
                 try:
                     move_time = datetime.now(timezone.utc)
                     if before_loggable and after_loggable:
-                        await asyncio.to_thread(
+                        await database_gateway.write(
                             self._log_channel_move_sync,
                             member.id,
                             member.display_name,
@@ -682,7 +696,7 @@ class MyEventsCog(commands.Cog):
                             move_time,
                         )
                     elif before_loggable:
-                        await asyncio.to_thread(
+                        await database_gateway.write(
                             insert_user_activity,
                             member.id,
                             member.display_name,
@@ -692,7 +706,7 @@ class MyEventsCog(commands.Cog):
                             move_time,
                         )
                     elif after_loggable:
-                        await asyncio.to_thread(
+                        await database_gateway.write(
                             insert_user_activity,
                             member.id,
                             member.display_name,
@@ -705,10 +719,10 @@ class MyEventsCog(commands.Cog):
                     print_error_log(f"on_voice_state_update: Error logging channel move: {e}")
 
                 # Update voice user list cache (always, regardless of tracking)
-                await data_access_remove_voice_user_list(guild_id, before.channel.id, member.id)
                 user_activity = get_any_siege_activity(member)
-                await data_access_update_voice_user_list(
+                await data_access_move_voice_user_list(
                     guild_id,
+                    before.channel.id,
                     after.channel.id,
                     member.id,
                     user_activity.details if user_activity else None,
@@ -749,7 +763,7 @@ class MyEventsCog(commands.Cog):
                 try:
                     for member in channel.members:
                         if not member.bot:
-                            await asyncio.to_thread(
+                            await database_gateway.write(
                                 insert_user_activity,
                                 member.id,
                                 member.display_name,
@@ -907,11 +921,17 @@ class MyEventsCog(commands.Cog):
         """
         A task that can be cancelled and will wait for X seconds before sending the automatic message
         """
+        key = f"lfg-{guild_id}-{channel_id}"
         try:
             await asyncio.sleep(5)  # Wait
-            await send_automatic_lfg_message(
+            roster_version = data_access_get_voice_user_list_version(guild_id, channel_id)
+            if self.evaluated_roster_versions.get(key) == roster_version:
+                return  # Nobody joined, left or changed activity since the last evaluation
+            evaluated = await send_automatic_lfg_message(
                 self.bot, guild_id, channel_id
             )  # Send the actual command to see if we can send a message (depending of everyone state)
+            if evaluated:
+                self.evaluated_roster_versions[key] = roster_version
         except asyncio.CancelledError:
             pass  # Task was cancelled, cleanup will happen in finally
         finally:
@@ -953,6 +973,12 @@ class MyEventsCog(commands.Cog):
                 # Check if 1+ users just started a ranked match (not just queuing, but actually in match)
                 # We detect this by looking for users who transitioned TO ranked-specific states like
                 # "Picking Operators: Ranked on..." which indicates match actually started
+                version_key = f"matchstartgif-{guild_id}-{channel_id}"
+                roster_version = data_access_get_voice_user_list_version(guild_id, channel_id)
+                if self.evaluated_roster_versions.get(version_key) == roster_version:
+                    return  # Same members and activities as the last evaluation
+                # Forgotten again below if the send fails, so the next presence update retries
+                self.evaluated_roster_versions[version_key] = roster_version
                 user_activities = await data_access_get_voice_user_list(guild_id, channel_id)
                 aggregation = get_aggregation_all_activities(user_activities)
                 number_users = len(user_activities)
@@ -992,6 +1018,7 @@ class MyEventsCog(commands.Cog):
                         if sent:
                             print_log(f"Posted match start GIF for guild {guild_id}, channel {channel_id}.")
                         else:
+                            self.evaluated_roster_versions.pop(version_key, None)
                             data_access_clear_last_match_start_gif_time(guild_id, channel_id)
                             print_log(
                                 f"Match start GIF send did not post for guild {guild_id}, channel {channel_id}. Reservation cleared."
@@ -1004,6 +1031,7 @@ class MyEventsCog(commands.Cog):
             # Task was cancelled during sleep, this is expected
             pass
         except Exception as e:
+            self.evaluated_roster_versions.pop(f"matchstartgif-{guild_id}-{channel_id}", None)
             print_error_log(f"send_match_start_gif_debounced_cancellable_task: {e}")
         finally:
             async with self.last_task_lock:
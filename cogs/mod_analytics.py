@@ -2,11 +2,14 @@
 Command for moderator only concerning analytic
 """
 
+import asyncio
 import io
+from concurrent.futures.process import BrokenProcessPool
 import discord
 from discord.ext import commands
 from discord import app_commands
 from deps.analytic_visualizer import display_graph_cluster_people
+from deps.render_service import render_service
 from deps.values import COMMAND_SHOW_COMMUNITY
 from deps.mybot import MyBot
 
@@ -26,14 +29,22 @@ class ModAnalytics(commands.Cog):
         to_day_ago: int = 0,
     ):
         """Activate or deactivate the bot voice message"""
-        img_bytes = display_graph_cluster_people(False, from_day_ago, to_day_ago)
+        await interaction.response.defer(ephemeral=True)
+        try:
+            img_bytes = await render_service.submit(display_graph_cluster_people, False, from_day_ago, to_day_ago)
+        except asyncio.TimeoutError:
+            await interaction.followup.send("The community graph took too long to generate.", ephemeral=True)
+            return
+        except BrokenProcessPool:
+            await interaction.followup.send("Failed to generate community graph.", ephemeral=True)
+            return
         if img_bytes is None:
-            await interaction.response.send_message("Failed to generate community graph.", ephemeral=True)
+            await interaction.followup.send("Failed to generate community graph.", ephemeral=True)
             return
         bytesio = io.BytesIO(img_bytes)
         bytesio.seek(0)  # Ensure the BytesIO cursor is at the beginning
         file = discord.File(fp=bytesio, filename="plot.png")
-        await interaction.response.send_message(file=file, ephemeral=True)
+        await interaction.followup.send(file=file, ephemeral=True)
 
 
 async def setup(bot):
@@ -10,6 +10,7 @@ from discord.ext import commands
 from discord import app_commands
 from cogs.events import MyEventsCog
 from deps.bot_common_actions import refresh_current_rank_roles_cross_guilds, send_daily_question_to_a_guild
+from deps.scrape_scheduler import ScrapePriority
 from deps.values import (
     COMMAND_AI_CONTEXT_CLEAR,
     COMMAND_AI_CONTEXT_EDIT,
@@ -291,6 +292,7 @@ class ModBasic(commands.Cog):
             self.bot,
             guild=interaction.guild,
             include_connected_voice=False,
+            priority=ScrapePriority.INTERACTIVE,
         )
         await interaction.followup.send(
             "Rank refresh complete for users active in the last "
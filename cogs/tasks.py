@@ -7,7 +7,7 @@ from datetime import datetime, time, timedelta, timezone
 from zoneinfo import ZoneInfo
 from discord.ext import commands, tasks
 from deps.ai.ai_bot_functions import send_daily_ai_summary_guild
-from deps.monthly_report import send_monthly_analytics_report_guild
+from deps.monthly_report_discord_actions import send_monthly_analytics_report_guild
 from deps.streak_functions import announce_streak_milestones_for_guild
 from deps.bot_common_actions import (
     check_voice_channel,
@@ -17,12 +17,14 @@ from deps.bot_common_actions import (
     reconcile_pending_tribemarkets,
     send_daily_question_to_a_guild,
 )
+from deps.data_access import data_access_wait_for_due_member_stats
 from deps.mybot import MyBot
 from deps.log import print_error_log, print_log
 from deps.system_database import run_wal_checkpoint
 from deps.functions_stats import send_daily_stats_to_a_guild
-from deps.analytic_player_value_functions import compute_and_store_player_values
+from deps.analytic_player_value_functions import PLAYER_VALUE_FULL_REBUILD_WEEKDAY, compute_and_store_player_values
 from deps.analytic_player_value_weekly import send_weekly_player_value_to_a_guild
+from deps.values import STATS_QUEUE_RETRY_MINUTES
 
 # ZoneInfo and not pytz: a pytz timezone attached directly to time() uses the
 # zone's LMT offset (-7:53 for Los Angeles), firing every task 53 minutes late.
@@ -76,15 +78,18 @@ class MyTasksCog(commands.Cog):
         except Exception as e:
             print_error_log(f"check_voice_channel_task task: {e}")
 
-    @tasks.loop(minutes=3)
+    @tasks.loop()
     async def send_queue_user_stats(self):
         """
-        Every x minutes post to the gaming stats channel the queued user awaiting for their gaming session
+        Post to the gaming stats channel the queued user awaiting for their gaming session,
+        sleeping until the next one is due or a user is queued
         """
         try:
+            await data_access_wait_for_due_member_stats()
             await post_queued_user_stats()
         except Exception as e:
             print_error_log(f"send_queue_user_stats task: {e}")
+            await asyncio.sleep(STATS_QUEUE_RETRY_MINUTES * 60)  # Do not spin on a failing queue
 
     @tasks.loop(minutes=30)
     async def reconcile_tribemarkets_task(self):
@@ -186,10 +191,12 @@ class MyTasksCog(commands.Cog):
         Every night, recompute the team-balancing player values for every user.
         All users and not only the recently active ones: the values decay with
         calendar time, so idle players must keep dropping until they play again.
+        Once a week the stored states are rebuilt from the full history to catch drift.
         """
         print_log(f"daily_compute_player_values_task, current time {datetime.now()}")
+        full_rebuild = datetime.now(pacific_tz).weekday() == PLAYER_VALUE_FULL_REBUILD_WEEKDAY
         try:
-            await asyncio.to_thread(compute_and_store_player_values)
+            await asyncio.to_thread(compute_and_store_player_values, full_rebuild=full_rebuild)
         except Exception as e:
             print_error_log(f"daily_compute_player_values_task task: {e}")
 
@@ -25,6 +25,7 @@ from deps.bet.bet_data_access import (
     KEY_bet_user_game,
     KEY_bet_user_tournament,
 )
+from deps.http_clients import http_clients
 from deps.data_access import (
     data_access_get_guild_ai_context,
     data_access_set_guild_ai_context,
@@ -227,9 +228,13 @@ class BotAI:
             prefix = gemini_key[:8] if key_len >= 8 else gemini_key
             print_log(f"ask_ai: GEMINI_API_KEY present: True, prefix: {prefix}... (len={key_len})")
             print_log("ask_ai: Attempting to use Gemini API (model: gemini-2.5-flash)...")
-            client_gemini = genai.Client(
-                api_key=gemini_key,
-                http_options=types.HttpOptions(timeout=GEMINI_HTTP_TIMEOUT_MS),
+            client_gemini = http_clients.get_client(
+                "gemini",
+                lambda: genai.Client(
+                    api_key=gemini_key,
+                    http_options=types.HttpOptions(timeout=GEMINI_HTTP_TIMEOUT_MS),
+                ),
+                config=gemini_key,
             )
             print_log("ask_ai: Calling Gemini generate_content...")
             t_call = time.monotonic()
@@ -259,7 +264,7 @@ class BotAI:
             print_log(f"ask_ai: API key starts with: {openai_key[:10]}...")
 
         try:
-            client_open_ai = OpenAI()
+            client_open_ai = http_clients.get_client("openai", OpenAI, config=openai_key)
 
             for model in OPENAI_FALLBACK_MODELS:
                 try:
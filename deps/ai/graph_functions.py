@@ -5,21 +5,16 @@ from __future__ import annotations
 import io
 import re
 from dataclasses import dataclass
-from collections import defaultdict
 from datetime import datetime, timedelta, timezone
 
 import matplotlib
 
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
 
-from deps.analytic_data_access import (
-    data_access_fetch_user_matches_in_time_range,
-    fetch_all_user_activities,
-    fetch_user_info,
-)
-from deps.data_access_data_class import UserActivity
-from deps.system_database import EVENT_CONNECT, EVENT_DISCONNECT
+from deps.analytic_data_access import fetch_user_info
+from deps.analytic_snapshot import SECONDS_PER_DAY, VoiceColumns, load_analytic_snapshot, seconds_by_bucket, to_epoch
 
 
 SUPPORTED_CHART_TYPES = {"line", "bar", "stacked_bar", "area", "scatter"}
@@ -88,60 +83,26 @@ def _subtract_months(value: datetime, months: int) -> datetime:
     return value.replace(year=index // 12, month=index % 12 + 1, day=1)
 
 
-def _parse_activity_timestamp(timestamp: str) -> datetime:
-    """Normalize database timestamps before comparing or sorting them."""
-    parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
-    return parsed if parsed.tzinfo is not None else parsed.replace(tzinfo=timezone.utc)
-
-
-def _distribute_session_by_month(start: datetime, end: datetime) -> dict[str, float]:
-    """Split one voice session across calendar months in seconds."""
-    if end <= start:
-        return {}
-    values: dict[str, float] = defaultdict(float)
-    cursor = start
-    while cursor < end:
-        month_end = _subtract_months(cursor.replace(day=1), -1)
-        segment_end = min(end, month_end)
-        values[cursor.strftime("%Y-%m")] += (segment_end - cursor).total_seconds()
-        cursor = segment_end
-    return dict(values)
-
-
-def _voice_time_by_month(activities: list[UserActivity]) -> dict[str, dict[int, float]]:
-    """Pair activity per user/channel, preventing cross-channel event pairing."""
-    sessions: dict[tuple[int, int], datetime] = {}
-    totals: dict[str, dict[int, float]] = defaultdict(lambda: defaultdict(float))
-    for activity in sorted(activities, key=lambda item: _parse_activity_timestamp(item.timestamp)):
-        key = (activity.user_id, activity.channel_id)
-        timestamp = _parse_activity_timestamp(activity.timestamp)
-        if activity.event == EVENT_CONNECT:
-            sessions[key] = timestamp
-        elif activity.event == EVENT_DISCONNECT and key in sessions:
-            for month, seconds in _distribute_session_by_month(sessions.pop(key), timestamp).items():
-                totals[month][activity.user_id] += seconds
-    return totals
+def _voice_time_by_month(voice: VoiceColumns, month_starts: list[datetime]) -> dict[int, np.ndarray]:
+    """
+    Seconds in voice of each user in each month between consecutive month_starts,
+    a session across months is split between them.
+    """
+    seconds = seconds_by_bucket(voice, np.array([to_epoch(month_start) for month_start in month_starts]))
+    users, user_rows = np.unique(voice.user_id, return_inverse=True)
+    totals = np.zeros((len(users), len(month_starts) - 1))
+    np.add.at(totals, user_rows, seconds)
+    return dict(zip(users.tolist(), totals))
 
 
 def _render_voice_time_graph(plan: dict, guild_id: int | None) -> GraphResponse:
     now = datetime.now(timezone.utc)
     end_month = _month_start(now)
     start_month = _subtract_months(end_month, plan["months"] - 1)
-    activities = fetch_all_user_activities(
-        from_day=max(31, plan["months"] * 32), to_day=0, guild_id=guild_id
-    )
-    activities = [
-        activity
-        for activity in activities
-        if start_month <= _parse_activity_timestamp(activity.timestamp) < now
-        and (not plan["user_ids"] or activity.user_id in plan["user_ids"])
-    ]
-    monthly_by_user = _voice_time_by_month(activities)
-    month_keys = []
-    cursor = start_month
-    for _ in range(plan["months"]):
-        month_keys.append(cursor.strftime("%Y-%m"))
-        cursor = _subtract_months(cursor, -1)
+    snapshot = load_analytic_snapshot(start_month, now, guild_id=guild_id, user_ids=plan["user_ids"] or None)
+    month_starts = [_subtract_months(start_month, -index) for index in range(plan["months"] + 1)]
+    month_keys = [month_start.strftime("%Y-%m") for month_start in month_starts[:-1]]
+    monthly_by_user = _voice_time_by_month(snapshot.voice, month_starts)
     users = fetch_user_info()
     labels = {
         user_id: (
@@ -155,8 +116,7 @@ def _render_voice_time_graph(plan: dict, guild_id: int | None) -> GraphResponse:
     if not labels:
         raise ValueError("No matching user data was found")
     values = {
-        user_id: [monthly_by_user.get(month, {}).get(user_id, 0.0) / 3600 for month in month_keys]
-        for user_id in labels
+        user_id: (monthly_by_user.get(user_id, np.zeros(len(month_keys))) / 3600).tolist() for user_id in labels
     }
     if not any(any(series) for series in values.values()):
         raise ValueError("No activity data was found for the requested period")
@@ -205,23 +165,14 @@ def _render_kd_graph(plan: dict) -> GraphResponse:
     now = datetime.now(timezone.utc)
     start = _subtract_months(_month_start(now), plan["months"] - 1)
     start -= timedelta(days=start.weekday())
-    matches_by_user = data_access_fetch_user_matches_in_time_range(plan["user_ids"], start, now)
+    matches = load_analytic_snapshot(start, now, user_ids=plan["user_ids"]).matches
     week_keys: list[str] = []
     cursor = start
     while cursor < now:
         week_keys.append(cursor.date().isoformat())
         cursor += timedelta(days=7)
-    totals: dict[str, dict[int, list[int]]] = defaultdict(lambda: defaultdict(lambda: [0, 0]))
-    for user_id, matches in matches_by_user.items():
-        for match in matches:
-            timestamp = match.match_timestamp
-            if timestamp.tzinfo is None:
-                timestamp = timestamp.replace(tzinfo=timezone.utc)
-            week_start = timestamp - timedelta(days=timestamp.weekday())
-            week_key = week_start.date().isoformat()
-            if week_key in week_keys:
-                totals[week_key][user_id][0] += int(match.kill_count or 0)
-                totals[week_key][user_id][1] += int(match.death_count or 0)
+    # start is a Monday at midnight: the week of a match is the number of whole weeks since it
+    week_rows = ((matches.timestamp - to_epoch(start)) // (7 * SECONDS_PER_DAY)).astype(np.int64)
     users = fetch_user_info()
     labels = {
         user_id: (
@@ -234,15 +185,10 @@ def _render_kd_graph(plan: dict) -> GraphResponse:
     }
     values = {}
     for user_id in labels:
-        values[user_id] = [
-            (
-                totals[week].get(user_id, [0, 0])[0]
-                / totals[week].get(user_id, [0, 0])[1]
-            )
-            if totals[week].get(user_id, [0, 0])[1] > 0
-            else float("nan")
-            for week in week_keys
-        ]
+        user_rows = (matches.user_id == user_id) & (week_rows >= 0) & (week_rows < len(week_keys))
+        kills = np.bincount(week_rows[user_rows], weights=matches.kill_count[user_rows], minlength=len(week_keys))
+        deaths = np.bincount(week_rows[user_rows], weights=matches.death_count[user_rows], minlength=len(week_keys))
+        values[user_id] = np.divide(kills, deaths, out=np.full(len(week_keys), np.nan), where=deaths > 0).tolist()
     if not labels or not any(any(value == value for value in series) for series in values.values()):
         raise ValueError("No K/D data was found for the requested period")
 
@@ -11,6 +11,7 @@ Functions:
 - fetch_user_info_by_user_id: Get specific user profile by ID (cached)
 - fetch_user_info_by_user_id_list: Get multiple user profiles by ID list
 - fetch_all_user_activities: Fetch all user activities in date range
+- fetch_pair_overlap_seconds: Time spent in the same channel by every pair of users
 - fetch_all_user_activities2: Fetch user overlap time calculations
 - fetch_user_activities: Fetch activities for specific user
 - fetch_user_infos_with_activity: Get user IDs with activity in time range
@@ -25,12 +26,17 @@ from deps.analytic_constants import (
     USER_ACTIVITY_SELECT_FIELD,
     USER_INFO_SELECT_FIELD,
 )
-from deps.data_access_data_class import UserInfo, UserActivity
+from deps.data_access_data_class import UserInfo, UserActivity, UserVoiceSession
 from deps.system_database import database_manager
-from deps.analytic_functions import compute_users_weights
-from deps.cache import get_cache
+from deps.analytic_functions import (
+    compute_pair_overlap_seconds,
+    sum_pair_overlap_across_channels,
+    voice_session_intervals,
+)
+from deps.cache import DEFAULT_NEGATIVE_TTL, get_cache, remove_negative_cache
 from deps.functions_date import ensure_utc
 from deps.log import print_warning_log
+from deps.voice_session_data_access import apply_voice_session_event, fetch_voice_sessions
 
 
 def delete_all_user_weights():
@@ -96,7 +102,10 @@ def insert_user_activity(
                 "time": time.isoformat(),
             },
         )
+        apply_voice_session_event(cursor, user_id, guild_id, channel_id, event, time)
         # Transaction will be committed automatically by context manager
+    # The user_info row exists now
+    remove_negative_cache(True, f"{KEY_USER_INFO}:{user_id}")
 
 
 def fetch_user_info() -> Dict[int, UserInfo]:
@@ -127,7 +136,10 @@ async def fetch_user_info_by_user_id(user_id: int) -> Optional[UserInfo]:
             # Handle the case where no user was found, e.g., return None or raise an exception
             return None  # Or raise an appropriate exception
 
-    return await get_cache(True, f"{KEY_USER_INFO}:{user_id}", fetch_from_db)
+    # Sync fetchers run on a gateway reader connection; unknown users are remembered for a short while
+    return await get_cache(
+        True, f"{KEY_USER_INFO}:{user_id}", fetch_from_db, negative_ttl_in_seconds=DEFAULT_NEGATIVE_TTL
+    )
 
 
 def fetch_user_info_by_user_id_list(user_id_list: list[int]) -> List[Optional[UserInfo]]:
@@ -156,82 +168,36 @@ def fetch_user_info_by_user_id_list(user_id_list: list[int]) -> List[Optional[Us
     return result_with_none
 
 
-def fetch_all_user_activities2(from_date: date) -> list[tuple[str, str, int]]:
+def fetch_pair_overlap_seconds(from_date: date) -> list[tuple[str, str, float]]:
     """
-    Fetch all connect and disconnect events from the user_activity table
+    Time spent in the same channel by every pair of users, in seconds, over the closed voice sessions
+    started after the date. Sorted from the pair with the most time together.
+    A user missing from user_info is named by its id.
     """
     query = """
-            WITH
-            user_sessions AS (
-                SELECT
-                ua1.user_id,
-                ua1.channel_id,
-                ua1.guild_id,
-                ua1.timestamp AS connect_time,
-                ua2.timestamp AS disconnect_time
-                FROM
-                user_activity ua1
-                JOIN user_activity ua2 ON ua1.user_id = ua2.user_id
-                AND ua1.channel_id = ua2.channel_id
-                AND ua1.guild_id = ua2.guild_id
-                AND ua1.event = 'connect'
-                AND ua2.event = 'disconnect'
-                AND ua2.timestamp > ua1.timestamp
-                AND ua1.timestamp > :date_from
-                AND ua2.timestamp > :date_from
-                WHERE
-                NOT EXISTS (
-                    SELECT
-                    1
-                    FROM
-                    user_activity ua3
-                    WHERE
-                    ua3.user_id = ua1.user_id
-                    AND ua3.channel_id = ua1.channel_id
-                    AND ua3.guild_id = ua1.guild_id
-                    AND ua3.event = 'connect'
-                    AND ua3.timestamp > ua1.timestamp
-                    AND ua3.timestamp < ua2.timestamp
-                    AND ua1.timestamp > :date_from
-                    AND ua2.timestamp > :date_from
-                    AND ua3.timestamp > :date_from
-                )
-            )
-            SELECT
-            user1_info.display_name AS user1_display_name,
-            user2_info.display_name AS user2_display_name,
-            SUM(
-                CAST(
-                (
-                    strftime ('%s', MIN(a.disconnect_time, b.disconnect_time)) - strftime ('%s', MAX(a.connect_time, b.connect_time))
-                ) AS INTEGER
-                )
-            ) AS total_overlap_seconds
-            FROM
-            user_sessions a
-            JOIN user_sessions b ON a.guild_id = b.guild_id
-            AND a.user_id < b.user_id -- Avoid duplicate comparisons
-            AND a.connect_time < b.disconnect_time
-            AND b.connect_time < a.disconnect_time
-            LEFT JOIN user_info AS user1_info on user1_info.id = a.user_id
-            LEFT JOIN user_info AS user2_info on user2_info.id = b.user_id
-            GROUP BY
-            a.user_id,
-            b.user_id
-            ORDER BY total_overlap_seconds DESC;
+        SELECT voice_session.user_id, voice_session.guild_id, voice_session.channel_id,
+            voice_session.start_ts, voice_session.end_ts, voice_session.duration_s, user_info.display_name
+        FROM voice_session
+        LEFT JOIN user_info ON user_info.id = voice_session.user_id
+        WHERE voice_session.end_ts IS NOT NULL
+        AND voice_session.start_ts > :date_from
         """
-    result = (
-        database_manager.get_cursor()
-        .execute(
-            query,
-            {
-                "date_from": from_date.isoformat(),
-            },
-        )
-        .fetchall()
+    rows = database_manager.get_cursor().execute(query, {"date_from": from_date.isoformat()}).fetchall()
+    display_names: dict[int, str] = {row[0]: row[6] if row[6] is not None else str(row[0]) for row in rows}
+    pair_seconds = sum_pair_overlap_across_channels(
+        compute_pair_overlap_seconds(voice_session_intervals([UserVoiceSession(*row[:6]) for row in rows]))
     )
+    return [
+        (display_names[user_a], display_names[user_b], seconds)
+        for (user_a, user_b), seconds in sorted(pair_seconds.items(), key=lambda item: item[1], reverse=True)
+    ]
 
-    return [(row[0], row[1], row[2]) for row in result]
+
+def fetch_all_user_activities2(from_date: date) -> list[tuple[str, str, int]]:
+    """
+    Fetch the overlap time of every pair of users from the voice_session table
+    """
+    return [(user_a, user_b, int(seconds)) for user_a, user_b, seconds in fetch_pair_overlap_seconds(from_date)]
 
 
 def fetch_all_user_activities(
@@ -315,18 +281,18 @@ def calculate_time_spent_from_db(from_day: int, to_day: int) -> None:
     """
     delete_all_user_weights()
 
-    # Fetch all user activity data, ordered by room and timestamp
-    activity_data = fetch_all_user_activities(from_day, to_day)
+    # Closed voice sessions of the range, grouped by room and user
+    now = datetime.now(timezone.utc)
+    sessions = fetch_voice_sessions(now - timedelta(days=from_day), now - timedelta(days=to_day))
 
-    user_weights = compute_users_weights(activity_data)
+    user_weights = compute_pair_overlap_seconds(voice_session_intervals(sessions))
 
     # Insert accumulated weights into the user_weights table
-    for (user_a, user_b, channel_id), total_weight in user_weights.items():
-        database_manager.get_cursor().execute(
-            """
+    database_manager.get_cursor().executemany(
+        """
         INSERT INTO user_weights (user_a, user_b, channel_id, weight)
         VALUES (?, ?, ?, ?)
         """,
-            (user_a, user_b, channel_id, total_weight),
-        )
+        [(*pair, total_weight) for pair, total_weight in user_weights.items()],
+    )
     database_manager.get_conn().commit()
@@ -63,10 +63,13 @@ from deps.analytic_settings_data_access import (
 # Re-export match data functions
 from deps.analytic_match_data_access import (
     insert_if_nonexistant_full_match_info,
+    insert_if_nonexistant_full_match_info_for_users,
+    data_access_fetch_match_high_water_marks,
     data_access_fetch_user_full_match_info,
     data_access_fetch_users_full_match_info,
     data_access_fetch_user_matches_in_time_range,
     insert_if_nonexistant_full_user_info,
+    insert_if_nonexistant_full_user_info_for_users,
     data_access_fetch_user_full_user_info,
     data_access_fetch_recent_win_loss,
 )
@@ -156,10 +159,13 @@ __all__ = [
     "get_active_user_info",
     # Match data functions
     "insert_if_nonexistant_full_match_info",
+    "insert_if_nonexistant_full_match_info_for_users",
+    "data_access_fetch_match_high_water_marks",
     "data_access_fetch_user_full_match_info",
     "data_access_fetch_users_full_match_info",
     "data_access_fetch_user_matches_in_time_range",
     "insert_if_nonexistant_full_user_info",
+    "insert_if_nonexistant_full_user_info_for_users",
     "data_access_fetch_user_full_user_info",
     # Leaderboard functions
     "data_access_fetch_tk_count_by_user",
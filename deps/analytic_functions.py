@@ -4,12 +4,13 @@ Module to gather user activity data and calculate the time spent together
 
 from datetime import datetime, timezone
 from collections import defaultdict
-from typing import Any, Dict, Tuple, List, Union, cast
+from typing import Any, Dict, Iterable, Tuple, List, Union, cast
+import numpy as np
 import pandas as pd
 from dateutil import parser
 from deps.analytic_models import UserInfoWithCount
 from deps.system_database import EVENT_CONNECT, EVENT_DISCONNECT
-from deps.data_access_data_class import UserActivity, UserInfo
+from deps.data_access_data_class import UserActivity, UserInfo, UserVoiceSession
 
 
 def calculate_overlap(start1: datetime, end1: datetime, start2: datetime, end2: datetime) -> float:
@@ -57,46 +58,110 @@ def calculate_user_connections(
     return user_connections
 
 
-def compute_users_weights(  # pylint: disable=too-many-locals,too-many-nested-blocks
+def compute_users_weights(
     activity_data: list[UserActivity],
 ) -> Dict[Tuple[int, int, int], float]:
     """
     Compute the weights of users in the same channel in seconds
     The return is (channel_id, user_a, user_b) -> total time in seconds
     """
-    # Dictionary to store connection times of users in rooms
-    user_connections: Dict[int, Dict[int, List[List[Union[datetime, None]]]]] = calculate_user_connections(
-        activity_data
+    return compute_users_weights_from_connections(calculate_user_connections(activity_data))
+
+
+def compute_users_weights_from_connections(
+    user_connections: Dict[int, Dict[int, List[List[Union[datetime, None]]]]],
+) -> Dict[Tuple[int, int, int], float]:
+    """
+    Compute the weights of users in the same channel in seconds from their connection periods
+    The return is (user_a, user_b, channel_id) -> total time in seconds
+    """
+    return compute_pair_overlap_seconds(
+        (channel_id, user_id, connect.timestamp(), disconnect.timestamp())
+        for channel_id, users in user_connections.items()
+        for user_id, periods in users.items()
+        for connect, disconnect in periods
+        if connect is not None and disconnect is not None
     )
 
-    # Now calculate overlapping time between users in the same room
-    user_weights: Dict[Tuple[int, int, int], float] = {}  # { (user_a, user_b, channel_id): total_weight }
-
-    for channel_id, users in user_connections.items():
-        user_ids = list(users.keys())
-        for i in range(len(user_ids)):  # pylint: disable=consider-using-enumerate
-            for j in range(i + 1, len(user_ids)):  # pylint: disable=consider-using-enumerate
-                user_a = user_ids[i]
-                user_b = user_ids[j]
-
-                total_overlap_time = 0.0  # Accumulate total overlap time for this pair
-
-                # Compare all connect/disconnect periods for user_a and user_b
-                for connect_a, disconnect_a in users[user_a]:
-                    for connect_b, disconnect_b in users[user_b]:
-                        # Ensure both users have valid connect and disconnect times
-                        if connect_a and connect_b and disconnect_a and disconnect_b:
-                            overlap_time = calculate_overlap(connect_a, disconnect_a, connect_b, disconnect_b)
-                            total_overlap_time += overlap_time
-
-                # Store the total weight if there's any overlap
-                if total_overlap_time > 0:
-                    key = (user_a, user_b, channel_id)
-                    if key in user_weights:
-                        user_weights[key] += total_overlap_time
-                    else:
-                        user_weights[key] = total_overlap_time
-    return user_weights
+
+def compute_pair_overlap_seconds(
+    intervals: Iterable[Tuple[int, int, float, float]],
+) -> Dict[Tuple[int, int, int], float]:
+    """
+    Co-presence engine: time spent together by every pair of users in the same channel.
+    intervals are (channel_id, user_id, start, end) in epoch seconds, in any order.
+    The return is (user_a, user_b, channel_id) -> total time in seconds, with user_a < user_b
+
+    One sweep over the sorted interval ends of each channel keeps the users in the channel with their
+    count of open sessions. A pair accumulates count_a * count_b seconds per second, which is the sum of
+    the overlaps of every session of user_a with every session of user_b. The pair total is only brought
+    up to date when one of the two users joins or leaves, so the cost is O(E log E + E * users present).
+    """
+    events_by_channel: Dict[int, List[Tuple[float, int, int]]] = defaultdict(list)
+    for channel_id, user_id, start, end in intervals:
+        if end > start:
+            events_by_channel[channel_id].append((start, 1, user_id))
+            events_by_channel[channel_id].append((end, -1, user_id))
+
+    pair_seconds: Dict[Tuple[int, int, int], float] = defaultdict(float)
+    for channel_id, events in events_by_channel.items():
+        events.sort()
+        open_sessions: Dict[int, int] = {}  # { user_id: sessions open in the channel }
+        pair_since: Dict[Tuple[int, int], float] = {}  # { (user_a, user_b): time the pair total is up to date }
+        for time, delta, user_id in events:
+            count = open_sessions.get(user_id, 0)
+            for other_id, other_count in open_sessions.items():
+                if other_id == user_id:
+                    continue
+                pair = (user_id, other_id) if user_id < other_id else (other_id, user_id)
+                if count > 0:
+                    pair_seconds[(pair[0], pair[1], channel_id)] += count * other_count * (time - pair_since[pair])
+                pair_since[pair] = time
+            if count + delta == 0:
+                del open_sessions[user_id]
+            else:
+                open_sessions[user_id] = count + delta
+    return {key: seconds for key, seconds in pair_seconds.items() if seconds > 0}
+
+
+def compute_pair_overlap_arrays(
+    intervals: Iterable[Tuple[int, int, float, float]],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Same as compute_pair_overlap_seconds as the user_a, user_b, channel_id and seconds columns"""
+    pair_seconds = compute_pair_overlap_seconds(intervals)
+    keys = np.array(list(pair_seconds.keys()), dtype=np.int64).reshape(-1, 3)
+    return keys[:, 0], keys[:, 1], keys[:, 2], np.fromiter(pair_seconds.values(), dtype=np.float64)
+
+
+def sum_pair_overlap_across_channels(
+    pair_seconds: Dict[Tuple[int, int, int], float],
+) -> Dict[Tuple[int, int], float]:
+    """Time spent together by each pair in any channel: (user_a, user_b) -> total time in seconds"""
+    totals: Dict[Tuple[int, int], float] = defaultdict(float)
+    for (user_a, user_b, _), seconds in pair_seconds.items():
+        totals[(user_a, user_b)] += seconds
+    return dict(totals)
+
+
+def voice_session_intervals(sessions: list[UserVoiceSession]) -> List[Tuple[int, int, float, float]]:
+    """The closed voice sessions as the (channel_id, user_id, start, end) intervals of the co-presence engine"""
+    return [
+        (
+            session.channel_id,
+            session.user_id,
+            _timestamp_to_epoch(session.start_ts),
+            _timestamp_to_epoch(session.end_ts),
+        )
+        for session in sessions
+    ]
+
+
+def _timestamp_to_epoch(raw: str) -> float:
+    """Epoch seconds of a stored timestamp, the timestamps without timezone are UTC"""
+    parsed = datetime.fromisoformat(str(raw).replace(" ", "T"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
 
 
 def computer_users_voice_in_out(
@@ -391,17 +391,17 @@ def data_access_fetch_kd_by_user(from_data: date) -> list[tuple[int, str, int]]:
     FROM
     (
         SELECT
-            user_full_match_info.user_id,
+            user_match_daily_rollup.user_id,
             user_info.display_name,
-            sum(user_full_match_info.kill_count) as sum_kill,
-            sum(user_full_match_info.death_count) as sum_death
+            sum(user_match_daily_rollup.kill_count) as sum_kill,
+            sum(user_match_daily_rollup.death_count) as sum_death
         FROM
-            user_full_match_info
-            LEFT JOIN user_info on user_info.id = user_full_match_info.user_id
+            user_match_daily_rollup
+            LEFT JOIN user_info on user_info.id = user_match_daily_rollup.user_id
         WHERE
             is_rollback = false
-            AND match_timestamp > :from_data
-            AND user_full_match_info.user_id IN (
+            AND day >= :from_data
+            AND user_match_daily_rollup.user_id IN (
                     SELECT DISTINCT
                     user_id
                     from
@@ -431,52 +431,28 @@ def data_access_fetch_best_duo(from_data: date) -> list[tuple[str, str, int, int
     """
     query = """
         WITH
-        MatchPairs AS (
-            SELECT
-            m1.match_uuid,
-            m2.match_uuid,
-            m1.user_id AS user1,
-            m2.user_id AS user2,
-            m1.has_win AS has_win
-            FROM
-                user_full_match_info m1
-                JOIN user_full_match_info m2 ON m1.match_uuid = m2.match_uuid
-            AND m1.user_id < m2.user_id -- Avoid duplicate pairs and self-joins
-            WHERE
-                m1.match_timestamp >= :from_data
-            AND m1.user_id IN (
-                    SELECT DISTINCT
-                    user_id
-                    from
-                    user_activity
-                    where
-                    timestamp >= :from_data
-                )
-            AND m2.user_id IN (
-                    SELECT DISTINCT
-                    user_id
-                    from
-                    user_activity
-                    where
-                    timestamp >= :from_data
-                )
+        active_user AS (
+            SELECT DISTINCT user_id
+            FROM user_activity
+            WHERE timestamp >= :from_data
         )
         SELECT
             UI_1.display_name AS user1_name,
             UI_2.display_name AS user2_name,
-            COUNT(*) AS games_played,
-            SUM(has_win) AS has_win_sum,
-            SUM(has_win) * 1.0 / COUNT(*) AS win_rate_percentage
+            SUM(match_count) AS games_played,
+            SUM(win_count) AS has_win_sum,
+            SUM(win_count) * 1.0 / SUM(match_count) AS win_rate_percentage
         FROM
-            MatchPairs
-            LEFT JOIN user_info AS UI_1 ON UI_1.id = user1
-            LEFT JOIN user_info AS UI_2 ON UI_2.id = user2
+            match_party_pair
+            LEFT JOIN user_info AS UI_1 ON UI_1.id = user_a
+            LEFT JOIN user_info AS UI_2 ON UI_2.id = user_b
         WHERE
-            user1 IS NOT NULL
-            AND user2 IS NOT NULL
+            day >= DATE(:from_data)
+            AND user_a IN active_user
+            AND user_b IN active_user
         GROUP BY
-            user1,
-            user2
+            user_a,
+            user_b
         HAVING
             games_played >= 10
         ORDER BY
@@ -500,68 +476,32 @@ def data_access_fetch_best_trio(from_data: date) -> list[tuple[str, str, str, in
     """
     query = """
         WITH
-        MatchPairs AS (
-            SELECT
-            m1.match_uuid,
-            m2.match_uuid,
-            m3.match_uuid,
-            m1.user_id AS user1,
-            m2.user_id AS user2,
-            m3.user_id AS user3,
-            m1.has_win AS has_win
-            FROM
-                user_full_match_info m1
-            JOIN user_full_match_info m2 ON m1.match_uuid = m2.match_uuid
-            JOIN user_full_match_info m3 ON m2.match_uuid = m3.match_uuid
-            AND m1.user_id < m2.user_id -- Avoid duplicate pairs and self-joins
-            AND m2.user_id < m3.user_id -- Avoid duplicate pairs and self-joins
-            WHERE
-                m1.match_timestamp >= :from_data
-            AND m1.user_id IN (
-                SELECT DISTINCT
-                user_id
-                from
-                user_activity
-                where
-                timestamp >= :from_data
-            )
-            AND m2.user_id IN (
-                SELECT DISTINCT
-                user_id
-                from
-                user_activity
-                where
-                timestamp >= :from_data
-            )
-            AND m3.user_id IN (
-                SELECT DISTINCT
-                user_id
-                from
-                user_activity
-                where
-                timestamp >= :from_data
-            )
+        active_user AS (
+            SELECT DISTINCT user_id
+            FROM user_activity
+            WHERE timestamp >= :from_data
         )
         SELECT
             UI_1.display_name AS user1_name,
             UI_2.display_name AS user2_name,
             UI_3.display_name AS user3_name,
-            COUNT(*) AS games_played,
-            SUM(has_win) AS has_win_sum,
-            SUM(has_win) * 1.0 / COUNT(*) AS win_rate_percentage
+            SUM(match_count) AS games_played,
+            SUM(win_count) AS has_win_sum,
+            SUM(win_count) * 1.0 / SUM(match_count) AS win_rate_percentage
         FROM
-            MatchPairs
-        LEFT JOIN user_info AS UI_1 ON UI_1.id = user1
-        LEFT JOIN user_info AS UI_2 ON UI_2.id = user2
-        LEFT JOIN user_info AS UI_3 ON UI_3.id = user3
+            match_party_trio
+        LEFT JOIN user_info AS UI_1 ON UI_1.id = user_a
+        LEFT JOIN user_info AS UI_2 ON UI_2.id = user_b
+        LEFT JOIN user_info AS UI_3 ON UI_3.id = user_c
         WHERE
-            user1 IS NOT NULL
-            AND user2 IS NOT NULL
-            AND user3 IS NOT NULL
+            day >= DATE(:from_data)
+            AND user_a IN active_user
+            AND user_b IN active_user
+            AND user_c IN active_user
         GROUP BY
-            user1,
-            user2,
-            user3
+            user_a,
+            user_b,
+            user_c
         HAVING
             games_played >= 10
         ORDER BY
@@ -582,6 +522,7 @@ def data_access_fetch_best_trio(from_data: date) -> list[tuple[str, str, str, in
 def data_access_fetch_team_stats(user_ids: List[int]) -> tuple[int, float] | None:
     """
     Get the number of games played and win rate percentage for a specific group of 2-5 players.
+    Duos and trios are read from their aggregate, bigger groups from the party members.
 
     Args:
         user_ids: List of 2-5 user IDs to get stats for
@@ -598,42 +539,40 @@ def data_access_fetch_team_stats(user_ids: List[int]) -> tuple[int, float] | Non
     # Sort user IDs to ensure consistent ordering
     sorted_user_ids = sorted(user_ids)
     num_users = len(sorted_user_ids)
-
-    # Build the query dynamically based on number of users
-    # We need to join the table once per user and ensure they all played in the same match
-    joins = []
-    where_clauses = []
-
-    for i in range(num_users):
-        alias = f"m{i+1}"
-        if i == 0:
-            joins.append(f"user_full_match_info {alias}")
-        else:
-            joins.append(f"JOIN user_full_match_info {alias} ON m1.match_uuid = {alias}.match_uuid")
-        where_clauses.append(f"{alias}.user_id = :user{i+1}")
-
-    query = f"""
-        SELECT
-            COUNT(*) AS games_played,
-            SUM(m1.has_win) AS wins,
-            SUM(m1.has_win) * 1.0 / COUNT(*) AS win_rate_percentage
-        FROM
-            {joins[0]}
-        {' '.join(joins[1:])}
-        WHERE
-            {' AND '.join(where_clauses)}
-        """
-
-    # Build parameters dict
     params = {f"user{i+1}": sorted_user_ids[i] for i in range(num_users)}
 
+    if num_users == 2:
+        query = """
+            SELECT SUM(match_count), SUM(win_count)
+            FROM match_party_pair
+            WHERE user_a = :user1 AND user_b = :user2
+            """
+    elif num_users == 3:
+        query = """
+            SELECT SUM(match_count), SUM(win_count)
+            FROM match_party_trio
+            WHERE user_a = :user1 AND user_b = :user2 AND user_c = :user3
+            """
+    else:
+        # The parties holding every one of the users
+        query = f"""
+            SELECT COUNT(*), SUM(has_win)
+            FROM (
+                SELECT has_win
+                FROM match_party_member
+                WHERE user_id IN ({", ".join(f":{name}" for name in params)})
+                GROUP BY match_uuid, has_win
+                HAVING COUNT(*) = {num_users}
+            )
+            """
+
     result = database_manager.get_cursor().execute(query, params).fetchone()
 
-    if result is None or result[0] == 0:
+    if result is None or not result[0]:
         return None
 
     games_played = result[0]
-    win_rate_percentage = result[2]
+    win_rate_percentage = result[1] * 1.0 / games_played
 
     return (games_played, win_rate_percentage)
 
@@ -648,11 +587,11 @@ def data_access_fetch_first_death(from_data: date) -> list[tuple[str, int, int,
         SUM(first_death_count) AS first_death_count_sum,
         SUM(round_played_count) AS round_played_count_sum,
         SUM(first_death_count) * 1.0 / SUM(round_played_count) AS first_death_rate
-    FROM user_full_match_info
+    FROM user_match_daily_rollup
     LEFT JOIN user_info ON user_info.id = user_id
     WHERE
-        match_timestamp >= :from_data
-    AND user_full_match_info.user_id IN (
+        day >= :from_data
+    AND user_match_daily_rollup.user_id IN (
         SELECT DISTINCT
         user_id
         from
@@ -688,11 +627,11 @@ def data_access_fetch_first_kill(from_data: date) -> list[tuple[str, int, int, f
             SUM(round_played_count) AS round_played_count_sum,
             SUM(first_kill_count) * 1.0 / SUM(round_played_count) AS first_kill_rate
         FROM
-            user_full_match_info
+            user_match_daily_rollup
         LEFT JOIN user_info ON user_info.id = user_id
         WHERE
-            match_timestamp >= :from_data
-        AND user_full_match_info.user_id IN (
+            day >= :from_data
+        AND user_match_daily_rollup.user_id IN (
             SELECT DISTINCT
             user_id
             from
@@ -738,11 +677,11 @@ def data_access_fetch_success_fragging(from_data: date) -> list[tuple[str, float
             ) AS delta,
             SUM(first_kill_count) * 1.0 / (SUM(first_kill_count) + SUM(first_death_count)) AS first_kill_ratio
         FROM
-            user_full_match_info
+            user_match_daily_rollup
         LEFT JOIN user_info ON user_info.id = user_id
         WHERE
-            match_timestamp >= :from_data
-        AND user_full_match_info.user_id IN (
+            day >= :from_data
+        AND user_match_daily_rollup.user_id IN (
             SELECT DISTINCT
             user_id
             from
@@ -780,11 +719,11 @@ def data_access_fetch_clutch_win_rate(from_data: date) -> list[tuple[str, int, i
             SUM(clutches_loss_count) AS loss,
             SUM(clutches_win_count) * 1.0 / (SUM(clutches_win_count) + SUM(clutches_loss_count)) AS ratio
         FROM
-            user_full_match_info
+            user_match_daily_rollup
         LEFT JOIN user_info ON user_info.id = user_id
         WHERE
-            match_timestamp >= :from_data
-        AND user_full_match_info.user_id IN (
+            day >= :from_data
+        AND user_match_daily_rollup.user_id IN (
             SELECT DISTINCT
             user_id
             from
@@ -821,11 +760,11 @@ def data_access_fetch_ace_4k_3k(from_data: date) -> list[tuple[str, int, int, in
             SUM(kill_3_count) AS kill3,
             SUM(kill_5_count) + SUM(kill_4_count) + SUM(kill_3_count) as total
         FROM
-            user_full_match_info
+            user_match_daily_rollup
         LEFT JOIN user_info ON user_info.id = user_id
         WHERE
-            match_timestamp >= :from_data
-        AND user_full_match_info.user_id IN (
+            day >= :from_data
+        AND user_match_daily_rollup.user_id IN (
             SELECT DISTINCT
             user_id
             from
@@ -903,22 +842,17 @@ def data_access_fetch_win_rate_server(
         WITH
         user_sessions AS (
             SELECT
-            ua1.user_id,
-            ua1.timestamp AS session_start,
-            MIN(ua2.timestamp) AS session_end
+            user_id,
+            start_ts AS session_start,
+            end_ts AS session_end
             FROM
-            user_activity ua1
-            LEFT JOIN user_activity ua2 ON ua1.user_id = ua2.user_id
-            AND ua1.timestamp < ua2.timestamp
-            AND ua2.event = 'disconnect'
+            voice_session
             WHERE
-            ua1.event = 'connect'
-            and ua1.timestamp >= :from_data
-            and ua1.timestamp <= :to_data
-            and ua2.timestamp >= :from_data
-            and ua2.timestamp <= :to_data
-            GROUP BY
-            ua1.id
+            end_ts IS NOT NULL
+            and start_ts >= :from_data
+            and start_ts <= :to_data
+            and end_ts >= :from_data
+            and end_ts <= :to_data
         ),
         matches_in_session AS (
             SELECT
@@ -1026,20 +960,15 @@ def data_access_fetch_user_ranked_match_server_split_by_week(
         WITH
         user_sessions AS (
             SELECT
-                ua1.user_id,
-                ua1.timestamp AS session_start,
-                MIN(ua2.timestamp) AS session_end
-            FROM user_activity ua1
-            LEFT JOIN user_activity ua2
-                ON ua1.user_id = ua2.user_id
-                AND ua1.timestamp < ua2.timestamp
-                AND ua2.event = 'disconnect'
+                user_id,
+                start_ts AS session_start,
+                end_ts AS session_end
+            FROM voice_session
             WHERE
-                ua1.event = 'connect'
-                AND ua1.user_id = :user_id
-                AND ua1.timestamp <= :to_data
-                AND ua2.timestamp >= :from_data
-            GROUP BY ua1.id
+                user_id = :user_id
+                AND end_ts IS NOT NULL
+                AND start_ts <= :to_data
+                AND end_ts >= :from_data
         ),
         selected_matches AS (
             SELECT
@@ -1096,20 +1025,15 @@ def data_access_fetch_user_outside_ranked_match_partners(
         WITH
         user_sessions AS (
             SELECT
-                ua1.user_id,
-                ua1.timestamp AS session_start,
-                MIN(ua2.timestamp) AS session_end
-            FROM user_activity ua1
-            LEFT JOIN user_activity ua2
-                ON ua1.user_id = ua2.user_id
-                AND ua1.timestamp < ua2.timestamp
-                AND ua2.event = 'disconnect'
+                user_id,
+                start_ts AS session_start,
+                end_ts AS session_end
+            FROM voice_session
             WHERE
-                ua1.event = 'connect'
-                AND ua1.user_id = :user_id
-                AND ua1.timestamp <= :to_data
-                AND ua2.timestamp >= :from_data
-            GROUP BY ua1.id
+                user_id = :user_id
+                AND end_ts IS NOT NULL
+                AND start_ts <= :to_data
+                AND end_ts >= :from_data
         ),
         selected_outside_matches AS (
             SELECT
@@ -1271,10 +1195,9 @@ def data_access_fetch_unique_user_per_day(from_data: date) -> List[tuple[str, in
     Count the number of unique person who played per day
     """
     query = """
-    SELECT DATE(timestamp) AS day, COUNT(DISTINCT user_id) as unique_users
-    FROM user_activity
-    WHERE event = 'connect'
-    AND timestamp > :from_data
+    SELECT DATE(start_ts) AS day, COUNT(DISTINCT user_id) as unique_users
+    FROM voice_session
+    WHERE start_ts > :from_data
     GROUP BY day
     ORDER BY day
     """
@@ -5,15 +5,21 @@ This module handles match statistics persistence and retrieval, including batch
 insertion of match data and user statistics from R6 Tracker.
 
 Functions:
-- insert_if_nonexistant_full_match_info: Batch insert match statistics (avoid duplicates)
+- insert_if_nonexistant_full_match_info: Batch insert match statistics (avoid duplicates), update the daily rollup
+  and the match parties
+- insert_if_nonexistant_full_match_info_for_users: Same for all the users of a scrape run, in one transaction
+- data_access_fetch_match_high_water_marks: Newest stored match per user, where the incremental fetch stops
 - data_access_fetch_user_full_match_info: Fetch paginated match history for user
 - data_access_fetch_users_full_match_info: Fetch paginated match history for multiple users
 - insert_if_nonexistant_full_user_info: Insert/update aggregated user statistics
+- insert_if_nonexistant_full_user_info_for_users: Same for all the users of a scrape run, in one transaction
 - data_access_fetch_user_full_user_info: Fetch user's overall statistics
 """
 
+from collections import defaultdict
 from datetime import datetime
-import json
+from itertools import combinations
+import sqlite3
 from typing import Union, List
 
 from deps.analytic_constants import (
@@ -21,7 +27,7 @@ from deps.analytic_constants import (
     SELECT_USER_FULL_STATS_INFO,
 )
 from deps.data_access_data_class import UserInfo
-from deps.models import UserFullMatchStats, UserInformation
+from deps.models import MatchHighWaterMark, UserFullMatchStats, UserInformation
 from deps.system_database import database_manager
 from deps.log import print_error_log, print_log
 
@@ -53,235 +59,327 @@ def data_access_fetch_recent_win_loss(user_id: int, match_count: int = 10) -> tu
     return (result[0] or 0, result[1] or 0)
 
 
-def insert_if_nonexistant_full_match_info(user_info: UserInfo, list_matches: list[UserFullMatchStats]) -> None:
+# The unique_match_user index skips the matches already stored, no pre-check query needed
+_INSERT_FULL_MATCH_INFO = """
+    INSERT INTO user_full_match_info (
+        match_uuid,
+        user_id,
+        match_timestamp,
+        match_duration_ms,
+        data_center,
+        session_type,
+        map_name,
+        is_surrender,
+        is_forfeit,
+        is_rollback,
+        r6_tracker_user_uuid,
+        ubisoft_username,
+        operators,
+        round_played_count,
+        round_won_count,
+        round_lost_count,
+        round_disconnected_count,
+        kill_count,
+        death_count,
+        assist_count,
+        head_shot_count,
+        tk_count,
+        ace_count,
+        first_kill_count,
+        first_death_count,
+        clutches_win_count,
+        clutches_loss_count,
+        clutches_win_count_1v1,
+        clutches_win_count_1v2,
+        clutches_win_count_1v3,
+        clutches_win_count_1v4,
+        clutches_win_count_1v5,
+        clutches_lost_count_1v1,
+        clutches_lost_count_1v2,
+        clutches_lost_count_1v3,
+        clutches_lost_count_1v4,
+        clutches_lost_count_1v5,
+        kill_1_count,
+        kill_2_count,
+        kill_3_count,
+        kill_4_count,
+        kill_5_count,
+        rank_points,
+        rank_name,
+        points_gained,
+        rank_previous,
+        kd_ratio,
+        head_shot_percentage,
+        kills_per_round,
+        deaths_per_round,
+        assists_per_round,
+        has_win)
+    VALUES (
+        :match_uuid,
+        :user_id,
+        :match_timestamp,
+        :match_duration_ms,
+        :data_center,
+        :session_type,
+        :map_name,
+        :is_surrender,
+        :is_forfeit,
+        :is_rollback,
+        :r6_tracker_user_uuid,
+        :ubisoft_username,
+        :operators,
+        :round_played_count,
+        :round_won_count,
+        :round_lost_count,
+        :round_disconnected_count,
+        :kill_count,
+        :death_count,
+        :assist_count,
+        :head_shot_count,
+        :tk_count,
+        :ace_count,
+        :first_kill_count,
+        :first_death_count,
+        :clutches_win_count,
+        :clutches_loss_count,
+        :clutches_win_count_1v1,
+        :clutches_win_count_1v2,
+        :clutches_win_count_1v3,
+        :clutches_win_count_1v4,
+        :clutches_win_count_1v5,
+        :clutches_lost_count_1v1,
+        :clutches_lost_count_1v2,
+        :clutches_lost_count_1v3,
+        :clutches_lost_count_1v4,
+        :clutches_lost_count_1v5,
+        :kill_1_count,
+        :kill_2_count,
+        :kill_3_count,
+        :kill_4_count,
+        :kill_5_count,
+        :rank_points,
+        :rank_name,
+        :points_gained,
+        :rank_previous,
+        :kd_ratio,
+        :head_shot_percentage,
+        :kills_per_round,
+        :deaths_per_round,
+        :assists_per_round,
+        :has_win
+    )
+    ON CONFLICT(match_uuid, user_id) DO NOTHING
     """
-    We have a list of full match info, we want to insert them if they do not exist
-    A match might exist in the case we fetched more and the user already had some matches recorded.
+
+# Add the matches inserted after a given id to the user_match_daily_rollup row of their UTC day
+_ADD_NEW_MATCHES_TO_DAILY_ROLLUP = """
+    INSERT INTO user_match_daily_rollup (
+        user_id, day, session_type, is_rollback,
+        match_count, win_count, round_played_count, kill_count, death_count,
+        first_kill_count, first_death_count, clutches_win_count, clutches_loss_count,
+        ace_count, kill_3_count, kill_4_count, kill_5_count
+    )
+    SELECT
+        user_id, DATE(match_timestamp), session_type, is_rollback,
+        COUNT(*), SUM(has_win), SUM(round_played_count), SUM(kill_count), SUM(death_count),
+        SUM(first_kill_count), SUM(first_death_count), SUM(clutches_win_count), SUM(clutches_loss_count),
+        SUM(ace_count), SUM(kill_3_count), SUM(kill_4_count), SUM(kill_5_count)
+    FROM user_full_match_info
+    WHERE id > :last_id
+    GROUP BY user_id, DATE(match_timestamp), session_type, is_rollback
+    ON CONFLICT(user_id, day, session_type, is_rollback) DO UPDATE SET
+        match_count = match_count + excluded.match_count,
+        win_count = win_count + excluded.win_count,
+        round_played_count = round_played_count + excluded.round_played_count,
+        kill_count = kill_count + excluded.kill_count,
+        death_count = death_count + excluded.death_count,
+        first_kill_count = first_kill_count + excluded.first_kill_count,
+        first_death_count = first_death_count + excluded.first_death_count,
+        clutches_win_count = clutches_win_count + excluded.clutches_win_count,
+        clutches_loss_count = clutches_loss_count + excluded.clutches_loss_count,
+        ace_count = ace_count + excluded.ace_count,
+        kill_3_count = kill_3_count + excluded.kill_3_count,
+        kill_4_count = kill_4_count + excluded.kill_4_count,
+        kill_5_count = kill_5_count + excluded.kill_5_count
     """
 
-    # Remove duplicate match id (some times rollback appears twice)
-    list_matches = list({match.match_uuid: match for match in list_matches}.values())
 
-    match_user_pairs = [
-        (
-            match.match_uuid,
-            match.user_id,
-        )
-        for match in list_matches
-    ]
+def _add_new_matches_to_parties(cursor: sqlite3.Cursor, last_id: int) -> None:
+    """
+    Add the users of the matches inserted after a given id to their match party (the users of the community
+    in the same match with the same result) and count the duos and trios they form with the known members
+    """
+    new_members: dict[tuple[str, int], set[int]] = defaultdict(set)
+    for match_uuid, has_win, user_id in cursor.execute(
+        "SELECT match_uuid, has_win, user_id FROM user_full_match_info WHERE id > ?", (last_id,)
+    ).fetchall():
+        new_members[(match_uuid, int(has_win))].add(user_id)
+
+    # (match_uuid, has_win, match_timestamp, member_count, members)
+    party_rows: list[tuple[str, int, str, int, str]] = []
+    # (user_id, match_uuid, has_win)
+    member_rows: list[tuple[int, str, int]] = []
+    # (user_a, user_b, day, has_win) and (user_a, user_b, user_c, day, has_win)
+    pair_rows: list[tuple[int, int, str, int]] = []
+    trio_rows: list[tuple[int, int, int, str, int]] = []
+    for (match_uuid, has_win), added in new_members.items():
+        rows = cursor.execute(
+            """
+            SELECT user_id, match_timestamp, DATE(match_timestamp)
+            FROM user_full_match_info
+            WHERE match_uuid = ? AND has_win = ?
+            ORDER BY user_id
+            """,
+            (match_uuid, has_win),
+        ).fetchall()
+        if len(rows) < 2:
+            continue  # Played without anyone of the community
+        members = [row[0] for row in rows]
+        day = rows[0][2]
+        party_rows.append((match_uuid, has_win, rows[0][1], len(members), ",".join(str(user) for user in members)))
+        member_rows.extend((user_id, match_uuid, has_win) for user_id in members)
+        # Only the duos and trios with a new member, the others were counted with an earlier insert
+        pair_rows.extend((*pair, day, has_win) for pair in combinations(members, 2) if not added.isdisjoint(pair))
+        trio_rows.extend((*trio, day, has_win) for trio in combinations(members, 3) if not added.isdisjoint(trio))
+
+    cursor.executemany(
+        """
+        INSERT OR REPLACE INTO match_party (match_uuid, has_win, match_timestamp, member_count, members)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        party_rows,
+    )
+    cursor.executemany(
+        "INSERT OR IGNORE INTO match_party_member (user_id, match_uuid, has_win) VALUES (?, ?, ?)", member_rows
+    )
+    cursor.executemany(
+        """
+        INSERT INTO match_party_pair (user_a, user_b, day, match_count, win_count)
+        VALUES (?, ?, ?, 1, ?)
+        ON CONFLICT(user_a, user_b, day) DO UPDATE SET
+            match_count = match_count + 1,
+            win_count = win_count + excluded.win_count
+        """,
+        pair_rows,
+    )
+    cursor.executemany(
+        """
+        INSERT INTO match_party_trio (user_a, user_b, user_c, day, match_count, win_count)
+        VALUES (?, ?, ?, ?, 1, ?)
+        ON CONFLICT(user_a, user_b, user_c, day) DO UPDATE SET
+            match_count = match_count + 1,
+            win_count = win_count + excluded.win_count
+        """,
+        trio_rows,
+    )
 
-    # Construct a query using AND and OR instead of row-value comparisons
-    conditions = " OR ".join(["(match_uuid = ? AND user_id = ?)" for _ in match_user_pairs])
 
-    if not conditions.strip():  # Ensure conditions exist
-        print_log("insert_if_nonexistant_full_match_info: No user-match pair to insert, leaving the function early")
-        return
+def _full_match_info_params(user_id: int, match: UserFullMatchStats) -> dict:
+    """Bound values of _INSERT_FULL_MATCH_INFO for one match"""
+    return {
+        "match_uuid": match.match_uuid,
+        "user_id": user_id,
+        "match_timestamp": match.match_timestamp,
+        "match_duration_ms": match.match_duration_ms,
+        "data_center": match.data_center,
+        "session_type": match.session_type,
+        "map_name": match.map_name,
+        "is_surrender": match.is_surrender,
+        "is_forfeit": match.is_forfeit,
+        "is_rollback": match.is_rollback,
+        "r6_tracker_user_uuid": match.r6_tracker_user_uuid,
+        "ubisoft_username": match.ubisoft_username,
+        "operators": match.operators,
+        "round_played_count": match.round_played_count,
+        "round_won_count": match.round_won_count,
+        "round_lost_count": match.round_lost_count,
+        "round_disconnected_count": match.round_disconnected_count,
+        "kill_count": match.kill_count,
+        "death_count": match.death_count,
+        "assist_count": match.assist_count,
+        "head_shot_count": match.head_shot_count,
+        "tk_count": match.tk_count,
+        "ace_count": match.ace_count,
+        "first_kill_count": match.first_kill_count,
+        "first_death_count": match.first_death_count,
+        "clutches_win_count": match.clutches_win_count,
+        "clutches_loss_count": match.clutches_loss_count,
+        "clutches_win_count_1v1": match.clutches_win_count_1v1,
+        "clutches_win_count_1v2": match.clutches_win_count_1v2,
+        "clutches_win_count_1v3": match.clutches_win_count_1v3,
+        "clutches_win_count_1v4": match.clutches_win_count_1v4,
+        "clutches_win_count_1v5": match.clutches_win_count_1v5,
+        "clutches_lost_count_1v1": match.clutches_lost_count_1v1,
+        "clutches_lost_count_1v2": match.clutches_lost_count_1v2,
+        "clutches_lost_count_1v3": match.clutches_lost_count_1v3,
+        "clutches_lost_count_1v4": match.clutches_lost_count_1v4,
+        "clutches_lost_count_1v5": match.clutches_lost_count_1v5,
+        "kill_1_count": match.kill_1_count,
+        "kill_2_count": match.kill_2_count,
+        "kill_3_count": match.kill_3_count,
+        "kill_4_count": match.kill_4_count,
+        "kill_5_count": match.kill_5_count,
+        "rank_points": match.rank_points,
+        "rank_name": match.rank_name,
+        "points_gained": match.points_gained,
+        "rank_previous": match.rank_previous,
+        "kd_ratio": match.kd_ratio,
+        "head_shot_percentage": match.head_shot_percentage,
+        "kills_per_round": match.kills_per_round,
+        "deaths_per_round": match.deaths_per_round,
+        "assists_per_round": match.assists_per_round,
+        "has_win": match.has_win,
+    }
 
-    query = f"""
-        SELECT match_uuid, user_id
-        FROM user_full_match_info
-        WHERE {conditions}
-    """
-    params = [item for pair in match_user_pairs for item in pair]
 
-    if len(params) == 0:
-        print_log("insert_if_nonexistant_full_match_info: No match to insert, leaving the function early")
-        return
+def insert_if_nonexistant_full_match_info(user_info: UserInfo, list_matches: list[UserFullMatchStats]) -> None:
+    """
+    We have a list of full match info, we want to insert them if they do not exist
+    A match might exist in the case we fetched more and the user already had some matches recorded.
+    """
+    insert_if_nonexistant_full_match_info_for_users([(user_info, list_matches)])
 
-    # Get the list of match that is already in the database that matches a match+user pair
-    database_manager.get_cursor().execute(query, params)
 
-    existing_records = database_manager.get_cursor().fetchall()
-    existing_set = set(existing_records)
-    filtered_data = [obj for obj in list_matches if (obj.match_uuid, obj.user_id) not in existing_set]
-    print_log(
-        f"insert_if_nonexistant_full_match_info: Found {len(filtered_data)} new matches to insert out of {len(list_matches)} for {user_info.display_name}"
-    )
-    # Try to insert the match that are not yet in the database
-    # Todo: Batch insert
-    last_match: Union[UserFullMatchStats, None] = None
+def insert_if_nonexistant_full_match_info_for_users(
+    users_matches: list[tuple[UserInfo, list[UserFullMatchStats]]],
+) -> int:
+    """
+    Insert the matches of all the users of a scrape run in a single transaction, one executemany per user.
+    The matches already stored are skipped. Return the number of matches inserted.
+    """
+    batches: list[tuple[UserInfo, list[UserFullMatchStats]]] = []
+    for user_info, list_matches in users_matches:
+        # Remove duplicate match id (some times rollback appears twice)
+        unique_matches = list({match.match_uuid: match for match in list_matches}.values())
+        if len(unique_matches) == 0:
+            print_log(f"insert_if_nonexistant_full_match_info: No match to insert for {user_info.display_name}")
+            continue
+        batches.append((user_info, unique_matches))
+
+    if len(batches) == 0:
+        return 0
+
+    inserted_total = 0
     try:
-        with database_manager.data_access_transaction():
-            cursor = database_manager.get_cursor()
-            for match in filtered_data:
-                last_match = match
-                cursor.execute(
-                    """
-                INSERT INTO user_full_match_info (
-                    match_uuid,
-                    user_id,
-                    match_timestamp,
-                    match_duration_ms,
-                    data_center,
-                    session_type,
-                    map_name,
-                    is_surrender,
-                    is_forfeit,
-                    is_rollback,
-                    r6_tracker_user_uuid,
-                    ubisoft_username,
-                    operators,
-                    round_played_count,
-                    round_won_count,
-                    round_lost_count,
-                    round_disconnected_count,
-                    kill_count,
-                    death_count,
-                    assist_count,
-                    head_shot_count,
-                    tk_count,
-                    ace_count,
-                    first_kill_count,
-                    first_death_count,
-                    clutches_win_count,
-                    clutches_loss_count,
-                    clutches_win_count_1v1,
-                    clutches_win_count_1v2,
-                    clutches_win_count_1v3,
-                    clutches_win_count_1v4,
-                    clutches_win_count_1v5,
-                    clutches_lost_count_1v1,
-                    clutches_lost_count_1v2,
-                    clutches_lost_count_1v3,
-                    clutches_lost_count_1v4,
-                    clutches_lost_count_1v5,
-                    kill_1_count,
-                    kill_2_count,
-                    kill_3_count,
-                    kill_4_count,
-                    kill_5_count,
-                    rank_points,
-                    rank_name,
-                    points_gained,
-                    rank_previous,
-                    kd_ratio,
-                    head_shot_percentage,
-                    kills_per_round,
-                    deaths_per_round,
-                    assists_per_round,
-                    has_win)
-                VALUES (
-                    :match_uuid,
-                    :user_id,
-                    :match_timestamp,
-                    :match_duration_ms,
-                    :data_center,
-                    :session_type,
-                    :map_name,
-                    :is_surrender,
-                    :is_forfeit,
-                    :is_rollback,
-                    :r6_tracker_user_uuid,
-                    :ubisoft_username,
-                    :operators,
-                    :round_played_count,
-                    :round_won_count,
-                    :round_lost_count,
-                    :round_disconnected_count,
-                    :kill_count,
-                    :death_count,
-                    :assist_count,
-                    :head_shot_count,
-                    :tk_count,
-                    :ace_count,
-                    :first_kill_count,
-                    :first_death_count,
-                    :clutches_win_count,
-                    :clutches_loss_count,
-                    :clutches_win_count_1v1,
-                    :clutches_win_count_1v2,
-                    :clutches_win_count_1v3,
-                    :clutches_win_count_1v4,
-                    :clutches_win_count_1v5,
-                    :clutches_lost_count_1v1,
-                    :clutches_lost_count_1v2,
-                    :clutches_lost_count_1v3,
-                    :clutches_lost_count_1v4,
-                    :clutches_lost_count_1v5,
-                    :kill_1_count,
-                    :kill_2_count,
-                    :kill_3_count,
-                    :kill_4_count,
-                    :kill_5_count,
-                    :rank_points,
-                    :rank_name,
-                    :points_gained,
-                    :rank_previous,
-                    :kd_ratio,
-                    :head_shot_percentage,
-                    :kills_per_round,
-                    :deaths_per_round,
-                    :assists_per_round,
-                    :has_win
-                )
-                """,
-                    {
-                        "match_uuid": match.match_uuid,
-                        "user_id": user_info.id,
-                        "match_timestamp": match.match_timestamp,
-                        "match_duration_ms": match.match_duration_ms,
-                        "data_center": match.data_center,
-                        "session_type": match.session_type,
-                        "map_name": match.map_name,
-                        "is_surrender": match.is_surrender,
-                        "is_forfeit": match.is_forfeit,
-                        "is_rollback": match.is_rollback,
-                        "r6_tracker_user_uuid": match.r6_tracker_user_uuid,
-                        "ubisoft_username": match.ubisoft_username,
-                        "operators": match.operators,
-                        "round_played_count": match.round_played_count,
-                        "round_won_count": match.round_won_count,
-                        "round_lost_count": match.round_lost_count,
-                        "round_disconnected_count": match.round_disconnected_count,
-                        "kill_count": match.kill_count,
-                        "death_count": match.death_count,
-                        "assist_count": match.assist_count,
-                        "head_shot_count": match.head_shot_count,
-                        "tk_count": match.tk_count,
-                        "ace_count": match.ace_count,
-                        "first_kill_count": match.first_kill_count,
-                        "first_death_count": match.first_death_count,
-                        "clutches_win_count": match.clutches_win_count,
-                        "clutches_loss_count": match.clutches_loss_count,
-                        "clutches_win_count_1v1": match.clutches_win_count_1v1,
-                        "clutches_win_count_1v2": match.clutches_win_count_1v2,
-                        "clutches_win_count_1v3": match.clutches_win_count_1v3,
-                        "clutches_win_count_1v4": match.clutches_win_count_1v4,
-                        "clutches_win_count_1v5": match.clutches_win_count_1v5,
-                        "clutches_lost_count_1v1": match.clutches_lost_count_1v1,
-                        "clutches_lost_count_1v2": match.clutches_lost_count_1v2,
-                        "clutches_lost_count_1v3": match.clutches_lost_count_1v3,
-                        "clutches_lost_count_1v4": match.clutches_lost_count_1v4,
-                        "clutches_lost_count_1v5": match.clutches_lost_count_1v5,
-                        "kill_1_count": match.kill_1_count,
-                        "kill_2_count": match.kill_2_count,
-                        "kill_3_count": match.kill_3_count,
-                        "kill_4_count": match.kill_4_count,
-                        "kill_5_count": match.kill_5_count,
-                        "rank_points": match.rank_points,
-                        "rank_name": match.rank_name,
-                        "points_gained": match.points_gained,
-                        "rank_previous": match.rank_previous,
-                        "kd_ratio": match.kd_ratio,
-                        "head_shot_percentage": match.head_shot_percentage,
-                        "kills_per_round": match.kills_per_round,
-                        "deaths_per_round": match.deaths_per_round,
-                        "assists_per_round": match.assists_per_round,
-                        "has_win": match.has_win,
-                    },
+        with database_manager.data_access_transaction() as cursor:
+            # Ids keep growing (AUTOINCREMENT): the rows above the current max are the ones inserted below
+            last_id = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM user_full_match_info").fetchone()[0]
+            for user_info, unique_matches in batches:
+                cursor.executemany(
+                    _INSERT_FULL_MATCH_INFO, [_full_match_info_params(user_info.id, match) for match in unique_matches]
                 )
+                inserted_total += cursor.rowcount
                 print_log(
-                    f"insert_if_nonexistant_full_match_info: Inserted match {cursor.rowcount} for {user_info.display_name}. Match id {match.match_uuid} and user id {user_info.id}"
+                    f"insert_if_nonexistant_full_match_info: Inserted {cursor.rowcount} new matches out of {len(unique_matches)} for {user_info.display_name}"
                 )
-        # End transaction
+            if inserted_total > 0:
+                cursor.execute(_ADD_NEW_MATCHES_TO_DAILY_ROLLUP, {"last_id": last_id})
+                _add_new_matches_to_parties(cursor, last_id)
     except Exception as e:
-        if last_match is None:
-            print_error_log("insert_if_nonexistant_full_match_info: Error inserting match: No match to insert")
-        stringify_match = (
-            json.dumps(vars(last_match), default=str, indent=4) if last_match is not None else "No match data"
-        )
-        print_error_log(f"insert_if_nonexistant_full_match_info: Error inserting match: {e}\n{stringify_match}")
+        names = ", ".join(user_info.display_name for user_info, _ in batches)
+        print_error_log(f"insert_if_nonexistant_full_match_info: Error inserting the matches of {names}: {e}")
         raise e
+    return inserted_total
 
 
 def data_access_fetch_user_full_match_info(
@@ -334,6 +432,30 @@ def data_access_fetch_users_full_match_info(
     return [UserFullMatchStats.from_db_row(row) for row in result]
 
 
+def data_access_fetch_match_high_water_marks(user_ids: list[int]) -> dict[int, MatchHighWaterMark]:
+    """
+    Newest stored match of each user, users without any match are absent
+    One query for all the users, served by idx_user_match_timestamp
+    """
+    if not user_ids:
+        return {}
+
+    list_ids = ",".join("?" for _ in user_ids)
+    # SQLite returns the bare match_uuid column from the row holding the MAX
+    query = f"""
+        SELECT user_id, match_uuid, MAX(match_timestamp)
+        FROM user_full_match_info
+        WHERE user_id IN ({list_ids})
+        GROUP BY user_id
+        """
+    result = database_manager.get_cursor().execute(query, user_ids).fetchall()
+    return {
+        row[0]: MatchHighWaterMark(row[0], row[1], datetime.fromisoformat(row[2]))
+        for row in result
+        if row[2] is not None
+    }
+
+
 def data_access_fetch_user_matches_in_time_range(
     user_ids: list[int], from_timestamp: Union[datetime, None], to_timestamp: Union[datetime, None] = None
 ) -> dict[int, list[UserFullMatchStats]]:
@@ -392,6 +514,239 @@ def data_access_fetch_user_matches_in_time_range(
     return matches_by_user
 
 
+_INSERT_FULL_USER_INFO = """
+    INSERT INTO user_full_stats_info (
+        user_id,
+        r6_tracker_user_uuid,
+        total_matches_played,
+        total_matches_won,
+        total_matches_lost,
+        total_matches_abandoned,
+        time_played_seconds,
+        total_kills,
+        total_deaths,
+        total_attacker_round_wins,
+        total_defender_round_wins,
+        total_headshots,
+        total_headshots_missed,
+        headshot_percentage,
+        total_wall_bang,
+        total_damage,
+        total_assists,
+        total_team_kills,
+        attacked_breacher_count,
+        attacked_breacher_percentage,
+        attacked_fragger_count,
+        attacked_fragger_percentage,
+        attacked_intel_count,
+        attacked_intel_percentage,
+        attacked_roam_count,
+        attacked_roam_percentage,
+        attacked_support_count,
+        attacked_support_percentage,
+        attacked_utility_count,
+        attacked_utility_percentage,
+        defender_debuffer_count,
+        defender_debuffer_percentage,
+        defender_entry_denier_count,
+        defender_entry_denier_percentage,
+        defender_intel_count,
+        defender_intel_percentage,
+        defender_support_count,
+        defender_support_percentage,
+        defender_trapper_count,
+        defender_trapper_percentage,
+        defender_utility_denier_count,
+        defender_utility_denier_percentage,
+        kd_ratio,
+        kill_per_match,
+        kill_per_minute,
+        win_percentage,
+        rank_match_played,
+        rank_match_won,
+        rank_match_lost,
+        rank_match_abandoned,
+        rank_kills_count,
+        rank_deaths_count,
+        rank_kd_ratio,
+        rank_kill_per_match,
+        rank_win_percentage,
+        arcade_match_played,
+        arcade_match_won,
+        arcade_match_lost,
+        arcade_match_abandoned,
+        arcade_kills_count,
+        arcade_deaths_count,
+        arcade_kd_ratio,
+        arcade_kill_per_match,
+        arcade_win_percentage,
+        quickmatch_match_played,
+        quickmatch_match_won,
+        quickmatch_match_lost,
+        quickmatch_match_abandoned,
+        quickmatch_kills_count,
+        quickmatch_deaths_count,
+        quickmatch_kd_ratio,
+        quickmatch_kill_per_match,
+        quickmatch_win_percentage
+    )
+    VALUES (
+        :user_id,
+        :r6_tracker_user_uuid,
+        :total_matches_played,
+        :total_matches_won,
+        :total_matches_lost,
+        :total_matches_abandoned,
+        :time_played_seconds,
+        :total_kills,
+        :total_deaths,
+        :total_attacker_round_wins,
+        :total_defender_round_wins,
+        :total_headshots,
+        :total_headshots_missed,
+        :headshot_percentage,
+        :total_wall_bang,
+        :total_damage,
+        :total_assists,
+        :total_team_kills,
+        :attacked_breacher_count,
+        :attacked_breacher_percentage,
+        :attacked_fragger_count,
+        :attacked_fragger_percentage,
+        :attacked_intel_count,
+        :attacked_intel_percentage,
+        :attacked_roam_count,
+        :attacked_roam_percentage,
+        :attacked_support_count,
+        :attacked_support_percentage,
+        :attacked_utility_count,
+        :attacked_utility_percentage,
+        :defender_debuffer_count,
+        :defender_debuffer_percentage,
+        :defender_entry_denier_count,
+        :defender_entry_denier_percentage,
+        :defender_intel_count,
+        :defender_intel_percentage,
+        :defender_support_count,
+        :defender_support_percentage,
+        :defender_trapper_count,
+        :defender_trapper_percentage,
+        :defender_utility_denier_count,
+        :defender_utility_denier_percentage,
+        :kd_ratio,
+        :kill_per_match,
+        :kill_per_minute,
+        :win_percentage,
+        :rank_match_played,
+        :rank_match_won,
+        :rank_match_lost,
+        :rank_match_abandoned,
+        :rank_kills_count,
+        :rank_deaths_count,
+        :rank_kd_ratio,
+        :rank_kill_per_match,
+        :rank_win_percentage,
+        :arcade_match_played,
+        :arcade_match_won,
+        :arcade_match_lost,
+        :arcade_match_abandoned,
+        :arcade_kills_count,
+        :arcade_deaths_count,
+        :arcade_kd_ratio,
+        :arcade_kill_per_match,
+        :arcade_win_percentage,
+        :quickmatch_match_played,
+        :quickmatch_match_won,
+        :quickmatch_match_lost,
+        :quickmatch_match_abandoned,
+        :quickmatch_kills_count,
+        :quickmatch_deaths_count,
+        :quickmatch_kd_ratio,
+        :quickmatch_kill_per_match,
+        :quickmatch_win_percentage
+    )
+    """
+
+
+def _full_user_info_params(user_id: int, user_information: UserInformation) -> dict:
+    """Bound values of _INSERT_FULL_USER_INFO for one user"""
+    return {
+        "user_id": user_id,
+        "r6_tracker_user_uuid": user_information.r6_tracker_user_uuid,
+        "total_matches_played": user_information.total_matches_played,
+        "total_matches_won": user_information.total_matches_won,
+        "total_matches_lost": user_information.total_matches_lost,
+        "total_matches_abandoned": user_information.total_matches_abandoned,
+        "time_played_seconds": user_information.time_played_seconds,
+        "total_kills": user_information.total_kills,
+        "total_deaths": user_information.total_deaths,
+        "total_attacker_round_wins": user_information.total_attacker_round_wins,
+        "total_defender_round_wins": user_information.total_defender_round_wins,
+        "total_headshots": user_information.total_headshots,
+        "total_headshots_missed": user_information.total_headshots_missed,
+        "headshot_percentage": user_information.headshot_percentage,
+        "total_wall_bang": user_information.total_wall_bang,
+        "total_damage": user_information.total_damage,
+        "total_assists": user_information.total_assists,
+        "total_team_kills": user_information.total_team_kills,
+        "attacked_breacher_count": user_information.attacked_breacher_count,
+        "attacked_breacher_percentage": user_information.attacked_breacher_percentage,
+        "attacked_fragger_count": user_information.attacked_fragger_count,
+        "attacked_fragger_percentage": user_information.attacked_fragger_percentage,
+        "attacked_intel_count": user_information.attacked_intel_count,
+        "attacked_intel_percentage": user_information.attacked_intel_percentage,
+        "attacked_roam_count": user_information.attacked_roam_count,
+        "attacked_roam_percentage": user_information.attacked_roam_percentage,
+        "attacked_support_count": user_information.attacked_support_count,
+        "attacked_support_percentage": user_information.attacked_support_percentage,
+        "attacked_utility_count": user_information.attacked_utility_count,
+        "attacked_utility_percentage": user_information.attacked_utility_percentage,
+        "defender_debuffer_count": user_information.defender_debuffer_count,
+        "defender_debuffer_percentage": user_information.defender_debuffer_percentage,
+        "defender_entry_denier_count": user_information.defender_entry_denier_count,
+        "defender_entry_denier_percentage": user_information.defender_entry_denier_percentage,
+        "defender_intel_count": user_information.defender_intel_count,
+        "defender_intel_percentage": user_information.defender_intel_percentage,
+        "defender_support_count": user_information.defender_support_count,
+        "defender_support_percentage": user_information.defender_support_percentage,
+        "defender_trapper_count": user_information.defender_trapper_count,
+        "defender_trapper_percentage": user_information.defender_trapper_percentage,
+        "defender_utility_denier_count": user_information.defender_utility_denier_count,
+        "defender_utility_denier_percentage": user_information.defender_utility_denier_percentage,
+        "kd_ratio": user_information.kd_ratio,
+        "kill_per_match": user_information.kill_per_match,
+        "kill_per_minute": user_information.kill_per_minute,
+        "win_percentage": user_information.win_percentage,
+        "rank_match_played": user_information.rank_match_played,
+        "rank_match_won": user_information.rank_match_won,
+        "rank_match_lost": user_information.rank_match_lost,
+        "rank_match_abandoned": user_information.rank_match_abandoned,
+        "rank_kills_count": user_information.rank_kills_count,
+        "rank_deaths_count": user_information.rank_deaths_count,
+        "rank_kd_ratio": user_information.rank_kd_ratio,
+        "rank_kill_per_match": user_information.rank_kill_per_match,
+        "rank_win_percentage": user_information.rank_win_percentage,
+        "arcade_match_played": user_information.arcade_match_played,
+        "arcade_match_won": user_information.arcade_match_won,
+        "arcade_match_lost": user_information.arcade_match_lost,
+        "arcade_match_abandoned": user_information.arcade_match_abandoned,
+        "arcade_kills_count": user_information.arcade_kills_count,
+        "arcade_deaths_count": user_information.arcade_deaths_count,
+        "arcade_kd_ratio": user_information.arcade_kd_ratio,
+        "arcade_kill_per_match": user_information.arcade_kill_per_match,
+        "arcade_win_percentage": user_information.arcade_win_percentage,
+        "quickmatch_match_played": user_information.quickmatch_match_played,
+        "quickmatch_match_won": user_information.quickmatch_match_won,
+        "quickmatch_match_lost": user_information.quickmatch_match_lost,
+        "quickmatch_match_abandoned": user_information.quickmatch_match_abandoned,
+        "quickmatch_kills_count": user_information.quickmatch_kills_count,
+        "quickmatch_deaths_count": user_information.quickmatch_deaths_count,
+        "quickmatch_kd_ratio": user_information.quickmatch_kd_ratio,
+        "quickmatch_kill_per_match": user_information.quickmatch_kill_per_match,
+        "quickmatch_win_percentage": user_information.quickmatch_win_percentage,
+    }
+
+
 def insert_if_nonexistant_full_user_info(user_info: UserInfo, user_information: UserInformation) -> None:
     """
     Insert or update the user full stats info if it does not exist.
@@ -402,265 +757,40 @@ def insert_if_nonexistant_full_user_info(user_info: UserInfo, user_information:
         user_info: The UserInfo object containing the user's basic information
         user_information: The UserInformation object containing the detailed user statistics
     """
-    # Wrap DELETE + INSERT in transaction to prevent data loss on failure
-    try:
-        with database_manager.data_access_transaction() as cursor:
-            # Check if a record for this user already exists and delete it
-            query = """
-                DELETE FROM user_full_stats_info
-                WHERE user_id = ?
-            """
+    insert_if_nonexistant_full_user_info_for_users([(user_info, user_information)])
 
-            cursor.execute(query, (user_info.id,))
-            deleted_count = cursor.rowcount
 
-            if deleted_count > 0:
-                print_log(
-                    f"insert_if_nonexistant_full_user_info: Deleted {deleted_count} existing record(s) for user {user_info.display_name}"
-                )
+def insert_if_nonexistant_full_user_info_for_users(users_information: list[tuple[UserInfo, UserInformation]]) -> None:
+    """
+    Replace the full stats info of all the users of a scrape run in a single transaction
 
-            # Insert the new record
-            cursor.execute(
-                """
-            INSERT INTO user_full_stats_info (
-                user_id,
-                r6_tracker_user_uuid,
-                total_matches_played,
-                total_matches_won,
-                total_matches_lost,
-                total_matches_abandoned,
-                time_played_seconds,
-                total_kills,
-                total_deaths,
-                total_attacker_round_wins,
-                total_defender_round_wins,
-                total_headshots,
-                total_headshots_missed,
-                headshot_percentage,
-                total_wall_bang,
-                total_damage,
-                total_assists,
-                total_team_kills,
-                attacked_breacher_count,
-                attacked_breacher_percentage,
-                attacked_fragger_count,
-                attacked_fragger_percentage,
-                attacked_intel_count,
-                attacked_intel_percentage,
-                attacked_roam_count,
-                attacked_roam_percentage,
-                attacked_support_count,
-                attacked_support_percentage,
-                attacked_utility_count,
-                attacked_utility_percentage,
-                defender_debuffer_count,
-                defender_debuffer_percentage,
-                defender_entry_denier_count,
-                defender_entry_denier_percentage,
-                defender_intel_count,
-                defender_intel_percentage,
-                defender_support_count,
-                defender_support_percentage,
-                defender_trapper_count,
-                defender_trapper_percentage,
-                defender_utility_denier_count,
-                defender_utility_denier_percentage,
-                kd_ratio,
-                kill_per_match,
-                kill_per_minute,
-                win_percentage,
-                rank_match_played,
-                rank_match_won,
-                rank_match_lost,
-                rank_match_abandoned,
-                rank_kills_count,
-                rank_deaths_count,
-                rank_kd_ratio,
-                rank_kill_per_match,
-                rank_win_percentage,
-                arcade_match_played,
-                arcade_match_won,
-                arcade_match_lost,
-                arcade_match_abandoned,
-                arcade_kills_count,
-                arcade_deaths_count,
-                arcade_kd_ratio,
-                arcade_kill_per_match,
-                arcade_win_percentage,
-                quickmatch_match_played,
-                quickmatch_match_won,
-                quickmatch_match_lost,
-                quickmatch_match_abandoned,
-                quickmatch_kills_count,
-                quickmatch_deaths_count,
-                quickmatch_kd_ratio,
-                quickmatch_kill_per_match,
-                quickmatch_win_percentage
+    Args:
+        users_information: The UserInfo of each user with its detailed UserInformation statistics
+    """
+    if len(users_information) == 0:
+        return
+    # Wrap DELETE + INSERT in transaction to prevent data loss on failure
+    try:
+        with database_manager.data_access_transaction() as cursor:
+            cursor.executemany(
+                "DELETE FROM user_full_stats_info WHERE user_id = ?",
+                [(user_info.id,) for user_info, _ in users_information],
             )
-            VALUES (
-                :user_id,
-                :r6_tracker_user_uuid,
-                :total_matches_played,
-                :total_matches_won,
-                :total_matches_lost,
-                :total_matches_abandoned,
-                :time_played_seconds,
-                :total_kills,
-                :total_deaths,
-                :total_attacker_round_wins,
-                :total_defender_round_wins,
-                :total_headshots,
-                :total_headshots_missed,
-                :headshot_percentage,
-                :total_wall_bang,
-                :total_damage,
-                :total_assists,
-                :total_team_kills,
-                :attacked_breacher_count,
-                :attacked_breacher_percentage,
-                :attacked_fragger_count,
-                :attacked_fragger_percentage,
-                :attacked_intel_count,
-                :attacked_intel_percentage,
-                :attacked_roam_count,
-                :attacked_roam_percentage,
-                :attacked_support_count,
-                :attacked_support_percentage,
-                :attacked_utility_count,
-                :attacked_utility_percentage,
-                :defender_debuffer_count,
-                :defender_debuffer_percentage,
-                :defender_entry_denier_count,
-                :defender_entry_denier_percentage,
-                :defender_intel_count,
-                :defender_intel_percentage,
-                :defender_support_count,
-                :defender_support_percentage,
-                :defender_trapper_count,
-                :defender_trapper_percentage,
-                :defender_utility_denier_count,
-                :defender_utility_denier_percentage,
-                :kd_ratio,
-                :kill_per_match,
-                :kill_per_minute,
-                :win_percentage,
-                :rank_match_played,
-                :rank_match_won,
-                :rank_match_lost,
-                :rank_match_abandoned,
-                :rank_kills_count,
-                :rank_deaths_count,
-                :rank_kd_ratio,
-                :rank_kill_per_match,
-                :rank_win_percentage,
-                :arcade_match_played,
-                :arcade_match_won,
-                :arcade_match_lost,
-                :arcade_match_abandoned,
-                :arcade_kills_count,
-                :arcade_deaths_count,
-                :arcade_kd_ratio,
-                :arcade_kill_per_match,
-                :arcade_win_percentage,
-                :quickmatch_match_played,
-                :quickmatch_match_won,
-                :quickmatch_match_lost,
-                :quickmatch_match_abandoned,
-                :quickmatch_kills_count,
-                :quickmatch_deaths_count,
-                :quickmatch_kd_ratio,
-                :quickmatch_kill_per_match,
-                :quickmatch_win_percentage
+            deleted_count = cursor.rowcount
+            cursor.executemany(
+                _INSERT_FULL_USER_INFO,
+                [
+                    _full_user_info_params(user_info.id, user_information)
+                    for user_info, user_information in users_information
+                ],
             )
-            """,
-                {
-                    "user_id": user_info.id,
-                    "r6_tracker_user_uuid": user_information.r6_tracker_user_uuid,
-                    "total_matches_played": user_information.total_matches_played,
-                    "total_matches_won": user_information.total_matches_won,
-                    "total_matches_lost": user_information.total_matches_lost,
-                    "total_matches_abandoned": user_information.total_matches_abandoned,
-                    "time_played_seconds": user_information.time_played_seconds,
-                    "total_kills": user_information.total_kills,
-                    "total_deaths": user_information.total_deaths,
-                    "total_attacker_round_wins": user_information.total_attacker_round_wins,
-                    "total_defender_round_wins": user_information.total_defender_round_wins,
-                    "total_headshots": user_information.total_headshots,
-                    "total_headshots_missed": user_information.total_headshots_missed,
-                    "headshot_percentage": user_information.headshot_percentage,
-                    "total_wall_bang": user_information.total_wall_bang,
-                    "total_damage": user_information.total_damage,
-                    "total_assists": user_information.total_assists,
-                    "total_team_kills": user_information.total_team_kills,
-                    "attacked_breacher_count": user_information.attacked_breacher_count,
-                    "attacked_breacher_percentage": user_information.attacked_breacher_percentage,
-                    "attacked_fragger_count": user_information.attacked_fragger_count,
-                    "attacked_fragger_percentage": user_information.attacked_fragger_percentage,
-                    "attacked_intel_count": user_information.attacked_intel_count,
-                    "attacked_intel_percentage": user_information.attacked_intel_percentage,
-                    "attacked_roam_count": user_information.attacked_roam_count,
-                    "attacked_roam_percentage": user_information.attacked_roam_percentage,
-                    "attacked_support_count": user_information.attacked_support_count,
-                    "attacked_support_percentage": user_information.attacked_support_percentage,
-                    "attacked_utility_count": user_information.attacked_utility_count,
-                    "attacked_utility_percentage": user_information.attacked_utility_percentage,
-                    "defender_debuffer_count": user_information.defender_debuffer_count,
-                    "defender_debuffer_percentage": user_information.defender_debuffer_percentage,
-                    "defender_entry_denier_count": user_information.defender_entry_denier_count,
-                    "defender_entry_denier_percentage": user_information.defender_entry_denier_percentage,
-                    "defender_intel_count": user_information.defender_intel_count,
-                    "defender_intel_percentage": user_information.defender_intel_percentage,
-                    "defender_support_count": user_information.defender_support_count,
-                    "defender_support_percentage": user_information.defender_support_percentage,
-                    "defender_trapper_count": user_information.defender_trapper_count,
-                    "defender_trapper_percentage": user_information.defender_trapper_percentage,
-                    "defender_utility_denier_count": user_information.defender_utility_denier_count,
-                    "defender_utility_denier_percentage": user_information.defender_utility_denier_percentage,
-                    "kd_ratio": user_information.kd_ratio,
-                    "kill_per_match": user_information.kill_per_match,
-                    "kill_per_minute": user_information.kill_per_minute,
-                    "win_percentage": user_information.win_percentage,
-                    "rank_match_played": user_information.rank_match_played,
-                    "rank_match_won": user_information.rank_match_won,
-                    "rank_match_lost": user_information.rank_match_lost,
-                    "rank_match_abandoned": user_information.rank_match_abandoned,
-                    "rank_kills_count": user_information.rank_kills_count,
-                    "rank_deaths_count": user_information.rank_deaths_count,
-                    "rank_kd_ratio": user_information.rank_kd_ratio,
-                    "rank_kill_per_match": user_information.rank_kill_per_match,
-                    "rank_win_percentage": user_information.rank_win_percentage,
-                    "arcade_match_played": user_information.arcade_match_played,
-                    "arcade_match_won": user_information.arcade_match_won,
-                    "arcade_match_lost": user_information.arcade_match_lost,
-                    "arcade_match_abandoned": user_information.arcade_match_abandoned,
-                    "arcade_kills_count": user_information.arcade_kills_count,
-                    "arcade_deaths_count": user_information.arcade_deaths_count,
-                    "arcade_kd_ratio": user_information.arcade_kd_ratio,
-                    "arcade_kill_per_match": user_information.arcade_kill_per_match,
-                    "arcade_win_percentage": user_information.arcade_win_percentage,
-                    "quickmatch_match_played": user_information.quickmatch_match_played,
-                    "quickmatch_match_won": user_information.quickmatch_match_won,
-                    "quickmatch_match_lost": user_information.quickmatch_match_lost,
-                    "quickmatch_match_abandoned": user_information.quickmatch_match_abandoned,
-                    "quickmatch_kills_count": user_information.quickmatch_kills_count,
-                    "quickmatch_deaths_count": user_information.quickmatch_deaths_count,
-                    "quickmatch_kd_ratio": user_information.quickmatch_kd_ratio,
-                    "quickmatch_kill_per_match": user_information.quickmatch_kill_per_match,
-                    "quickmatch_win_percentage": user_information.quickmatch_win_percentage,
-                },
+            print_log(
+                f"insert_if_nonexistant_full_user_info: Inserted stats for {len(users_information)} user(s), replacing {deleted_count} existing record(s)"
             )
-            print_log(f"insert_if_nonexistant_full_user_info: Inserted stats for user {user_info.display_name}")
             # Transaction will be committed automatically by context manager
     except Exception as e:
-        try:
-            stringify_user_info = (
-                json.dumps(vars(user_information), default=str, indent=4)
-                if user_information is not None
-                else f"No user_information for user id: {user_info.id}"
-            )
-        except Exception:
-            stringify_user_info = f"user id: {user_info.id}"
-        print_error_log(f"insert_if_nonexistant_full_user_info: Error inserting user stats: {e}\n{stringify_user_info}")
+        names = ", ".join(user_info.display_name for user_info, _ in users_information)
+        print_error_log(f"insert_if_nonexistant_full_user_info: Error inserting the user stats of {names}: {e}")
         raise e
 
 
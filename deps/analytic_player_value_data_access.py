@@ -1,14 +1,66 @@
 """
 Data access for the user_player_value table: the nightly computed
-team-balancing value per user per algorithm.
+team-balancing value per user per algorithm, and for the user_player_value_state
+table: the accumulators the values are computed from.
 """
 
 from datetime import datetime
 from typing import Dict, List, Optional
 
-from deps.models import PlayerValueAlgorithm, PlayerValueResult
+from deps.analytic_constants import SELECT_USER_FULL_MATCH_INFO
+from deps.functions_date import convert_to_datetime
+from deps.models import (
+    PerformanceEloState,
+    PlayerValueAlgorithm,
+    PlayerValueResult,
+    PlayerValueState,
+    TimeDecayedState,
+    UserFullMatchStats,
+)
 from deps.system_database import database_manager
 
+_UPSERT_PLAYER_VALUE = """
+    INSERT INTO user_player_value
+        (user_id, algorithm, value, rating, match_count, last_match_timestamp, computed_at)
+    VALUES (:user_id, :algorithm, :value, :rating, :match_count, :last_match_timestamp, :computed_at)
+    ON CONFLICT(user_id, algorithm) DO UPDATE SET
+        value = excluded.value,
+        rating = excluded.rating,
+        match_count = excluded.match_count,
+        last_match_timestamp = excluded.last_match_timestamp,
+        computed_at = excluded.computed_at
+"""
+
+_UPSERT_PLAYER_VALUE_STATE = """
+    INSERT INTO user_player_value_state (
+        user_id, last_match_id, last_match_timestamp, match_count, peak_rank_points,
+        elo_rating, elo_lobby_estimate, elo_match_index,
+        decay_anchor_timestamp, decayed_peak, decayed_kills, decayed_deaths, updated_at
+    )
+    VALUES (
+        :user_id, :last_match_id, :last_match_timestamp, :match_count, :peak_rank_points,
+        :elo_rating, :elo_lobby_estimate, :elo_match_index,
+        :decay_anchor_timestamp, :decayed_peak, :decayed_kills, :decayed_deaths, :updated_at
+    )
+    ON CONFLICT(user_id) DO UPDATE SET
+        last_match_id = excluded.last_match_id,
+        last_match_timestamp = excluded.last_match_timestamp,
+        match_count = excluded.match_count,
+        peak_rank_points = excluded.peak_rank_points,
+        elo_rating = excluded.elo_rating,
+        elo_lobby_estimate = excluded.elo_lobby_estimate,
+        elo_match_index = excluded.elo_match_index,
+        decay_anchor_timestamp = excluded.decay_anchor_timestamp,
+        decayed_peak = excluded.decayed_peak,
+        decayed_kills = excluded.decayed_kills,
+        decayed_deaths = excluded.decayed_deaths,
+        updated_at = excluded.updated_at
+"""
+
+
+def _isoformat_or_none(timestamp: Optional[datetime]) -> Optional[str]:
+    return timestamp.isoformat() if timestamp is not None else None
+
 
 def data_access_fetch_all_user_ids_with_matches() -> List[int]:
     """All users that have at least one stored ranked match."""
@@ -23,31 +75,29 @@ def data_access_upsert_player_value(
     computed_at: datetime,
 ) -> None:
     """Insert or update the computed value of one user for one algorithm."""
-    database_manager.get_cursor().execute(
-        """
-        INSERT INTO user_player_value
-            (user_id, algorithm, value, rating, match_count, last_match_timestamp, computed_at)
-        VALUES (:user_id, :algorithm, :value, :rating, :match_count, :last_match_timestamp, :computed_at)
-        ON CONFLICT(user_id, algorithm) DO UPDATE SET
-            value = excluded.value,
-            rating = excluded.rating,
-            match_count = excluded.match_count,
-            last_match_timestamp = excluded.last_match_timestamp,
-            computed_at = excluded.computed_at
-        """,
+    data_access_upsert_player_values({user_id: {algorithm: result}}, computed_at)
+
+
+def data_access_upsert_player_values(
+    results: Dict[int, Dict[PlayerValueAlgorithm, PlayerValueResult]],
+    computed_at: datetime,
+) -> None:
+    """Insert or update the computed values of many users in one transaction."""
+    params = [
         {
             "user_id": user_id,
             "algorithm": algorithm.value,
             "value": result.value,
             "rating": result.rating,
             "match_count": result.match_count,
-            "last_match_timestamp": (
-                result.last_match_timestamp.isoformat() if result.last_match_timestamp is not None else None
-            ),
+            "last_match_timestamp": _isoformat_or_none(result.last_match_timestamp),
             "computed_at": computed_at.isoformat(),
-        },
-    )
-    database_manager.get_conn().commit()
+        }
+        for user_id, user_results in results.items()
+        for algorithm, result in user_results.items()
+    ]
+    with database_manager.data_access_transaction() as cursor:
+        cursor.executemany(_UPSERT_PLAYER_VALUE, params)
 
 
 def data_access_fetch_player_value(user_id: int, algorithm: PlayerValueAlgorithm) -> Optional[float]:
@@ -74,3 +124,138 @@ def data_access_fetch_player_values_by_algorithm(algorithm: PlayerValueAlgorithm
         .fetchall()
     )
     return {row[0]: row[1] for row in result}
+
+
+def data_access_fetch_player_value_states(user_ids: List[int]) -> Dict[int, PlayerValueState]:
+    """The stored accumulators of the given users, users never computed are absent."""
+    if not user_ids:
+        return {}
+    placeholders = ",".join(["?"] * len(user_ids))
+    result = (
+        database_manager.get_cursor()
+        .execute(
+            f"""
+            SELECT user_id, last_match_id, last_match_timestamp, match_count, peak_rank_points,
+                elo_rating, elo_lobby_estimate, elo_match_index,
+                decay_anchor_timestamp, decayed_peak, decayed_kills, decayed_deaths
+            FROM user_player_value_state
+            WHERE user_id IN ({placeholders})
+            """,
+            list(user_ids),
+        )
+        .fetchall()
+    )
+    return {
+        row[0]: PlayerValueState(
+            elo=PerformanceEloState(rating=row[5], lobby_estimate=row[6], match_index=row[7]),
+            time_decayed=TimeDecayedState(
+                anchor_timestamp=convert_to_datetime(row[8]),
+                decayed_peak=row[9],
+                weighted_kills=row[10],
+                weighted_deaths=row[11],
+            ),
+            peak_rank_points=row[4],
+            match_count=row[3],
+            last_match_id=row[1],
+            last_match_timestamp=convert_to_datetime(row[2]),
+        )
+        for row in result
+    }
+
+
+def data_access_upsert_player_value_states(states: Dict[int, PlayerValueState], updated_at: datetime) -> None:
+    """Insert or update the accumulators of many users in one transaction."""
+    params = [
+        {
+            "user_id": user_id,
+            "last_match_id": state.last_match_id,
+            "last_match_timestamp": _isoformat_or_none(state.last_match_timestamp),
+            "match_count": state.match_count,
+            "peak_rank_points": state.peak_rank_points,
+            "elo_rating": state.elo.rating,
+            "elo_lobby_estimate": state.elo.lobby_estimate,
+            "elo_match_index": state.elo.match_index,
+            "decay_anchor_timestamp": _isoformat_or_none(state.time_decayed.anchor_timestamp),
+            "decayed_peak": state.time_decayed.decayed_peak,
+            "decayed_kills": state.time_decayed.weighted_kills,
+            "decayed_deaths": state.time_decayed.weighted_deaths,
+            "updated_at": updated_at.isoformat(),
+        }
+        for user_id, state in states.items()
+    ]
+    with database_manager.data_access_transaction() as cursor:
+        cursor.executemany(_UPSERT_PLAYER_VALUE_STATE, params)
+
+
+def data_access_fetch_matches_after_player_value_states(user_ids: List[int]) -> Dict[int, List[UserFullMatchStats]]:
+    """
+    The matches of the given users inserted after the last one applied to their stored state,
+    oldest first. Users without a stored state are not returned.
+    """
+    if not user_ids:
+        return {}
+    placeholders = ",".join(["?"] * len(user_ids))
+    result = (
+        database_manager.get_cursor()
+        .execute(
+            f"""
+            SELECT {SELECT_USER_FULL_MATCH_INFO}
+            FROM user_full_match_info
+            JOIN user_player_value_state
+                ON user_player_value_state.user_id = user_full_match_info.user_id
+                AND user_full_match_info.id > user_player_value_state.last_match_id
+            WHERE user_full_match_info.user_id IN ({placeholders})
+            ORDER BY user_full_match_info.match_timestamp, user_full_match_info.id
+            """,
+            list(user_ids),
+        )
+        .fetchall()
+    )
+    matches_by_user: Dict[int, List[UserFullMatchStats]] = {}
+    for row in result:
+        match = UserFullMatchStats.from_db_row(row)
+        matches_by_user.setdefault(match.user_id, []).append(match)
+    return matches_by_user
+
+
+def data_access_fetch_recent_usable_matches(
+    user_ids: List[int], from_timestamp: datetime, min_count: int
+) -> Dict[int, List[UserFullMatchStats]]:
+    """
+    The usable matches (no rollback, rounds played) of the given users since from_timestamp,
+    extended to the last min_count usable matches of the users who played less, newest first.
+    """
+    if not user_ids:
+        return {}
+    placeholders = ",".join(["?"] * len(user_ids))
+    result = (
+        database_manager.get_cursor()
+        .execute(
+            f"""
+            SELECT {SELECT_USER_FULL_MATCH_INFO}
+            FROM user_full_match_info
+            WHERE user_full_match_info.id IN (
+                SELECT id
+                FROM (
+                    SELECT
+                        id,
+                        match_timestamp,
+                        ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY match_timestamp DESC) AS position
+                    FROM user_full_match_info
+                    WHERE user_id IN ({placeholders})
+                        AND is_rollback = 0
+                        AND round_played_count > 0
+                )
+                WHERE match_timestamp >= ? OR position <= ?
+            )
+            ORDER BY user_full_match_info.match_timestamp DESC
+            """,
+            [*user_ids, from_timestamp.isoformat(), min_count],
+        )
+        .fetchall()
+    )
+    matches_by_user: Dict[int, List[UserFullMatchStats]] = {}
+    for row in result:
+        match = UserFullMatchStats.from_db_row(row)
+        matches_by_user.setdefault(match.user_id, []).append(match)
+    return matches_by_user
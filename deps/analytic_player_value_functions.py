@@ -19,6 +19,11 @@ familiar rank-dollar scale (Copper 10 ... Champion 120, extrapolated above):
    by the exponentially recency-weighted K/D over the whole history. No hard
    windows: recent form dominates but sparsely captured players keep their
    (discounted) history's signal.
+
+Algorithms 3 and 4 fold the history into a PlayerValueState (Elo state, decayed
+accumulators, all-time peak) persisted per user with the id of the last match
+applied: the nightly computation only applies the matches inserted since, and
+algorithms 1 and 2 only need the recent window on top of the stored peak.
 """
 
 import math
@@ -30,10 +35,21 @@ from typing import Dict, List, Optional
 from deps.analytic_match_data_access import data_access_fetch_user_matches_in_time_range
 from deps.analytic_player_value_data_access import (
     data_access_fetch_all_user_ids_with_matches,
-    data_access_upsert_player_value,
+    data_access_fetch_matches_after_player_value_states,
+    data_access_fetch_player_value_states,
+    data_access_fetch_recent_usable_matches,
+    data_access_upsert_player_value_states,
+    data_access_upsert_player_values,
 )
 from deps.log import print_log
-from deps.models import PlayerValueAlgorithm, PlayerValueResult, UserFullMatchStats
+from deps.models import (
+    PerformanceEloState,
+    PlayerValueAlgorithm,
+    PlayerValueResult,
+    PlayerValueState,
+    TimeDecayedState,
+    UserFullMatchStats,
+)
 
 # Community rank-dollar scale: (rank floor in rank points, dollar value)
 RANK_DOLLAR_TABLE = [
@@ -110,6 +126,12 @@ TIME_DECAY_PEAK_FADE_RP_PER_DAY = 1.2
 # Kills/deaths of prior (at K/D 1.0) blended into the decayed K/D
 TIME_DECAY_KD_PRIOR = 15
 
+# The nightly computation replays every user's full history on this weekday (Monday)
+# instead of applying the new matches to the stored states, and logs the drift.
+PLAYER_VALUE_FULL_REBUILD_WEEKDAY = 0
+# Elo or decayed peak rank points difference above which a rebuilt state counts as drifted
+PLAYER_VALUE_DRIFT_TOLERANCE = 0.01
+
 
 # The algorithm consumers (team balancing) read. Change here once an algorithm is chosen.
 PLAYER_VALUE_OFFICIAL_ALGORITHM = PlayerValueAlgorithm.TIME_DECAYED
@@ -166,10 +188,17 @@ def _select_recent_matches(matches_newest_first: List[UserFullMatchStats], now:
 
 
 def _compute_effective_rank_points(
-    usable_newest_first: List[UserFullMatchStats], recent: List[UserFullMatchStats]
+    usable_newest_first: List[UserFullMatchStats],
+    recent: List[UserFullMatchStats],
+    peak_rank_points: Optional[float] = None,
 ) -> Optional[float]:
-    """Blend of the recent-peak and all-time-peak rank points, None when never ranked."""
-    ranked_points_seen = [m.rank_points for m in usable_newest_first if m.rank_points > 0]
+    """
+    Blend of the recent-peak and all-time-peak rank points, None when never ranked.
+    peak_rank_points is the stored all-time peak when the matches are only the recent window.
+    """
+    ranked_points_seen: List[float] = [m.rank_points for m in usable_newest_first if m.rank_points > 0]
+    if peak_rank_points is not None and peak_rank_points > 0:
+        ranked_points_seen.append(peak_rank_points)
     if not ranked_points_seen:
         return None
     max_rp = max(ranked_points_seen)
@@ -177,7 +206,9 @@ def _compute_effective_rank_points(
     return CURRENT_FORM_RECENT_RP_WEIGHT * recent_peak_rp + (1 - CURRENT_FORM_RECENT_RP_WEIGHT) * max_rp
 
 
-def compute_value_current_form(matches: List[UserFullMatchStats], now: datetime) -> Optional[PlayerValueResult]:
+def compute_value_current_form(
+    matches: List[UserFullMatchStats], now: datetime, peak_rank_points: Optional[float] = None
+) -> Optional[PlayerValueResult]:
     """
     Algorithm 1: rank dollars of the effective rank points (blend of recent peak
     and all-time peak) multiplied by the recent shrunk K/D.
@@ -186,7 +217,7 @@ def compute_value_current_form(matches: List[UserFullMatchStats], now: datetime)
     if not usable:
         return None
     recent = _select_recent_matches(usable, now)
-    effective_rp = _compute_effective_rank_points(usable, recent)
+    effective_rp = _compute_effective_rank_points(usable, recent, peak_rank_points)
     if effective_rp is None:
         return None
 
@@ -203,14 +234,16 @@ def compute_value_current_form(matches: List[UserFullMatchStats], now: datetime)
     )
 
 
-def compute_performance_metrics(matches: List[UserFullMatchStats], now: datetime) -> Optional[PerformanceMetrics]:
+def compute_performance_metrics(
+    matches: List[UserFullMatchStats], now: datetime, peak_rank_points: Optional[float] = None
+) -> Optional[PerformanceMetrics]:
     """Extract the raw recent metrics of one user for the PERFORMANCE algorithm."""
     usable = _usable_matches_newest_first(matches)
     if not usable:
         return None
     recent = _select_recent_matches(usable, now)
     rounds = sum(m.round_played_count for m in recent)
-    effective_rp = _compute_effective_rank_points(usable, recent)
+    effective_rp = _compute_effective_rank_points(usable, recent, peak_rank_points)
     if rounds == 0 or effective_rp is None:
         return None
 
@@ -304,15 +337,6 @@ def compute_match_performance_score(match: UserFullMatchStats) -> float:
     return min(max(score, 1.0 - ELO_PERF_SCORE_CLAMP), ELO_PERF_SCORE_CLAMP)
 
 
-@dataclass
-class PerformanceEloState:
-    """Mutable state of the Elo replay over one user's chronological matches."""
-
-    rating: float
-    lobby_estimate: float = 0.0
-    match_index: int = 0
-
-
 def apply_performance_elo_match(state: PerformanceEloState, match: UserFullMatchStats) -> float:
     """
     Update the Elo state with one match and return the expected outcome that was
@@ -342,29 +366,71 @@ def apply_performance_elo_match(state: PerformanceEloState, match: UserFullMatch
     return expected
 
 
-def compute_value_performance_elo(matches: List[UserFullMatchStats], now: datetime) -> Optional[PlayerValueResult]:
+def _age_time_decayed_state(state: TimeDecayedState, timestamp: datetime) -> TimeDecayedState:
+    """The accumulators moved from their anchor to a later timestamp (earlier ones count as no age)."""
+    if state.anchor_timestamp is None:
+        return TimeDecayedState(anchor_timestamp=timestamp)
+    age_days = max((timestamp - state.anchor_timestamp).total_seconds() / 86400.0, 0.0)
+    weight = 0.5 ** (age_days / TIME_DECAY_KD_HALF_LIFE_DAYS)
+    return TimeDecayedState(
+        anchor_timestamp=max(timestamp, state.anchor_timestamp),
+        decayed_peak=state.decayed_peak - TIME_DECAY_PEAK_FADE_RP_PER_DAY * age_days,
+        weighted_kills=state.weighted_kills * weight,
+        weighted_deaths=state.weighted_deaths * weight,
+    )
+
+
+def apply_time_decayed_match(state: TimeDecayedState, match: UserFullMatchStats) -> None:
+    """Age the accumulators to the match, then add it with a full weight."""
+    aged = _age_time_decayed_state(state, match.match_timestamp)
+    state.anchor_timestamp = aged.anchor_timestamp
+    state.decayed_peak = (
+        max(aged.decayed_peak, float(match.rank_points)) if match.rank_points > 0 else aged.decayed_peak
+    )
+    state.weighted_kills = aged.weighted_kills + match.kill_count
+    state.weighted_deaths = aged.weighted_deaths + match.death_count
+
+
+def advance_player_value_state(state: PlayerValueState, matches: List[UserFullMatchStats]) -> bool:
     """
-    Algorithm 3: replay the full match history chronologically. Each match moves
-    the rating by K * (outcome - expected), where the outcome blends win/loss with
-    per-round performance and expected comes from the gap between the rating and
-    the smoothed lobby strength. Idle players drift back toward the smoothed
-    lobby estimate.
+    Apply new matches to the state in chronological order. Returns False, leaving the
+    state untouched, when the matches cannot be appended: a usable match older than the
+    last one applied, or the first ranked match of a user whose Elo was seeded without one.
+    The caller then rebuilds the state from the full history.
     """
-    usable = _usable_matches_newest_first(matches)
-    if not usable:
+    usable = list(reversed(_usable_matches_newest_first(matches)))
+    if usable:
+        if state.last_match_timestamp is not None and usable[0].match_timestamp < state.last_match_timestamp:
+            return False
+        if state.match_count > 0 and state.elo.lobby_estimate <= 0 and any(m.rank_points > 0 for m in usable):
+            return False
+        if state.match_count == 0:
+            state.elo.rating = next((float(m.rank_points) for m in usable if m.rank_points > 0), ELO_DEFAULT_SEED)
+        for match in usable:
+            apply_performance_elo_match(state.elo, match)
+            apply_time_decayed_match(state.time_decayed, match)
+            state.peak_rank_points = max(state.peak_rank_points, float(match.rank_points))
+        state.match_count += len(usable)
+        state.last_match_timestamp = usable[-1].match_timestamp
+    state.last_match_id = max([state.last_match_id] + [m.id for m in matches if m.id is not None])
+    return True
+
+
+def build_player_value_state(matches: List[UserFullMatchStats]) -> PlayerValueState:
+    """Fold a full match history into a new state."""
+    state = PlayerValueState(elo=PerformanceEloState(rating=ELO_DEFAULT_SEED), time_decayed=TimeDecayedState())
+    advance_player_value_state(state, matches)
+    return state
+
+
+def compute_value_performance_elo_from_state(state: PlayerValueState, now: datetime) -> Optional[PlayerValueResult]:
+    """Algorithm 3 from the folded history: idle players drift back toward the smoothed lobby estimate."""
+    if state.match_count == 0 or state.last_match_timestamp is None:
         return None
-    chronological = list(reversed(usable))
-
-    seed = next((float(m.rank_points) for m in chronological if m.rank_points > 0), ELO_DEFAULT_SEED)
-    state = PerformanceEloState(rating=seed)
-    for match in chronological:
-        apply_performance_elo_match(state, match)
-    rating = state.rating
-
-    last_match = chronological[-1]
-    idle_months = (now - last_match.match_timestamp).days / 30.0
+    rating = state.elo.rating
+    idle_months = (now - state.last_match_timestamp).days / 30.0
     if idle_months > 1.0:
-        baseline = state.lobby_estimate if state.lobby_estimate > 0 else rating
+        baseline = state.elo.lobby_estimate if state.elo.lobby_estimate > 0 else rating
         decay = min(ELO_IDLE_DECAY_PER_MONTH * (idle_months - 1.0), ELO_IDLE_DECAY_MAX)
         rating += (baseline - rating) * decay
 
@@ -372,11 +438,40 @@ def compute_value_performance_elo(matches: List[UserFullMatchStats], now: dateti
     return PlayerValueResult(
         value=value,
         rating=rating,
-        match_count=len(chronological),
-        last_match_timestamp=last_match.match_timestamp,
+        match_count=state.match_count,
+        last_match_timestamp=state.last_match_timestamp,
+    )
+
+
+def compute_value_time_decayed_from_state(state: PlayerValueState, now: datetime) -> Optional[PlayerValueResult]:
+    """Algorithm 4 from the folded history: the accumulators aged from their anchor to now."""
+    if state.match_count == 0:
+        return None
+    aged = _age_time_decayed_state(state.time_decayed, now)
+    if aged.decayed_peak <= 0:
+        return None
+    decayed_kd = (aged.weighted_kills + TIME_DECAY_KD_PRIOR) / (aged.weighted_deaths + TIME_DECAY_KD_PRIOR)
+
+    value = min(max(rank_points_to_dollar(aged.decayed_peak) * decayed_kd, VALUE_MIN), VALUE_MAX)
+    return PlayerValueResult(
+        value=value,
+        rating=aged.decayed_peak,
+        match_count=state.match_count,
+        last_match_timestamp=state.last_match_timestamp,
     )
 
 
+def compute_value_performance_elo(matches: List[UserFullMatchStats], now: datetime) -> Optional[PlayerValueResult]:
+    """
+    Algorithm 3: replay the full match history chronologically. Each match moves
+    the rating by K * (outcome - expected), where the outcome blends win/loss with
+    per-round performance and expected comes from the gap between the rating and
+    the smoothed lobby strength. Idle players drift back toward the smoothed
+    lobby estimate.
+    """
+    return compute_value_performance_elo_from_state(build_player_value_state(matches), now)
+
+
 def compute_value_time_decayed(matches: List[UserFullMatchStats], now: datetime) -> Optional[PlayerValueResult]:
     """
     Algorithm 4: rank dollars of the time-decayed peak rank points (a peak fades
@@ -384,87 +479,157 @@ def compute_value_time_decayed(matches: List[UserFullMatchStats], now: datetime)
     whole match history. Recent form dominates, but players with sparse recent
     data fall back on their (discounted) history instead of a tiny sample.
     """
-    usable = _usable_matches_newest_first(matches)
-    if not usable:
-        return None
-    decayed_peak = 0.0
-    weighted_kills = 0.0
-    weighted_deaths = 0.0
-    for match in usable:
-        age_days = max((now - match.match_timestamp).days, 0)
-        if match.rank_points > 0:
-            decayed_peak = max(decayed_peak, match.rank_points - TIME_DECAY_PEAK_FADE_RP_PER_DAY * age_days)
-        weight = 0.5 ** (age_days / TIME_DECAY_KD_HALF_LIFE_DAYS)
-        weighted_kills += weight * match.kill_count
-        weighted_deaths += weight * match.death_count
-    if decayed_peak <= 0:
-        return None
-    decayed_kd = (weighted_kills + TIME_DECAY_KD_PRIOR) / (weighted_deaths + TIME_DECAY_KD_PRIOR)
-
-    value = min(max(rank_points_to_dollar(decayed_peak) * decayed_kd, VALUE_MIN), VALUE_MAX)
-    return PlayerValueResult(
-        value=value,
-        rating=decayed_peak,
-        match_count=len(usable),
-        last_match_timestamp=usable[0].match_timestamp,
-    )
+    return compute_value_time_decayed_from_state(build_player_value_state(matches), now)
 
 
-def compute_all_player_values(
-    matches_by_user: Dict[int, List[UserFullMatchStats]],
-    now: Optional[datetime] = None,
+def compute_player_values_from_states(
+    states: Dict[int, PlayerValueState],
+    recent_matches_by_user: Dict[int, List[UserFullMatchStats]],
+    now: datetime,
     only_user_ids: Optional[List[int]] = None,
 ) -> Dict[int, Dict[PlayerValueAlgorithm, PlayerValueResult]]:
     """
-    Compute every algorithm's value for the requested users. The PERFORMANCE
-    community baseline always uses every user in matches_by_user, so pass the full
-    community even when recomputing a subset (only_user_ids).
+    Compute every algorithm's value from the users' states and recent matches (at
+    least the last 180 days and the last 20 usable matches). The PERFORMANCE
+    community baseline uses every user of recent_matches_by_user.
     """
-    now = now or datetime.now(timezone.utc)
-    target_ids = set(only_user_ids) if only_user_ids is not None else set(matches_by_user.keys())
+    target_ids = set(only_user_ids) if only_user_ids is not None else set(states) | set(recent_matches_by_user)
+
+    def peak_of(user_id: int) -> Optional[float]:
+        state = states.get(user_id)
+        return state.peak_rank_points if state is not None else None
 
     metrics_by_user: Dict[int, PerformanceMetrics] = {}
-    for user_id, matches in matches_by_user.items():
-        metrics = compute_performance_metrics(matches, now)
+    for user_id, matches in recent_matches_by_user.items():
+        metrics = compute_performance_metrics(matches, now, peak_of(user_id))
         if metrics is not None:
             metrics_by_user[user_id] = metrics
     performance_results = compute_values_performance(metrics_by_user)
 
     results: Dict[int, Dict[PlayerValueAlgorithm, PlayerValueResult]] = {}
     for user_id in target_ids:
-        matches = matches_by_user.get(user_id, [])
         user_results: Dict[PlayerValueAlgorithm, PlayerValueResult] = {}
-        current_form = compute_value_current_form(matches, now)
+        current_form = compute_value_current_form(recent_matches_by_user.get(user_id, []), now, peak_of(user_id))
         if current_form is not None:
             user_results[PlayerValueAlgorithm.CURRENT_FORM] = current_form
         if user_id in performance_results:
             user_results[PlayerValueAlgorithm.PERFORMANCE] = performance_results[user_id]
-        elo = compute_value_performance_elo(matches, now)
-        if elo is not None:
-            user_results[PlayerValueAlgorithm.PERFORMANCE_ELO] = elo
-        time_decayed = compute_value_time_decayed(matches, now)
-        if time_decayed is not None:
-            user_results[PlayerValueAlgorithm.TIME_DECAYED] = time_decayed
+        state = states.get(user_id)
+        if state is not None:
+            elo = compute_value_performance_elo_from_state(state, now)
+            if elo is not None:
+                user_results[PlayerValueAlgorithm.PERFORMANCE_ELO] = elo
+            time_decayed = compute_value_time_decayed_from_state(state, now)
+            if time_decayed is not None:
+                user_results[PlayerValueAlgorithm.TIME_DECAYED] = time_decayed
         if user_results:
             results[user_id] = user_results
     return results
 
 
+def compute_all_player_values(
+    matches_by_user: Dict[int, List[UserFullMatchStats]],
+    now: Optional[datetime] = None,
+    only_user_ids: Optional[List[int]] = None,
+) -> Dict[int, Dict[PlayerValueAlgorithm, PlayerValueResult]]:
+    """
+    Compute every algorithm's value for the requested users from their full match
+    history. The PERFORMANCE community baseline always uses every user in
+    matches_by_user, so pass the full community even when recomputing a subset
+    (only_user_ids).
+    """
+    now = now or datetime.now(timezone.utc)
+    target_ids = set(only_user_ids) if only_user_ids is not None else set(matches_by_user.keys())
+    states = {user_id: build_player_value_state(matches_by_user.get(user_id, [])) for user_id in target_ids}
+    return compute_player_values_from_states(states, matches_by_user, now, list(target_ids))
+
+
+def _state_drift(incremental: PlayerValueState, rebuilt: PlayerValueState) -> float:
+    """Largest rating difference between the incrementally maintained state and the rebuilt one."""
+    return max(
+        abs(incremental.elo.rating - rebuilt.elo.rating),
+        abs(incremental.time_decayed.decayed_peak - rebuilt.time_decayed.decayed_peak),
+        abs(incremental.peak_rank_points - rebuilt.peak_rank_points),
+    )
+
+
+def refresh_player_value_states(user_ids: List[int], full_rebuild: bool = False) -> Dict[int, PlayerValueState]:
+    """
+    Bring the stored states of the users up to date and persist them. Only the matches
+    inserted since each state was saved are loaded; users without a state, or whose new
+    matches cannot be appended, are rebuilt from their history one user at a time.
+    With full_rebuild every user is rebuilt and the drift of the incremental states is logged.
+    """
+    states = data_access_fetch_player_value_states(user_ids)
+    new_matches_by_user = data_access_fetch_matches_after_player_value_states(list(states))
+    changed: Dict[int, PlayerValueState] = {}
+    to_rebuild = [user_id for user_id in user_ids if user_id not in states]
+    for user_id, new_matches in new_matches_by_user.items():
+        if advance_player_value_state(states[user_id], new_matches):
+            changed[user_id] = states[user_id]
+        else:
+            to_rebuild.append(user_id)
+
+    drifted = 0
+    max_drift = 0.0
+    for user_id in user_ids if full_rebuild else to_rebuild:
+        matches = data_access_fetch_user_matches_in_time_range([user_id], None, None).get(user_id, [])
+        rebuilt = build_player_value_state(matches)
+        incremental = states.get(user_id)
+        if full_rebuild and incremental is not None and user_id not in to_rebuild:
+            drift = _state_drift(incremental, rebuilt)
+            max_drift = max(max_drift, drift)
+            drifted += 1 if drift > PLAYER_VALUE_DRIFT_TOLERANCE else 0
+        states[user_id] = changed[user_id] = rebuilt
+
+    if changed:
+        data_access_upsert_player_value_states(changed, datetime.now(timezone.utc))
+    if full_rebuild:
+        print_log(
+            f"refresh_player_value_states: Full rebuild of {len(user_ids)} users, {drifted} drifted (max drift {max_drift:.4f})"
+        )
+    else:
+        print_log(f"refresh_player_value_states: Updated {len(changed)} states, {len(to_rebuild)} rebuilt")
+    return states
+
+
+def update_player_values_for_users(user_ids: List[int], now: Optional[datetime] = None) -> None:
+    """
+    Apply the just-inserted matches of some users to their states and refresh the values
+    that do not depend on the rest of the community. PERFORMANCE is normalized against
+    every user, so it stays with the nightly computation.
+    """
+    if not user_ids:
+        return
+    now = now or datetime.now(timezone.utc)
+    states = refresh_player_value_states(user_ids)
+    recent_matches_by_user = data_access_fetch_recent_usable_matches(
+        user_ids, now - timedelta(days=RECENT_WINDOW_EXTENDED_DAYS), RECENT_FALLBACK_MATCH_COUNT
+    )
+    results = compute_player_values_from_states(states, recent_matches_by_user, now, user_ids)
+    for user_results in results.values():
+        user_results.pop(PlayerValueAlgorithm.PERFORMANCE, None)
+    data_access_upsert_player_values(results, now)
+
+
 def compute_and_store_player_values(
     only_user_ids: Optional[List[int]] = None,
     now: Optional[datetime] = None,
+    full_rebuild: bool = False,
 ) -> Dict[int, Dict[PlayerValueAlgorithm, PlayerValueResult]]:
     """
     Compute and persist every algorithm's value for the given users (all users
-    with matches when None). The whole community's matches are always loaded
-    because the PERFORMANCE algorithm normalizes against everyone.
+    with matches when None). The states of every user are refreshed with the
+    matches inserted since the last run (or rebuilt with full_rebuild), and only the
+    recent window of the whole community is loaded for the PERFORMANCE baseline.
     """
     now = now or datetime.now(timezone.utc)
     all_user_ids = data_access_fetch_all_user_ids_with_matches()
-    matches_by_user = data_access_fetch_user_matches_in_time_range(all_user_ids, None, None)
-    results = compute_all_player_values(matches_by_user, now, only_user_ids)
-    for user_id, user_results in results.items():
-        for algorithm, result in user_results.items():
-            data_access_upsert_player_value(user_id, algorithm, result, now)
+    states = refresh_player_value_states(all_user_ids, full_rebuild)
+    recent_matches_by_user = data_access_fetch_recent_usable_matches(
+        all_user_ids, now - timedelta(days=RECENT_WINDOW_EXTENDED_DAYS), RECENT_FALLBACK_MATCH_COUNT
+    )
+    results = compute_player_values_from_states(states, recent_matches_by_user, now, only_user_ids)
+    data_access_upsert_player_values(results, now)
     print_log(f"compute_and_store_player_values: Stored values for {len(results)} users")
     return results
@@ -112,57 +112,19 @@ def data_access_fetch_total_hours(user_id: int) -> int:
     Get the total hours played on the server
     """
     query = """
-WITH user_event_sequence AS (
-    SELECT
-        id,
-        user_id,
-        event,
-        timestamp,
-        LAG(id) OVER (PARTITION BY user_id ORDER BY timestamp) AS previous_id,
-        LAG(event) OVER (PARTITION BY user_id ORDER BY timestamp) AS previous_event,
-        LAG(timestamp) OVER (PARTITION BY user_id ORDER BY timestamp) AS previous_timestamp
-    FROM
-        user_activity
-    WHERE user_id = :user_id
-),
-valid_pairs AS (
-    SELECT
-        previous_id,
-        id,
-        user_id,
-        previous_event,
-        event,
-        previous_timestamp,
-        timestamp,
-        (strftime('%s', timestamp) - strftime('%s', previous_timestamp)) AS seconds_between_events
-    FROM
-        user_event_sequence
-    WHERE
-        event = 'disconnect'
-        AND previous_event = 'connect'
-        AND previous_timestamp IS NOT NULL -- Ensures valid pairs
-),
-aggregated_time AS (
-    SELECT
-        user_id,
-        SUM(seconds_between_events) AS total_time
-    FROM
-        valid_pairs
-    GROUP BY
-        user_id
-)
 SELECT
     ua.display_name,
-    at.total_time / 3600 AS total_hours
+    SUM(vs.duration_s) / 3600 AS total_hours
 FROM
-    aggregated_time at
+    voice_session vs
 LEFT JOIN
     user_info ua
-    ON at.user_id = ua.id
+    ON vs.user_id = ua.id
 WHERE
-    at.total_time > 0
-ORDER BY
-    at.total_time DESC;
+    vs.user_id = :user_id
+    AND vs.end_ts IS NOT NULL
+GROUP BY
+    vs.user_id;
     """
     result = (
         database_manager.get_cursor().execute(
@@ -14,6 +14,7 @@ All functions follow the pattern:
 from datetime import date
 from typing import List
 
+from deps.analytic_activity_data_access import fetch_pair_overlap_seconds
 from deps.system_database import database_manager
 
 
@@ -329,29 +330,13 @@ def data_access_fetch_time_played_siege_on_server(from_data: date, top: int) ->
         user_id,
         channel_id,
         guild_id,
-        timestamp AS connect_time,
-        LEAD (timestamp) OVER (
-            PARTITION BY
-            user_id,
-            channel_id,
-            guild_id
-            ORDER BY
-            timestamp
-        ) AS disconnect_time,
-        event,
-        LEAD (event) OVER (
-            PARTITION BY
-            user_id,
-            channel_id,
-            guild_id
-            ORDER BY
-            timestamp
-        ) AS next_event
+        start_ts AS connect_time,
+        end_ts AS disconnect_time
         FROM
-        user_activity
+        voice_session
         WHERE
-        event in ('connect', 'disconnect')
-        AND timestamp > :from_data
+        end_ts IS NOT NULL
+        AND start_ts > :from_data
     )
     SELECT
     user1_info.display_name AS user1_display_name,
@@ -368,13 +353,7 @@ def data_access_fetch_time_played_siege_on_server(from_data: date, top: int) ->
     AND a.user_id < b.user_id -- Avoid duplicate comparisons
     AND a.connect_time < b.disconnect_time
     AND b.connect_time < a.disconnect_time
-    AND a.event = 'connect'
-    AND a.next_event = 'disconnect'
-    AND b.event = 'connect'
-    AND b.next_event = 'disconnect'
     LEFT JOIN user_info AS user1_info ON user1_info.id = a.user_id
-    WHERE
-    a.connect_time IS NOT NULL -- Ensure proper session pairing
     GROUP BY
     a.user_id
     ORDER BY
@@ -394,72 +373,7 @@ def data_access_fetch_time_duo_partners(from_data: date, top: int) -> list[tuple
     """
     Get the total hours played with someone else
     """
-    query = """
-    WITH
-    user_sessions AS (
-        SELECT
-        user_id,
-        channel_id,
-        guild_id,
-        timestamp AS connect_time,
-        LEAD (timestamp) OVER (
-            PARTITION BY
-            user_id,
-            channel_id,
-            guild_id
-            ORDER BY
-            timestamp
-        ) AS disconnect_time,
-        event,
-        LEAD (event) OVER (
-            PARTITION BY
-            user_id,
-            channel_id,
-            guild_id
-            ORDER BY
-            timestamp
-        ) AS next_event
-        FROM
-        user_activity
-        WHERE
-        event in ('connect', 'disconnect')
-        AND timestamp > :from_data
-    )
-    SELECT
-    user1_info.display_name AS user1_display_name,
-    user2_info.display_name AS user2_display_name,
-    SUM(
-        CAST(
-        (
-            strftime ('%s', MIN(a.disconnect_time, b.disconnect_time)) - strftime ('%s', MAX(a.connect_time, b.connect_time))
-        ) AS INTEGER
-        )
-    ) / 3600 AS total_overlap_seconds
-    FROM
-    user_sessions a
-    JOIN user_sessions b ON a.guild_id = b.guild_id
-    AND a.user_id < b.user_id -- Avoid duplicate comparisons
-    AND a.connect_time < b.disconnect_time
-    AND b.connect_time < a.disconnect_time
-    AND a.event = 'connect'
-    AND a.next_event = 'disconnect'
-    AND b.event = 'connect'
-    AND b.next_event = 'disconnect'
-    LEFT JOIN user_info AS user1_info ON user1_info.id = a.user_id
-    LEFT JOIN user_info AS user2_info ON user2_info.id = b.user_id
-    WHERE
-    a.connect_time IS NOT NULL -- Ensure proper session pairing
-    GROUP BY
-    a.user_id,
-    b.user_id
-    ORDER BY
-    total_overlap_seconds DESC
-    LIMIT :top_result;
-    """
-    result = (
-        database_manager.get_cursor().execute(
-            query,
-            {"from_data": from_data.isoformat(), "top_result": top},
-        )
-    ).fetchall()
-    return [(row[0], row[1], row[2]) for row in result]
+    return [
+        (user_a, user_b, int(seconds) // 3600)
+        for user_a, user_b, seconds in fetch_pair_overlap_seconds(from_data)[:top]
+    ]
@@ -18,6 +18,7 @@ from datetime import datetime
 from typing import Union
 
 from deps.analytic_constants import USER_INFO_SELECT_FIELD, KEY_USER_INFO
+from deps.cache import remove_negative_cache
 from deps.data_access_data_class import UserInfo
 from deps.system_database import database_manager
 from deps.analytic_activity_data_access import (
@@ -140,6 +141,7 @@ def upsert_user_info(
     )
 
     database_manager.get_conn().commit()
+    remove_negative_cache(True, f"{KEY_USER_INFO}:{user_id}")
 
 
 def get_active_user_info(
@@ -0,0 +1,440 @@
+"""
+Columnar snapshot of the match and voice data for the report and analytics builders.
+
+The builders of one run read overlapping date ranges: every window of the monthly report, every chart
+of a graph request. Instead of one SQL query per window, user and chart returning Python tuples, the
+snapshot loads user_full_match_info, voice_session and user_activity once into numpy columns sorted by
+time. A date range is a searchsorted slice and the aggregates are vectorized masks and groupbys.
+
+Timestamps are float epoch seconds to the millisecond (UTC, the stored timestamps without timezone are UTC),
+computed by SQLite with julianday so no row is parsed in Python.
+
+Functions:
+- load_analytic_snapshot: Load the columns of a date range
+- in_voice_mask: Which matches were played while the user was in a voice channel
+- count_by_user / sum_by_user: Group by user
+- ranked_server_split_by_week: In-server and outside ranked matches of a user per week
+- outside_ranked_match_partners: Users on the same team in a user's outside-server ranked matches
+- distinct_users_per_day / seconds_by_bucket: Calendar groupbys
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+from datetime import date, datetime, timezone
+from typing import Any, Optional, TypeVar
+
+import numpy as np
+
+from deps.functions_date import ensure_utc
+from deps.system_database import EVENT_CONNECT, database_manager
+
+SECONDS_PER_DAY = 86_400
+# julianday() of the Unix epoch
+_EPOCH_JULIAN_DAY = 2440587.5
+# SQLite keeps whole milliseconds: rounding removes the floating point error of the julianday product
+_EPOCH_SQL = f"ROUND((julianday({{column}}) - {_EPOCH_JULIAN_DAY}) * {SECONDS_PER_DAY}.0, 3)"
+
+_ColumnsT = TypeVar("_ColumnsT", bound="_Columns")
+
+
+def to_epoch(value: datetime) -> float:
+    """Epoch seconds of a datetime, a naive datetime is UTC"""
+    return ensure_utc(value).timestamp()
+
+
+class _Columns:
+    """Equal length numpy columns sorted by their time column"""
+
+    def __len__(self) -> int:
+        return len(getattr(self, fields(self)[0].name))  # type: ignore[arg-type]
+
+    @classmethod
+    def empty(cls: type[_ColumnsT]) -> _ColumnsT:
+        """Columns without rows"""
+        return cls(**{field.name: np.empty(0) for field in fields(cls)})  # type: ignore[arg-type]
+
+    def take(self: _ColumnsT, selector: Any) -> _ColumnsT:
+        """The rows picked by a slice, a boolean mask or indices, in the same order"""
+        columns = {field.name: getattr(self, field.name)[selector] for field in fields(self)}  # type: ignore[arg-type]
+        return type(self)(**columns)
+
+    def _time_slice(self, times: np.ndarray, start: datetime, end_exclusive: datetime) -> slice:
+        return slice(
+            int(np.searchsorted(times, to_epoch(start), side="left")),
+            int(np.searchsorted(times, to_epoch(end_exclusive), side="left")),
+        )
+
+
+@dataclass(frozen=True)
+class MatchColumns(_Columns):
+    """user_full_match_info rows ordered by match time"""
+
+    user_id: np.ndarray
+    timestamp: np.ndarray
+    # Same value for the rows of the same match_uuid
+    match_index: np.ndarray
+    has_win: np.ndarray
+    is_ranked: np.ndarray
+    is_rollback: np.ndarray
+    kill_count: np.ndarray
+    death_count: np.ndarray
+
+    def between(self, start: datetime, end_exclusive: datetime) -> MatchColumns:
+        """The matches played in [start, end_exclusive)"""
+        return self.take(self._time_slice(self.timestamp, start, end_exclusive))
+
+    def ranked(self) -> MatchColumns:
+        """The ranked matches, without the rollbacks"""
+        return self.take(self.is_ranked & ~self.is_rollback)
+
+
+@dataclass(frozen=True)
+class VoiceColumns(_Columns):
+    """Closed voice_session rows ordered by start time"""
+
+    user_id: np.ndarray
+    guild_id: np.ndarray
+    channel_id: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+
+    @property
+    def seconds(self) -> np.ndarray:
+        """Duration of each session"""
+        return np.maximum(self.end - self.start, 0.0)
+
+    def clipped(self, start: datetime, end_exclusive: datetime) -> VoiceColumns:
+        """The sessions overlapping [start, end_exclusive), cut to the range"""
+        range_start, range_end = to_epoch(start), to_epoch(end_exclusive)
+        candidates = self.take(slice(0, int(np.searchsorted(self.start, range_end, side="left"))))
+        clipped_start = np.maximum(candidates.start, range_start)
+        clipped_end = np.minimum(candidates.end, range_end)
+        overlapping = clipped_end > clipped_start
+        return VoiceColumns(
+            user_id=candidates.user_id[overlapping],
+            guild_id=candidates.guild_id[overlapping],
+            channel_id=candidates.channel_id[overlapping],
+            start=clipped_start[overlapping],
+            end=clipped_end[overlapping],
+        )
+
+    def intervals(self) -> list[tuple[int, int, float, float]]:
+        """The (channel_id, user_id, start, end) intervals of the co-presence engine"""
+        return list(zip(self.channel_id.tolist(), self.user_id.tolist(), self.start.tolist(), self.end.tolist()))
+
+
+@dataclass(frozen=True)
+class ActivityColumns(_Columns):
+    """user_activity events ordered by time then id"""
+
+    user_id: np.ndarray
+    channel_id: np.ndarray
+    is_connect: np.ndarray
+    timestamp: np.ndarray
+
+    def between(self, start: datetime, end_exclusive: datetime) -> ActivityColumns:
+        """The events in [start, end_exclusive)"""
+        return self.take(self._time_slice(self.timestamp, start, end_exclusive))
+
+    def before(self, end_exclusive: datetime) -> ActivityColumns:
+        """The events before end_exclusive"""
+        return self.take(slice(0, int(np.searchsorted(self.timestamp, to_epoch(end_exclusive), side="left"))))
+
+
+@dataclass(frozen=True)
+class AnalyticSnapshot:
+    """The columns loaded for [start, end_exclusive) and the display name of every user"""
+
+    start: datetime
+    end_exclusive: datetime
+    matches: MatchColumns
+    voice: VoiceColumns
+    # The whole event history, only when loaded with with_activity
+    activity: ActivityColumns
+    display_names: dict[int, str]
+
+
+def _range_params(start: datetime, end_exclusive: datetime) -> dict[str, Any]:
+    return {"start": ensure_utc(start).isoformat(), "end": ensure_utc(end_exclusive).isoformat()}
+
+
+def _user_filter(user_ids: Optional[list[int]], params: dict[str, Any]) -> str:
+    """The SQL condition keeping the rows of the users, none when all the users are loaded"""
+    if user_ids is None:
+        return ""
+    params.update({f"user_{index}": user_id for index, user_id in enumerate(user_ids)})
+    return f" AND user_id IN ({', '.join(f':user_{index}' for index in range(len(user_ids)))})"
+
+
+def _fetch_match_columns(start: datetime, end_exclusive: datetime, user_ids: Optional[list[int]]) -> MatchColumns:
+    params = _range_params(start, end_exclusive)
+    query = f"""
+        SELECT
+            user_id,
+            {_EPOCH_SQL.format(column="match_timestamp")},
+            match_uuid,
+            has_win,
+            LOWER(session_type) = 'ranked',
+            is_rollback,
+            COALESCE(kill_count, 0),
+            COALESCE(death_count, 0)
+        FROM user_full_match_info
+        WHERE julianday(match_timestamp) >= julianday(:start)
+          AND julianday(match_timestamp) < julianday(:end)
+        """
+    query += _user_filter(user_ids, params) + " ORDER BY julianday(match_timestamp), id;"
+    rows = database_manager.get_cursor().execute(query, params).fetchall()
+    user_id, timestamp, match_uuid, has_win, is_ranked, is_rollback, kill_count, death_count = (
+        zip(*rows) if rows else ((),) * 8
+    )
+    _, match_index = np.unique(np.array(match_uuid, dtype=str), return_inverse=True)
+    return MatchColumns(
+        user_id=np.array(user_id, dtype=np.int64),
+        timestamp=np.array(timestamp, dtype=float),
+        match_index=match_index.astype(np.int64),
+        has_win=np.array(has_win, dtype=bool),
+        is_ranked=np.array(is_ranked, dtype=bool),
+        is_rollback=np.array(is_rollback, dtype=bool),
+        kill_count=np.array(kill_count, dtype=np.int64),
+        death_count=np.array(death_count, dtype=np.int64),
+    )
+
+
+def _fetch_voice_columns(
+    start: datetime, end_exclusive: datetime, guild_id: Optional[int], user_ids: Optional[list[int]]
+) -> VoiceColumns:
+    params = _range_params(start, end_exclusive)
+    query = f"""
+        SELECT
+            user_id,
+            guild_id,
+            channel_id,
+            {_EPOCH_SQL.format(column="start_ts")},
+            {_EPOCH_SQL.format(column="end_ts")}
+        FROM voice_session
+        WHERE end_ts IS NOT NULL
+          AND julianday(start_ts) < julianday(:end)
+          AND julianday(end_ts) > julianday(:start)
+        """
+    if guild_id is not None:
+        query += " AND guild_id = :guild_id"
+        params["guild_id"] = guild_id
+    query += _user_filter(user_ids, params) + " ORDER BY julianday(start_ts), id;"
+    rows = database_manager.get_cursor().execute(query, params).fetchall()
+    columns = list(zip(*rows)) if rows else [(), (), (), (), ()]
+    return VoiceColumns(
+        user_id=np.array(columns[0], dtype=np.int64),
+        guild_id=np.array(columns[1], dtype=np.int64),
+        channel_id=np.array(columns[2], dtype=np.int64),
+        start=np.array(columns[3], dtype=float),
+        end=np.array(columns[4], dtype=float),
+    )
+
+
+def _fetch_activity_columns(with_activity: bool) -> ActivityColumns:
+    rows = []
+    if with_activity:
+        rows = (
+            database_manager.get_cursor()
+            .execute(
+                f"""
+                SELECT user_id, channel_id, event = :connect, {_EPOCH_SQL.format(column="timestamp")}
+                FROM user_activity
+                ORDER BY julianday(timestamp), id;
+                """,
+                {"connect": EVENT_CONNECT},
+            )
+            .fetchall()
+        )
+    columns = list(zip(*rows)) if rows else [(), (), (), ()]
+    return ActivityColumns(
+        user_id=np.array(columns[0], dtype=np.int64),
+        channel_id=np.array(columns[1], dtype=np.int64),
+        is_connect=np.array(columns[2], dtype=bool),
+        timestamp=np.array(columns[3], dtype=float),
+    )
+
+
+def load_analytic_snapshot(
+    start: datetime,
+    end_exclusive: datetime,
+    guild_id: Optional[int] = None,
+    user_ids: Optional[list[int]] = None,
+    with_activity: bool = False,
+) -> AnalyticSnapshot:
+    """
+    Load the matches played and the closed voice sessions overlapping [start, end_exclusive), optionally only the
+    sessions of one guild and the rows of some users. with_activity also loads the whole user_activity event log,
+    which the data quality counts replay.
+    """
+    display_names = {
+        int(row[0]): str(row[1])
+        for row in database_manager.get_cursor().execute("SELECT id, display_name FROM user_info;").fetchall()
+    }
+    return AnalyticSnapshot(
+        start=start,
+        end_exclusive=end_exclusive,
+        matches=_fetch_match_columns(start, end_exclusive, user_ids),
+        voice=_fetch_voice_columns(start, end_exclusive, guild_id, user_ids),
+        activity=_fetch_activity_columns(with_activity),
+        display_names=display_names,
+    )
+
+
+def in_voice_mask(matches: MatchColumns, voice: VoiceColumns) -> np.ndarray:
+    """
+    For each match, whether one of the user's voice sessions covers its timestamp (bounds included).
+    Per user, a match is covered when the furthest end of the sessions started before it is after it.
+    """
+    covered = np.zeros(len(matches), dtype=bool)
+    if len(matches) == 0 or len(voice) == 0:
+        return covered
+    order = np.argsort(voice.user_id, kind="stable")  # Stable: the sessions of a user stay ordered by start
+    users = voice.user_id[order]
+    starts = voice.start[order]
+    ends = voice.end[order]
+    user_ids, first_rows = np.unique(users, return_index=True)
+    last_rows = np.append(first_rows[1:], len(users))
+    for user_id, first_row, last_row in zip(user_ids, first_rows, last_rows):
+        match_rows = np.flatnonzero(matches.user_id == user_id)
+        if len(match_rows) == 0:
+            continue
+        timestamps = matches.timestamp[match_rows]
+        furthest_end = np.maximum.accumulate(ends[first_row:last_row])
+        session_row = np.searchsorted(starts[first_row:last_row], timestamps, side="right") - 1
+        started = session_row >= 0
+        covered[match_rows[started]] = furthest_end[session_row[started]] >= timestamps[started]
+    return covered
+
+
+def count_by_user(user_ids: np.ndarray) -> dict[int, int]:
+    """Number of rows of each user"""
+    users, counts = np.unique(user_ids, return_counts=True)
+    return dict(zip(users.tolist(), counts.tolist()))
+
+
+def sum_by_user(user_ids: np.ndarray, values: np.ndarray) -> dict[int, float]:
+    """Sum of the values of each user"""
+    users, user_rows = np.unique(user_ids, return_inverse=True)
+    return dict(zip(users.tolist(), np.bincount(user_rows, weights=values, minlength=len(users)).tolist()))
+
+
+def epoch_days(timestamps: np.ndarray) -> np.ndarray:
+    """UTC calendar day of each timestamp, as days since the epoch"""
+    return np.floor(timestamps / SECONDS_PER_DAY).astype(np.int64)
+
+
+def epoch_week_starts(timestamps: np.ndarray) -> np.ndarray:
+    """UTC Monday starting the week of each timestamp, as days since the epoch (a Thursday)"""
+    days = epoch_days(timestamps)
+    return days - (days + 3) % 7
+
+
+def epoch_weekdays(timestamps: np.ndarray) -> np.ndarray:
+    """UTC weekday of each timestamp, Monday is 0"""
+    return (epoch_days(timestamps) + 3) % 7
+
+
+def month_labels(timestamps: np.ndarray) -> np.ndarray:
+    """UTC "YYYY-MM" month of each timestamp"""
+    return np.datetime_as_string(timestamps.astype("datetime64[s]").astype("datetime64[M]"))
+
+
+def iso_week_labels(timestamps: np.ndarray) -> np.ndarray:
+    """UTC "YYYY-Www" ISO week of each timestamp, the ISO year is the year of the week's Thursday"""
+    thursdays = (epoch_week_starts(timestamps) + 3).astype("datetime64[D]")
+    years = thursdays.astype("datetime64[Y]")
+    weeks = (thursdays - years.astype("datetime64[D]")).astype(np.int64) // 7 + 1
+    return np.char.add(np.char.add(np.datetime_as_string(years), "-W"), np.char.zfill(weeks.astype(str), 2))
+
+
+def sum_by_label_and_user(
+    labels: np.ndarray, user_ids: np.ndarray, values: np.ndarray, selected_user_ids: list[int]
+) -> tuple[list[str], np.ndarray]:
+    """
+    The sorted labels of all the rows and the (selected users, labels) matrix of the summed values,
+    a row per selected user in the given order
+    """
+    unique_labels, label_rows = np.unique(labels, return_inverse=True)
+    matrix = np.zeros((len(selected_user_ids), len(unique_labels)))
+    if selected_user_ids:
+        order = np.argsort(selected_user_ids)
+        sorted_ids = np.array(selected_user_ids)[order]
+        positions = np.minimum(np.searchsorted(sorted_ids, user_ids), len(sorted_ids) - 1)
+        selected = sorted_ids[positions] == user_ids
+        np.add.at(matrix, (order[positions[selected]], label_rows[selected]), values[selected])
+    return unique_labels.tolist(), matrix
+
+
+def epoch_day_to_date(day: int) -> date:
+    """Date of a day since the epoch"""
+    return date.fromordinal(date(1970, 1, 1).toordinal() + int(day))
+
+
+def distinct_users_per_day(user_ids: np.ndarray, timestamps: np.ndarray) -> list[tuple[str, int]]:
+    """(ISO date, distinct users) for every UTC day with rows, in date order"""
+    if len(user_ids) == 0:
+        return []
+    pairs = np.unique(np.stack([epoch_days(timestamps), user_ids]), axis=1)
+    days, users = np.unique(pairs[0], return_counts=True)
+    return [(epoch_day_to_date(day).isoformat(), int(count)) for day, count in zip(days.tolist(), users.tolist())]
+
+
+def seconds_by_bucket(voice: VoiceColumns, edges: np.ndarray) -> np.ndarray:
+    """
+    Seconds of each session inside each bucket [edges[i], edges[i + 1]), a session overlapping several
+    buckets is split between them. Returns a (sessions, buckets) matrix.
+    """
+    overlap_start = np.maximum(voice.start[:, None], edges[None, :-1])
+    overlap_end = np.minimum(voice.end[:, None], edges[None, 1:])
+    return np.maximum(overlap_end - overlap_start, 0.0)
+
+
+def ranked_server_split_by_week(ranked: MatchColumns, in_voice: np.ndarray, user_id: int) -> list[tuple[str, int, int]]:
+    """(ISO week start, in-server matches, outside matches) of a user's ranked matches, in week order"""
+    user_rows = ranked.user_id == user_id
+    if not user_rows.any():
+        return []
+    week_starts = epoch_week_starts(ranked.timestamp[user_rows])
+    user_in_voice = in_voice[user_rows]
+    weeks, week_rows = np.unique(week_starts, return_inverse=True)
+    in_server = np.bincount(week_rows, weights=user_in_voice, minlength=len(weeks)).astype(int)
+    outside = np.bincount(week_rows, weights=~user_in_voice, minlength=len(weeks)).astype(int)
+    return [
+        (epoch_day_to_date(week).isoformat(), int(inside), int(out))
+        for week, inside, out in zip(weeks.tolist(), in_server.tolist(), outside.tolist())
+    ]
+
+
+def outside_ranked_match_partners(
+    ranked: MatchColumns, in_voice: np.ndarray, user_id: int, top: int, display_names: dict[int, str]
+) -> list[tuple[str, int, int, float]]:
+    """
+    (partner name, shared matches, user wins, user win rate) of the users in the same team as user_id in the
+    ranked matches the user played outside server voice. Same team: same match and same result.
+    Ordered by shared matches then name, at most top partners.
+    """
+    selected = (ranked.user_id == user_id) & ~in_voice
+    if not selected.any():
+        return []
+    # Result of the selected user in each match, -1 when the user did not play it outside server voice
+    selected_result = np.full(int(ranked.match_index.max()) + 1, -1, dtype=np.int8)
+    selected_result[ranked.match_index[selected]] = ranked.has_win[selected]
+    teammate = (ranked.user_id != user_id) & (selected_result[ranked.match_index] == ranked.has_win)
+    if not teammate.any():
+        return []
+    partners, partner_rows = np.unique(ranked.user_id[teammate], return_inverse=True)
+    shared = np.bincount(partner_rows, minlength=len(partners))
+    wins = np.bincount(partner_rows, weights=ranked.has_win[teammate], minlength=len(partners)).astype(int)
+    rows = [
+        (display_names.get(partner, str(partner)), int(count), int(win), round(win * 100.0 / count, 2))
+        for partner, count, win in zip(partners.tolist(), shared.tolist(), wins.tolist())
+    ]
+    rows.sort(key=lambda row: (-row[1], row[0]))
+    return rows[:top]
+
+
+def utc_datetime(timestamp: float) -> datetime:
+    """UTC datetime of epoch seconds"""
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
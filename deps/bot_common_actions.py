@@ -5,31 +5,35 @@
 
 import asyncio
 import io
-import os
-import tempfile
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
 from collections import Counter
-from typing import Any, Dict, List, Mapping, Optional, Union
-from gtts import gTTS  # type: ignore
+from typing import Any, Callable, Dict, List, Mapping, Optional, TypeVar, Union
 import discord
 from deps.browser import (
     download_full_matches_async,
     download_full_user_information_async,
     download_operator_stats_for_users_async,
 )
+from deps.scrape_scheduler import ScrapePriority
+from deps.tts_clip_cache import hold_tts_clips, play_tts_clips
 from deps.analytic_data_access import (
+    data_access_fetch_match_high_water_marks,
     data_access_set_max_mmr,
     data_access_set_r6_tracker_id,
     fetch_user_info_by_user_id,
     get_active_user_info,
     insert_if_nonexistant_full_match_info,
+    insert_if_nonexistant_full_match_info_for_users,
     insert_if_nonexistant_full_user_info,
+    insert_if_nonexistant_full_user_info_for_users,
 )
 from deps.data_access_data_class import UserInfo
 from deps.operator_stats_data_access import upsert_operator_stats
+from deps.analytic_player_value_functions import update_player_values_for_users
 from deps.data_access import (
     data_access_add_list_member_stats,
+    data_access_claim_due_member_stats,
     data_access_get_bot_voice_first_user,
     data_access_get_channel,
     data_access_get_daily_message_id,
@@ -39,7 +43,6 @@ from deps.data_access import (
     data_access_get_guild_username_text_channel_id,
     data_access_get_guild_voice_channel_ids,
     data_access_get_last_bot_message_in_main_text_channel,
-    data_access_get_list_member_stats,
     data_access_get_main_text_channel_id,
     data_access_get_member,
     data_access_get_message,
@@ -68,6 +71,7 @@ from deps.models import (
     UserWithUserInformation,
     UserWithUserMatchInfo,
 )
+from deps.database_gateway import database_gateway
 from deps.log import print_error_log, print_log, print_warning_log
 from deps.functions_model import get_empty_votes
 from deps.functions_date import get_current_hour_eastern, is_today
@@ -324,45 +328,39 @@ async def send_notification_voice_channel(
     # )
     channel_schedule: Optional[discord.TextChannel] = await data_access_get_channel(schedule_text_channel_id)
     channel_name = channel_schedule.name if channel_schedule is not None else "schedule"
+    # The announcement is made of fragments cached separately: the greeting of a member and the
+    # channel hint of a guild are synthesized once and replayed on every later announcement
+    text_fragments = [f"Hello {member.display_name}!"]
     list_simple_users = await get_users_scheduled_today_current_hour(guild_id, get_current_hour_eastern())
     list_simple_users = list(filter(lambda x: x.user_id != member.id, list_simple_users))
     if len(list_simple_users) > 0:
         other_members = ", ".join([f"{user.display_name}" for user in list_simple_users])
-        text_message = f"Hello {member.display_name}! {other_members} are scheduled to play at this time. Check the bot {channel_name} channel."
+        text_fragments.append(f"{other_members} are scheduled to play at this time.")
+        text_fragments.append(f"Check the bot {channel_name} channel.")
     else:
         # Check next hour
         list_simple_users = await get_users_scheduled_today_current_hour(guild_id, get_current_hour_eastern(1))
         list_simple_users = list(filter(lambda x: x.user_id != member.id, list_simple_users))
         if len(list_simple_users) > 0:
             other_members = ", ".join([f"{user.display_name}" for user in list_simple_users])
-            text_message = f"Hello {member.display_name}! {other_members} are scheduled to play in the upcoming hour. Check the bot {channel_name} channel."
+            text_fragments.append(f"{other_members} are scheduled to play in the upcoming hour.")
+            text_fragments.append(f"Check the bot {channel_name} channel.")
         else:
-            text_message = f"Hello {member.display_name}! Use the slash lfg command in the rainbow six siege channel to find partners and check the {channel_name} channel."
+            text_fragments.append(
+                f"Use the slash lfg command in the rainbow six siege channel to find partners and check the {channel_name} channel."
+            )
 
     print_log(f"Sending voice message to {member.display_name}")
-    temp_audio_path: str | None = None
-    try:
-        with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as temp_audio_file:
-            temp_audio_path = temp_audio_file.name
-        await asyncio.to_thread(gTTS(text_message, lang="en").save, temp_audio_path)
-
+    # Every clip is ready before connecting so the playback starts right away
+    async with hold_tts_clips(text_fragments) as clips:
         # Connect to the voice channel
         if member.guild.voice_client is None:  # Bot isn't already in a channel
             voice_client: discord.VoiceClient = await voice_channel.connect()
-
-            # Play the audio
-            audio_source = discord.FFmpegPCMAudio(temp_audio_path)
-            voice_client.play(audio_source)
-
-            # Wait for the audio to finish playing
-            while voice_client.is_playing():
-                await asyncio.sleep(1)
-
-            # Disconnect after playing the audio
-            await voice_client.disconnect()
-    finally:
-        if temp_audio_path is not None and os.path.exists(temp_audio_path):
-            os.remove(temp_audio_path)
+            try:
+                await play_tts_clips(voice_client, clips)
+            finally:
+                # Disconnect after playing the audio
+                await voice_client.disconnect()
 
 
 async def get_users_scheduled_today_current_hour(guild_id: int, current_hour_str: str) -> List[SimpleUser]:
@@ -460,10 +458,10 @@ async def sync_member_current_rank_role(
 
 
 async def fetch_current_season_rank_for_account(
-    ubisoft_active_account: str, force_fetch: bool = True
+    ubisoft_active_account: str, force_fetch: bool = True, priority: ScrapePriority = ScrapePriority.INTERACTIVE
 ) -> tuple[str, int]:
     """Fetch the active account's current season rank without changing Discord roles."""
-    return await data_access_get_r6tracker_current_season_rank(ubisoft_active_account, force_fetch)
+    return await data_access_get_r6tracker_current_season_rank(ubisoft_active_account, force_fetch, priority)
 
 
 async def set_member_role_from_current_rank(
@@ -657,40 +655,28 @@ async def post_queued_user_stats(check_time_delay: bool = True) -> None:
     The function relies on opening a browser once and get all the users
     from the queue to get their stats at the same time
     """
-    # Get all the user waiting even if it's not the time yet (might just got added but the task kicked in)
-    list_users: Optional[List[UserQueueForStats]] = await data_access_get_list_member_stats()
-    list_users = list_users if list_users is not None else []  # Avoid None
-    # print_log(f"post_queued_user_stats: {len(list_users)} users in the queue before delta time")
-
-    if check_time_delay:
-        # Filter the list for only user who it's been at least 2 minutes since added to the queue
-        # This is to avoid getting the stats too early and miss the last match
-        current_time = datetime.now(timezone.utc)
-        delta = current_time - timedelta(minutes=2)
-        users = [
-            user_in_list for user_in_list in list_users if user_in_list.time_queue < delta
-        ]  # Keep user that has been there for -infinity to -2 minutes
-
-        if len(users) == 0:
-            # print_log("post_queued_user_stats: 0 user in the queue after delta time")
-            return
-        # print_log(f"post_queued_user_stats: {len(users)} users in the queue after delta time")
-    else:
-        users = list_users
-
+    # The delayed queue only takes the users who left at least 2 minutes ago, to avoid getting the stats
+    # too early and miss the last match. A direct request (mod command) takes everyone in the queue.
+    users: List[UserQueueForStats] = await data_access_claim_due_member_stats(due_only=check_time_delay)
     if len(users) == 0:
         return
 
     # Accumulate all the stats for all the users before posting them
-    all_users_matches = await download_full_matches_async(users)
+    # A direct request (mod command) is interactive, the delayed queue is post-session
+    priority = ScrapePriority.POST_SESSION if check_time_delay else ScrapePriority.INTERACTIVE
+    all_users_matches = await download_full_matches_async(users, priority=priority)
 
-    # Post to the channel the stats for the users who disconnected
-    for user_stats in all_users_matches:
-        # Persist the data into the database
-        try:
-            insert_if_nonexistant_full_match_info(user_stats.user_request_stats.user_info, user_stats.match_stats)
-        except Exception as e:
-            print_error_log(f"post_queued_user_stats: Error persisting the data: {e}")
+    # Persist the data of all the users into the database in one transaction
+    await save_full_matches_of_users(all_users_matches, "post_queued_user_stats")
+    try:
+        # Apply the new matches to the player values used by the team balancing, off the event loop: a user
+        # without a stored state replays the whole match history
+        await database_gateway.write(
+            update_player_values_for_users,
+            [user_stats.user_request_stats.user_info.id for user_stats in all_users_matches if user_stats.match_stats],
+        )
+    except Exception as e:
+        print_error_log(f"post_queued_user_stats: Error updating the player values: {e}")
     try:
         # Reuse the just-fetched match history for delayed market resolution.
         # This keeps the normal leave-voice path to one R6 Tracker fetch.
@@ -819,15 +805,16 @@ def add_star_if_above_value(value: int, threshold: int = 0) -> str:
     return f"{value}{'⭐' if value > threshold else ''}"
 
 
-async def send_automatic_lfg_message(bot: MyBot, guild_id: int, voice_channel_id: int) -> None:
+async def send_automatic_lfg_message(bot: MyBot, guild_id: int, voice_channel_id: int) -> bool:
     """
     Send a message to the main text channel about looking for group to play
+    Returns False when the voice channel users could not be evaluated (missing channel, recent message or error)
     """
 
     dict_users: Mapping[int, ActivityTransition] = await data_access_get_voice_user_list(guild_id, voice_channel_id)
     if dict_users is None:
         # No user, nothing to do
-        return
+        return True
 
     # Get the text channel to send the message
     text_channel_main_siege_id = await data_access_get_main_text_channel_id(guild_id)
@@ -835,13 +822,13 @@ async def send_automatic_lfg_message(bot: MyBot, guild_id: int, voice_channel_id
         print_warning_log(
             f"send_automatic_lfg_message: Main Siege text channel id not set for guild id {guild_id}. Skipping."
         )
-        return
+        return False
     channel = await data_access_get_channel(text_channel_main_siege_id)
     if not channel:
         print_warning_log(
             f"send_automatic_lfg_message: Main Siege text channel not found for guild id {guild_id}. Skipping."
         )
-        return
+        return False
 
     # Commented because the dict_users might not have all users since the activity is optional in Discord. Better do the rule about the user count using the vc_channel.members (we sdo it below)
     # Check the number of users in the voice channel
@@ -862,7 +849,7 @@ async def send_automatic_lfg_message(bot: MyBot, guild_id: int, voice_channel_id
         delta = current_time - last_message_time
         # To avoid spamming, we allow only one message every x minutes maximum
         if delta < timedelta(minutes=15):
-            return
+            return False
 
     # Get current voice channel information
     vc_channel = await data_access_get_channel(voice_channel_id)
@@ -870,14 +857,14 @@ async def send_automatic_lfg_message(bot: MyBot, guild_id: int, voice_channel_id
         print_warning_log(
             f"""send_automatic_lfg_message: Voice channel {voice_channel_id} not found for guild id {guild_id} . Skipping."""
         )
-        return
+        return False
     # Redundant check since we checked with the data_access_get_voice_user_list but we want to be sure
     user_count_vc = len(vc_channel.members)
     if user_count_vc >= 5:
         # print_log(
         #     f"send_automatic_lfg_message: {user_count_vc} users in the voice channel, no need to send the message."
         # )
-        return
+        return True
     needed_user = 5 - user_count_vc
     # At this point, we have 1 to 4 users in the voice channel, we still miss few to get 5
     try:
@@ -901,7 +888,8 @@ async def send_automatic_lfg_message(bot: MyBot, guild_id: int, voice_channel_id
             data_access_set_last_bot_message_in_main_text_channel(guild_id, voice_channel_id, current_time)
     except Exception as e:
         print_error_log(f"send_automatic_lfg_message: Error sending the message: {e}")
-        return
+        return False
+    return True
 
 
 async def get_currently_connected_user_ids(bot: MyBot) -> set[int]:
@@ -928,6 +916,59 @@ async def get_currently_connected_user_ids(bot: MyBot) -> set[int]:
     return connected_user_ids
 
 
+UserDataT = TypeVar("UserDataT")
+
+
+async def save_users_with_fallback(
+    users_data: List[tuple[UserInfo, UserDataT]],
+    save_all: Callable[[List[tuple[UserInfo, UserDataT]]], Any],
+    save_one: Callable[[UserInfo, UserDataT], Any],
+    what: str,
+    caller: str,
+) -> List[UserInfo]:
+    """
+    Save the data of all the users in one transaction on the database writer thread.
+    One bad row rolls back every user: if it fails, save each user in its own transaction to only skip that user.
+    Return the users whose data was saved
+    """
+    try:
+        await database_gateway.write(save_all, users_data)
+        return [user_info for user_info, _ in users_data]
+    except Exception as e:
+        print_error_log(f"{caller}: Error saving the {what} of all the users, saving them one by one: {e}")
+    saved_users: List[UserInfo] = []
+    for user_info, data in users_data:
+        try:
+            await database_gateway.write(save_one, user_info, data)
+        except Exception as e:
+            print_error_log(f"{caller}: Error saving the {what} of {user_info.display_name}: {e}")
+            continue
+        saved_users.append(user_info)
+    return saved_users
+
+
+async def save_full_matches_of_users(
+    all_users_matches: List[UserWithUserMatchInfo], caller: str
+) -> List[UserWithUserMatchInfo]:
+    """Save the matches of the users, return the users whose matches were saved"""
+    saved_users = await save_users_with_fallback(
+        [
+            (user_and_matches.user_request_stats.user_info, user_and_matches.match_stats)
+            for user_and_matches in all_users_matches
+        ],
+        insert_if_nonexistant_full_match_info_for_users,
+        insert_if_nonexistant_full_match_info,
+        "match info",
+        caller,
+    )
+    saved_user_ids = {user_info.id for user_info in saved_users}
+    return [
+        user_and_matches
+        for user_and_matches in all_users_matches
+        if user_and_matches.user_request_stats.user_info.id in saved_user_ids
+    ]
+
+
 async def persist_siege_matches_cross_guilds(
     from_time: datetime, to_time: datetime, bot: Optional[MyBot] = None
 ) -> None:
@@ -963,29 +1004,36 @@ async def persist_siege_matches_cross_guilds(
     )
     print_log(f"persist_siege_matches_cross_guilds: Users: {[user.display_name for user in users]}")
     users_stats: List[UserQueueForStats] = [UserQueueForStats(user, 0, from_time) for user in users]
-    # Before the loop, start the browser and do a request to the R6 tracker to get the cookies
-    # Then, in the loop, use the cookies to get the stats using the API
-    all_users_matches = await download_full_matches_async(users_stats)
+    # Only the matches newer than the stored ones are downloaded, parsed and inserted
+    high_water_marks = data_access_fetch_match_high_water_marks([user.id for user in users])
+    all_users_matches = await download_full_matches_async(users_stats, high_water_marks)
 
     # Persist the match info in the database
     # Persist the r6 tracker UUID in the user profile table if available
 
-    # Use the matches that we downloaded
-    for user_and_matches in all_users_matches:
-        # Save the matches in the database
+    # Save the matches we downloaded in the database, all the users in one transaction
+    saved_users_matches = await save_full_matches_of_users(all_users_matches, "persist_siege_matches_cross_guilds")
+    try:
+        # Apply the new matches to the player values used by the team balancing, off the event loop
+        await database_gateway.write(
+            update_player_values_for_users,
+            [
+                user_and_matches.user_request_stats.user_info.id
+                for user_and_matches in saved_users_matches
+                if user_and_matches.match_stats
+            ],
+        )
+    except Exception as e:
+        print_error_log(f"persist_siege_matches_cross_guilds: Error updating the player values: {e}")
+
+    for user_and_matches in saved_users_matches:
         user_info = user_and_matches.user_request_stats.user_info
         match_stats = user_and_matches.match_stats
-        try:
-            insert_if_nonexistant_full_match_info(user_info, match_stats)
-        except Exception as e:
-            print_error_log(f"persist_siege_matches_cross_guilds: Error saving the match info: {e}")
-            continue
-
         # Add r6 tracker UUID to the user profile table if available
         if user_info.r6_tracker_active_id is None and len(match_stats) > 0:
             # Update user with the R6 tracker if if it wasn't available before
             r6_id = match_stats[0].r6_tracker_user_uuid
-            data_access_set_r6_tracker_id(user_info.id, r6_id)
+            await database_gateway.write(data_access_set_r6_tracker_id, user_info.id, r6_id)
 
 
 async def get_active_user_info_with_connected_voice(
@@ -1015,6 +1063,7 @@ async def refresh_current_rank_roles_cross_guilds(
     bot: MyBot,
     guild: Optional[discord.Guild] = None,
     include_connected_voice: bool = True,
+    priority: ScrapePriority = ScrapePriority.PERIODIC,
 ) -> RankRefreshSummary:
     """Refresh current-season rank roles for users who played, optionally including users in voice."""
     users = await get_active_user_info_with_connected_voice(
@@ -1027,10 +1076,11 @@ async def refresh_current_rank_roles_cross_guilds(
     summary = RankRefreshSummary(candidates=len(users))
     guilds_to_refresh = [guild] if guild is not None else bot.guilds
 
-    # Warm the rank cache with one browser session for everyone instead of one
-    # browser per user, which starves the stats queue of the shared browser lock
+    # Warm the rank cache through the scrape scheduler for everyone at once: the more urgent
+    # scrapes (stats queue, commands) keep going first between two users
     await data_access_prefetch_r6tracker_current_season_ranks(
-        [user.ubisoft_username_active for user in users if user.ubisoft_username_active is not None]
+        [user.ubisoft_username_active for user in users if user.ubisoft_username_active is not None],
+        priority=priority,
     )
 
     for user_info in users:
@@ -1041,6 +1091,7 @@ async def refresh_current_rank_roles_cross_guilds(
             current_rank, _ = await fetch_current_season_rank_for_account(
                 user_info.ubisoft_username_active,
                 force_fetch=False,
+                priority=priority,
             )
         except Exception as e:
             print_error_log(
@@ -1135,41 +1186,49 @@ async def persist_matches_and_refresh_rank_roles(bot: MyBot, hours: int) -> None
     """Persist Siege matches and refresh current-season rank roles for the last N hours."""
     now_utc = datetime.now(timezone.utc)
     begin_time = now_utc - timedelta(hours=hours)
-    await persist_siege_matches_cross_guilds(begin_time, now_utc, bot)
-    await refresh_current_rank_roles_cross_guilds(begin_time, now_utc, bot)
+    # Queued together, the scrape scheduler fetches the matches and the rank of a user in the same visit
+    await asyncio.gather(
+        persist_siege_matches_cross_guilds(begin_time, now_utc, bot),
+        refresh_current_rank_roles_cross_guilds(begin_time, now_utc, bot),
+    )
 
 
 async def fetch_and_persist_operator_stats(users: List[UserInfo]) -> None:
     """
     Fetch and persist operator statistics for all active users.
-    Uses BrowserContextManager to fetch data with proper cookies and rate limiting.
+    Uses a pooled browser to fetch data with proper cookies and rate limiting.
 
     Args:
         users: List of UserInfo objects with r6_tracker_active_id
     """
     print_log(f"fetch_and_persist_operator_stats: Starting collection for {len(users)} users")
 
-    # Download operator stats using BrowserContextManager (with built-in rate limiting)
-    all_operator_data = await download_operator_stats_for_users_async(users)
+    # Download operator stats through the scrape scheduler, behind any more urgent scrape
+    all_operator_data = await download_operator_stats_for_users_async(users, ScrapePriority.BULK)
 
-    # Parse and store the data
+    # Parse the data of every user, then store all of it in one transaction
+    operator_stats_by_user: List[tuple[UserInfo, List[Dict[str, Any]]]] = []
     for user, operator_data in all_operator_data:
         try:
-            # Parse the operator stats
             operator_stats = parse_operator_stats_from_json(operator_data, user.id)
-
-            if operator_stats:
-                # Store in database
-                upsert_operator_stats(operator_stats)
-                print_log(
-                    f"fetch_and_persist_operator_stats: Saved {len(operator_stats)} operator stats for {user.display_name}"
-                )
-            else:
-                print_log(f"fetch_and_persist_operator_stats: No operator stats found for {user.display_name}")
-
         except Exception as e:
             print_error_log(f"fetch_and_persist_operator_stats: Error processing stats for {user.display_name}: {e}")
             continue
+        if operator_stats:
+            operator_stats_by_user.append((user, operator_stats))
+            print_log(
+                f"fetch_and_persist_operator_stats: Parsed {len(operator_stats)} operator stats for {user.display_name}"
+            )
+        else:
+            print_log(f"fetch_and_persist_operator_stats: No operator stats found for {user.display_name}")
+
+    await save_users_with_fallback(
+        operator_stats_by_user,
+        lambda users_stats: upsert_operator_stats([row for _, user_stats in users_stats for row in user_stats]),
+        lambda _user, user_stats: upsert_operator_stats(user_stats),
+        "operator stats",
+        "fetch_and_persist_operator_stats",
+    )
 
     print_log(f"fetch_and_persist_operator_stats: Completed collection for {len(all_operator_data)} users")
 
@@ -1182,24 +1241,24 @@ async def persist_user_full_information_cross_guilds(from_time: datetime, to_tim
     # Get the list of user who were active between the time
     users: List[UserInfo] = get_active_user_info(from_time, to_time)
     users_stats: List[UserQueueForStats] = [UserQueueForStats(user, 0, from_time) for user in users]
-    # Before the loop, start the browser and do a request to the R6 tracker to get the cookies
-    # Then, in the loop, use the cookies to get the stats using the API
-    all_users = await download_full_user_information_async(users_stats)
-
-    # Persist the full user information in the database
-    for full_user_stats_info in all_users:
-        # Save the matches in the database
-        try:
-            insert_if_nonexistant_full_user_info(
-                full_user_stats_info.user_request_stats.user_info, full_user_stats_info.full_stats
-            )
-        except Exception as e:
-            print_error_log(f"persist_user_full_information_cross_guilds: Error saving the user full stats info: {e}")
-            continue
-
-    # Fetch and persist operator statistics for all active users
+    # Queue the operator stats with the user information so both are fetched in the same visit
     print_log("persist_user_full_information_cross_guilds: Starting operator stats collection...")
-    await fetch_and_persist_operator_stats(users)
+    operator_stats_task = asyncio.create_task(fetch_and_persist_operator_stats(users))
+    all_users = await download_full_user_information_async(users_stats, ScrapePriority.BULK)
+
+    # Persist the full user information of all the users in the database in one transaction
+    await save_users_with_fallback(
+        [
+            (full_user_stats_info.user_request_stats.user_info, full_user_stats_info.full_stats)
+            for full_user_stats_info in all_users
+        ],
+        insert_if_nonexistant_full_user_info_for_users,
+        insert_if_nonexistant_full_user_info,
+        "user full stats info",
+        "persist_user_full_information_cross_guilds",
+    )
+
+    await operator_stats_task
 
 
 async def move_members_between_voice_channel(
@@ -1,10 +1,7 @@
 """Browser manipulation functions"""
 
-import asyncio
-import random
-import time
-from typing import Any, List, Union
-from deps.browser_context_manager import BrowserContextManager
+from typing import Any, List, Optional, Union
+from deps.browser_pool import browser_pool
 from deps.browser_exceptions import (
     BrowserException,
     BrowserLockContentionException,
@@ -13,7 +10,9 @@ from deps.browser_exceptions import (
     CircuitBreakerOpenException,
 )
 from deps.data_access_data_class import UserInfo
+from deps.database_gateway import database_gateway
 from deps.models import (
+    MatchHighWaterMark,
     UserFullMatchStats,
     UserInformation,
     UserQueueForStats,
@@ -21,25 +20,41 @@ from deps.models import (
     UserWithUserMatchInfo,
 )
 from deps.log import print_error_log, print_log, print_warning_log
+from deps.scrape_scheduler import ScrapePriority, scrape_scheduler
+from deps.scraper_rate_limiter import scraper_rate_limiter
 
 
-def download_full_matches(users_queued: List[UserQueueForStats]) -> List[UserWithUserMatchInfo]:
+async def save_scraper_rate_limiter(caller: str) -> None:
+    """Log the scraping pace of the batch and keep the learned intervals for the next run"""
+    if not scraper_rate_limiter.has_requests():
+        return  # The scraping runs in scraper_worker.py, which saves its own intervals
+    scraper_rate_limiter.log_stats(caller)
+    try:
+        await database_gateway.write(scraper_rate_limiter.save)
+    except Exception as e:
+        print_warning_log(f"{caller}: Unable to save the scraper rate limiter: {e}")
+
+
+def download_full_matches(
+    users_queued: List[UserQueueForStats], high_water_marks: Optional[dict[int, MatchHighWaterMark]] = None
+) -> List[UserWithUserMatchInfo]:
     """
     Download the maximum information for matches with the goal to persist the data into the database
+    With the high water marks (by user id), only the matches newer than the stored ones are returned.
     """
+    high_water_marks = high_water_marks or {}
     all_users_matches: List[UserWithUserMatchInfo] = []
-    # Before the loop, start the browser and do a request to the R6 tracker to get the cookies
+    # Before the loop, lease a warm browser that already visited the R6 tracker to get the cookies
     # Then, in the loop, use the cookies to get the stats using the API
     try:
-        with BrowserContextManager() as context:
+        with browser_pool.lease() as context:
             for user_queue in users_queued:
                 try:
-                    matches: List[UserFullMatchStats] = context.download_full_matches(user_queue)
+                    matches: List[UserFullMatchStats] = context.download_full_matches(
+                        user_queue, high_water_marks.get(user_queue.user_info.id)
+                    )
                     all_users_matches.append(UserWithUserMatchInfo(user_queue, matches))
 
-                    if len(users_queued) > 1:
-                        time.sleep(random.uniform(3, 12))  # Sleep few seconds between each request
-
                 except BrowserTimeoutException as e:
                     # Timeout for individual user - log and continue with next user
                     print_error_log(
@@ -53,8 +68,8 @@ def download_full_matches(users_queued: List[UserQueueForStats]) -> List[UserWit
                     )
                     continue  # Skip to the next user
     except BrowserLockContentionException as e:
-        # Browser busy with another task - users stay queued and retry next cycle
-        print_warning_log(f"download_full_matches: Browser lock busy, will retry next cycle: {e}")
+        # Every pooled browser busy with another task - users stay queued and retry next cycle
+        print_warning_log(f"download_full_matches: Browser pool busy, will retry next cycle: {e}")
     except CircuitBreakerOpenException as e:
         # Circuit breaker open - abort all remaining users
         print_error_log(f"download_full_matches: Circuit breaker open, aborting: {e}")
@@ -66,14 +81,19 @@ def download_full_matches(users_queued: List[UserQueueForStats]) -> List[UserWit
     return all_users_matches
 
 
-async def download_full_matches_async(users_queue_stats: List[UserQueueForStats]) -> List[UserWithUserMatchInfo]:
+async def download_full_matches_async(
+    users_queue_stats: List[UserQueueForStats],
+    high_water_marks: Optional[dict[int, MatchHighWaterMark]] = None,
+    priority: ScrapePriority = ScrapePriority.PERIODIC,
+) -> List[UserWithUserMatchInfo]:
     """
-    Run the blocking download_full_matches in another thread and perform a post-processing task
-    in the main thread after completion.
+    Queue the match downloads in the scrape scheduler, one job per user, and wait for all of them
+    With the high water marks (by user id), only the matches newer than the stored ones are returned.
     """
     try:
-        # Offload the blocking task to a thread
-        return await asyncio.to_thread(download_full_matches, users_queue_stats)
+        results = await scrape_scheduler.fetch_matches(users_queue_stats, priority, high_water_marks)
+        await save_scraper_rate_limiter("download_full_matches_async")
+        return results
     except Exception as e:
         print_error_log(f"download_full_matches_async: Error during match download: {e}")
         return []
@@ -84,10 +104,10 @@ def download_full_user_information(users_queued: List[UserQueueForStats]) -> Lis
     Download the maximum information for user with the goal to persist the data into the database
     """
     all_user_stats: List[UserWithUserInformation] = []
-    # Before the loop, start the browser and do a request to the R6 tracker to get the cookies
+    # Before the loop, lease a warm browser that already visited the R6 tracker to get the cookies
     # Then, in the loop, use the cookies to get the stats using the API
     try:
-        with BrowserContextManager() as context:
+        with browser_pool.lease() as context:
             for user_queue in users_queued:
                 try:
                     user_info: Union[UserInformation, None] = context.download_full_user_information(user_queue)
@@ -98,9 +118,6 @@ def download_full_user_information(users_queued: List[UserQueueForStats]) -> Lis
                         continue
                     all_user_stats.append(UserWithUserInformation(user_queue, user_info))
 
-                    if len(users_queued) > 1:
-                        time.sleep(random.uniform(3, 12))  # Sleep few seconds between each request
-
                 except BrowserTimeoutException as e:
                     # Timeout for individual user - log and continue with next user
                     print_error_log(
@@ -114,8 +131,8 @@ def download_full_user_information(users_queued: List[UserQueueForStats]) -> Lis
                     )
                     continue  # Skip to the next user
     except BrowserLockContentionException as e:
-        # Browser busy with another task - callers can retry on their next cycle
-        print_warning_log(f"download_full_user_information: Browser lock busy, will retry next cycle: {e}")
+        # Every pooled browser busy with another task - callers can retry on their next cycle
+        print_warning_log(f"download_full_user_information: Browser pool busy, will retry next cycle: {e}")
     except CircuitBreakerOpenException as e:
         # Circuit breaker open - abort all remaining users
         print_error_log(f"download_full_user_information: Circuit breaker open, aborting: {e}")
@@ -129,14 +146,15 @@ def download_full_user_information(users_queued: List[UserQueueForStats]) -> Lis
 
 async def download_full_user_information_async(
     users_queue_stats: List[UserQueueForStats],
+    priority: ScrapePriority = ScrapePriority.BULK,
 ) -> List[UserWithUserInformation]:
     """
-    Run the blocking download_full_user_information in another thread and perform a post-processing task
-    in the main thread after completion.
+    Queue the user information downloads in the scrape scheduler, one job per user, and wait for all of them
     """
     try:
-        # Offload the blocking task to a thread
-        return await asyncio.to_thread(download_full_user_information, users_queue_stats)
+        results = await scrape_scheduler.fetch_user_information(users_queue_stats, priority)
+        await save_scraper_rate_limiter("download_full_user_information_async")
+        return results
     except Exception as e:
         print_error_log(f"download_full_user_information_async: Error during match download: {e}")
         return []
@@ -146,14 +164,14 @@ def download_operator_stats_for_users(
     users: List[UserInfo],
 ) -> List[tuple[UserInfo, dict[str, Any]]]:
     """
-    Download operator statistics for a list of users using BrowserContextManager.
+    Download operator statistics for a list of users with a browser leased from the pool.
     Returns list of tuples: (UserInfo, operator_stats_data)
     """
     all_operator_stats = []
 
     try:
-        with BrowserContextManager() as context:
-            for i, user in enumerate(users):
+        with browser_pool.lease() as context:
+            for user in users:
                 try:
                     # Skip users without R6 Tracker ID
                     if not user.r6_tracker_active_id:
@@ -169,14 +187,6 @@ def download_operator_stats_for_users(
                     else:
                         print_log(f"download_operator_stats_for_users: No stats found for {user.display_name}")
 
-                    # Rate limiting: sleep between requests (except for the last one)
-                    if i < len(users) - 1:
-                        sleep_time = random.uniform(8, 12)  # Random 8-12 seconds to avoid rate limiting
-                        print_log(
-                            f"download_operator_stats_for_users: Waiting {sleep_time:.1f} seconds before next request..."
-                        )
-                        time.sleep(sleep_time)
-
                 except BrowserTimeoutException as e:
                     # Timeout for individual user - log and continue with next user
                     print_error_log(
@@ -191,8 +201,8 @@ def download_operator_stats_for_users(
                     continue
 
     except BrowserLockContentionException as e:
-        # Browser busy with another task - callers can retry on their next cycle
-        print_warning_log(f"download_operator_stats_for_users: Browser lock busy, will retry next cycle: {e}")
+        # Every pooled browser busy with another task - callers can retry on their next cycle
+        print_warning_log(f"download_operator_stats_for_users: Browser pool busy, will retry next cycle: {e}")
     except CircuitBreakerOpenException as e:
         # Circuit breaker open - abort all remaining users
         print_error_log(f"download_operator_stats_for_users: Circuit breaker open, aborting: {e}")
@@ -207,13 +217,15 @@ def download_operator_stats_for_users(
 
 async def download_operator_stats_for_users_async(
     users: List[UserInfo],
+    priority: ScrapePriority = ScrapePriority.BULK,
 ) -> List[tuple[UserInfo, dict[str, Any]]]:
     """
-    Run the blocking download_operator_stats_for_users in another thread.
+    Queue the operator stats downloads in the scrape scheduler, one job per user, and wait for all of them
     """
     try:
-        # Offload the blocking task to a thread
-        return await asyncio.to_thread(download_operator_stats_for_users, users)
+        results = await scrape_scheduler.fetch_operator_stats(users, priority)
+        await save_scraper_rate_limiter("download_operator_stats_for_users_async")
+        return results
     except Exception as e:
         print_error_log(f"download_operator_stats_for_users_async: Error during operator stats download: {e}")
         return []
@@ -33,6 +33,16 @@ class BrowserConfig:
     fd_warning_threshold_percent: float = 80.0
     fd_info_threshold_percent: float = 50.0
 
+    # Warm browser pool settings
+    pool_size: int = 1
+    pool_max_requests_per_browser: int = 200
+    pool_max_browser_age_seconds: float = 1800.0
+    pool_idle_timeout_seconds: float = 600.0
+    pool_lease_timeout_seconds: float = 120.0
+
+    # Incremental match fetch: pages followed while every match is newer than the stored ones
+    match_fetch_max_pages: int = 3
+
     @classmethod
     def from_environment(cls) -> "BrowserConfig":
         """Create config from environment variables, falling back to defaults"""
@@ -58,4 +68,12 @@ class BrowserConfig:
             # File descriptor thresholds
             fd_warning_threshold_percent=float(os.getenv("BROWSER_FD_WARNING_THRESHOLD", "80.0")),
             fd_info_threshold_percent=float(os.getenv("BROWSER_FD_INFO_THRESHOLD", "50.0")),
+            # Warm browser pool settings
+            pool_size=int(os.getenv("BROWSER_POOL_SIZE", "1")),
+            pool_max_requests_per_browser=int(os.getenv("BROWSER_POOL_MAX_REQUESTS", "200")),
+            pool_max_browser_age_seconds=float(os.getenv("BROWSER_POOL_MAX_AGE", "1800.0")),
+            pool_idle_timeout_seconds=float(os.getenv("BROWSER_POOL_IDLE_TIMEOUT", "600.0")),
+            pool_lease_timeout_seconds=float(os.getenv("BROWSER_POOL_LEASE_TIMEOUT", "120.0")),
+            # Incremental match fetch
+            match_fetch_max_pages=int(os.getenv("BROWSER_MATCH_MAX_PAGES", "3")),
         )
@@ -1,5 +1,6 @@
 """Browser Context Manager to handle the browser and download the matches from the Ubisoft API"""
 
+import glob
 import json
 import os
 import random
@@ -19,9 +20,11 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException
 import undetected_chromedriver as uc  # type: ignore
 from bs4 import BeautifulSoup
-from deps.models import UserFullMatchStats, UserInformation, UserQueueForStats
+from deps.models import MatchHighWaterMark, UserFullMatchStats, UserInformation, UserQueueForStats
 from deps.log import print_error_log, print_log, print_warning_log
 from deps.functions_r6_tracker import (
+    get_new_matches,
+    parse_full_matches,
     parse_json_current_season_rank,
     parse_json_from_full_matches,
     parse_json_max_rank,
@@ -37,17 +40,94 @@ from deps.browser_config import BrowserConfig
 from deps.browser_exceptions import (
     BrowserException,
     BrowserLockContentionException,
+    BrowserRateLimitedException,
     BrowserStartupException,
     BrowserTimeoutException,
     BrowserVersionMismatchException,
     CircuitBreakerOpenException,
 )
 from deps.browser_circuit_breaker import BrowserCircuitBreaker
+from deps.scraper_rate_limiter import (
+    ENDPOINT_MATCHES,
+    ENDPOINT_OPERATORS,
+    ENDPOINT_PROFILE,
+    is_throttled_page,
+    scraper_rate_limiter,
+)
 
 CHROMIUM_LOCK = FileLock("/tmp/chromium.lock")
+CHROME_PROFILE_ROOT = "/tmp"
+# chrome_profile_<pid of the bot or worker process>_<random>: the orphan cleanup knows whose browser it is
+CHROME_PROFILE_PREFIX = "chrome_profile_"
+LEGACY_PROFILE_MAX_AGE_SECONDS = 3600
 # Shared circuit breaker across all BrowserContextManager instances
 _CIRCUIT_BREAKER: Optional[BrowserCircuitBreaker] = None
 
+
+def get_shared_circuit_breaker(config: BrowserConfig) -> BrowserCircuitBreaker:
+    """Return the circuit breaker shared by every browser, created on first use"""
+    global _CIRCUIT_BREAKER  # pylint: disable=global-statement
+    if _CIRCUIT_BREAKER is None:
+        _CIRCUIT_BREAKER = BrowserCircuitBreaker(
+            failure_threshold=config.circuit_breaker_failure_threshold,
+            success_threshold=config.circuit_breaker_success_threshold,
+            timeout_seconds=config.circuit_breaker_timeout_seconds,
+        )
+    return _CIRCUIT_BREAKER
+
+
+def get_profile_owner_pid(profile_dir: str) -> Optional[int]:
+    """The pid of the process that started the browser of the profile, None for the profiles without it"""
+    match = re.fullmatch(rf"{CHROME_PROFILE_PREFIX}(\d+)_.+", os.path.basename(profile_dir))
+    return int(match.group(1)) if match else None
+
+
+def _profile_pids_path(profile_dir: str) -> str:
+    return f"{profile_dir}.pids"
+
+
+def kill_orphaned_browsers(profile_root: str = CHROME_PROFILE_ROOT) -> int:
+    """
+    Kill the Chrome and chromedriver processes whose owner process died, and delete their profile.
+    The browsers of the running bot, scraper workers and scripts are left alone: only the profiles of a dead
+    owner are cleaned. Return the number of processes killed.
+    """
+    killed = 0
+    for profile_dir in glob.glob(os.path.join(profile_root, f"{CHROME_PROFILE_PREFIX}*")):
+        if not os.path.isdir(profile_dir):
+            continue
+        owner_pid = get_profile_owner_pid(profile_dir)
+        if owner_pid is None:
+            # Profile of a version that did not record its owner: only removed once old, like before
+            if time.time() - os.path.getmtime(profile_dir) > LEGACY_PROFILE_MAX_AGE_SECONDS:
+                shutil.rmtree(profile_dir, ignore_errors=True)
+            continue
+        if psutil.pid_exists(owner_pid):
+            continue
+        pids: set[int] = set()
+        try:
+            with open(_profile_pids_path(profile_dir), "r", encoding="utf-8") as pids_file:
+                pids.update(int(line) for line in pids_file.read().split())
+        except (OSError, ValueError):
+            pass
+        user_data_dir_argument = f"--user-data-dir={profile_dir}"
+        for process in psutil.process_iter(["pid", "cmdline"]):
+            try:
+                cmdline = process.info["cmdline"] or []
+                # The recorded chromedriver and Chrome, and every Chrome child using the profile. A recorded pid
+                # reused by another program is not a chrome process and is skipped
+                is_recorded = process.info["pid"] in pids and any("chrom" in part for part in cmdline)
+                if is_recorded or user_data_dir_argument in cmdline:
+                    process.kill()
+                    killed += 1
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        shutil.rmtree(profile_dir, ignore_errors=True)
+        if os.path.exists(_profile_pids_path(profile_dir)):
+            os.remove(_profile_pids_path(profile_dir))
+    return killed
+
+
 _CHROME_BINARY_CANDIDATES = (
     "/usr/bin/google-chrome-stable",
     "/usr/bin/google-chrome",
@@ -99,25 +179,26 @@ class BrowserContextManager:
     environment: Union[str, None]
     config: BrowserConfig
 
-    def __init__(self, default_profile: str = "noSleep_rb6", config: Optional[BrowserConfig] = None) -> None:
+    def __init__(
+        self, default_profile: str = "noSleep_rb6", config: Optional[BrowserConfig] = None, pooled: bool = False
+    ) -> None:
         self.environment = (os.getenv("ENV") or "").lower()
         self.default_profile = default_profile
         self.counter = 0
         self.driver = None
-        self._lock = CHROMIUM_LOCK
+        self.pooled = pooled
+        # A pooled browser is kept alive between jobs: the BrowserPool lease gives the exclusivity
+        self._lock: Optional[FileLock] = None if pooled else CHROMIUM_LOCK
+        # The orphan cleanup only touches the browsers of dead processes; the pool runs it for its first browser
+        self.kill_orphans_on_start = True
+        self.started_at: Optional[float] = None
         self._xvfb_proc: Optional[subprocess.Popen] = None
         self._profile_dir: Optional[str] = None
         self._lock_acquired = False
         self.config = config or BrowserConfig.from_environment()
 
         # Initialize global circuit breaker if needed
-        global _CIRCUIT_BREAKER  # pylint: disable=global-statement
-        if _CIRCUIT_BREAKER is None:
-            _CIRCUIT_BREAKER = BrowserCircuitBreaker(
-                failure_threshold=self.config.circuit_breaker_failure_threshold,
-                success_threshold=self.config.circuit_breaker_success_threshold,
-                timeout_seconds=self.config.circuit_breaker_timeout_seconds,
-            )
+        get_shared_circuit_breaker(self.config)
 
     def _active_driver(self) -> uc.Chrome:
         if self.driver is None:
@@ -208,9 +289,11 @@ class BrowserContextManager:
 
         for attempt in range(self.config.max_retries):
             try:
-                self._lock.acquire(timeout=120)
-                self._lock_acquired = True
+                if self._lock is not None:
+                    self._lock.acquire(timeout=120)
+                    self._lock_acquired = True
                 self._config_browser()
+                self.started_at = time.monotonic()
 
                 # Success! Record with circuit breaker
                 if self.config.circuit_breaker_enabled and _CIRCUIT_BREAKER:
@@ -308,6 +391,16 @@ class BrowserContextManager:
     def __exit__(self, exc_type, exc_value, traceback):
         self._cleanup()
 
+    def is_alive(self) -> bool:
+        """Health check of a warm browser: the driver still answers a script"""
+        if self.driver is None:
+            return False
+        try:
+            return self.driver.execute_script("return 1;") == 1
+        except Exception as e:
+            print_warning_log(f"BrowserContextManager: Browser health check failed: {e}")
+            return False
+
     def _wait_for_process_termination(self, pids: List[int], timeout: float) -> bool:
         """
         Wait for processes to terminate using psutil.
@@ -430,10 +523,12 @@ class BrowserContextManager:
                 print_log(f"Deleted profile directory: {self._profile_dir}")
             except Exception as e:
                 print_warning_log(f"Failed to delete profile directory {self._profile_dir}: {e}")
+            if os.path.exists(_profile_pids_path(self._profile_dir)):
+                os.remove(_profile_pids_path(self._profile_dir))
             self._profile_dir = None
 
         # 5. Always release the lock, even if cleanup partially failed
-        if self._lock_acquired:
+        if self._lock_acquired and self._lock is not None:
             try:
                 self._lock.release()
                 print_log("Released browser lock")
@@ -442,38 +537,32 @@ class BrowserContextManager:
             self._lock_acquired = False
 
     def _kill_orphaned_chrome_processes(self) -> None:
-        """Kill any orphaned Chrome/chromedriver processes before starting"""
+        """Kill the Chrome/chromedriver processes left by a crashed bot or scraper worker before starting"""
         try:
             # Only do this in production to avoid interfering with developer's Chrome instances
             if self.environment == "prod":
-                # Kill orphaned chrome processes
-                # Note: capture_output=True returns strings, not file objects, so no .close() needed
-                subprocess.run(
-                    ["pkill", "-9", "-f", "google-chrome.*--remote-debugging"],
-                    check=False,
-                    capture_output=True,
-                    timeout=5,
-                )
-
-                subprocess.run(["pkill", "-9", "-f", "chromedriver"], check=False, capture_output=True, timeout=5)
-
-                time.sleep(0.5)  # Give processes time to die
-                print_log("Cleaned up any orphaned Chrome processes")
-
-                # Clean up any leftover profile directories from previous crashes
-                # Note: capture_output=True returns strings, not file objects, so no .close() needed
-                subprocess.run(
-                    "find /tmp -maxdepth 1 -name 'chrome_profile_*' -mmin +60 -exec rm -rf {} +",
-                    shell=True,
-                    check=False,
-                    capture_output=True,
-                    timeout=10,
-                )
-
-                time.sleep(0.5)  # Give processes time to die
+                killed = kill_orphaned_browsers()
+                if killed > 0:
+                    time.sleep(0.5)  # Give processes time to die
+                print_log(f"Cleaned up {killed} orphaned Chrome processes")
         except Exception as e:
             print_log(f"Failed to kill orphaned processes (non-critical): {e}")
 
+    def _record_browser_pids(self) -> None:
+        """Write the chromedriver and Chrome pids next to the profile, for the orphan cleanup if we crash"""
+        if self._profile_dir is None:
+            return
+        driver = self._active_driver()
+        pids = [driver.browser_pid]
+        service_process = getattr(getattr(driver, "service", None), "process", None)
+        if service_process is not None:
+            pids.append(service_process.pid)
+        try:
+            with open(_profile_pids_path(self._profile_dir), "w", encoding="utf-8") as pids_file:
+                pids_file.write("\n".join(str(pid) for pid in pids if isinstance(pid, int)))
+        except OSError as e:
+            print_warning_log(f"BrowserContextManager: Failed to record the browser pids: {e}")
+
     def _check_chrome_environment(self) -> dict[str, Any]:
         """
         Verify Chrome/chromedriver environment before attempting to launch.
@@ -539,9 +628,10 @@ class BrowserContextManager:
     def _config_browser(self):
         # 1. Create a unique path for THIS instance
         # This ensures that even with the lock, we know exactly which folder to kill
-        self._profile_dir = tempfile.mkdtemp(prefix="chrome_profile_", dir="/tmp")
+        self._profile_dir = tempfile.mkdtemp(prefix=f"{CHROME_PROFILE_PREFIX}{os.getpid()}_", dir=CHROME_PROFILE_ROOT)
         # Clean up any orphaned processes first
-        self._kill_orphaned_chrome_processes()
+        if self.kill_orphans_on_start:
+            self._kill_orphaned_chrome_processes()
 
         # 2. Check environment before attempting launch
         self._check_chrome_environment()
@@ -640,8 +730,9 @@ class BrowserContextManager:
                 "options": options,
                 "headless": False,
                 "use_subprocess": True,
-                "port": 45455,
             }
+            if not self.pooled:
+                chrome_kwargs["port"] = 45455  # Pooled browsers take a free port, several can run
             if chrome_major_version is not None:
                 chrome_kwargs["version_main"] = chrome_major_version
                 print_log(f"Launching Chrome with chromedriver for major version {chrome_major_version}.")
@@ -652,6 +743,7 @@ class BrowserContextManager:
                 )
             self.driver = uc.Chrome(**chrome_kwargs)
 
+        self._record_browser_pids()
         driver = self._active_driver()
         driver.set_page_load_timeout(self.config.page_load_timeout_seconds)
         warmup_url = get_url_user_profile_main(self.default_profile)
@@ -683,37 +775,66 @@ class BrowserContextManager:
         except Exception as e:
             print_warning_log(f"Initial page load encountered unexpected error: {e}, proceeding anyway...")
 
-    def download_full_matches(self, user_queued: UserQueueForStats) -> List[UserFullMatchStats]:
+    def download_full_matches(
+        self, user_queued: UserQueueForStats, high_water_mark: Optional[MatchHighWaterMark] = None
+    ) -> List[UserFullMatchStats]:
         """
         Download the matches for the given Ubisoft username
         This is version 2 of download_matches. It contains a lot more fields.
         The future goal is to replace download_matches with this function.
 
+        Without a high water mark, the first page of recent matches is returned. With the newest stored
+        match as high water mark, only the newer matches are parsed: the download stops at the first known
+        match and follows the next pages (up to match_fetch_max_pages) while every match is new.
+
         Raises:
             BrowserException: If Ubisoft username not provided or JSON not found
             BrowserTimeoutException: If page load times out
         """
-        # # Step 1: Download the page content
-        self.counter += 1
         ubisoft_user_name = user_queued.user_info.ubisoft_username_active
         if not ubisoft_user_name:
             raise BrowserException("download_matches: Ubisoft username not found.")
 
         api_url = get_url_api_ranked_matches(ubisoft_user_name)
-        driver = self._active_driver()
-        driver.get(api_url)
-        print_log(f"download_matches: Downloading matches for {ubisoft_user_name} using {api_url}")
+        data = self._download_matches_page(api_url, ubisoft_user_name)
+        if high_water_mark is None:
+            # Step 6: Parse the JSON data to extract the matches
+            return parse_json_from_full_matches(data, user_queued.user_info)
 
-        # Wait until the page contains the expected JSON data
-        try:
-            WebDriverWait(driver, self.config.element_wait_timeout_seconds).until(
-                EC.presence_of_element_located((By.TAG_NAME, "pre"))
-            )
-        except TimeoutException as e:
-            raise BrowserTimeoutException(f"download_matches: Timeout waiting for JSON data: {e}") from e
+        new_matches: List[dict] = []
+        for page in range(self.config.match_fetch_max_pages):
+            try:
+                page_matches = data["data"]["matches"] or []
+                next_page = (data["data"].get("metadata") or {}).get("next")
+            except (KeyError, TypeError, AttributeError):
+                break
+            page_new_matches = get_new_matches(page_matches, high_water_mark)
+            new_matches.extend(page_new_matches)
+            if len(page_new_matches) < len(page_matches) or len(page_matches) == 0 or next_page is None:
+                break  # Reached the stored matches or the end of the history
+            if page == self.config.match_fetch_max_pages - 1:
+                print_warning_log(
+                    f"download_matches: {ubisoft_user_name} has more than {len(new_matches)} new matches, "
+                    "the older ones are not fetched"
+                )
+                break
+            data = self._download_matches_page(f"{api_url}&next={next_page}", ubisoft_user_name)
+        print_log(f"download_matches: {len(new_matches)} new matches for {ubisoft_user_name}")
+        return parse_full_matches(new_matches, user_queued.user_info)
+
+    def _download_matches_page(self, api_url: str, ubisoft_user_name: str) -> dict:
+        """
+        Download one page of the matches API and return its JSON
 
+        Raises:
+            BrowserException: If the JSON is not found
+            BrowserTimeoutException: If page load times out
+        """
+        # # Step 1: Download the page content
+        self.counter += 1
+        print_log(f"download_matches: Downloading matches for {ubisoft_user_name} using {api_url}")
         # Step 2: Extract the page content, expecting JSON
-        page_source = driver.page_source
+        page_source = self._load_api_page(api_url, ENDPOINT_MATCHES, "download_matches")
 
         # Step 3: Remove the HTML
         soup = BeautifulSoup(page_source, "html.parser")
@@ -738,11 +859,41 @@ class BrowserContextManager:
                         file.write(json.dumps(data, indent=4))
                 except Exception as e:
                     print_warning_log(f"Failed to write debug JSON file: {e}")
-            # Step 6: Parse the JSON data to extract the matches
-            return parse_json_from_full_matches(data, user_queued.user_info)
+            return data
         except json.JSONDecodeError as e:
             raise BrowserException(f"download_matches: Error parsing JSON: {e}") from e
 
+    def _load_api_page(self, api_url: str, endpoint: str, log_name: str) -> str:
+        """
+        Load an API URL at the pace of the shared rate limiter and return the page source
+
+        Raises:
+            BrowserRateLimitedException: If the site answers with a throttling page
+            BrowserTimeoutException: If page load times out
+        """
+        scraper_rate_limiter.acquire(endpoint)
+        driver = self._active_driver()
+        driver.get(api_url)
+
+        # Wait until the page contains the expected JSON data
+        try:
+            WebDriverWait(driver, self.config.element_wait_timeout_seconds).until(
+                EC.presence_of_element_located((By.TAG_NAME, "pre"))
+            )
+        except TimeoutException as e:
+            # A Cloudflare challenge never shows the <pre> JSON
+            if is_throttled_page(driver.page_source):
+                scraper_rate_limiter.record_response(endpoint, True)
+                raise BrowserRateLimitedException(f"{log_name}: Throttled by the remote site") from e
+            raise BrowserTimeoutException(f"{log_name}: Timeout waiting for JSON data: {e}") from e
+
+        page_source = driver.page_source
+        throttled = is_throttled_page(page_source)
+        scraper_rate_limiter.record_response(endpoint, throttled)
+        if throttled:
+            raise BrowserRateLimitedException(f"{log_name}: Throttled by the remote site")
+        return page_source
+
     def refresh_browser(self) -> None:
         """Refresh the browser"""
         driver = self._active_driver()
@@ -750,14 +901,9 @@ class BrowserContextManager:
         WebDriverWait(driver, 15).until(EC.visibility_of_element_located((By.ID, "app-container")))
         print_log("refresh_browser: Browser refreshed")
 
-    def _download_rank_from_profile(
-        self,
-        ubisoft_user_name: Optional[str],
-        parser,
-        log_name: str,
-    ) -> tuple[str, int]:
+    def download_profile(self, ubisoft_user_name: Optional[str] = None, log_name: str = "download_profile") -> dict:
         """
-        Download the profile JSON and parse a rank tuple.
+        Download the profile API JSON, the source of the ranks and of the full user information
 
         Raises:
             BrowserException: If Ubisoft username not provided or JSON not found
@@ -771,18 +917,8 @@ class BrowserContextManager:
             raise BrowserException(f"{log_name}: Ubisoft username not found.")
 
         api_url = get_url_api_user_info(ubisoft_user_name)
-        driver = self._active_driver()
-        driver.get(api_url)
         print_log(f"{log_name}: Downloading profile for {ubisoft_user_name} using {api_url}")
-
-        try:
-            WebDriverWait(driver, self.config.element_wait_timeout_seconds).until(
-                EC.presence_of_element_located((By.TAG_NAME, "pre"))
-            )
-        except TimeoutException as e:
-            raise BrowserTimeoutException(f"{log_name}: Timeout waiting for JSON data: {e}") from e
-
-        page_source = driver.page_source
+        page_source = self._load_api_page(api_url, ENDPOINT_PROFILE, log_name)
 
         soup = BeautifulSoup(page_source, "html.parser")
         pre_tag = soup.find("pre")
@@ -801,10 +937,25 @@ class BrowserContextManager:
                         file.write(json.dumps(data, indent=4))
                 except Exception as e:
                     print_warning_log(f"Failed to write debug JSON file: {e}")
-            return parser(data)
+            return data
         except json.JSONDecodeError as e:
             raise BrowserException(f"{log_name}: Error parsing JSON: {e}") from e
 
+    def _download_rank_from_profile(
+        self,
+        ubisoft_user_name: Optional[str],
+        parser,
+        log_name: str,
+    ) -> tuple[str, int]:
+        """
+        Download the profile JSON and parse a rank tuple.
+
+        Raises:
+            BrowserException: If Ubisoft username not provided or JSON not found
+            BrowserTimeoutException: If page load times out
+        """
+        return parser(self.download_profile(ubisoft_user_name, log_name))
+
     def download_max_rank(self, ubisoft_user_name: Optional[str] = None) -> tuple[str, int]:
         """Download the web page, and extract the max rank."""
         return self._download_rank_from_profile(ubisoft_user_name, parse_json_max_rank, "download_max_rank")
@@ -832,20 +983,9 @@ class BrowserContextManager:
             raise BrowserException("download_full_user_stats: Ubisoft username not found.")
 
         api_url = get_url_api_user_info(ubisoft_user_name)
-        driver = self._active_driver()
-        driver.get(api_url)
         print_log(f"download_full_user_stats: Downloading stats for {ubisoft_user_name} using {api_url}")
-
-        # Wait until the page contains the expected JSON data
-        try:
-            WebDriverWait(driver, self.config.element_wait_timeout_seconds).until(
-                EC.presence_of_element_located((By.TAG_NAME, "pre"))
-            )
-        except TimeoutException as e:
-            raise BrowserTimeoutException(f"download_full_user_stats: Timeout waiting for JSON data: {e}") from e
-
         # Step 2: Extract the page content, expecting JSON
-        page_source = driver.page_source
+        page_source = self._load_api_page(api_url, ENDPOINT_PROFILE, "download_full_user_stats")
 
         # Step 3: Remove the HTML
         soup = BeautifulSoup(page_source, "html.parser")
@@ -897,20 +1037,9 @@ class BrowserContextManager:
         # Construct API URL
         api_url = f"https://api.tracker.gg/api/v2/r6siege/standard/profile/ubi/{r6_tracker_user_uuid}/segments/operator?sessionType=ranked&season=all"
 
-        driver = self._active_driver()
-        driver.get(api_url)
         print_log(f"download_operator_stats: Downloading operator stats using {api_url}")
-
-        # Wait until the page contains the expected JSON data
-        try:
-            WebDriverWait(driver, self.config.element_wait_timeout_seconds).until(
-                EC.presence_of_element_located((By.TAG_NAME, "pre"))
-            )
-        except TimeoutException as e:
-            raise BrowserTimeoutException(f"download_operator_stats: Timeout waiting for JSON data: {e}") from e
-
         # Get the page source
-        page_source = driver.page_source
+        page_source = self._load_api_page(api_url, ENDPOINT_OPERATORS, "download_operator_stats")
 
         # Remove the HTML
         soup = BeautifulSoup(page_source, "html.parser")
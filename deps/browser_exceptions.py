@@ -17,6 +17,10 @@ class BrowserTimeoutException(BrowserException):
     """Raised when browser operation times out"""
 
 
+class BrowserRateLimitedException(BrowserException):
+    """Raised when the site answers with a 403/429 or a Cloudflare challenge instead of the JSON"""
+
+
 class BrowserResourceException(BrowserException):
     """Raised when browser hits resource limits (e.g., file descriptors)"""
 
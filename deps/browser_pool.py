@@ -0,0 +1,221 @@
+"""
+Pool of warm browsers for the R6 Tracker scraping
+
+Starting a BrowserContextManager costs a Chrome/chromedriver launch and the warm-up page that sets the
+cookies, which dominates small batches. The pool keeps the browsers alive between jobs and leases them
+to one caller at a time. A browser is recycled after a number of requests, after a maximum age, after
+staying idle too long or when it fails; the shared circuit breaker rejects leases while the browser
+keeps failing to start.
+"""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from deps.browser_config import BrowserConfig
+from deps.browser_context_manager import BrowserContextManager, get_shared_circuit_breaker
+from deps.browser_exceptions import (
+    BrowserException,
+    BrowserLockContentionException,
+    BrowserStartupException,
+    CircuitBreakerOpenException,
+)
+from deps.log import print_error_log, print_log, print_warning_log
+
+REAP_INTERVAL_SECONDS = 60
+
+
+class BrowserPool:
+    """Lease warm BrowserContextManager instances to the scraping jobs"""
+
+    def __init__(
+        self,
+        config: Optional[BrowserConfig] = None,
+        context_factory: Optional[Callable[[BrowserConfig], BrowserContextManager]] = None,
+    ) -> None:
+        # Read on first lease: the singleton is created before the bot loads its .env
+        self._config = config
+        self._context_factory = context_factory or (lambda config: BrowserContextManager(config=config, pooled=True))
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        # Most recently released first, the oldest idle browsers are the ones reaped
+        self._idle: "queue.LifoQueue[Tuple[BrowserContextManager, float]]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._live_count = 0
+        self._closed = False
+        self._reaper: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    @property
+    def config(self) -> BrowserConfig:
+        """Browser and pool settings"""
+        if self._config is None:
+            self._config = BrowserConfig.from_environment()
+        return self._config
+
+    def _get_slots(self) -> threading.BoundedSemaphore:
+        with self._lock:
+            if self._slots is None:
+                # One slot per browser: a lease holds a slot, so there are never more than pool_size browsers
+                self._slots = threading.BoundedSemaphore(max(1, self.config.pool_size))
+            return self._slots
+
+    def _is_recyclable(self, context: BrowserContextManager, released_at: float) -> Optional[str]:
+        """Return why a browser must not be reused, None when it is still good"""
+        now = time.monotonic()
+        if context.counter >= self.config.pool_max_requests_per_browser:
+            return f"served {context.counter} requests"
+        if context.started_at is not None and now - context.started_at >= self.config.pool_max_browser_age_seconds:
+            return "reached its maximum age"
+        if now - released_at >= self.config.pool_idle_timeout_seconds:
+            return "stayed idle too long"
+        return None
+
+    def _close(self, context: BrowserContextManager, reason: str) -> None:
+        print_log(f"BrowserPool: Closing a browser that {reason}")
+        try:
+            context.__exit__(None, None, None)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print_warning_log(f"BrowserPool: Error closing a browser: {e}")
+        with self._lock:
+            self._live_count -= 1
+
+    def _drain_idle(self) -> List[Tuple[BrowserContextManager, float]]:
+        idle = []
+        while True:
+            try:
+                idle.append(self._idle.get_nowait())
+            except queue.Empty:
+                return idle
+
+    def _open(self) -> BrowserContextManager:
+        context = self._context_factory(self.config)
+        with self._lock:
+            # The first browser cleans the orphans left by a crashed process, the next ones would find none
+            context.kill_orphans_on_start = self._live_count == 0
+            self._live_count += 1
+        try:
+            context.__enter__()  # Retries and records the startup in the circuit breaker
+        except Exception:
+            with self._lock:
+                self._live_count -= 1
+            raise
+        self._start_reaper()
+        return context
+
+    def _acquire_context(self) -> BrowserContextManager:
+        """Pick a healthy idle browser or start a new one, the caller holds a slot"""
+        while True:
+            try:
+                context, released_at = self._idle.get_nowait()
+            except queue.Empty:
+                return self._open()
+            reason = self._is_recyclable(context, released_at)
+            if reason is None and not context.is_alive():
+                reason = "failed its health check"
+            if reason is None:
+                return context
+            self._close(context, reason)
+
+    @contextmanager
+    def lease(self, timeout_seconds: Optional[float] = None) -> Iterator[BrowserContextManager]:
+        """
+        Borrow a warm browser for the duration of the with block
+
+        Raises:
+            BrowserLockContentionException: Every browser stayed busy for the lease timeout
+            CircuitBreakerOpenException: The browsers keep failing, nothing is started
+        """
+        if self._closed:
+            raise BrowserException("BrowserPool: The pool is shut down.")
+        breaker = get_shared_circuit_breaker(self.config) if self.config.circuit_breaker_enabled else None
+        if breaker is not None and not breaker.allow_request():
+            # The warm browsers are suspects too: do not hand them out once the circuit opens
+            for idle_context, _ in self._drain_idle():
+                self._close(idle_context, "was evicted by the open circuit breaker")
+            stats = breaker.get_stats()
+            raise CircuitBreakerOpenException(
+                f"Circuit breaker is OPEN after {stats['consecutive_failures']} consecutive failures. "
+                f"Will retry after timeout. Last failure: {stats.get('last_failure_time', 'N/A')}"
+            )
+        timeout = self.config.pool_lease_timeout_seconds if timeout_seconds is None else timeout_seconds
+        slots = self._get_slots()
+        if not slots.acquire(timeout=timeout):
+            raise BrowserLockContentionException(f"Every pooled browser stayed busy for {timeout}s")
+        context: Optional[BrowserContextManager] = None
+        try:
+            context = self._acquire_context()
+            yield context
+        except BrowserException as e:
+            # A job error (missing JSON, timeout of one page) leaves the browser usable, a startup error does not
+            if context is not None and isinstance(e, BrowserStartupException):
+                self._close(context, f"failed: {e}")
+                context = None
+            raise
+        except Exception as e:
+            # Anything else (WebDriverException, dead session) means the browser is broken
+            if context is not None:
+                if breaker is not None:
+                    breaker.record_failure(e)
+                self._close(context, f"failed: {e}")
+                context = None
+            raise
+        else:
+            if breaker is not None:
+                breaker.record_success()
+        finally:
+            if context is not None:
+                self._release(context)
+            slots.release()
+
+    def _release(self, context: BrowserContextManager) -> None:
+        if self._closed:
+            self._close(context, "was released after the pool shut down")
+            return
+        reason = self._is_recyclable(context, time.monotonic())
+        if reason is not None:
+            self._close(context, reason)
+            return
+        self._idle.put((context, time.monotonic()))
+
+    def reap_idle(self) -> int:
+        """Close the idle browsers past their idle timeout or maximum age, return how many were closed"""
+        closed = 0
+        for context, released_at in self._drain_idle():
+            reason = self._is_recyclable(context, released_at)
+            if reason is None:
+                self._idle.put((context, released_at))
+            else:
+                self._close(context, reason)
+                closed += 1
+        return closed
+
+    def _start_reaper(self) -> None:
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap_loop, name="browser-pool-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self) -> None:
+        while not self._stop_event.wait(REAP_INTERVAL_SECONDS):
+            try:
+                self.reap_idle()
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                print_error_log(f"BrowserPool: Failed to reap the idle browsers: {e}")
+
+    def live_count(self) -> int:
+        """Number of browsers running, leased or idle"""
+        with self._lock:
+            return self._live_count
+
+    def shutdown(self) -> None:
+        """Close the idle browsers, the leased ones are closed when they come back"""
+        self._closed = True
+        self._stop_event.set()
+        for context, _ in self._drain_idle():
+            self._close(context, "was closed by the pool shutdown")
+
+
+browser_pool = BrowserPool()
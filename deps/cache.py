@@ -2,17 +2,26 @@
 
 import dataclasses
 import asyncio
+import heapq
+import math
+import random
+import sys
+import threading
 import time
+from collections import OrderedDict
 from typing import Callable, Awaitable, List, Union, Optional, Any
 import inspect
 
 from deps.cache_data_access import (
     clear_expired_cache,
     get_value,
+    get_value_with_presence,
     remove_key,
     remove_key_by_prefix,
     set_value,
 )
+from deps.cache_write_behind import persistent_cache_write_behind
+from deps.database_gateway import database_gateway
 from deps.log import print_log
 
 ALWAYS_TTL = 60 * 60 * 24 * 365 * 10
@@ -23,87 +32,187 @@ ONE_DAY_TTL = 60 * 60 * 24
 ONE_HOUR_TTL = 60 * 60 * 1
 TWO_HOUR_TTL = 60 * 60 * 2
 DEFAULT_TTL = 60
+DEFAULT_NEGATIVE_TTL = 60
+
+
+DEFAULT_MAX_ENTRIES = 20_000
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
 
 
 @dataclasses.dataclass
 class CacheItem:
-    """Represents an item in the cache with an expiry time"""
+    """Represents an item in the cache with an expiry time and its approximate size"""
+
+    value: Any
+    expiry: float
+    size: int
+    namespace: str
+    fetch_seconds: float = 0.0
+
+
+class _Absent:
+    """Type of the ABSENT sentinel"""
+
+    def __repr__(self) -> str:
+        return "ABSENT"
+
+    def __reduce__(self) -> str:
+        return "ABSENT"
+
+
+# Stored in the memory tier to remember that a key has no value (negative entry)
+ABSENT = _Absent()
+# Memory tier prefix remembering the persistent keys known to be missing
+PERSISTENT_ABSENT_PREFIX = "PersistentAbsent"
 
-    def __init__(self, value: Any, ttl_in_seconds: int):
-        self.value = value
-        self.expiry = time.time() + ttl_in_seconds
+
+def _persistent_absent_key(key: str) -> str:
+    return f"{PERSISTENT_ABSENT_PREFIX}:{key}"
+
+
+def _namespace_of(key: str) -> str:
+    """Keys are built as '<KEY_*>:<id>:...', the namespace is the first segment"""
+    return key.split(":", 1)[0]
+
+
+def _approximate_size(value: Any) -> int:
+    """Shallow size in bytes, good enough to keep the memory budget in check"""
+    try:
+        return sys.getsizeof(value)
+    except TypeError:
+        return 0
 
 
 class TTLCache:
-    """A simple in-memory cache with time-to-live (TTL) support"""
+    """
+    A bounded in-memory cache with time-to-live (TTL) support.
+    Entries are evicted least recently used first when the entry count, the approximate byte budget
+    or the limit of their namespace is exceeded. Expiry times are kept in a min-heap so expired
+    entries are dropped in O(log n) each as time passes, without scanning the whole cache.
+    """
 
-    def __init__(self, default_ttl_in_seconds=60) -> None:
-        self.cache: dict[str, Any] = {}
+    def __init__(
+        self,
+        default_ttl_in_seconds: int = DEFAULT_TTL,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
         self.default_ttl = default_ttl_in_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # Ordered from least to most recently used
+        self.cache: OrderedDict[str, CacheItem] = OrderedDict()
+        self.current_bytes = 0
+        # (expiry, key) pairs, stale pairs (key replaced or deleted) are skipped when popped
+        self._expiry_heap: list[tuple[float, str]] = []
+        self._namespace_limits: dict[str, int] = {}
+        self._namespace_keys: dict[str, OrderedDict[str, None]] = {}
+        self._lock = threading.RLock()
+
+    def set_namespace_limit(self, namespace: str, max_entries: int) -> None:
+        """Cap the number of entries whose key starts with the namespace (e.g. KEY_MESSAGE)"""
+        with self._lock:
+            self._namespace_limits[namespace] = max_entries
+            self._enforce_namespace_limit(namespace)
+
+    def _remove(self, key: str) -> None:
+        item = self.cache.pop(key, None)
+        if item is None:
+            return
+        self.current_bytes -= item.size
+        namespace_keys = self._namespace_keys.get(item.namespace)
+        if namespace_keys is not None:
+            namespace_keys.pop(key, None)
+            if not namespace_keys:
+                del self._namespace_keys[item.namespace]
+
+    def _purge_expired(self, now: float) -> None:
+        """Pop every heap entry that expired, removing the cache items that still match it"""
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expiry, key = heapq.heappop(heap)
+            item = self.cache.get(key)
+            if item is not None and item.expiry == expiry:
+                self._remove(key)
+        # Stale pairs left by overwritten keys are dropped once they outnumber the live entries
+        if len(heap) > 2 * len(self.cache) + 64:
+            self._expiry_heap = [(item.expiry, key) for key, item in self.cache.items()]
+            heapq.heapify(self._expiry_heap)
+
+    def _enforce_namespace_limit(self, namespace: str) -> None:
+        limit = self._namespace_limits.get(namespace)
+        namespace_keys = self._namespace_keys.get(namespace)
+        if limit is None or namespace_keys is None:
+            return
+        while len(namespace_keys) > limit:
+            self._remove(next(iter(namespace_keys)))
 
-    def _is_expired(self, key: str) -> bool:
-        """Check if the cache item with the given key is expired"""
-        item = self.cache.get(key, None)
-        if not item:
-            return True
-        if time.time() > item.expiry:
-            del self.cache[key]
-            return True
-        return False
+    def _enforce_global_limits(self) -> None:
+        while self.cache and (len(self.cache) > self.max_entries or self.current_bytes > self.max_bytes):
+            self._remove(next(iter(self.cache)))
 
-    def set(self, key: str, value: Any, ttl_in_seconds: Optional[int] = None) -> None:
-        """Set the value in the cache with an optional TTL"""
+    def set(self, key: str, value: Any, ttl_in_seconds: Optional[int] = None, fetch_seconds: float = 0.0) -> None:
+        """Set the value in the cache with an optional TTL
+        fetch_seconds is how long the value took to produce, used by the early refresh of get_cache
+        """
         if ttl_in_seconds is None:
             ttl_in_seconds = self.default_ttl
-        self.cache[key] = CacheItem(value, ttl_in_seconds)
+        now = time.time()
+        with self._lock:
+            self._remove(key)
+            namespace = _namespace_of(key)
+            item = CacheItem(value, now + ttl_in_seconds, _approximate_size(value), namespace, fetch_seconds)
+            self.cache[key] = item
+            self.current_bytes += item.size
+            self._namespace_keys.setdefault(namespace, OrderedDict())[key] = None
+            heapq.heappush(self._expiry_heap, (item.expiry, key))
+            self._purge_expired(now)
+            self._enforce_namespace_limit(namespace)
+            self._enforce_global_limits()
 
     def get(self, key: str) -> Union[Optional[Any]]:
         """Get the value from the cache if it exists and is not expired"""
-        if self._is_expired(key):
-            return None
-        existing_value: Union[CacheItem, None] = self.cache.get(key)
-        if existing_value is None:
-            return None
-        return existing_value.value
+        item = self.get_item(key)
+        return item.value if item is not None else None
+
+    def get_item(self, key: str) -> Optional[CacheItem]:
+        """Get the cache item (value and expiry) if it exists and is not expired"""
+        now = time.time()
+        with self._lock:
+            self._purge_expired(now)
+            item = self.cache.get(key)
+            if item is None:
+                return None
+            if now > item.expiry:
+                self._remove(key)
+                return None
+            self.cache.move_to_end(key)
+            self._namespace_keys[item.namespace].move_to_end(key)
+            return item
 
     def delete(self, key: str) -> None:
         """Delete the value from the cache"""
-        if key in self.cache:
-            del self.cache[key]
+        with self._lock:
+            self._remove(key)
 
     def delete_by_prefix(self, prefix: str) -> int:
         """Delete all keys that start with the given prefix"""
-        counter = 0
-        keys_to_delete = [key for key in self.cache if key.startswith(prefix)]
-        for key in keys_to_delete:
-            del self.cache[key]
-            counter += 1
-        return counter
+        with self._lock:
+            keys_to_delete = [key for key in self.cache if key.startswith(prefix)]
+            for key in keys_to_delete:
+                self._remove(key)
+            return len(keys_to_delete)
 
     def clear(self) -> None:
         """Delete ALL the cache"""
-        self.cache.clear()
-
-    async def _cleanup(self) -> None:
-        """Remove expired key."""
-        while True:
-            expired_keys: List[str] = []
-            for key in list(self.cache.keys()):
-                if self._is_expired(key):
-                    expired_keys.append(key)
-            for key in expired_keys:
-                if key in self.cache:
-                    del self.cache[key]
-            await asyncio.sleep(10000)  # Adjust the sleep time as needed
-
-    def start_cleanup(self) -> None:
-        """Start the task to clean up in the background."""
-        try:
-            loop = asyncio.get_running_loop()
-        except RuntimeError:
-            return
+        with self._lock:
+            self.cache.clear()
+            self._namespace_keys.clear()
+            self._expiry_heap.clear()
+            self.current_bytes = 0
 
-        asyncio.run_coroutine_threadsafe(self._cleanup(), loop)
+    def __len__(self) -> int:
+        return len(self.cache)
 
 
 def remove_cache(in_memory: bool, key: str) -> None:
@@ -111,35 +220,181 @@ def remove_cache(in_memory: bool, key: str) -> None:
     if in_memory:
         memoryCache.delete(key)
     else:
+        persistent_cache_write_behind.discard(key)
         remove_key(key)
 
 
+def _set_persistent_value(key: str, value: Any, ttl_in_seconds: Optional[int]) -> None:
+    """Write the value now, or let the write-behind buffer batch it when enabled"""
+    if persistent_cache_write_behind.enabled:
+        persistent_cache_write_behind.set(key, value, ttl_in_seconds)
+    else:
+        set_value(key, value, ttl_in_seconds)
+
+
+def get_persistent_cache_with_presence(key: str) -> tuple[bool, Any]:
+    """Get a persistent value and whether the key exists, including the values not flushed yet"""
+    found, value = persistent_cache_write_behind.get_with_presence(key)
+    if found:
+        return value is not None, value
+    return get_value_with_presence(key)
+
+
+def remove_negative_cache(in_memory: bool, key: str) -> None:
+    """Forget that the key was missing (e.g. after the row got created), positive values are kept"""
+    if in_memory:
+        item = memoryCache.get_item(key)
+        if item is not None and item.value is ABSENT:
+            memoryCache.delete(key)
+    else:
+        memoryCache.delete(_persistent_absent_key(key))
+
+
+def _store_fetched_value(
+    in_memory: bool,
+    key: str,
+    value: Any,
+    ttl_in_seconds: Optional[int],
+    negative_ttl_in_seconds: Optional[int],
+    fetch_seconds: float,
+) -> None:
+    """Store a truthy value with its TTL; None and other empty values only when negative caching is on"""
+    if value:
+        if in_memory:
+            memoryCache.set(key, value, ttl_in_seconds, fetch_seconds=fetch_seconds)
+        else:
+            _set_persistent_value(key, value, ttl_in_seconds)
+        return
+    if negative_ttl_in_seconds is None:
+        return
+    if in_memory:
+        memoryCache.set(key, ABSENT if value is None else value, negative_ttl_in_seconds)
+    elif value is None:
+        memoryCache.set(_persistent_absent_key(key), True, negative_ttl_in_seconds)
+    else:
+        _set_persistent_value(key, value, negative_ttl_in_seconds)
+
+
+def _should_refresh_early(item: CacheItem, beta: float) -> bool:
+    """
+    Probabilistic early expiration (XFetch): the closer to expiry and the slower the fetch,
+    the more likely a read triggers a refresh, so a hot key is renewed before it expires.
+    """
+    if item.fetch_seconds <= 0:
+        return False
+    return time.time() - item.fetch_seconds * beta * math.log(random.random() or 1e-12) >= item.expiry
+
+
+async def _run_fetch_function(fetch_function: Union[Callable[[], Awaitable], Callable[[], Any]]) -> Any:
+    # Check if the fetch function itself is an async function
+    if inspect.iscoroutinefunction(fetch_function):
+        return await fetch_function()
+    # Sync fetchers hit SQLite: run them on a reader connection instead of the event loop
+    return await database_gateway.read(fetch_function)
+
+
+async def _fetch_and_store(
+    in_memory: bool,
+    key: str,
+    fetch_function: Union[Callable[[], Awaitable], Callable[[], Any]],
+    ttl_in_seconds: Optional[int],
+    negative_ttl_in_seconds: Optional[int],
+) -> Any:
+    """The fetch shared by the concurrent misses of a key, in its own task"""
+    try:
+        started = time.perf_counter()
+        value = await _run_fetch_function(fetch_function)
+        _store_fetched_value(
+            in_memory, key, value, ttl_in_seconds, negative_ttl_in_seconds, time.perf_counter() - started
+        )
+        return value
+    finally:
+        _in_flight_fetches.pop((in_memory, key), None)
+
+
+def _retrieve_fetch_exception(task: asyncio.Task) -> None:
+    """Mark the exception as retrieved so a fetch whose waiters were all cancelled is not reported as lost"""
+    if not task.cancelled():
+        task.exception()
+
+
+async def _fetch_single_flight(
+    in_memory: bool,
+    key: str,
+    fetch_function: Union[Callable[[], Awaitable], Callable[[], Any]],
+    ttl_in_seconds: Optional[int],
+    negative_ttl_in_seconds: Optional[int] = None,
+) -> Any:
+    """
+    Run the fetch once per key: concurrent misses await the fetch already in flight.
+    The fetch runs in its own task and every caller awaits it shielded, so a cancelled caller (the first
+    one included) does not cancel the fetch of the others.
+    """
+    flight_key = (in_memory, key)
+    task = _in_flight_fetches.get(flight_key)
+    if task is None:
+        task = asyncio.create_task(
+            _fetch_and_store(in_memory, key, fetch_function, ttl_in_seconds, negative_ttl_in_seconds)
+        )
+        task.add_done_callback(_retrieve_fetch_exception)
+        _in_flight_fetches[flight_key] = task
+    return await asyncio.shield(task)
+
+
+async def _refresh_in_background(
+    key: str, fetch_function: Union[Callable[[], Awaitable], Callable[[], Any]], ttl_in_seconds: Optional[int]
+) -> None:
+    try:
+        await _fetch_single_flight(True, key, fetch_function, ttl_in_seconds)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        print_log(f"get_cache: Early refresh of {key} failed, keeping the cached value: {e}")
+
+
 async def get_cache(
     in_memory: bool,
     key: str,
     fetch_function: Optional[Union[Callable[[], Awaitable], Callable[[], Any]]] = None,
     ttl_in_seconds: Optional[int] = None,
+    early_refresh_beta: Optional[float] = None,
+    negative_ttl_in_seconds: Optional[int] = None,
 ) -> Any:
     """Get the value from the cache from the in-memory or data cache
-    If the value is not in the cache, calls the fetch function to get the value and set it into the cache
+    If the value is not in the cache, calls the fetch function to get the value and set it into the cache.
+    Concurrent misses on the same key share a single call of the fetch function.
+    With early_refresh_beta (in-memory only, 1.0 is a good default), a hit close to the expiry
+    may refresh the value in the background while the cached value is returned.
+    With negative_ttl_in_seconds, a missing value (None, False, 0, empty) is remembered for that
+    duration instead of being fetched or looked up in the database again on every call.
     """
+    item: Optional[CacheItem] = None
     if in_memory:
-        value = memoryCache.get(key)
+        item = memoryCache.get_item(key)
+        if item is not None and item.value is ABSENT:
+            return None
+        value = item.value if item is not None else None
     else:
-        value = get_value(key)
+        if negative_ttl_in_seconds is not None and memoryCache.get(_persistent_absent_key(key)) is not None:
+            return None
+        found, value = persistent_cache_write_behind.get_with_presence(key)
+        if not found:
+            value = get_value(key)
 
     if value is None and fetch_function:
-        # Check if the fetch function itself is an async function
-        if inspect.iscoroutinefunction(fetch_function):
-            value = await fetch_function()
-        else:
-            value = fetch_function()
-
-        if value:
-            if in_memory:
-                memoryCache.set(key, value, ttl_in_seconds)
-            else:
-                set_value(key, value, ttl_in_seconds)
+        return await _fetch_single_flight(in_memory, key, fetch_function, ttl_in_seconds, negative_ttl_in_seconds)
+
+    if value is None and not in_memory and negative_ttl_in_seconds is not None:
+        memoryCache.set(_persistent_absent_key(key), True, negative_ttl_in_seconds)
+
+    if (
+        item is not None
+        and fetch_function
+        and early_refresh_beta
+        and (True, key) not in _in_flight_fetches
+        and _should_refresh_early(item, early_refresh_beta)
+    ):
+        task = asyncio.create_task(_refresh_in_background(key, fetch_function, ttl_in_seconds))
+        _background_refreshes.add(task)
+        task.add_done_callback(_background_refreshes.discard)
     return value
 
 
@@ -150,7 +405,13 @@ def set_cache(in_memory: bool, key: str, value: Any, cache_seconds: Optional[int
     if in_memory:
         memoryCache.set(key, value, cache_seconds)
     else:
-        set_value(key, value, cache_seconds)
+        _set_persistent_value(key, value, cache_seconds)
+        memoryCache.delete(_persistent_absent_key(key))
+
+
+def set_memory_cache_namespace_limit(namespace: str, max_entries: int) -> None:
+    """Cap the number of in-memory entries of a key namespace (e.g. KEY_MESSAGE)"""
+    memoryCache.set_namespace_limit(namespace, max_entries)
 
 
 def reset_cache_by_prefixes(prefixes: List[str]) -> None:
@@ -158,6 +419,8 @@ def reset_cache_by_prefixes(prefixes: List[str]) -> None:
 
     for prefix in prefixes:
         del_memory_count = memoryCache.delete_by_prefix(prefix)
+        memoryCache.delete_by_prefix(_persistent_absent_key(prefix))
+        persistent_cache_write_behind.discard_by_prefix(prefix)
         del_file_count = remove_key_by_prefix(prefix)
         print_log(
             f"Deleted {del_memory_count} from memory and {del_file_count} from the persisted cache for prefix {prefix}"
@@ -178,4 +441,7 @@ async def periodic_cache_cleanup():
 
 
 memoryCache = TTLCache(default_ttl_in_seconds=DEFAULT_TTL)
-memoryCache.start_cleanup()
+# Fetches currently running, keyed by (in_memory, key)
+_in_flight_fetches: dict[tuple[bool, str], asyncio.Task] = {}
+# Strong references to the early refresh tasks until they complete
+_background_refreshes: set[asyncio.Task] = set()
@@ -0,0 +1,280 @@
+"""
+Binary codec for the values of the persistent cache table.
+
+Every value is stored as a BLOB starting with a one-byte type tag followed by the payload.
+Scalars, lists of ids and the scheduling structures (SimpleUser, SimpleUserHour and the reaction
+votes) have compact struct encodings; anything else falls back to pickle.
+Rows written before the codec existed are base64 TEXT of a dill pickle and are still decoded.
+"""
+
+import base64
+import dataclasses
+import pickle
+import struct
+from datetime import datetime
+from typing import Any, Callable
+
+from deps.models import SimpleUser, SimpleUserHour
+
+TAG_PICKLE = 0x01
+TAG_NONE = 0x02
+TAG_BOOL = 0x03
+TAG_INT = 0x04
+TAG_FLOAT = 0x05
+TAG_STR = 0x06
+TAG_INT_LIST = 0x07
+TAG_DATETIME = 0x08
+TAG_SIMPLE_USER = 0x09
+TAG_SIMPLE_USER_LIST = 0x0A
+TAG_SIMPLE_USER_HOUR = 0x0B
+TAG_REACTION_VOTES = 0x0C
+
+_INT64 = struct.Struct("<q")
+_FLOAT64 = struct.Struct("<d")
+_UINT32 = struct.Struct("<I")
+_INT64_MIN = -(2**63)
+_INT64_MAX = 2**63 - 1
+
+
+@dataclasses.dataclass(frozen=True)
+class Codec:
+    """Encode and decode one family of values under a type tag"""
+
+    tag: int
+    can_encode: Callable[[Any], bool]
+    encode: Callable[[Any], bytes]
+    decode: Callable[[bytes], Any]
+
+
+_codecs: list[Codec] = []
+_codecs_by_tag: dict[int, Codec] = {}
+
+
+def register_codec(codec: Codec) -> None:
+    """Add a codec, checked in registration order before the pickle fallback"""
+    if codec.tag in _codecs_by_tag:
+        raise ValueError(f"Cache codec tag {codec.tag} is already registered")
+    _codecs.append(codec)
+    _codecs_by_tag[codec.tag] = codec
+
+
+def _is_int64(value: Any) -> bool:
+    return type(value) is int and _INT64_MIN <= value <= _INT64_MAX  # pylint: disable=unidiomatic-typecheck
+
+
+def _pack_str(value: str) -> bytes:
+    encoded = value.encode("utf-8")
+    return _UINT32.pack(len(encoded)) + encoded
+
+
+def _unpack_str(data: bytes, offset: int) -> tuple[str, int]:
+    (length,) = _UINT32.unpack_from(data, offset)
+    offset += _UINT32.size
+    return data[offset : offset + length].decode("utf-8"), offset + length
+
+
+def _is_simple_user(value: Any) -> bool:
+    return (
+        type(value) is SimpleUser  # pylint: disable=unidiomatic-typecheck
+        and _is_int64(value.user_id)
+        and isinstance(value.display_name, str)
+        and isinstance(value.rank_emoji, str)
+    )
+
+
+def _pack_simple_user(user: SimpleUser) -> bytes:
+    return _INT64.pack(user.user_id) + _pack_str(user.display_name) + _pack_str(user.rank_emoji)
+
+
+def _unpack_simple_user(data: bytes, offset: int) -> tuple[SimpleUser, int]:
+    (user_id,) = _INT64.unpack_from(data, offset)
+    display_name, offset = _unpack_str(data, offset + _INT64.size)
+    rank_emoji, offset = _unpack_str(data, offset)
+    return SimpleUser(user_id, display_name, rank_emoji), offset
+
+
+def _pack_simple_user_list(users: list[SimpleUser]) -> bytes:
+    return _UINT32.pack(len(users)) + b"".join(_pack_simple_user(user) for user in users)
+
+
+def _unpack_simple_user_list(data: bytes, offset: int) -> tuple[list[SimpleUser], int]:
+    (count,) = _UINT32.unpack_from(data, offset)
+    offset += _UINT32.size
+    users = []
+    for _ in range(count):
+        user, offset = _unpack_simple_user(data, offset)
+        users.append(user)
+    return users, offset
+
+
+def _is_simple_user_list(value: Any) -> bool:
+    return type(value) is list and all(_is_simple_user(user) for user in value)  # pylint: disable=unidiomatic-typecheck
+
+
+def _decode_int_list(data: bytes) -> list[int]:
+    return list(struct.unpack(f"<{len(data) // _INT64.size}q", data))
+
+
+def _decode_simple_user_hour(data: bytes) -> SimpleUserHour:
+    user, offset = _unpack_simple_user(data, 0)
+    hour, _ = _unpack_str(data, offset)
+    return SimpleUserHour(user, hour)
+
+
+def _encode_reaction_votes(votes: dict[str, list[SimpleUser]]) -> bytes:
+    """The same users vote for many hours: store each user once and the hours as indices"""
+    user_indices: dict[tuple[int, str, str], int] = {}
+    user_parts = []
+    hour_parts = []
+    for hour, users in votes.items():
+        indices = []
+        for user in users:
+            user_key = (user.user_id, user.display_name, user.rank_emoji)
+            index = user_indices.get(user_key)
+            if index is None:
+                index = user_indices[user_key] = len(user_indices)
+                user_parts.append(_pack_simple_user(user))
+            indices.append(index)
+        hour_parts.append(_pack_str(hour) + struct.pack(f"<I{len(indices)}I", len(indices), *indices))
+    return b"".join([_UINT32.pack(len(user_parts)), *user_parts, _UINT32.pack(len(hour_parts)), *hour_parts])
+
+
+def _decode_reaction_votes(data: bytes) -> dict[str, list[SimpleUser]]:
+    (user_count,) = _UINT32.unpack_from(data, 0)
+    offset = _UINT32.size
+    users = []
+    for _ in range(user_count):
+        user, offset = _unpack_simple_user(data, offset)
+        users.append(user)
+    (hour_count,) = _UINT32.unpack_from(data, offset)
+    offset += _UINT32.size
+    votes: dict[str, list[SimpleUser]] = {}
+    for _ in range(hour_count):
+        hour, offset = _unpack_str(data, offset)
+        (count,) = _UINT32.unpack_from(data, offset)
+        offset += _UINT32.size
+        votes[hour] = [users[index] for index in struct.unpack_from(f"<{count}I", data, offset)]
+        offset += count * _UINT32.size
+    return votes
+
+
+register_codec(Codec(TAG_NONE, lambda value: value is None, lambda _value: b"", lambda _data: None))
+register_codec(
+    Codec(
+        TAG_BOOL,
+        lambda value: type(value) is bool,  # pylint: disable=unidiomatic-typecheck
+        lambda value: b"\x01" if value else b"\x00",
+        lambda data: data[0] == 1,
+    )
+)
+register_codec(Codec(TAG_INT, _is_int64, _INT64.pack, lambda data: _INT64.unpack(data)[0]))
+register_codec(
+    Codec(
+        TAG_FLOAT,
+        lambda value: type(value) is float,  # pylint: disable=unidiomatic-typecheck
+        _FLOAT64.pack,
+        lambda data: _FLOAT64.unpack(data)[0],
+    )
+)
+register_codec(
+    Codec(
+        TAG_STR,
+        lambda value: type(value) is str,  # pylint: disable=unidiomatic-typecheck
+        lambda value: value.encode("utf-8"),
+        lambda data: data.decode("utf-8"),
+    )
+)
+register_codec(
+    Codec(
+        TAG_INT_LIST,
+        lambda value: type(value) is list  # pylint: disable=unidiomatic-typecheck
+        and len(value) > 0
+        and all(_is_int64(item) for item in value),
+        lambda value: struct.pack(f"<{len(value)}q", *value),
+        _decode_int_list,
+    )
+)
+register_codec(
+    Codec(
+        TAG_DATETIME,
+        lambda value: type(value) is datetime,  # pylint: disable=unidiomatic-typecheck
+        lambda value: value.isoformat().encode("ascii"),
+        lambda data: datetime.fromisoformat(data.decode("ascii")),
+    )
+)
+register_codec(Codec(TAG_SIMPLE_USER, _is_simple_user, _pack_simple_user, lambda data: _unpack_simple_user(data, 0)[0]))
+register_codec(
+    Codec(
+        TAG_SIMPLE_USER_LIST,
+        lambda value: _is_simple_user_list(value) and len(value) > 0,
+        _pack_simple_user_list,
+        lambda data: _unpack_simple_user_list(data, 0)[0],
+    )
+)
+register_codec(
+    Codec(
+        TAG_SIMPLE_USER_HOUR,
+        lambda value: type(value) is SimpleUserHour  # pylint: disable=unidiomatic-typecheck
+        and _is_simple_user(value.simple_user)
+        and isinstance(value.hour, str),
+        lambda value: _pack_simple_user(value.simple_user) + _pack_str(value.hour),
+        _decode_simple_user_hour,
+    )
+)
+register_codec(
+    Codec(
+        TAG_REACTION_VOTES,
+        lambda value: type(value) is dict  # pylint: disable=unidiomatic-typecheck
+        and all(isinstance(hour, str) and _is_simple_user_list(users) for hour, users in value.items()),
+        _encode_reaction_votes,
+        _decode_reaction_votes,
+    )
+)
+
+
+def _pickle_dumps(value: Any) -> bytes:
+    try:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        # Lambdas and local classes need dill, only imported when such a value shows up
+        import dill  # type: ignore # pylint: disable=import-outside-toplevel
+
+        return dill.dumps(value)
+
+
+def _pickle_loads(data: bytes) -> Any:
+    try:
+        return pickle.loads(data)
+    except (pickle.UnpicklingError, AttributeError, ImportError):
+        import dill  # type: ignore # pylint: disable=import-outside-toplevel
+
+        return dill.loads(data)
+
+
+def encode_value(value: Any) -> bytes:
+    """Encode a value into a tagged BLOB"""
+    for codec in _codecs:
+        if codec.can_encode(value):
+            return bytes((codec.tag,)) + codec.encode(value)
+    return bytes((TAG_PICKLE,)) + _pickle_dumps(value)
+
+
+def is_legacy_value(raw: Any) -> bool:
+    """Rows written before the codec are base64 TEXT"""
+    return isinstance(raw, str)
+
+
+def decode_value(raw: Any) -> Any:
+    """Decode a tagged BLOB, or a legacy base64 dill TEXT value"""
+    if is_legacy_value(raw):
+        import dill  # type: ignore # pylint: disable=import-outside-toplevel
+
+        return dill.loads(base64.b64decode(raw))
+    data = bytes(raw)
+    tag = data[0]
+    if tag == TAG_PICKLE:
+        return _pickle_loads(data[1:])
+    codec = _codecs_by_tag.get(tag)
+    if codec is None:
+        raise ValueError(f"Unknown cache codec tag {tag}")
+    return codec.decode(data[1:])
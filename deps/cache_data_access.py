@@ -4,8 +4,7 @@ Module to gather access to the cached data
 
 from datetime import datetime, timedelta, timezone
 from typing import Any, Optional, Union
-import base64
-import dill as pickle  # type: ignore
+from deps.cache_codec import decode_value, encode_value
 from deps.system_database import database_manager
 from deps.log import print_error_log
 
@@ -17,8 +16,7 @@ def set_value(key: str, value: Any, ttl_seconds: Optional[int]) -> None:
     expiration: Union[str, None] = (
         None if ttl_seconds is None else (datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)).isoformat()
     )
-    pickled_value = pickle.dumps(value)  # Serialize the value
-    encoded_value = base64.b64encode(pickled_value).decode("utf-8")  # Base64 encode it
+    encoded_value = encode_value(value)  # Tagged binary, see deps/cache_codec.py
     conn = database_manager.get_conn()
     cursor = conn.cursor()
     try:
@@ -39,6 +37,37 @@ def set_value(key: str, value: Any, ttl_seconds: Optional[int]) -> None:
         print_error_log(f"Error setting cache value: {e}")
 
 
+def set_values(items: list[tuple[str, Any, Optional[datetime]]]) -> bool:
+    """
+    Set many (key, value, expiration) in the cache with a single transaction
+    Returns False if the transaction was rolled back
+    """
+    rows = [
+        {
+            "key": key,
+            "value": encode_value(value),
+            "expiration": None if expiration is None else expiration.isoformat(),
+        }
+        for key, value, expiration in items
+    ]
+    conn = database_manager.get_conn()
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(
+            """
+      INSERT OR REPLACE INTO cache(key, value, expiration)
+      VALUES (:key, :value, :expiration)
+      """,
+            rows,
+        )
+        conn.commit()
+        return True
+    except Exception as e:
+        conn.rollback()  # Ensure rollback on error
+        print_error_log(f"Error setting {len(rows)} cache values: {e}")
+        return False
+
+
 def clear_expired_cache() -> None:
     """
     Delete all the expired cache
@@ -88,10 +117,7 @@ def get_value_with_presence(key: str) -> tuple[bool, Any]:
     if result is None:
         return False, None
 
-    encoded_value = result[0]  # Get the encoded value
-    pickled_value = base64.b64decode(encoded_value)  # Decode the Base64 value
-    value = pickle.loads(pickled_value)  # Deserialize the value
-    return True, value
+    return True, decode_value(result[0])  # Legacy base64 TEXT rows are still understood
 
 
 def remove_key(key: str) -> None:
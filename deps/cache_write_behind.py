@@ -0,0 +1,161 @@
+"""
+Write-behind buffer for the persistent cache.
+
+When enabled, set_cache(False, ...) only records the value in a memory overlay. The dirty keys are
+written in a single transaction when the flush interval elapses or when enough keys are pending,
+so a burst of reactions costs one commit instead of one per vote. Reads check the overlay before
+the database, and stop() writes what is left when the bot closes.
+Disabled by default: every set goes to the database right away like before.
+"""
+
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from deps.cache_data_access import set_values
+from deps.log import print_error_log, print_log
+from deps.system_database import database_manager
+
+DEFAULT_FLUSH_INTERVAL_MS = 500
+DEFAULT_MAX_PENDING_KEYS = 200
+
+
+class PersistentCacheWriteBehind:
+    """Memory overlay of the dirty persistent cache keys flushed by a background thread"""
+
+    def __init__(
+        self, flush_interval_ms: int = DEFAULT_FLUSH_INTERVAL_MS, max_pending_keys: int = DEFAULT_MAX_PENDING_KEYS
+    ) -> None:
+        self.enabled = False
+        self.flush_interval_ms = flush_interval_ms
+        self.max_pending_keys = max_pending_keys
+        self.flush_count = 0
+        # key -> (value, absolute expiration or None)
+        self._pending: dict[str, tuple[Any, Optional[datetime]]] = {}
+        self._lock = threading.Lock()
+        # Serializes the flushes so an older batch never lands after a newer one
+        self._flush_lock = threading.Lock()
+        self._wake_up = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        # Bumped when the database file changes so the flush thread reopens its connection
+        self._generation = 0
+
+    def start(self, flush_interval_ms: Optional[int] = None, max_pending_keys: Optional[int] = None) -> None:
+        """Enable the write-behind mode and start the flush thread"""
+        if flush_interval_ms is not None:
+            self.flush_interval_ms = flush_interval_ms
+        if max_pending_keys is not None:
+            self.max_pending_keys = max_pending_keys
+        self.enabled = True
+        self._stopping = False
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._flush_loop, name="cache-write-behind", daemon=True)
+            self._thread.start()
+        print_log(
+            f"Persistent cache write-behind enabled: every {self.flush_interval_ms} ms "
+            f"or {self.max_pending_keys} keys"
+        )
+
+    def stop(self, timeout_seconds: float = 10) -> None:
+        """Disable the write-behind mode after writing every pending key"""
+        self.enabled = False
+        self._stopping = True
+        self._wake_up.set()
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            thread.join(timeout=timeout_seconds)
+            if thread.is_alive():
+                print_error_log("PersistentCacheWriteBehind.stop: Flush thread did not stop before the timeout")
+        self._thread = None
+        self.flush()  # Anything set while the thread was stopping
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[int]) -> None:
+        """Record the value, it reaches the database with the next flush"""
+        expiration = None if ttl_seconds is None else datetime.now(timezone.utc) + timedelta(seconds=ttl_seconds)
+        with self._lock:
+            self._pending[key] = (value, expiration)
+            pending_count = len(self._pending)
+        if pending_count >= self.max_pending_keys:
+            self._wake_up.set()
+
+    def get_with_presence(self, key: str) -> tuple[bool, Any]:
+        """
+        Value of a pending key. An expired pending value is reported as present with None so the
+        older value still in the database is not served.
+        """
+        with self._lock:
+            pending = self._pending.get(key)
+        if pending is None:
+            return False, None
+        value, expiration = pending
+        if expiration is not None and expiration <= datetime.now(timezone.utc):
+            return True, None
+        return True, value
+
+    def discard(self, key: str) -> None:
+        """
+        Forget a pending key (the caller removes it from the database)
+        Waits for a flush in progress: its batch, or its failed batch put back, would write the key again
+        after the caller removed it from the database
+        """
+        with self._flush_lock, self._lock:
+            self._pending.pop(key, None)
+
+    def discard_by_prefix(self, prefix: str) -> int:
+        """Forget the pending keys starting with the prefix, after the flush in progress like discard"""
+        with self._flush_lock, self._lock:
+            keys = [key for key in self._pending if key.startswith(prefix)]
+            for key in keys:
+                del self._pending[key]
+        return len(keys)
+
+    def pending_count(self) -> int:
+        """Number of keys waiting for the next flush"""
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> int:
+        """Write every pending key in one transaction with the connection of the calling thread"""
+        with self._flush_lock:
+            with self._lock:
+                batch = self._pending
+                self._pending = {}
+            if not batch:
+                return 0
+            if set_values([(key, value, expiration) for key, (value, expiration) in batch.items()]):
+                self.flush_count += 1
+                return len(batch)
+            # Keep the batch for the next flush, without overriding keys set again meanwhile
+            with self._lock:
+                for key, pending in batch.items():
+                    self._pending.setdefault(key, pending)
+            return 0
+
+    def reset(self) -> None:
+        """Drop the pending keys of the previous database file"""
+        with self._lock:
+            self._pending.clear()
+        self._generation += 1
+
+    def _flush_loop(self) -> None:
+        generation = None
+        try:
+            while True:
+                self._wake_up.wait(timeout=self.flush_interval_ms / 1000)
+                self._wake_up.clear()
+                if generation != self._generation:
+                    generation = self._generation
+                    database_manager.open_thread_connection(read_only=False)
+                try:
+                    self.flush()
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    print_error_log(f"PersistentCacheWriteBehind._flush_loop: {e}")
+                if self._stopping:
+                    return
+        finally:
+            database_manager.close_thread_connection()
+
+
+persistent_cache_write_behind = PersistentCacheWriteBehind()
+database_manager.register_reset_hook(persistent_cache_write_behind.reset)
@@ -3,30 +3,48 @@
 from typing import Any, List, Optional, Union
 from datetime import datetime, timedelta, timezone
 import asyncio
-import random
 import re
-from time import sleep
+import weakref
 import discord
-from deps.browser_context_manager import BrowserContextManager
-from deps.browser_exceptions import BrowserException
 from deps.bot_singleton import BotSingleton
 from deps.cache import (
     ALWAYS_TTL,
+    DEFAULT_NEGATIVE_TTL,
     ONE_DAY_TTL,
     ONE_HOUR_TTL,
     ONE_MONTH_TTL,
     THREE_DAY_TTL,
     TWO_HOUR_TTL,
     get_cache,
+    get_persistent_cache_with_presence,
     remove_cache,
     reset_cache_by_prefixes,
     set_cache,
+    set_memory_cache_namespace_limit,
 )
-from deps.cache_data_access import get_value_with_presence
-from deps.models import ActivityTransition, SimpleUser, SimpleUserHour, UserQueueForStats
+from deps.models import ActivityTransition, GuildConfig, SimpleUser, SimpleUserHour, UserQueueForStats
+from deps.database_gateway import database_gateway
 from deps.log import print_error_log, print_log, print_warning_log
 from deps.functions_date import get_now_eastern
+from deps.functions_r6_tracker import parse_json_current_season_rank, parse_json_max_rank
+from deps.scrape_scheduler import ScrapePriority, scrape_scheduler
+from deps.stats_queue_data_access import (
+    claim_due_stats_requests,
+    delete_stats_request,
+    enqueue_stats_request,
+    evict_stale_stats_requests,
+    fetch_next_stats_request_due_at,
+    fetch_stats_requests,
+    release_stats_requests,
+)
 from deps.system_database import database_manager
+from deps.values import (
+    STATS_QUEUE_CLAIM_LIMIT,
+    STATS_QUEUE_DELAY_MINUTES,
+    STATS_QUEUE_LEASE_MINUTES,
+    STATS_QUEUE_RETRY_MINUTES,
+)
+from deps.voice_roster_store import voice_roster_store
 
 KEY_DAILY_MSG = "DailyMessageSentInChannel"
 KEY_REACTION_USERS = "ReactionUsersV2"
@@ -45,13 +63,11 @@ KEY_GUILD_BOT_VOICE_FIRST_USER = "GuildBotVoiceFirstUser"
 KEY_R6TRACKER = "R6Tracker"
 KEY_R6TRACKER_CURRENT_SEASON_RANK = "R6TrackerCurrentSeasonRank"
 KEY_GAMING_SESSION_LAST_ACTIVITY = "GamingSessionLastActivity"
-KEY_QUEUE_USER_STATS = "QueueUserStats"
 KEY_GUILD_TOURNAMENT_TEXT_CHANNEL = "GuildAdminConfigTournamentTextChannel"
 KEY_GUILD_MAIN_TEXT_CHANNEL = "GuildMainSiegeTextChannel"
 KEY_GUILD_AI_TEXT_CHANNEL = "GuildAITextChannel"
 KEY_GUILD_ANALYTICS_REPORT_TEXT_CHANNEL = "GuildAnalyticsReportTextChannel"
 KEY_GUILD_ANALYTICS_REPORT_SENT = "GuildAnalyticsReportSent"
-KEY_GUILD_VOICE_CHANNEL_LIST_USER = "GuildVoiceChannelListUser"
 KEY_GUILD_LAST_BOT_MESSAGE_MAIN_TEXT_CHANNEL = "GuildLastBotMessageMainTextChannel"
 KEY_AI_COUNT = "AI_daily_Count"
 KEY_GUILD_AI_CONTEXT = "GuildAIPermanentContext"
@@ -63,6 +79,16 @@ KEY_PENDING_MATCH_START_GIF = "PendingMatchStartGif"
 KEY_GUILD_PRIVATE_CHANNEL_CATEGORY = "GuildPrivateChannelCategory"
 KEY_GUILD_ACTIVE_PRIVATE_CHANNEL = "GuildActivePrivateChannel"
 
+# Discord objects are the bulk of the in-memory cache, cap each kind independently
+set_memory_cache_namespace_limit(KEY_MESSAGE, 2000)
+set_memory_cache_namespace_limit(KEY_MEMBER, 5000)
+set_memory_cache_namespace_limit(KEY_USER, 5000)
+set_memory_cache_namespace_limit(KEY_CHANNEL, 1000)
+set_memory_cache_namespace_limit(KEY_GUILD, 100)
+
+# Settings snapshot per guild id, see data_access_get_guild_config
+_guild_configs: dict[int, GuildConfig] = {}
+
 
 async def data_access_get_guild(guild_id: int) -> Union[discord.Guild, None]:
     """Get the guild by the given guild"""
@@ -114,7 +140,7 @@ async def data_access_get_member(guild_id: int, user_id: int) -> Union[discord.M
         except discord.errors.NotFound:
             return None
 
-    return await get_cache(True, f"{KEY_MEMBER}:{guild_id}:{user_id}", fetch)
+    return await get_cache(True, f"{KEY_MEMBER}:{guild_id}:{user_id}", fetch, early_refresh_beta=1.0)
 
 
 async def data_access_get_channel(channel_id: int) -> Union[discord.TextChannel, None]:
@@ -123,7 +149,7 @@ async def data_access_get_channel(channel_id: int) -> Union[discord.TextChannel,
     async def fetch() -> Any:
         return BotSingleton().bot.get_channel(channel_id)
 
-    return await get_cache(True, f"{KEY_CHANNEL}:{channel_id}", fetch)
+    return await get_cache(True, f"{KEY_CHANNEL}:{channel_id}", fetch, early_refresh_beta=1.0)
 
 
 async def data_access_get_reaction_message(
@@ -166,7 +192,9 @@ async def data_access_get_guild_schedule_text_channel_id(
     guild_id: int,
 ) -> Union[int, None]:
     """Get the channel by the given channel id"""
-    return await get_cache(False, f"{KEY_GUILD_SCHEDULE_TEXT_CHANNEL}:{guild_id}")
+    return await get_cache(
+        False, f"{KEY_GUILD_SCHEDULE_TEXT_CHANNEL}:{guild_id}", negative_ttl_in_seconds=DEFAULT_NEGATIVE_TTL
+    )
 
 
 def data_access_set_guild_schedule_text_channel_id(guild_id: int, channel_id: int) -> None:
@@ -174,11 +202,48 @@ def data_access_set_guild_schedule_text_channel_id(guild_id: int, channel_id: in
     set_cache(False, f"{KEY_GUILD_SCHEDULE_TEXT_CHANNEL}:{guild_id}", channel_id, ALWAYS_TTL)
 
 
+async def data_access_get_guild_config(guild_id: int) -> GuildConfig:
+    """
+    Get the settings snapshot of the guild used by the hot event handlers
+    The persisted values are read once, then the setters keep the snapshot up to date
+    """
+    config = _guild_configs.get(guild_id)
+    if config is not None:
+        return config
+    main_text_channel_id = await get_cache(False, f"{KEY_GUILD_MAIN_TEXT_CHANNEL}:{guild_id}")
+    voice_channel_ids = await get_cache(False, f"{KEY_GUILD_VOICE_CHANNELS}:{guild_id}")
+    active_private_channels = await get_cache(False, f"{KEY_GUILD_ACTIVE_PRIVATE_CHANNEL}:{guild_id}")
+    # Another caller may have loaded (or a setter updated) the snapshot while awaiting
+    config = _guild_configs.get(guild_id)
+    if config is None:
+        config = GuildConfig(
+            guild_id=guild_id,
+            main_text_channel_id=main_text_channel_id,
+            voice_channel_ids=voice_channel_ids,
+            active_private_channels=active_private_channels if active_private_channels is not None else {},
+        )
+        _guild_configs[guild_id] = config
+    return config
+
+
+def data_access_invalidate_guild_config(guild_id: Optional[int] = None) -> None:
+    """Forget the settings snapshot of a guild (all guilds if None), reloaded on the next read"""
+    if guild_id is None:
+        _guild_configs.clear()
+    else:
+        _guild_configs.pop(guild_id, None)
+
+
+# The snapshots belong to the database file they were read from
+database_manager.register_reset_hook(data_access_invalidate_guild_config)
+
+
 async def data_access_get_guild_voice_channel_ids(
     guild_id: int,
 ) -> Union[List[int], None]:
     """Get the channel by the given channel id"""
-    return await get_cache(False, f"{KEY_GUILD_VOICE_CHANNELS}:{guild_id}")
+    voice_channel_ids = (await data_access_get_guild_config(guild_id)).voice_channel_ids
+    return list(voice_channel_ids) if voice_channel_ids is not None else None
 
 
 def data_access_set_guild_voice_channel_ids(guild_id: int, channel_ids: Union[List[int], None]) -> None:
@@ -187,10 +252,14 @@ def data_access_set_guild_voice_channel_ids(guild_id: int, channel_ids: Union[Li
         remove_cache(False, f"{KEY_GUILD_VOICE_CHANNELS}:{guild_id}")
     else:
         set_cache(False, f"{KEY_GUILD_VOICE_CHANNELS}:{guild_id}", channel_ids, ALWAYS_TTL)
+    config = _guild_configs.get(guild_id)
+    if config is not None:
+        config.voice_channel_ids = list(channel_ids) if channel_ids is not None else None
 
 
 def data_access_reset_guild_cache(guild_id: int) -> None:
     """Clear the cache for the given guild"""
+    data_access_invalidate_guild_config(guild_id)
     prefixes = [
         f"{KEY_DAILY_MSG}:{guild_id}",
         f"{KEY_REACTION_USERS}:{guild_id}",
@@ -217,7 +286,10 @@ def data_access_reset_guild_cache(guild_id: int) -> None:
 
 async def data_access_get_bot_voice_first_user(guild_id: int) -> bool:
     """Get the channel by the given channel id"""
-    return await get_cache(False, f"{KEY_GUILD_BOT_VOICE_FIRST_USER}:{guild_id}", lambda: False)
+    enabled = await get_cache(
+        False, f"{KEY_GUILD_BOT_VOICE_FIRST_USER}:{guild_id}", negative_ttl_in_seconds=DEFAULT_NEGATIVE_TTL
+    )
+    return False if enabled is None else enabled
 
 
 def data_access_set_bot_voice_first_user(guild_id: int, enabled: bool) -> None:
@@ -225,21 +297,19 @@ def data_access_set_bot_voice_first_user(guild_id: int, enabled: bool) -> None:
     set_cache(False, f"{KEY_GUILD_BOT_VOICE_FIRST_USER}:{guild_id}", enabled, ALWAYS_TTL)
 
 
-def _download_max_rank_sync(ubisoft_user_name: str) -> tuple[str, int]:
-    with BrowserContextManager(ubisoft_user_name) as context:
-        return context.download_max_rank(ubisoft_user_name)
+async def _download_max_rank(ubisoft_user_name: str) -> tuple[str, int]:
+    return await scrape_scheduler.fetch_profile(ubisoft_user_name, parse_json_max_rank, ScrapePriority.INTERACTIVE)
 
 
-def _download_current_season_rank_sync(ubisoft_user_name: str) -> tuple[str, int]:
-    with BrowserContextManager(ubisoft_user_name) as context:
-        return context.download_current_season_rank(ubisoft_user_name)
+async def _download_current_season_rank(ubisoft_user_name: str, priority: ScrapePriority) -> tuple[str, int]:
+    return await scrape_scheduler.fetch_profile(ubisoft_user_name, parse_json_current_season_rank, priority)
 
 
 async def data_access_get_r6tracker_max_rank(ubisoft_user_name: str, force_fetch: bool = False) -> tuple[str, int]:
     """
     Get from R6 Tracker website the max rank for the user
     """
-    return await asyncio.to_thread(_download_max_rank_sync, ubisoft_user_name)
+    return await _download_max_rank(ubisoft_user_name)
     # if force_fetch:
     #     remove_cache(True, f"{KEY_R6TRACKER}:{ubisoft_user_name}")
 
@@ -251,7 +321,7 @@ def _current_season_rank_cache_key(ubisoft_user_name: str) -> str:
 
 
 async def data_access_get_r6tracker_current_season_rank(
-    ubisoft_user_name: str, force_fetch: bool = False
+    ubisoft_user_name: str, force_fetch: bool = False, priority: ScrapePriority = ScrapePriority.INTERACTIVE
 ) -> tuple[str, int]:
     """
     Get from R6 Tracker website the user's current ranked season rank.
@@ -261,31 +331,17 @@ async def data_access_get_r6tracker_current_season_rank(
         remove_cache(False, cache_key)
 
     async def fetch() -> tuple[str, int]:
-        return await asyncio.to_thread(_download_current_season_rank_sync, ubisoft_user_name)
+        return await _download_current_season_rank(ubisoft_user_name, priority)
 
     return await get_cache(False, cache_key, fetch, ttl_in_seconds=TWO_HOUR_TTL)
 
 
-def _download_current_season_ranks_sync(ubisoft_user_names: List[str]) -> dict[str, tuple[str, int]]:
-    """Download the current season rank for many users while opening a single browser session."""
-    ranks: dict[str, tuple[str, int]] = {}
-    with BrowserContextManager(ubisoft_user_names[0]) as context:
-        for i, ubisoft_user_name in enumerate(ubisoft_user_names):
-            try:
-                ranks[ubisoft_user_name] = context.download_current_season_rank(ubisoft_user_name)
-            except BrowserException as e:
-                print_warning_log(
-                    f"_download_current_season_ranks_sync: Could not fetch rank for {ubisoft_user_name}: {e}"
-                )
-            if i < len(ubisoft_user_names) - 1:
-                sleep(random.uniform(3, 12))  # Sleep few seconds between each request
-    return ranks
-
-
-async def data_access_prefetch_r6tracker_current_season_ranks(ubisoft_user_names: List[str]) -> None:
+async def data_access_prefetch_r6tracker_current_season_ranks(
+    ubisoft_user_names: List[str], priority: ScrapePriority = ScrapePriority.PERIODIC
+) -> None:
     """
-    Warm the current season rank cache for many users using a single browser session
-    instead of opening one browser per user. Users already cached are skipped; users
+    Warm the current season rank cache for many users through the scrape scheduler
+    instead of one browser per user. Users already cached are skipped; users
     whose fetch fails are left uncached so the per-user fallback can retry them.
     """
     names_to_fetch: List[str] = []
@@ -302,7 +358,7 @@ async def data_access_prefetch_r6tracker_current_season_ranks(ubisoft_user_names
         return
 
     try:
-        ranks = await asyncio.to_thread(_download_current_season_ranks_sync, names_to_fetch)
+        ranks = await scrape_scheduler.fetch_profiles(names_to_fetch, parse_json_current_season_rank, priority)
     except Exception as e:
         print_warning_log(f"data_access_prefetch_r6tracker_current_season_ranks: Unable to prefetch ranks in bulk: {e}")
         return
@@ -315,7 +371,9 @@ async def data_access_get_guild_username_text_channel_id(
     guild_id: int,
 ) -> Union[int, None]:
     """Get the channel by the given channel id"""
-    return await get_cache(False, f"{KEY_GUILD_USERNAME_TEXT_CHANNEL}:{guild_id}")
+    return await get_cache(
+        False, f"{KEY_GUILD_USERNAME_TEXT_CHANNEL}:{guild_id}", negative_ttl_in_seconds=DEFAULT_NEGATIVE_TTL
+    )
 
 
 def data_access_set_guild_username_text_channel_id(guild_id: int, channel_id: int) -> None:
@@ -327,7 +385,9 @@ async def data_access_get_gaming_session_text_channel_id(
     guild_id: int,
 ) -> Union[int, None]:
     """Get the channel by the given guild id"""
-    return await get_cache(False, f"{KEY_GUILD_GAMING_SESSION_TEXT_CHANNEL}:{guild_id}")
+    return await get_cache(
+        False, f"{KEY_GUILD_GAMING_SESSION_TEXT_CHANNEL}:{guild_id}", negative_ttl_in_seconds=DEFAULT_NEGATIVE_TTL
+    )
 
 
 def data_access_set_gaming_session_text_channel_id(guild_id: int, channel_id: int) -> None:
@@ -349,7 +409,9 @@ async def data_access_get_new_user_text_channel_id(
     guild_id: int,
 ) -> Union[int, None]:
     """Get the channel by the given guild id"""
-    return await get_cache(False, f"{KEY_GUILD_NEW_USER_TEXT_CHANNEL}:{guild_id}")
+    return await get_cache(
+        False, f"{KEY_GUILD_NEW_USER_TEXT_CHANNEL}:{guild_id}", negative_ttl_in_seconds=DEFAULT_NEGATIVE_TTL
+    )
 
 
 def data_access_set_new_user_text_channel_id(guild_id: int, channel_id: int) -> None:
@@ -357,24 +419,27 @@ def data_access_set_new_user_text_channel_id(guild_id: int, channel_id: int) ->
     set_cache(False, f"{KEY_GUILD_NEW_USER_TEXT_CHANNEL}:{guild_id}", channel_id, ALWAYS_TTL)
 
 
-lock_member_stats = asyncio.Lock()
-lock_voice_user_list = asyncio.Lock()
+# Set when a user is queued, one event per event loop
+_STATS_QUEUE_WAKEUP: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Event]" = weakref.WeakKeyDictionary()
+
 
+def _get_stats_queue_wakeup() -> asyncio.Event:
+    """The event of the running loop set when a user is queued"""
+    return _STATS_QUEUE_WAKEUP.setdefault(asyncio.get_running_loop(), asyncio.Event())
 
-async def data_access_get_list_member_stats() -> Optional[List[UserQueueForStats]]:
+
+async def data_access_get_list_member_stats() -> List[UserQueueForStats]:
     """Get the list of all the members that are in the queue to get their stats"""
-    return await get_cache(True, f"{KEY_QUEUE_USER_STATS}")
+    return fetch_stats_requests()
 
 
-def _evict_stale_member_stats(list_users: List[UserQueueForStats]) -> List[UserQueueForStats]:
+def _evict_stale_member_stats() -> None:
     """
     Remove all the user where the time_queue is over 1 hour.
     Evicted users never got their stats posted, so log them loudly instead of dropping silently.
     """
     current_time = datetime.now(timezone.utc)
-    delta = current_time - timedelta(hours=1)
-    fresh_users = [user_in_list for user_in_list in list_users if user_in_list.time_queue > delta]
-    evicted_users = [user_in_list for user_in_list in list_users if user_in_list.time_queue <= delta]
+    evicted_users = evict_stale_stats_requests(current_time - timedelta(hours=1), current_time)
     if len(evicted_users) > 0:
         names = ", ".join(
             f"{user_in_list.user_info.display_name} (queued at {user_in_list.time_queue.isoformat()}, "
@@ -385,48 +450,61 @@ def _evict_stale_member_stats(list_users: List[UserQueueForStats]) -> List[UserQ
             f"_evict_stale_member_stats: Dropping {len(evicted_users)} stats queue entry(ies) older than "
             f"1 hour without posting their stats: {names}"
         )
-    return fresh_users
+
+
+def _enqueue_member_stats(user: UserQueueForStats, due_at: datetime) -> bool:
+    """Evict the stale members then queue the user, on the database writer thread"""
+    _evict_stale_member_stats()
+    return enqueue_stats_request(user.user_info.id, user.guild_id, user.time_queue, due_at)
+
+
+def _claim_due_member_stats(due_only: bool) -> List[UserQueueForStats]:
+    """Evict the stale members then lease the due ones, on the database writer thread"""
+    _evict_stale_member_stats()
+    current_time = datetime.now(timezone.utc)
+    return claim_due_stats_requests(
+        current_time,
+        current_time + timedelta(minutes=STATS_QUEUE_LEASE_MINUTES),
+        STATS_QUEUE_CLAIM_LIMIT,
+        due_only,
+    )
 
 
 async def data_access_add_list_member_stats(user: UserQueueForStats) -> None:
     """Add a user to the list of all the members that are in the queue to get their stats"""
-    async with lock_member_stats:
-        list_users = await data_access_get_list_member_stats()
-        if list_users is None:
-            list_users = []
+    # A user already queued for the guild (maybe few minutes ago) keeps its place
+    due_at = user.time_queue + timedelta(minutes=STATS_QUEUE_DELAY_MINUTES)
+    if await database_gateway.write(_enqueue_member_stats, user, due_at):
+        _get_stats_queue_wakeup().set()
 
-        list_users = _evict_stale_member_stats(list_users)
 
-        # Search to see if the user id is already in the list (maybe few minutes ago it was added to the list)
-        for user_in_list in list_users:
-            if user_in_list.user_info.id == user.user_info.id and user_in_list.guild_id == user.guild_id:
-                return
-        list_users.append(user)
-        # Lock to make sure that the list is not updated by multiple threads
+async def data_access_claim_due_member_stats(due_only: bool = True) -> List[UserQueueForStats]:
+    """
+    Take the members whose stats are due (all the queued members when due_only is False).
+    They stay in the queue, hidden from the other runs, until removed or their attempt is counted.
+    """
+    return await database_gateway.write(_claim_due_member_stats, due_only)
 
-        set_cache(True, f"{KEY_QUEUE_USER_STATS}", list_users, ONE_DAY_TTL)
-    # Lock is released here
+
+async def data_access_wait_for_due_member_stats(max_wait_seconds: float = ONE_HOUR_TTL) -> None:
+    """Sleep until the next queued member is due, a member is queued, or max_wait_seconds passed"""
+    wakeup = _get_stats_queue_wakeup()
+    wakeup.clear()
+    next_due_at = fetch_next_stats_request_due_at()
+    timeout = max_wait_seconds
+    if next_due_at is not None:
+        timeout = min(max((next_due_at - datetime.now(timezone.utc)).total_seconds(), 0.0), max_wait_seconds)
+    try:
+        await asyncio.wait_for(wakeup.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
 
 
 async def data_acess_remove_list_member_stats(user_queued_for_stats: UserQueueForStats) -> None:
     """Remove a user from the list of all the members that are in the queue to get their stats"""
-    async with lock_member_stats:
-        list_users = await data_access_get_list_member_stats()
-        if list_users is None:
-            return
-
-        list_users = _evict_stale_member_stats(list_users)
-
-        # Search to see if the user id is already in the list (maybe few minutes ago it was added to the list)
-        for user_in_list in list_users:
-            if (
-                user_in_list.user_info.id == user_queued_for_stats.user_info.id
-                and user_in_list.guild_id == user_queued_for_stats.guild_id
-            ):
-                list_users.remove(user_in_list)
-                break  # Break because we know maximum one entry per user
-        set_cache(True, f"{KEY_QUEUE_USER_STATS}", list_users, ONE_DAY_TTL)
-    # Lock is released here
+    await database_gateway.write(
+        delete_stats_request, user_queued_for_stats.user_info.id, user_queued_for_stats.guild_id
+    )
 
 
 async def data_access_increment_member_stats_attempts(
@@ -434,35 +512,24 @@ async def data_access_increment_member_stats_attempts(
 ) -> None:
     """
     Increment the failed-attempt counter for the attempted users that are still in the
-    queue (meaning their stats were not posted this cycle). Entries reaching max_attempts
-    are removed so a user whose fetch always fails cannot clog the queue forever.
+    queue (meaning their stats were not posted this cycle) and retry them a few minutes later.
+    Entries reaching max_attempts are removed so a user whose fetch always fails cannot clog the queue forever.
     """
-    async with lock_member_stats:
-        list_users = await data_access_get_list_member_stats()
-        if list_users is None or len(list_users) == 0:
-            return
-
-        attempted_keys = {(user.user_info.id, user.guild_id) for user in attempted_users}
-        remaining_users: List[UserQueueForStats] = []
-        for user_in_list in list_users:
-            if (user_in_list.user_info.id, user_in_list.guild_id) in attempted_keys:
-                user_in_list.attempts += 1
-                if user_in_list.attempts >= max_attempts:
-                    print_error_log(
-                        f"data_access_increment_member_stats_attempts: Giving up on stats for "
-                        f"{user_in_list.user_info.display_name} after {user_in_list.attempts} failed attempts"
-                    )
-                    continue
-            remaining_users.append(user_in_list)
-        set_cache(True, f"{KEY_QUEUE_USER_STATS}", remaining_users, ONE_DAY_TTL)
-    # Lock is released here
+    retry_at = datetime.now(timezone.utc) + timedelta(minutes=STATS_QUEUE_RETRY_MINUTES)
+    for user_in_list in await database_gateway.write(release_stats_requests, attempted_users, max_attempts, retry_at):
+        print_error_log(
+            f"data_access_increment_member_stats_attempts: Giving up on stats for "
+            f"{user_in_list.user_info.display_name} after {user_in_list.attempts} failed attempts"
+        )
 
 
 async def data_access_get_guild_tournament_text_channel_id(
     guild_id: int,
 ) -> Union[int, None]:
     """Get the channel by the given channel id"""
-    return await get_cache(False, f"{KEY_GUILD_TOURNAMENT_TEXT_CHANNEL}:{guild_id}")
+    return await get_cache(
+        False, f"{KEY_GUILD_TOURNAMENT_TEXT_CHANNEL}:{guild_id}", negative_ttl_in_seconds=DEFAULT_NEGATIVE_TTL
+    )
 
 
 def data_access_set_guild_tournament_text_channel_id(guild_id: int, channel_id: int) -> None:
@@ -474,7 +541,9 @@ async def data_access_get_analytics_report_text_channel_id(
     guild_id: int,
 ) -> Union[int, None]:
     """Get the configured monthly analytics report channel."""
-    return await get_cache(False, f"{KEY_GUILD_ANALYTICS_REPORT_TEXT_CHANNEL}:{guild_id}")
+    return await get_cache(
+        False, f"{KEY_GUILD_ANALYTICS_REPORT_TEXT_CHANNEL}:{guild_id}", negative_ttl_in_seconds=DEFAULT_NEGATIVE_TTL
+    )
 
 
 def data_access_set_analytics_report_text_channel_id(guild_id: int, channel_id: int) -> None:
@@ -497,19 +566,24 @@ async def data_access_get_main_text_channel_id(
     guild_id: int,
 ) -> Union[int, None]:
     """Get the channel by the given channel id"""
-    return await get_cache(False, f"{KEY_GUILD_MAIN_TEXT_CHANNEL}:{guild_id}")
+    return (await data_access_get_guild_config(guild_id)).main_text_channel_id
 
 
 def data_access_set_main_text_channel_id(guild_id: int, channel_id: int) -> None:
     """Set the channel that the bot will send text related to Siege"""
     set_cache(False, f"{KEY_GUILD_MAIN_TEXT_CHANNEL}:{guild_id}", channel_id, ALWAYS_TTL)
+    config = _guild_configs.get(guild_id)
+    if config is not None:
+        config.main_text_channel_id = channel_id
 
 
 async def data_access_get_ai_text_channel_id(
     guild_id: int,
 ) -> Union[int, None]:
     """Get the channel by the given channel id"""
-    return await get_cache(False, f"{KEY_GUILD_AI_TEXT_CHANNEL}:{guild_id}")
+    return await get_cache(
+        False, f"{KEY_GUILD_AI_TEXT_CHANNEL}:{guild_id}", negative_ttl_in_seconds=DEFAULT_NEGATIVE_TTL
+    )
 
 
 def data_access_set_ai_text_channel_id(guild_id: int, channel_id: int) -> None:
@@ -519,7 +593,7 @@ def data_access_set_ai_text_channel_id(guild_id: int, channel_id: int) -> None:
 
 async def data_access_get_guild_ai_context(guild_id: int) -> Union[str, None]:
     """Get the permanent AI context for a guild."""
-    found, value = get_value_with_presence(f"{KEY_GUILD_AI_CONTEXT}:{guild_id}")
+    found, value = get_persistent_cache_with_presence(f"{KEY_GUILD_AI_CONTEXT}:{guild_id}")
     if not found:
         return None
     return value
@@ -529,7 +603,7 @@ def data_access_set_guild_ai_context(guild_id: int, context: str) -> None:
     """Persist the permanent AI context for a guild."""
     key = f"{KEY_GUILD_AI_CONTEXT}:{guild_id}"
     set_cache(False, key, context, ALWAYS_TTL)
-    found, stored_value = get_value_with_presence(key)
+    found, stored_value = get_persistent_cache_with_presence(key)
     if not found or stored_value != context:
         print_error_log(f"data_access_set_guild_ai_context: Failed to persist AI context for guild {guild_id}")
 
@@ -541,24 +615,22 @@ def data_access_clear_guild_ai_context(guild_id: int) -> None:
 
 def data_access_set_voice_user_list(guild_id: int, channel_id: int, user_map: dict[int, ActivityTransition]) -> None:
     """Set the list of user for a voice channel and their activity"""
-    set_cache(True, f"{KEY_GUILD_VOICE_CHANNEL_LIST_USER}:{guild_id}:{channel_id}", user_map, ALWAYS_TTL)
+    voice_roster_store.replace(guild_id, channel_id, user_map)
 
 
 async def data_access_get_voice_user_list(guild_id: int, channel_id: int) -> dict[int, ActivityTransition]:
     """Get the list of user for a voice channel and their activity"""
-    result = await get_cache(True, f"{KEY_GUILD_VOICE_CHANNEL_LIST_USER}:{guild_id}:{channel_id}")
-    if result is None:
-        return {}
-    return result
+    return voice_roster_store.get(guild_id, channel_id)
+
+
+def data_access_get_voice_user_list_version(guild_id: int, channel_id: int) -> int:
+    """Get the change counter of the list of user of a voice channel"""
+    return voice_roster_store.version(guild_id, channel_id)
 
 
 async def data_access_remove_voice_user_list(guild_id: int, channel_id: int, user_id: int) -> None:
     """Remove a user from the voice channel list"""
-    async with lock_voice_user_list:  # FIX: Add locking
-        user_map = await data_access_get_voice_user_list(guild_id, channel_id)
-        user_map.pop(user_id, None)
-        print_log(f"data_access_remove_voice_user_list: Remove voice user list: {len(user_map.keys())}")
-        set_cache(True, f"{KEY_GUILD_VOICE_CHANNEL_LIST_USER}:{guild_id}:{channel_id}", user_map, ALWAYS_TTL)
+    voice_roster_store.remove(guild_id, channel_id, user_id)
 
 
 async def data_access_update_voice_user_list(
@@ -570,30 +642,18 @@ async def data_access_update_voice_user_list(
         If a string, we need to take the current after, set to before and use the string as the after
         If an activity, we just set the activity
     """
-    async with lock_voice_user_list:  # FIX: Add locking
-        user_map = await data_access_get_voice_user_list(guild_id, channel_id)
-
-        # The activity_detail exist (could be string or a full activity detail or None if the user does not have the activity feature enabled)
-        if isinstance(activity_detail, str):
-            # If a string is provided, it means we only have a activity detail (without the before)
-            # It happens in the case of changing status (offline to online)
-            current_activity = user_map.get(user_id, None)
-            if current_activity is None:
-                # If the user wasn't there and we have only the after, we set the None the before
-                to_save = ActivityTransition(None, activity_detail)
-            else:
-                # If we had the user before and now providing only a current detail, we set the current after as before and then the string as after
-                to_save = ActivityTransition(current_activity.after, activity_detail)
-        else:
-            # We have a full activity detail. Might be None, or might have both before and after
-            if activity_detail is None:
-                to_save = ActivityTransition(None, None)
-            else:
-                to_save = activity_detail
-
-        # Save the user which is None or a full activity detail
-        user_map[user_id] = to_save
-        data_access_set_voice_user_list(guild_id, channel_id, user_map)
+    voice_roster_store.update(guild_id, channel_id, user_id, activity_detail)
+
+
+async def data_access_move_voice_user_list(
+    guild_id: int,
+    from_channel_id: int,
+    to_channel_id: int,
+    user_id: int,
+    activity_detail: Optional[Union[ActivityTransition, str]],
+) -> None:
+    """Move a user from a voice channel list to another one"""
+    voice_roster_store.move(guild_id, from_channel_id, to_channel_id, user_id, activity_detail)
 
 
 async def data_access_get_last_bot_message_in_main_text_channel(
@@ -671,9 +731,15 @@ async def data_access_get_custom_game_voice_channels(
     guild_id: int,
 ) -> tuple[Optional[int], Optional[int], Optional[int]]:
     """Get the voice channels used for custom games"""
-    lobby_channel_id = await get_cache(False, f"{KEY_GUILD_CUSTOM_GAME_VOICE_CHANNEL_LOBBY}:{guild_id}")
-    team1_channel_id = await get_cache(False, f"{KEY_GUILD_CUSTOM_GAME_VOICE_CHANNEL_TEAM1}:{guild_id}")
-    team2_channel_id = await get_cache(False, f"{KEY_GUILD_CUSTOM_GAME_VOICE_CHANNEL_TEAM2}:{guild_id}")
+    lobby_channel_id = await get_cache(
+        False, f"{KEY_GUILD_CUSTOM_GAME_VOICE_CHANNEL_LOBBY}:{guild_id}", negative_ttl_in_seconds=DEFAULT_NEGATIVE_TTL
+    )
+    team1_channel_id = await get_cache(
+        False, f"{KEY_GUILD_CUSTOM_GAME_VOICE_CHANNEL_TEAM1}:{guild_id}", negative_ttl_in_seconds=DEFAULT_NEGATIVE_TTL
+    )
+    team2_channel_id = await get_cache(
+        False, f"{KEY_GUILD_CUSTOM_GAME_VOICE_CHANNEL_TEAM2}:{guild_id}", negative_ttl_in_seconds=DEFAULT_NEGATIVE_TTL
+    )
     return (lobby_channel_id, team1_channel_id, team2_channel_id)
 
 
@@ -739,7 +805,9 @@ def data_access_clear_pending_match_start_gif_message(guild_id: int, voice_chann
 
 async def data_access_get_guild_private_channel_category_id(guild_id: int) -> Union[int, None]:
     """Get the category where private channels are created"""
-    return await get_cache(False, f"{KEY_GUILD_PRIVATE_CHANNEL_CATEGORY}:{guild_id}")
+    return await get_cache(
+        False, f"{KEY_GUILD_PRIVATE_CHANNEL_CATEGORY}:{guild_id}", negative_ttl_in_seconds=DEFAULT_NEGATIVE_TTL
+    )
 
 
 def data_access_set_guild_private_channel_category_id(guild_id: int, category_id: int) -> None:
@@ -749,24 +817,25 @@ def data_access_set_guild_private_channel_category_id(guild_id: int, category_id
 
 async def data_access_get_guild_active_private_channels(guild_id: int) -> dict[int, tuple[int, bool]]:
     """Get all active private channels as {channel_id: (creator_id, track)}, or empty dict."""
-    result = await get_cache(False, f"{KEY_GUILD_ACTIVE_PRIVATE_CHANNEL}:{guild_id}")
-    return result if result is not None else {}
+    return dict((await data_access_get_guild_config(guild_id)).active_private_channels)
 
 
 async def data_access_set_guild_active_private_channel(
     guild_id: int, channel_id: int, creator_id: int, track: bool = True
 ) -> None:
     """Add or update a private channel entry."""
-    channels = await data_access_get_guild_active_private_channels(guild_id)
-    channels[channel_id] = (creator_id, track)
-    set_cache(False, f"{KEY_GUILD_ACTIVE_PRIVATE_CHANNEL}:{guild_id}", channels, ALWAYS_TTL)
+    config = await data_access_get_guild_config(guild_id)
+    config.active_private_channels[channel_id] = (creator_id, track)
+    set_cache(False, f"{KEY_GUILD_ACTIVE_PRIVATE_CHANNEL}:{guild_id}", dict(config.active_private_channels), ALWAYS_TTL)
 
 
 async def data_access_remove_guild_active_private_channel(guild_id: int, channel_id: int) -> None:
     """Remove a single private channel entry."""
-    channels = await data_access_get_guild_active_private_channels(guild_id)
-    channels.pop(channel_id, None)
-    if channels:
-        set_cache(False, f"{KEY_GUILD_ACTIVE_PRIVATE_CHANNEL}:{guild_id}", channels, ALWAYS_TTL)
+    config = await data_access_get_guild_config(guild_id)
+    config.active_private_channels.pop(channel_id, None)
+    if config.active_private_channels:
+        set_cache(
+            False, f"{KEY_GUILD_ACTIVE_PRIVATE_CHANNEL}:{guild_id}", dict(config.active_private_channels), ALWAYS_TTL
+        )
     else:
         remove_cache(False, f"{KEY_GUILD_ACTIVE_PRIVATE_CHANNEL}:{guild_id}")
@@ -35,6 +35,18 @@ class UserActivity:
     guild_id: int
 
 
+@dataclass
+class UserVoiceSession:
+    """Match the SQL table voice_session for a closed session"""
+
+    user_id: int
+    guild_id: int
+    channel_id: int
+    start_ts: str
+    end_ts: str
+    duration_s: float
+
+
 @dataclass
 class UserWeight:
     """Match the SQL table user_weights"""
@@ -0,0 +1,153 @@
+"""
+Async gateway in front of SQLite so the event loop never waits on the database.
+
+Writes are executed one after another by a single writer thread fed by a bounded queue: SQLite
+only allows one writer at a time, so serializing them in-process avoids busy retries. Reads are
+executed by a small pool of threads, each owning a read-only WAL connection, so a long
+leaderboard query or a match bulk insert does not stall presence and voice handlers.
+
+The callables submitted are the regular synchronous data access functions. While they run on a
+gateway thread, database_manager.get_conn()/get_cursor() return that thread's connection.
+
+The gateway is opt-in: only the calls wrapped in database_gateway.write/read go through it. The writes of
+the hot or heavy paths do:
+- the user activity and voice session writes of the voice state events (cogs/events.py)
+- the stats queue (deps/data_access.py)
+- the scrape jobs and the scraper rate limiter state (deps/scrape_scheduler.py, deps/browser.py)
+- the saves of a scrape run: matches, full stats, operator stats, player values and R6 Tracker ids
+  (deps/bot_common_actions.py)
+On the read side, the synchronous fetch functions of the cache misses (deps/cache.py) and the scrape job
+results use the readers. The other data access functions still run on the caller's thread with the shared
+connection, and the write-behind cache flush and the scraper worker processes write with their own
+connections: those writers are not serialized with the gateway and wait on the SQLite busy timeout
+(DATABASE_BUSY_TIMEOUT_SECONDS) of every connection.
+"""
+
+import asyncio
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from deps.log import print_error_log, print_log
+from deps.system_database import database_manager
+
+DEFAULT_READER_COUNT = 3
+DEFAULT_WRITE_QUEUE_SIZE = 1000
+
+
+class DatabaseGateway:
+    """Dedicated writer thread with a bounded queue and a pool of WAL reader connections"""
+
+    def __init__(self, reader_count: int = DEFAULT_READER_COUNT, write_queue_size: int = DEFAULT_WRITE_QUEUE_SIZE):
+        self.reader_count = reader_count
+        self._write_queue: queue.Queue = queue.Queue(maxsize=write_queue_size)
+        self._writer_thread: Optional[threading.Thread] = None
+        self._reader_executor: Optional[ThreadPoolExecutor] = None
+        self._start_lock = threading.Lock()
+        # Bumped when the database file changes so every gateway thread reopens its connection
+        self._generation = 0
+        self._thread_local = threading.local()
+
+    def _ensure_thread_connection(self, read_only: bool) -> None:
+        """Open (or reopen after a database switch) the connection of the calling gateway thread."""
+        if getattr(self._thread_local, "generation", None) == self._generation:
+            return
+        database_manager.open_thread_connection(read_only=read_only)
+        self._thread_local.generation = self._generation
+
+    def invalidate_connections(self) -> None:
+        """Ask every gateway thread to reopen its connection before its next job."""
+        self._generation += 1
+
+    def _start_writer(self) -> None:
+        with self._start_lock:
+            if self._writer_thread is not None and self._writer_thread.is_alive():
+                return
+            self._writer_thread = threading.Thread(target=self._writer_loop, name="db-writer", daemon=True)
+            self._writer_thread.start()
+
+    def _start_readers(self) -> ThreadPoolExecutor:
+        with self._start_lock:
+            if self._reader_executor is None:
+                self._reader_executor = ThreadPoolExecutor(
+                    max_workers=self.reader_count, thread_name_prefix="db-reader"
+                )
+            return self._reader_executor
+
+    def _writer_loop(self) -> None:
+        """Run the queued writes one at a time until the stop sentinel is received."""
+        try:
+            while True:
+                job = self._write_queue.get()
+                try:
+                    if job is None:
+                        return
+                    loop, future, function, args, kwargs = job
+                    try:
+                        self._ensure_thread_connection(read_only=False)
+                        result = function(*args, **kwargs)
+                    except Exception as e:  # pylint: disable=broad-exception-caught
+                        loop.call_soon_threadsafe(_set_future_exception, future, e)
+                    else:
+                        loop.call_soon_threadsafe(_set_future_result, future, result)
+                finally:
+                    self._write_queue.task_done()
+        finally:
+            database_manager.close_thread_connection()
+
+    def _run_read(self, function: Callable[..., Any], args: tuple, kwargs: dict) -> Any:
+        self._ensure_thread_connection(read_only=True)
+        return function(*args, **kwargs)
+
+    async def write(self, function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Queue a write for the writer thread and await its result."""
+        self._start_writer()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        job = (loop, future, function, args, kwargs)
+        try:
+            self._write_queue.put_nowait(job)
+        except queue.Full:
+            # Backpressure without blocking the event loop: wait for room from a helper thread
+            print_log("DatabaseGateway.write: Write queue is full, waiting for the writer to catch up")
+            await asyncio.to_thread(self._write_queue.put, job)
+        return await future
+
+    async def read(self, function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run a read on one of the reader connections and await its result."""
+        executor = self._start_readers()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self._run_read, function, args, kwargs)
+
+    def write_queue_depth(self) -> int:
+        """Number of writes waiting for the writer thread"""
+        return self._write_queue.qsize()
+
+    def stop(self, timeout_seconds: float = 10) -> None:
+        """Drain pending writes then stop the writer thread and the reader pool."""
+        writer_thread = self._writer_thread
+        if writer_thread is not None and writer_thread.is_alive():
+            self._write_queue.put(None)
+            writer_thread.join(timeout=timeout_seconds)
+            if writer_thread.is_alive():
+                print_error_log("DatabaseGateway.stop: Writer thread did not stop before the timeout")
+        self._writer_thread = None
+        reader_executor = self._reader_executor
+        self._reader_executor = None
+        if reader_executor is not None:
+            reader_executor.shutdown(wait=True)
+
+
+def _set_future_result(future: asyncio.Future, result: Any) -> None:
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_future_exception(future: asyncio.Future, exception: BaseException) -> None:
+    if not future.done():
+        future.set_exception(exception)
+
+
+database_gateway = DatabaseGateway()
+database_manager.register_reset_hook(database_gateway.invalidate_connections)
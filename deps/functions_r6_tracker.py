@@ -6,7 +6,7 @@ import json
 from datetime import datetime
 from dateutil import parser
 from deps.data_access_data_class import UserInfo
-from deps.models import UserFullMatchStats, UserInformation, UserMatchInfoSessionAggregate
+from deps.models import MatchHighWaterMark, UserFullMatchStats, UserInformation, UserMatchInfoSessionAggregate
 from deps.log import print_error_log
 from deps.siege import NO_RANK_ROLE
 
@@ -22,10 +22,29 @@ def download_stub_file() -> Optional[str]:
         return data
 
 
-def parse_json_from_full_matches(data_dict, user_info: UserInfo) -> List[UserFullMatchStats]:
+def get_new_matches(matches: List[dict], high_water_mark: MatchHighWaterMark) -> List[dict]:
+    """
+    Keep the matches played after the newest stored one
+    The API lists the newest match first, so the scan stops at the first known match.
+    """
+    for index, match in enumerate(matches):
+        try:
+            match_uuid = match.get("attributes", {}).get("id", "Unknown")
+            match_timestamp = parser.parse(match["metadata"].get("timestamp", "1970-01-01T00:00:00Z"))
+        except (KeyError, TypeError, ValueError, AttributeError):
+            continue  # The parser skips the malformed matches as well
+        if high_water_mark.is_known(match_uuid, match_timestamp):
+            return matches[:index]
+    return matches
+
+
+def parse_json_from_full_matches(
+    data_dict, user_info: UserInfo, high_water_mark: Optional[MatchHighWaterMark] = None
+) -> List[UserFullMatchStats]:
     """
     Function to parse the JSON dictionary into dataclasses
     The parse function returns more information than the one for the summary.
+    With a high water mark, only the matches newer than the stored ones are parsed.
     """
     try:
         matches = data_dict["data"]["matches"]
@@ -39,6 +58,15 @@ def parse_json_from_full_matches(data_dict, user_info: UserInfo) -> List[UserFul
     except TypeError as e:
         print_error_log(f"parse_json_from_full_matches: TypeError: Unexpected data format - {e}")
         return []
+    if high_water_mark is not None:
+        matches = get_new_matches(matches, high_water_mark)
+    return parse_full_matches(matches, user_info)
+
+
+def parse_full_matches(matches: List[dict], user_info: UserInfo) -> List[UserFullMatchStats]:
+    """
+    Parse the match entries of the R6 Tracker matches API
+    """
     # Loopp all matches
     match_infos = []
     for match in matches:
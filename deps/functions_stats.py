@@ -8,6 +8,7 @@ from datetime import date, datetime, timedelta, timezone
 import discord
 from deps.functions_date import get_now_eastern
 from deps.analytic_visualizer import display_user_top_operators
+from deps.render_service import render_service
 from deps.analytic_functions import compute_users_voice_channel_time_sec, computer_users_voice_in_out
 from deps.analytic_data_access import (
     data_access_fetch_ace_4k_3k,
@@ -276,8 +277,13 @@ async def stats_ops_by_members(day: int, from_date: date) -> tuple[str, Union[di
     """
     Return a msg and an image of a matrix of the user and operatoors
     """
-    img_bytes = display_user_top_operators(from_date, False)
     msg = f"📊 **Stats of the day: top Operators**\nHere is the top 10 operators in the last {day} days"
+    try:
+        img_bytes = await render_service.submit(display_user_top_operators, from_date, False)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        # Timeout, dead render worker or error in the render: the message goes without the image
+        print_error_log(f"stats_ops_by_members: Failed to render the operator matrix: {e}")
+        return (msg, None)
     if img_bytes is None:
         return (msg, None)
     bytesio = io.BytesIO(img_bytes)
@@ -0,0 +1,141 @@
+"""
+Long-lived HTTP and AI provider clients shared by the whole process.
+
+Building a client per request (genai.Client, OpenAI, httpx.AsyncClient, aiohttp.ClientSession) pays the
+client construction, a new connection pool and the TCP and TLS handshakes on every call. The registry keeps
+one client per provider: the next request reuses the keep-alive connections of the previous one.
+
+The blocking clients are thread safe and shared by the worker threads. An async client belongs to the event
+loop that created it, it is created again when used from another loop. A client is also created again when
+its configuration (API key, base URL) changes, the replaced one is closed with the others by MyBot.close.
+"""
+
+import asyncio
+import inspect
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional, TypeVar
+
+import aiohttp
+import httpx
+
+from deps.log import print_error_log, print_log
+
+# Bounded pools: a burst of requests waits for a connection instead of opening hundreds of sockets
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 10
+DEFAULT_KEEPALIVE_SECONDS = 60.0
+
+ClientT = TypeVar("ClientT")
+
+
+@dataclass
+class _RegisteredClient:
+    """A shared client with the configuration it was built with"""
+
+    client: Any
+    config: Hashable
+    loop: Optional[asyncio.AbstractEventLoop] = None  # None for the blocking clients
+
+
+def _is_closed(client: Any) -> bool:
+    """httpx exposes the is_closed property, OpenAI the is_closed() method and aiohttp the closed property"""
+    is_closed = getattr(client, "is_closed", False)
+    if callable(is_closed):
+        is_closed = is_closed()
+    return bool(is_closed or getattr(client, "closed", False))
+
+
+async def _close_client(client: Any) -> None:
+    """Close a client, sync or async. Some clients (genai.Client) have nothing to close"""
+    close = getattr(client, "aclose", None) or getattr(client, "close", None)
+    if close is None:
+        return
+    result = close()
+    if inspect.isawaitable(result):
+        await result
+
+
+def new_httpx_async_client(**kwargs: Any) -> httpx.AsyncClient:
+    """httpx.AsyncClient with the bounded keep-alive pool"""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=DEFAULT_MAX_CONNECTIONS,
+            max_keepalive_connections=DEFAULT_MAX_CONNECTIONS_PER_HOST,
+            keepalive_expiry=DEFAULT_KEEPALIVE_SECONDS,
+        ),
+        **kwargs,
+    )
+
+
+def new_aiohttp_session(**kwargs: Any) -> aiohttp.ClientSession:
+    """aiohttp.ClientSession with the bounded keep-alive pool, must be called from the event loop"""
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=DEFAULT_MAX_CONNECTIONS,
+            limit_per_host=DEFAULT_MAX_CONNECTIONS_PER_HOST,
+            keepalive_timeout=DEFAULT_KEEPALIVE_SECONDS,
+        ),
+        **kwargs,
+    )
+
+
+class HttpClientRegistry:
+    """Process wide registry of the shared clients, by name"""
+
+    def __init__(self) -> None:
+        self._clients: dict[str, _RegisteredClient] = {}
+        # Replaced clients may still serve a request in flight, they are closed at shutdown
+        self._retired: list[_RegisteredClient] = []
+        self._lock = threading.Lock()
+
+    def get_client(self, name: str, factory: Callable[[], ClientT], config: Hashable = None) -> ClientT:
+        """The blocking client registered as name, built by the factory on the first call or when config changed"""
+        with self._lock:
+            entry = self._clients.get(name)
+            if entry is not None and entry.config == config and not _is_closed(entry.client):
+                return entry.client
+            if entry is not None:
+                self._retired.append(entry)
+            client = factory()
+            self._clients[name] = _RegisteredClient(client, config)
+            return client
+
+    def get_async_client(self, name: str, factory: Callable[[], ClientT], config: Hashable = None) -> ClientT:
+        """The async client registered as name for the running event loop, built by the factory when needed"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._clients.get(name)
+            if entry is not None and entry.config == config and entry.loop is loop and not _is_closed(entry.client):
+                return entry.client
+            if entry is not None and entry.loop is not None and not entry.loop.is_closed():
+                self._retired.append(entry)
+            client = factory()
+            self._clients[name] = _RegisteredClient(client, config, loop)
+            return client
+
+    def client_count(self) -> int:
+        """Number of clients in use"""
+        return len(self._clients)
+
+    async def aclose(self) -> None:
+        """Close every client. The async clients of another event loop cannot be closed from here and are dropped"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entries = list(self._clients.values()) + self._retired
+            self._clients = {}
+            self._retired = []
+        closed = 0
+        for entry in entries:
+            if entry.loop is not None and entry.loop is not loop:
+                continue
+            try:
+                await _close_client(entry.client)
+                closed += 1
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                print_error_log(f"HttpClientRegistry: Failed to close {type(entry.client).__name__}: {e}")
+        if entries:
+            print_log(f"HttpClientRegistry: Closed {closed} of {len(entries)} HTTP clients")
+
+
+http_clients = HttpClientRegistry()
@@ -15,7 +15,6 @@ Individual frames display each player's stats:
 
 from PIL import Image, ImageDraw, ImageFont
 import io
-import aiohttp
 from datetime import datetime, timedelta, date, timezone as dt_timezone
 from typing import Any, List, Optional, Sequence, Union, cast
 import discord
@@ -30,6 +29,7 @@ from deps.analytic_data_access import (
 from deps.analytic_profile_data_access import data_access_fetch_total_hours
 from deps.operator_mapping import get_operator_role
 from deps.siege import StatsCcRankedMatchEndResult, get_user_rank_emoji
+from deps.http_clients import http_clients, new_aiohttp_session
 from deps.log import print_error_log
 
 FRAME_DURATION_MS = 4000
@@ -498,12 +498,12 @@ async def _download_avatar(member: discord.Member) -> Image.Image:
     avatar_url = member.avatar.url if member.avatar else member.default_avatar.url
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(str(avatar_url)) as resp:
-                if resp.status == 200:
-                    data = await resp.read()
-                    avatar_img = cast(Image.Image, Image.open(io.BytesIO(data)))
-                    return avatar_img.resize((100, 100), Image.Resampling.LANCZOS)
+        session = http_clients.get_async_client("discord_cdn", new_aiohttp_session)
+        async with session.get(str(avatar_url)) as resp:
+            if resp.status == 200:
+                data = await resp.read()
+                avatar_img = cast(Image.Image, Image.open(io.BytesIO(data)))
+                return avatar_img.resize((100, 100), Image.Resampling.LANCZOS)
     except Exception as e:
         print_error_log(f"_download_avatar: Failed to download avatar for {member.display_name}: {e}")
 
@@ -314,6 +314,19 @@ class UserQueueForStats:
     attempts: int = 0  # Number of processing cycles that failed to post the stats
 
 
+@dataclasses.dataclass
+class MatchHighWaterMark:
+    """Newest match already stored for a user: the match fetch stops when it reaches it"""
+
+    user_id: int
+    match_uuid: str
+    match_timestamp: datetime
+
+    def is_known(self, match_uuid: str, match_timestamp: datetime) -> bool:
+        """True when the match is the stored one or older (the API lists the newest first)"""
+        return match_uuid == self.match_uuid or match_timestamp <= self.match_timestamp
+
+
 @dataclasses.dataclass
 class UserWithUserMatchInfo:
     """Represent the user who request stats and their match stats response"""
@@ -332,6 +345,18 @@ class Reason:
         self.context = context
 
 
+@dataclasses.dataclass
+class GuildConfig:
+    """In-memory snapshot of the guild settings read by the presence and voice handlers
+    Loaded once per guild and kept in sync by the data access setters
+    """
+
+    guild_id: int
+    main_text_channel_id: Optional[int]
+    voice_channel_ids: Optional[List[int]]
+    active_private_channels: dict[int, tuple[int, bool]]
+
+
 @dataclasses.dataclass
 class ActivityTransition:
     """Keep Track of the last two activity details"""
@@ -639,3 +664,34 @@ class PlayerValueResult:
     rating: float  # Internal rating (effective RP, composite z-score, or Elo)
     match_count: int  # Matches the computation used
     last_match_timestamp: Optional[datetime]
+
+
+@dataclasses.dataclass
+class PerformanceEloState:
+    """Mutable state of the Elo replay over one user's chronological matches."""
+
+    rating: float
+    lobby_estimate: float = 0.0
+    match_index: int = 0
+
+
+@dataclasses.dataclass
+class TimeDecayedState:
+    """Decayed peak rank points and recency-weighted kills/deaths, all as of anchor_timestamp."""
+
+    anchor_timestamp: Optional[datetime] = None
+    decayed_peak: float = 0.0
+    weighted_kills: float = 0.0
+    weighted_deaths: float = 0.0
+
+
+@dataclasses.dataclass
+class PlayerValueState:
+    """Persisted per-user accumulators of the history-based player value algorithms."""
+
+    elo: PerformanceEloState
+    time_decayed: TimeDecayedState
+    peak_rank_points: float = 0.0  # All-time peak of the usable matches
+    match_count: int = 0  # Usable matches applied
+    last_match_id: int = 0  # Watermark: highest user_full_match_info.id applied (usable or not)
+    last_match_timestamp: Optional[datetime] = None  # Newest usable match applied
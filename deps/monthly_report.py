@@ -3,17 +3,18 @@
 from __future__ import annotations
 
 import asyncio
-import bisect
 import io
+import multiprocessing
+import os
 import textwrap
 import unicodedata
-from collections import defaultdict
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
 from datetime import date, datetime, time, timezone
+from functools import partial
 from pathlib import Path
-from typing import Any, Iterable, Optional
+from typing import Any, Callable, Iterable, Optional
 
-import discord
 import matplotlib
 import networkx as nx
 
@@ -22,26 +23,38 @@ import matplotlib.pyplot as plt  # noqa: E402
 import numpy as np  # noqa: E402
 from matplotlib.backends.backend_pdf import PdfPages  # noqa: E402
 from matplotlib.figure import Figure  # noqa: E402
+from pypdf import PdfWriter  # noqa: E402
 
 from deps import monthly_report_style as style
-from deps.ai.ai_functions import BotAISingleton
-from deps.analytic_data_access import (
-    data_access_fetch_user_outside_ranked_match_partners,
-    data_access_fetch_user_ranked_match_server_split_by_week,
+from deps.analytic_functions import compute_pair_overlap_seconds, sum_pair_overlap_across_channels
+from deps.analytic_snapshot import (
+    ActivityColumns,
+    AnalyticSnapshot,
+    MatchColumns,
+    VoiceColumns,
+    count_by_user,
+    distinct_users_per_day,
+    epoch_weekdays,
+    in_voice_mask,
+    iso_week_labels,
+    load_analytic_snapshot,
+    month_labels,
+    outside_ranked_match_partners,
+    sum_by_label_and_user,
+    sum_by_user,
+    to_epoch,
+    utc_datetime,
 )
-from deps.data_access import (
-    data_access_get_analytics_report_text_channel_id,
-    data_access_get_channel,
-    data_access_get_monthly_analytics_report_sent,
-    data_access_set_monthly_analytics_report_sent,
-)
-from deps.log import print_error_log, print_log, print_warning_log
+from deps.log import print_error_log, print_warning_log
+from deps.render_service import render_service
 from deps.system_database import database_manager
 
 
 REPORT_TOP_USERS = 20
 REPORT_PARTNER_TOP = 5
 LOW_SAMPLE_RANKED_ROWS = 5
+# Render time of one page fragment in a render worker, the report keeps at most one fragment per worker queued
+REPORT_FRAGMENT_TIMEOUT_SECONDS = 300
 
 
 @dataclass(frozen=True)
@@ -128,20 +141,6 @@ class MonthlyReportData:
     windows: list[WindowReportData]
 
 
-@dataclass(frozen=True)
-class VoiceSession:
-    """A paired voice session clipped to a report window."""
-
-    user_id: int
-    channel_id: int
-    start: datetime
-    end: datetime
-
-    @property
-    def seconds(self) -> float:
-        return max(0.0, (self.end - self.start).total_seconds())
-
-
 def _month_start(day: date) -> date:
     return date(day.year, day.month, 1)
 
@@ -224,10 +223,6 @@ def _fetch_all_data_start_date() -> Optional[date]:
     return datetime.fromisoformat(str(row[0]).replace(" ", "T")).date()
 
 
-def _execute(query: str, params: dict[str, Any]) -> list[tuple[Any, ...]]:
-    return database_manager.get_cursor().execute(query, params).fetchall()
-
-
 def _clean_text(value: Any) -> str:
     """Normalize stylized Discord names into PDF-friendly text."""
     normalized = unicodedata.normalize("NFKD", str(value))
@@ -244,213 +239,78 @@ def _format_percent(part: int | float, whole: int | float, digits: int = 0) -> s
     return f"{_percent(part, whole):.{digits}f}%"
 
 
-def _window_params(window: ReportWindow) -> dict[str, str]:
-    return {"start": window.start.isoformat(), "end": window.end_exclusive.isoformat()}
-
-
-def _merged_voice_intervals_by_user(sessions: list[VoiceSession]) -> dict[int, list[tuple[datetime, datetime]]]:
-    """Merge each user's voice sessions into non-overlapping, sorted intervals."""
-    intervals_by_user: dict[int, list[tuple[datetime, datetime]]] = defaultdict(list)
-    for session in sessions:
-        intervals_by_user[session.user_id].append((session.start, session.end))
-    merged_by_user: dict[int, list[tuple[datetime, datetime]]] = {}
-    for user_id, intervals in intervals_by_user.items():
-        intervals.sort()
-        merged: list[tuple[datetime, datetime]] = []
-        for start, end in intervals:
-            if merged and start <= merged[-1][1]:
-                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
-            else:
-                merged.append((start, end))
-        merged_by_user[user_id] = merged
-    return merged_by_user
-
-
-def _is_during_voice_session(intervals: list[tuple[datetime, datetime]], timestamp: datetime) -> bool:
-    """Check whether a timestamp falls inside one of the user's merged voice intervals."""
-    index = bisect.bisect_right(intervals, timestamp, key=lambda interval: interval[0]) - 1
-    return index >= 0 and intervals[index][1] >= timestamp
-
-
-def _fetch_window_ranked_rows(window: ReportWindow) -> list[tuple[int, datetime, bool]]:
-    """Fetch (user_id, match_timestamp, has_win) for ranked, non-rollback rows in the window."""
-    return [
-        (int(row[0]), _parse_db_datetime(str(row[1])), int(row[2] or 0) == 1)
-        for row in _execute(
-            """
-            SELECT user_id, match_timestamp, has_win
-            FROM user_full_match_info
-            WHERE julianday(match_timestamp) >= julianday(:start)
-              AND julianday(match_timestamp) < julianday(:end)
-              AND LOWER(session_type) = 'ranked'
-              AND is_rollback = 0;
-            """,
-            _window_params(window),
-        )
-    ]
-
-
-def _fetch_active_user_count(window: ReportWindow) -> int:
-    row = (
-        database_manager.get_cursor()
-        .execute(
-            """
-        SELECT COUNT(DISTINCT user_id)
-        FROM user_activity
-        WHERE julianday(timestamp) >= julianday(:start)
-          AND julianday(timestamp) < julianday(:end);
-        """,
-            _window_params(window),
-        )
-        .fetchone()
+def _report_windows(
+    reference_day: Optional[date], window_keys: Optional[Iterable[str]]
+) -> tuple[str, list[ReportWindow]]:
+    report_month, windows = get_monthly_report_windows(reference_day)
+    if window_keys is not None:
+        allowed_keys = set(window_keys)
+        windows = [window for window in windows if window.key in allowed_keys]
+    return report_month, windows
+
+
+def load_monthly_report_snapshot(windows: list[ReportWindow]) -> AnalyticSnapshot:
+    """Load the data of every window at once, the windows are slices of it."""
+    if not windows:
+        now = datetime.now(timezone.utc)
+        return load_analytic_snapshot(now, now, with_activity=True)
+    return load_analytic_snapshot(
+        min(window.start for window in windows),
+        max(window.end_exclusive for window in windows),
+        with_activity=True,
     )
-    return int(row[0] or 0)
 
 
-def _fetch_ranked_match_counts(window: ReportWindow) -> tuple[int, int]:
-    row = (
-        database_manager.get_cursor()
-        .execute(
-            """
-        SELECT COUNT(id), COUNT(DISTINCT match_uuid)
-        FROM user_full_match_info
-        WHERE julianday(match_timestamp) >= julianday(:start)
-          AND julianday(match_timestamp) < julianday(:end)
-          AND LOWER(session_type) = 'ranked'
-          AND is_rollback = 0;
-        """,
-            _window_params(window),
-        )
-        .fetchone()
-    )
-    return int(row[0] or 0), int(row[1] or 0)
+@dataclass(frozen=True)
+class _WindowColumns:
+    """The snapshot rows of one window: voice sessions clipped to it and its ranked, non-rollback match rows."""
 
+    voice: VoiceColumns
+    matches: MatchColumns
+    ranked: MatchColumns
+    # For each ranked row, whether the user was in a server voice channel
+    ranked_in_voice: np.ndarray
 
-def _parse_db_datetime(raw: str) -> datetime:
-    parsed = datetime.fromisoformat(str(raw).replace(" ", "T"))
-    if parsed.tzinfo is None:
-        parsed = parsed.replace(tzinfo=timezone.utc)
-    return parsed
+    @classmethod
+    def of(cls, snapshot: AnalyticSnapshot, window: ReportWindow) -> _WindowColumns:
+        voice = snapshot.voice.clipped(window.start, window.end_exclusive)
+        matches = snapshot.matches.between(window.start, window.end_exclusive)
+        ranked = matches.ranked()
+        return cls(voice=voice, matches=matches, ranked=ranked, ranked_in_voice=in_voice_mask(ranked, voice))
 
 
-def _fetch_voice_sessions(window: ReportWindow) -> list[VoiceSession]:
-    rows = _execute(
-        """
-        SELECT user_id, channel_id, event, timestamp
-        FROM user_activity
-        WHERE julianday(timestamp) < julianday(:end)
-        ORDER BY user_id, channel_id, julianday(timestamp), id;
-        """,
-        _window_params(window),
-    )
-    open_sessions: dict[tuple[int, int], datetime] = {}
-    sessions: list[VoiceSession] = []
-    for user_id_raw, channel_id_raw, event, timestamp_raw in rows:
-        user_id = int(user_id_raw)
-        channel_id = int(channel_id_raw)
-        timestamp = _parse_db_datetime(str(timestamp_raw))
-        key = (user_id, channel_id)
-        if event == "connect":
-            open_sessions[key] = timestamp
-            continue
-        if event != "disconnect" or key not in open_sessions:
-            continue
-        start = open_sessions.pop(key)
-        end = timestamp
-        if end <= window.start or start >= window.end_exclusive:
-            continue
-        overlap_start = max(start, window.start)
-        overlap_end = min(end, window.end_exclusive)
-        if overlap_end > overlap_start:
-            sessions.append(VoiceSession(user_id=user_id, channel_id=channel_id, start=overlap_start, end=overlap_end))
-    return sessions
+def _clean_display_names(snapshot: AnalyticSnapshot) -> dict[int, str]:
+    return {user_id: _clean_text(name) for user_id, name in snapshot.display_names.items()}
 
 
-def _fetch_data_quality_metrics(
-    window: ReportWindow, sessions: Optional[list[VoiceSession]] = None
+def _data_quality_metrics(
+    window: ReportWindow, activity: ActivityColumns, columns: _WindowColumns
 ) -> DataQualityMetrics:
-    if sessions is None:
-        sessions = _fetch_voice_sessions(window)
-
-    rows = _execute(
-        """
-        SELECT user_id, channel_id, event, timestamp
-        FROM user_activity
-        WHERE julianday(timestamp) < julianday(:end)
-        ORDER BY user_id, channel_id, julianday(timestamp), id;
-        """,
-        _window_params(window),
-    )
-    open_sessions: dict[tuple[int, int], datetime] = {}
-    unmatched_disconnects = 0
-    for user_id_raw, channel_id_raw, event, timestamp_raw in rows:
-        key = (int(user_id_raw), int(channel_id_raw))
-        timestamp = _parse_db_datetime(str(timestamp_raw))
-        if event == "connect":
-            open_sessions[key] = timestamp
-            continue
-        if event != "disconnect":
-            continue
-        if key not in open_sessions:
-            if window.start <= timestamp < window.end_exclusive:
-                unmatched_disconnects += 1
-            continue
-        open_sessions.pop(key)
-
-    open_sessions_at_window_end = sum(1 for opened_at in open_sessions.values() if opened_at < window.end_exclusive)
-    suspicious_voice_sessions = sum(1 for session in sessions if session.seconds > 12 * 3600)
-    intervals_by_user = _merged_voice_intervals_by_user(sessions)
-    ranked_rows_without_voice_context = sum(
-        1
-        for user_id, match_timestamp, _ in _fetch_window_ranked_rows(window)
-        if not _is_during_voice_session(intervals_by_user.get(user_id, []), match_timestamp)
-    )
-    rollback_ranked_rows_excluded = int(
-        _execute(
-            """
-            SELECT COUNT(*)
-            FROM user_full_match_info
-            WHERE julianday(match_timestamp) >= julianday(:start)
-              AND julianday(match_timestamp) < julianday(:end)
-              AND LOWER(session_type) = 'ranked'
-              AND is_rollback = 1;
-            """,
-            _window_params(window),
-        )[0][0]
-        or 0
-    )
+    # Replay the connect/disconnect events of each (user, channel) before the window end: a disconnect
+    # not following a connect is unmatched, a connect as the last event is still open
+    events = activity.before(window.end_exclusive)
+    order = np.lexsort((events.channel_id, events.user_id))  # Stable: each group stays in time order
+    user_ids = events.user_id[order]
+    channel_ids = events.channel_id[order]
+    is_connect = events.is_connect[order]
+    timestamps = events.timestamp[order]
+    group_start = np.ones(len(order), dtype=bool)
+    group_start[1:] = (user_ids[1:] != user_ids[:-1]) | (channel_ids[1:] != channel_ids[:-1])
+    follows_connect = np.zeros(len(order), dtype=bool)
+    follows_connect[1:] = is_connect[:-1]
+    follows_connect &= ~group_start
+    unmatched = ~is_connect & ~follows_connect & (timestamps >= to_epoch(window.start))
+    group_end = np.append(group_start[1:], True)
     return DataQualityMetrics(
-        voice_sessions=len(sessions),
-        unmatched_disconnects=unmatched_disconnects,
-        open_sessions_at_window_end=open_sessions_at_window_end,
-        suspicious_voice_sessions=suspicious_voice_sessions,
-        ranked_rows_without_voice_context=ranked_rows_without_voice_context,
-        rollback_ranked_rows_excluded=rollback_ranked_rows_excluded,
+        voice_sessions=len(columns.voice),
+        unmatched_disconnects=int(unmatched.sum()),
+        open_sessions_at_window_end=int((group_end & is_connect).sum()),
+        suspicious_voice_sessions=int((columns.voice.seconds > 12 * 3600).sum()),
+        ranked_rows_without_voice_context=int((~columns.ranked_in_voice).sum()),
+        rollback_ranked_rows_excluded=int((columns.matches.is_ranked & columns.matches.is_rollback).sum()),
     )
 
 
-def _fetch_ranked_counts_by_user(window: ReportWindow) -> dict[int, int]:
-    return {
-        int(row[0]): int(row[1] or 0)
-        for row in _execute(
-            """
-            SELECT user_id, COUNT(id)
-            FROM user_full_match_info
-            WHERE julianday(match_timestamp) >= julianday(:start)
-              AND julianday(match_timestamp) < julianday(:end)
-              AND LOWER(session_type) = 'ranked'
-              AND is_rollback = 0
-            GROUP BY user_id;
-            """,
-            _window_params(window),
-        )
-    }
-
-
-def _fetch_user_display_names() -> dict[int, str]:
-    return {int(row[0]): _clean_text(row[1]) for row in _execute("SELECT id, display_name FROM user_info;", {})}
-
-
 def _top_active_users_from_metrics(
     voice_seconds_by_user: dict[int, float],
     ranked_counts_by_user: dict[int, int],
@@ -471,28 +331,9 @@ def _top_active_users_from_metrics(
     return rows[:top_n]
 
 
-def _compute_pair_overlap_hours(
-    sessions: list[VoiceSession], display_names: dict[int, str]
-) -> list[tuple[str, str, float]]:
+def _compute_pair_overlap_hours(voice: VoiceColumns, display_names: dict[int, str]) -> list[tuple[str, str, float]]:
     """Compute same-channel overlap hours for user pairs."""
-    sessions_by_channel: dict[int, list[VoiceSession]] = defaultdict(list)
-    for session in sessions:
-        sessions_by_channel[session.channel_id].append(session)
-
-    pair_seconds: dict[tuple[int, int], float] = defaultdict(float)
-    for channel_sessions in sessions_by_channel.values():
-        channel_sessions.sort(key=lambda item: item.start)
-        for index, left in enumerate(channel_sessions):
-            for right in channel_sessions[index + 1 :]:
-                if right.start >= left.end:
-                    break
-                if left.user_id == right.user_id:
-                    continue
-                overlap = (min(left.end, right.end) - max(left.start, right.start)).total_seconds()
-                if overlap <= 0:
-                    continue
-                pair = (min(left.user_id, right.user_id), max(left.user_id, right.user_id))
-                pair_seconds[pair] += overlap
+    pair_seconds = sum_pair_overlap_across_channels(compute_pair_overlap_seconds(voice.intervals()))
 
     rows = [
         (display_names.get(user_a, str(user_a)), display_names.get(user_b, str(user_b)), seconds / 3600.0)
@@ -502,170 +343,133 @@ def _compute_pair_overlap_hours(
     return rows
 
 
-def _fetch_unique_users_per_day(window: ReportWindow) -> list[tuple[str, int]]:
+def _last_activity_by_user(
+    window: ReportWindow, activity: ActivityColumns, display_names: dict[int, str], limit: int = 30
+) -> list[tuple[str, str]]:
+    """The users seen the longest ago, when their last event of the whole history is before the window end."""
+    last_seen: dict[int, float] = {}
+    if len(activity) > 0:
+        # The events are in time order: the last row of each user is the latest
+        users, last_rows = np.unique(activity.user_id[::-1], return_index=True)
+        last_seen = dict(zip(users.tolist(), activity.timestamp[::-1][last_rows].tolist()))
+    end = to_epoch(window.end_exclusive)
+    rows = sorted(
+        (timestamp, user_id) for user_id, timestamp in last_seen.items() if user_id in display_names and timestamp < end
+    )
     return [
-        (str(row[0]), int(row[1]))
-        for row in _execute(
-            """
-            SELECT date(timestamp), COUNT(DISTINCT user_id)
-            FROM user_activity
-            WHERE julianday(timestamp) >= julianday(:start)
-              AND julianday(timestamp) < julianday(:end)
-            GROUP BY date(timestamp)
-            ORDER BY date(timestamp);
-            """,
-            _window_params(window),
-        )
+        (display_names[user_id], utc_datetime(timestamp).strftime("%Y-%m-%d %H:%M"))
+        for timestamp, user_id in rows[:limit]
     ]
 
 
-def _fetch_last_activity_by_user(
-    window: ReportWindow, display_names: dict[int, str], limit: int = 30
-) -> list[tuple[str, str]]:
-    rows = _execute(
-        """
-        SELECT user_info.id, user_info.display_name, MAX(user_activity.timestamp) AS last_seen
-        FROM user_info
-        LEFT JOIN user_activity ON user_activity.user_id = user_info.id
-        GROUP BY user_info.id, user_info.display_name
-        HAVING last_seen IS NOT NULL AND julianday(last_seen) < julianday(:end)
-        ORDER BY julianday(last_seen) ASC
-        LIMIT :limit;
-        """,
-        {"end": window.end_exclusive.isoformat(), "limit": limit},
-    )
-    return [(display_names.get(int(row[0]), _clean_text(row[1])), str(row[2])) for row in rows]
+def _match_server_rate_rows(
+    columns: _WindowColumns, display_names: dict[int, str], limit: int = 60
+) -> list[tuple[str, int, int, float, float, float]]:
+    """Per-user ranked totals with in-server/outside split and win rates for the window."""
+    ranked = columns.ranked
+    users, user_rows = np.unique(ranked.user_id, return_inverse=True)
+    in_voice_wins = ranked.has_win & columns.ranked_in_voice
+    totals = np.bincount(user_rows, minlength=len(users))
+    wins = np.bincount(user_rows, weights=ranked.has_win, minlength=len(users)).astype(int)
+    in_server = np.bincount(user_rows, weights=columns.ranked_in_voice, minlength=len(users)).astype(int)
+    in_server_wins = np.bincount(user_rows, weights=in_voice_wins, minlength=len(users)).astype(int)
+    rows = [
+        (
+            display_names.get(user_id, str(user_id)),
+            total,
+            user_in_server,
+            round(_percent(user_in_server_wins, user_in_server), 2),
+            round(_percent(user_wins - user_in_server_wins, total - user_in_server), 2),
+            round(_percent(user_in_server, total), 2),
+        )
+        for user_id, total, user_wins, user_in_server, user_in_server_wins in zip(
+            users.tolist(), totals.tolist(), wins.tolist(), in_server.tolist(), in_server_wins.tolist()
+        )
+    ]
+    rows.sort(key=lambda row: (-row[5], -row[1]))
+    return rows[:limit]
 
 
 def _voice_hours_by_month_and_user(
-    sessions: list[VoiceSession], top_user_ids: list[int], display_names: dict[int, str]
+    sessions: VoiceColumns, top_user_ids: list[int], display_names: dict[int, str]
 ) -> tuple[list[str], dict[str, list[float]]]:
-    months = sorted({session.start.strftime("%Y-%m") for session in sessions})
-    values: dict[str, list[float]] = {
-        display_names.get(user_id, str(user_id)): [0.0 for _ in months] for user_id in top_user_ids
+    months, matrix = sum_by_label_and_user(
+        month_labels(sessions.start), sessions.user_id, sessions.seconds / 3600.0, top_user_ids
+    )
+    return months, {
+        display_names.get(user_id, str(user_id)): row.tolist() for user_id, row in zip(top_user_ids, matrix)
     }
-    month_index = {month: index for index, month in enumerate(months)}
-    for session in sessions:
-        if session.user_id not in top_user_ids:
-            continue
-        name = display_names.get(session.user_id, str(session.user_id))
-        values[name][month_index[session.start.strftime("%Y-%m")]] += session.seconds / 3600.0
-    return months, values
 
 
 def _weekday_minutes_by_user(
-    sessions: list[VoiceSession], top_user_ids: list[int], display_names: dict[int, str]
+    sessions: VoiceColumns, top_user_ids: list[int], display_names: dict[int, str]
 ) -> tuple[list[str], np.ndarray]:
+    weekdays, minutes = sum_by_label_and_user(
+        epoch_weekdays(sessions.start), sessions.user_id, sessions.seconds / 60.0, top_user_ids
+    )
     matrix = np.zeros((len(top_user_ids), 7))
-    user_index = {user_id: index for index, user_id in enumerate(top_user_ids)}
-    for session in sessions:
-        if session.user_id not in user_index:
-            continue
-        matrix[user_index[session.user_id], session.start.weekday()] += session.seconds / 60.0
+    matrix[:, weekdays] = minutes
     return [display_names.get(user_id, str(user_id)) for user_id in top_user_ids], matrix
 
 
 def _weekly_voice_hours_by_user(
-    sessions: list[VoiceSession], top_user_ids: list[int], display_names: dict[int, str]
+    sessions: VoiceColumns, top_user_ids: list[int], display_names: dict[int, str]
 ) -> tuple[list[str], dict[str, list[float]]]:
-    weeks = sorted(
-        {f"{session.start.isocalendar().year}-W{session.start.isocalendar().week:02d}" for session in sessions}
+    weeks, matrix = sum_by_label_and_user(
+        iso_week_labels(sessions.start), sessions.user_id, sessions.seconds / 3600.0, top_user_ids
     )
-    values: dict[str, list[float]] = {
-        display_names.get(user_id, str(user_id)): [0.0 for _ in weeks] for user_id in top_user_ids
-    }
-    week_index = {week: index for index, week in enumerate(weeks)}
-    for session in sessions:
-        if session.user_id not in top_user_ids:
-            continue
-        week = f"{session.start.isocalendar().year}-W{session.start.isocalendar().week:02d}"
-        values[display_names.get(session.user_id, str(session.user_id))][week_index[week]] += session.seconds / 3600.0
-    return weeks, values
-
-
-def _fetch_match_server_rate_rows(
-    window: ReportWindow, sessions: list[VoiceSession], limit: int = 60
-) -> list[tuple[str, int, int, float, float, float]]:
-    """Per-user ranked totals with in-server/outside split and win rates for the window."""
-    intervals_by_user = _merged_voice_intervals_by_user(sessions)
-    totals: dict[int, list[int]] = defaultdict(lambda: [0, 0, 0, 0])  # total, wins, in_server, in_server_wins
-    for user_id, match_timestamp, has_win in _fetch_window_ranked_rows(window):
-        counters = totals[user_id]
-        counters[0] += 1
-        counters[1] += 1 if has_win else 0
-        if _is_during_voice_session(intervals_by_user.get(user_id, []), match_timestamp):
-            counters[2] += 1
-            counters[3] += 1 if has_win else 0
-    display_names = _fetch_user_display_names()
-    rows = [
-        (
-            display_names.get(user_id, str(user_id)),
-            total,
-            in_server,
-            round(_percent(in_server_wins, in_server), 2),
-            round(_percent(wins - in_server_wins, total - in_server), 2),
-            round(_percent(in_server, total), 2),
-        )
-        for user_id, (total, wins, in_server, in_server_wins) in totals.items()
-    ]
-    rows.sort(key=lambda row: (-row[5], -row[1]))
-    return rows[:limit]
+    return weeks, {display_names.get(user_id, str(user_id)): row.tolist() for user_id, row in zip(top_user_ids, matrix)}
 
 
 def collect_monthly_report_data(
     reference_day: Optional[date] = None,
     top_n: int = REPORT_TOP_USERS,
     window_keys: Optional[Iterable[str]] = None,
+    snapshot: Optional[AnalyticSnapshot] = None,
 ) -> MonthlyReportData:
-    """Collect deterministic data used by the monthly report."""
-    report_month, windows = get_monthly_report_windows(reference_day)
-    if window_keys is not None:
-        allowed_keys = set(window_keys)
-        windows = [window for window in windows if window.key in allowed_keys]
+    """Collect deterministic data used by the monthly report.
+
+    Every window is a slice of one snapshot of the data, loaded here unless given.
+    """
+    report_month, windows = _report_windows(reference_day, window_keys)
+    if snapshot is None:
+        snapshot = load_monthly_report_snapshot(windows)
+    display_names = _clean_display_names(snapshot)
     window_data: list[WindowReportData] = []
     for window in windows:
-        sessions = _fetch_voice_sessions(window)
-        voice_seconds_by_user: dict[int, float] = {}
-        for session in sessions:
-            voice_seconds_by_user[session.user_id] = voice_seconds_by_user.get(session.user_id, 0.0) + session.seconds
-        ranked_counts_by_user = _fetch_ranked_counts_by_user(window)
-        display_names = _fetch_user_display_names()
+        columns = _WindowColumns.of(snapshot, window)
+        voice_seconds_by_user = sum_by_user(columns.voice.user_id, columns.voice.seconds)
         top_users: list[UserWindowMetrics] = []
         for user_id, display_name, voice_seconds, ranked_matches in _top_active_users_from_metrics(
             voice_seconds_by_user,
-            ranked_counts_by_user,
+            count_by_user(columns.ranked.user_id),
             display_names,
             top_n,
         ):
-            split_rows = data_access_fetch_user_ranked_match_server_split_by_week(
-                user_id, window.start, window.end_exclusive
+            user_in_voice = columns.ranked_in_voice[columns.ranked.user_id == user_id]
+            partners = outside_ranked_match_partners(
+                columns.ranked, columns.ranked_in_voice, user_id, REPORT_PARTNER_TOP, snapshot.display_names
             )
-            in_server = sum(int(row[1] or 0) for row in split_rows)
-            outside = sum(int(row[2] or 0) for row in split_rows)
-            partners = data_access_fetch_user_outside_ranked_match_partners(
-                user_id, window.start, window.end_exclusive, REPORT_PARTNER_TOP
-            )
-            partners = [(_clean_text(row[0]), row[1], row[2], row[3]) for row in partners]
             top_users.append(
                 UserWindowMetrics(
                     user_id=user_id,
                     display_name=display_name,
                     voice_hours=voice_seconds / 3600.0,
                     ranked_matches=ranked_matches,
-                    in_server_matches=in_server,
-                    outside_server_matches=outside,
-                    outside_partners=partners,
+                    in_server_matches=int(user_in_voice.sum()),
+                    outside_server_matches=int((~user_in_voice).sum()),
+                    outside_partners=[(_clean_text(row[0]), row[1], row[2], row[3]) for row in partners],
                 )
             )
-        ranked_rows, distinct_ranked = _fetch_ranked_match_counts(window)
+        window_activity = snapshot.activity.between(window.start, window.end_exclusive)
         window_data.append(
             WindowReportData(
                 window=window,
                 total_voice_hours=sum(voice_seconds_by_user.values()) / 3600.0,
-                active_users=_fetch_active_user_count(window),
-                ranked_match_rows=ranked_rows,
-                distinct_ranked_matches=distinct_ranked,
-                data_quality=_fetch_data_quality_metrics(window, sessions),
+                active_users=len(np.unique(window_activity.user_id)),
+                ranked_match_rows=len(columns.ranked),
+                distinct_ranked_matches=len(np.unique(columns.ranked.match_index)),
+                data_quality=_data_quality_metrics(window, snapshot.activity, columns),
                 top_users=top_users,
             )
         )
@@ -717,25 +521,71 @@ class _ReportCanvas:
         plt.close(fig)
 
 
+@dataclass(frozen=True)
+class _PageJob:
+    """Consecutive pages rendered together into one PDF fragment, in a worker process."""
+
+    section_title: str
+    first_page: int
+    page_count: int
+    renders: tuple[tuple[Callable[..., None], tuple[Any, ...]], ...]
+
+
+class _ReportLayout:
+    """Page plan of the report: the jobs and TOC entries, computed from the data shape without drawing."""
+
+    def __init__(self, report_month: str) -> None:
+        self.report_month = report_month
+        self.page_number = 0
+        self.section_title = ""
+        self.toc_entries: list[style.TocEntry] = []
+        self.jobs: list[_PageJob] = []
+
+    def begin_section(self, title: str) -> None:
+        """Set the section name shown in the header band of subsequent pages."""
+        self.section_title = title
+
+    def add_toc_entry(self, title: str, level: int = 0) -> None:
+        """Record a TOC entry pointing at the next page to be added."""
+        self.toc_entries.append(style.TocEntry(title=title, level=level, page_number=self.page_number + 1))
+
+    def add_job(self, renders: list[tuple[Callable[..., None], tuple[Any, ...]]], page_count: int) -> None:
+        """Add pages drawn by calling each render with the canvas and its arguments."""
+        self.jobs.append(_PageJob(self.section_title, self.page_number + 1, page_count, tuple(renders)))
+        self.page_number += page_count
+
+    def add_page(self, render: Callable[..., None], *args: Any, page_count: int = 1) -> None:
+        """Add the page(s) of one render in their own job."""
+        self.add_job([(render, args)], page_count)
+
+
+def _text_line_height(line: str) -> float:
+    """Vertical space taken by one styled report text line."""
+    if line == "":
+        return 0.020
+    if line.startswith("  "):
+        return 0.032
+    if line.endswith(":") and not line.startswith("- "):
+        return 0.042
+    return 0.034
+
+
 def _draw_text_line(ax: Any, y: float, line: str) -> float:
     """Draw one styled report text line and return the next baseline position."""
-    if line == "":
-        return y - 0.020
     if line.startswith("- "):
         ax.text(0.012, y, "▪", fontsize=8, va="top", color=style.COLOR_ORANGE)
         ax.text(0.032, y, line[2:], fontsize=9, va="top", color=style.COLOR_TEXT)
-        return y - 0.034
-    if line.startswith("  "):
+    elif line.startswith("  "):
         ax.text(0.032, y, line.strip(), fontsize=8.5, va="top", color=style.COLOR_MUTED)
-        return y - 0.032
-    if line.endswith(":"):
+    elif line.endswith(":"):
         ax.text(0.0, y, line, fontsize=10.5, va="top", color=style.COLOR_NAVY, fontweight="bold")
-        return y - 0.042
-    ax.text(0.0, y, line, fontsize=9, va="top", color=style.COLOR_TEXT)
-    return y - 0.034
+    elif line != "":
+        ax.text(0.0, y, line, fontsize=9, va="top", color=style.COLOR_TEXT)
+    return y - _text_line_height(line)
 
 
-def _save_text_page(canvas: _ReportCanvas, title: str, lines: Iterable[str], subtitle: str = "") -> None:
+def _paginate_text_lines(lines: Iterable[str]) -> list[list[str]]:
+    """Wrap the lines and split them into the lines of each page, at least one page."""
     wrapped_lines: list[str] = []
     for line in lines:
         if line == "":
@@ -745,20 +595,29 @@ def _save_text_page(canvas: _ReportCanvas, title: str, lines: Iterable[str], sub
         indent = "  " if text.startswith(("- ", "  ")) else ""
         wrapped_lines.extend(textwrap.wrap(text, width=116, subsequent_indent=indent) or [""])
 
-    page_index = 1
-    line_index = 0
-    while line_index < len(wrapped_lines) or page_index == 1:
-        page_title = title if page_index == 1 else f"{title} (continued)"
+    pages: list[list[str]] = [[]]
+    y = 0.98
+    for line in wrapped_lines:
+        if y <= 0.02:
+            pages.append([])
+            y = 0.98
+        pages[-1].append(line)
+        y -= _text_line_height(line)
+    return pages
+
+
+def _text_page_count(lines: Iterable[str]) -> int:
+    return len(_paginate_text_lines(lines))
+
+
+def _save_text_page(canvas: _ReportCanvas, title: str, lines: Iterable[str], subtitle: str = "") -> None:
+    for page_index, page_lines in enumerate(_paginate_text_lines(lines)):
         fig = style.new_page_figure()
         ax = style.blank_axes(fig)
         y = 0.98
-        while line_index < len(wrapped_lines) and y > 0.02:
-            y = _draw_text_line(ax, y, wrapped_lines[line_index])
-            line_index += 1
-        canvas.save_content_page(fig, page_title, subtitle)
-        page_index += 1
-        if line_index >= len(wrapped_lines):
-            break
+        for line in page_lines:
+            y = _draw_text_line(ax, y, line)
+        canvas.save_content_page(fig, title if page_index == 0 else f"{title} (continued)", subtitle)
 
 
 def _save_table_page(
@@ -912,7 +771,7 @@ def _save_unique_users_page(canvas: _ReportCanvas, data: WindowReportData, rows:
 def _save_weekday_matrix_page(
     canvas: _ReportCanvas,
     title: str,
-    sessions: list[VoiceSession],
+    sessions: VoiceColumns,
     top_user_ids: list[int],
     display_names: dict[int, str],
     subtitle: str,
@@ -937,7 +796,7 @@ def _save_weekday_matrix_page(
 def _save_monthly_voice_gradient_page(
     canvas: _ReportCanvas,
     title: str,
-    sessions: list[VoiceSession],
+    sessions: VoiceColumns,
     top_user_ids: list[int],
     display_names: dict[int, str],
     subtitle: str,
@@ -963,7 +822,7 @@ def _save_monthly_voice_gradient_page(
 def _save_weekly_timeline_page(
     canvas: _ReportCanvas,
     title: str,
-    sessions: list[VoiceSession],
+    sessions: VoiceColumns,
     top_user_ids: list[int],
     display_names: dict[int, str],
     subtitle: str,
@@ -992,15 +851,10 @@ def _save_weekly_timeline_page(
     canvas.save_content_page(fig, title, subtitle)
 
 
-def _save_total_monthly_voice_page(
-    canvas: _ReportCanvas, title: str, sessions: list[VoiceSession], subtitle: str
-) -> None:
-    totals: dict[str, float] = defaultdict(float)
-    for session in sessions:
-        totals[session.start.strftime("%Y-%m")] += session.seconds / 3600.0
-    labels = sorted(totals)
-    values = [totals[label] for label in labels]
-    _save_bar_page(canvas, title, labels, values, "Total Voice Hours", subtitle, value_fmt="{:.1f}")
+def _save_total_monthly_voice_page(canvas: _ReportCanvas, title: str, sessions: VoiceColumns, subtitle: str) -> None:
+    labels, label_rows = np.unique(month_labels(sessions.start), return_inverse=True)
+    values = np.bincount(label_rows, weights=sessions.seconds / 3600.0, minlength=len(labels))
+    _save_bar_page(canvas, title, labels.tolist(), values.tolist(), "Total Voice Hours", subtitle, value_fmt="{:.1f}")
 
 
 def _save_rate_playing_server_page(
@@ -1106,21 +960,15 @@ def _save_user_circular_page(canvas: _ReportCanvas, data: WindowReportData, user
 
 
 def _save_user_timeline_page(
-    canvas: _ReportCanvas, data: WindowReportData, user: UserWindowMetrics, sessions: list[VoiceSession]
+    canvas: _ReportCanvas, data: WindowReportData, user: UserWindowMetrics, sessions: VoiceColumns
 ) -> None:
-    weeks: dict[str, float] = defaultdict(float)
-    for session in sessions:
-        if session.user_id != user.user_id:
-            continue
-        week = f"{session.start.isocalendar().year}-W{session.start.isocalendar().week:02d}"
-        weeks[week] += session.seconds / 3600.0
+    labels, hours = _weekly_voice_hours_by_user(sessions, [user.user_id], {})
     fig = style.new_page_figure()
     ax = style.content_axes(fig, style.CONTENT_RECT_ROTATED_XLABELS)
-    if not weeks:
+    if not labels:
         style.draw_empty_message(ax, "No voice timeline data available for this user.")
     else:
-        labels = sorted(weeks)
-        values = [weeks[label] for label in labels]
+        values = hours[str(user.user_id)]
         ax.plot(labels, values, marker="o", markersize=3.5, linewidth=1.8, color=style.COLOR_SERIES_PRIMARY)
         ax.set_ylabel("Voice Hours")
         ax.set_xlabel("Week")
@@ -1307,6 +1155,9 @@ def _ai_prompt(report: MonthlyReportData) -> str:
 
 def generate_ai_conclusion(report: MonthlyReportData) -> str:
     """Generate the final report conclusion using AI. Returns fallback text on failure."""
+    # Imported here: the AI module pulls in the bot, and this module also runs in the render workers
+    from deps.ai.ai_functions import BotAISingleton  # pylint: disable=import-outside-toplevel
+
     try:
         result = BotAISingleton().ask_ai(_ai_prompt(report), use_gpt=True)
     except Exception as e:  # pylint: disable=broad-exception-caught
@@ -1323,6 +1174,8 @@ def generate_ai_conclusion(report: MonthlyReportData) -> str:
 
 async def generate_ai_conclusion_async(report: MonthlyReportData) -> str:
     """Generate the final report conclusion using AI from async bot tasks."""
+    from deps.ai.ai_functions import BotAISingleton  # pylint: disable=import-outside-toplevel
+
     try:
         result = await BotAISingleton().ask_ai_async(_ai_prompt(report), timeout=240.0, use_gpt=True)
     except Exception as e:  # pylint: disable=broad-exception-caught
@@ -1339,9 +1192,9 @@ async def generate_ai_conclusion_async(report: MonthlyReportData) -> str:
 
 @dataclass(frozen=True)
 class _WindowRenderInputs:
-    """Prefetched data for rendering one window, shared by both render passes."""
+    """Precomputed data for rendering one window, shared by the page renders of the window."""
 
-    sessions: list[VoiceSession]
+    sessions: VoiceColumns
     display_names: dict[int, str]
     pair_rows: list[tuple[str, str, float]]
     inactive_rows: list[tuple[str, str]]
@@ -1349,16 +1202,17 @@ class _WindowRenderInputs:
     unique_users_rows: list[tuple[str, int]]
 
 
-def _collect_window_render_inputs(data: WindowReportData) -> _WindowRenderInputs:
-    sessions = _fetch_voice_sessions(data.window)
-    display_names = _fetch_user_display_names()
+def _collect_window_render_inputs(data: WindowReportData, snapshot: AnalyticSnapshot) -> _WindowRenderInputs:
+    columns = _WindowColumns.of(snapshot, data.window)
+    display_names = _clean_display_names(snapshot)
+    window_activity = snapshot.activity.between(data.window.start, data.window.end_exclusive)
     return _WindowRenderInputs(
-        sessions=sessions,
+        sessions=columns.voice,
         display_names=display_names,
-        pair_rows=_compute_pair_overlap_hours(sessions, display_names),
-        inactive_rows=_fetch_last_activity_by_user(data.window, display_names),
-        rate_rows=_fetch_match_server_rate_rows(data.window, sessions),
-        unique_users_rows=_fetch_unique_users_per_day(data.window),
+        pair_rows=_compute_pair_overlap_hours(columns.voice, display_names),
+        inactive_rows=_last_activity_by_user(data.window, snapshot.activity, display_names),
+        rate_rows=_match_server_rate_rows(columns, display_names),
+        unique_users_rows=distinct_users_per_day(window_activity.user_id, window_activity.timestamp),
     )
 
 
@@ -1366,7 +1220,7 @@ def _month_display(report_month: str) -> str:
     return datetime.strptime(report_month, "%Y-%m").strftime("%B %Y")
 
 
-def _save_user_detail_page(canvas: _ReportCanvas, data: WindowReportData, user: UserWindowMetrics) -> None:
+def _user_detail_lines(user: UserWindowMetrics) -> list[str]:
     partner_text = (
         "\n".join(
             f"- {partner[0]}: {partner[1]} matches, {partner[3]:.0f}% selected-user win rate"
@@ -1375,43 +1229,78 @@ def _save_user_detail_page(canvas: _ReportCanvas, data: WindowReportData, user:
         if user.outside_partners
         else "No same-team outside-server partners found."
     )
-    _save_text_page(
-        canvas,
-        f"{user.display_name} — Details",
-        [
-            f"- Voice hours: {user.voice_hours:.1f}",
-            f"- Ranked match rows: {user.ranked_matches}",
-            f"- In-server ranked match rows: {user.in_server_matches}",
-            f"- Outside-server ranked match rows: {user.outside_server_matches}",
-            f"- In-server percentage: {user.in_server_percent:.0f}%",
-            f"- Outside-server percentage: {user.outside_server_percent:.0f}%",
-            f"- Voice hours per ranked match row: {user.voice_hours / max(user.ranked_matches, 1):.2f}",
-            (
-                f"- Sample warning: fewer than {LOW_SAMPLE_RANKED_ROWS} classified ranked rows."
-                if user.classified_ranked_matches < LOW_SAMPLE_RANKED_ROWS
-                else "- Sample size is above the report warning threshold."
-            ),
-            "",
-            "Deterministic conclusion:",
-            (
-                f"{user.display_name} had {user.classified_ranked_matches} classified ranked rows. "
-                f"The split was {user.in_server_matches} in-server and {user.outside_server_matches} outside-server, "
-                f"with {user.voice_hours:.1f} voice hours in this report window."
-            ),
-            "",
-            "Top same-team outside-server partners:",
-            partner_text,
-        ],
-        data.window.label(),
+    return [
+        f"- Voice hours: {user.voice_hours:.1f}",
+        f"- Ranked match rows: {user.ranked_matches}",
+        f"- In-server ranked match rows: {user.in_server_matches}",
+        f"- Outside-server ranked match rows: {user.outside_server_matches}",
+        f"- In-server percentage: {user.in_server_percent:.0f}%",
+        f"- Outside-server percentage: {user.outside_server_percent:.0f}%",
+        f"- Voice hours per ranked match row: {user.voice_hours / max(user.ranked_matches, 1):.2f}",
+        (
+            f"- Sample warning: fewer than {LOW_SAMPLE_RANKED_ROWS} classified ranked rows."
+            if user.classified_ranked_matches < LOW_SAMPLE_RANKED_ROWS
+            else "- Sample size is above the report warning threshold."
+        ),
+        "",
+        "Deterministic conclusion:",
+        (
+            f"{user.display_name} had {user.classified_ranked_matches} classified ranked rows. "
+            f"The split was {user.in_server_matches} in-server and {user.outside_server_matches} outside-server, "
+            f"with {user.voice_hours:.1f} voice hours in this report window."
+        ),
+        "",
+        "Top same-team outside-server partners:",
+        partner_text,
+    ]
+
+
+def _save_user_detail_page(canvas: _ReportCanvas, data: WindowReportData, user: UserWindowMetrics) -> None:
+    _save_text_page(canvas, f"{user.display_name} — Details", _user_detail_lines(user), data.window.label())
+
+
+def _save_cover_page(canvas: _ReportCanvas, report: MonthlyReportData) -> None:
+    canvas.save_full_bleed_page(
+        style.draw_cover_page(
+            month_display=_month_display(report.report_month),
+            report_month=report.report_month,
+            generated_display=report.generated_at.strftime("%Y-%m-%d %H:%M UTC"),
+            stats=_executive_summary_cards(report)[:4],
+        )
+    )
+
+
+def _save_toc_pages(canvas: _ReportCanvas, toc_entries: list[style.TocEntry]) -> None:
+    for page_start in range(0, len(toc_entries), style.TOC_ROWS_PER_PAGE):
+        fig = style.new_page_figure()
+        style.draw_toc_entries(fig, toc_entries[page_start : page_start + style.TOC_ROWS_PER_PAGE])
+        canvas.save_content_page(fig, "Table of Contents", f"Report month {canvas.report_month}")
+
+
+def _save_section_divider_page(canvas: _ReportCanvas, section_number: int, data: WindowReportData) -> None:
+    canvas.save_full_bleed_page(
+        style.draw_section_divider(
+            section_number=section_number,
+            title=data.window.title,
+            date_range=data.window.label(),
+            bullets=[
+                "Window summary and data quality",
+                "Community relationship networks",
+                "Voice activity trends and heatmaps",
+                "Ranked in-server vs outside analysis",
+                "Win-rate comparisons",
+                f"Player profiles for the top {len(data.top_users)} active members",
+            ],
+        )
     )
 
 
-def _render_window_pages(canvas: _ReportCanvas, data: WindowReportData, inputs: _WindowRenderInputs) -> None:
+def _plan_window_pages(layout: _ReportLayout, data: WindowReportData, inputs: _WindowRenderInputs) -> None:
     subtitle = data.window.label()
     top_user_ids = [user.user_id for user in data.top_users]
-    canvas.add_toc_entry("Window Summary", 1)
-    _save_table_page(
-        canvas,
+    layout.add_toc_entry("Window Summary", 1)
+    layout.add_page(
+        _save_table_page,
         "Window Summary",
         ["Metric", "Value"],
         [
@@ -1426,64 +1315,79 @@ def _render_window_pages(canvas: _ReportCanvas, data: WindowReportData, inputs:
         ],
         subtitle,
     )
-    canvas.add_toc_entry("Community Network (2D)", 1)
-    _save_network_page(canvas, "Community Network (2D)", inputs.pair_rows, subtitle, dim_3d=False)
-    canvas.add_toc_entry("Community Network (3D)", 1)
-    _save_network_page(canvas, "Community Network (3D)", inputs.pair_rows, subtitle, dim_3d=True)
-    canvas.add_toc_entry("Duo Relationship Time", 1)
-    _save_pair_bar_page(canvas, "Duo Relationship Time", inputs.pair_rows, subtitle)
-    canvas.add_toc_entry("Top Voice Time", 1)
-    _save_bar_page(
-        canvas,
+    layout.add_toc_entry("Community Network (2D)", 1)
+    layout.add_page(_save_network_page, "Community Network (2D)", inputs.pair_rows, subtitle, False)
+    layout.add_toc_entry("Community Network (3D)", 1)
+    layout.add_page(_save_network_page, "Community Network (3D)", inputs.pair_rows, subtitle, True)
+    layout.add_toc_entry("Duo Relationship Time", 1)
+    layout.add_page(_save_pair_bar_page, "Duo Relationship Time", inputs.pair_rows, subtitle)
+    layout.add_toc_entry("Top Voice Time", 1)
+    layout.add_page(
+        _save_bar_page,
         f"Top {len(data.top_users)} Voice Time",
         [user.display_name for user in data.top_users],
         [user.voice_hours for user in data.top_users],
         "Voice Hours",
         subtitle,
-        value_fmt="{:.1f}",
+        "{:.1f}",
     )
-    canvas.add_toc_entry("Inactive Users", 1)
-    _save_table_page(
-        canvas,
+    layout.add_toc_entry("Inactive Users", 1)
+    layout.add_page(
+        _save_table_page,
         "Inactive Users",
         ["User", "Last Seen"],
         [[row[0], row[1]] for row in inputs.inactive_rows],
         subtitle,
     )
-    canvas.add_toc_entry("Voice Minutes by Weekday", 1)
-    _save_weekday_matrix_page(
-        canvas, "Voice Minutes by Weekday", inputs.sessions, top_user_ids, inputs.display_names, subtitle
+    layout.add_toc_entry("Voice Minutes by Weekday", 1)
+    layout.add_page(
+        _save_weekday_matrix_page,
+        "Voice Minutes by Weekday",
+        inputs.sessions,
+        top_user_ids,
+        inputs.display_names,
+        subtitle,
     )
-    canvas.add_toc_entry("Voice Hours by Month", 1)
-    _save_monthly_voice_gradient_page(
-        canvas, "Voice Hours by Month", inputs.sessions, top_user_ids, inputs.display_names, subtitle
+    layout.add_toc_entry("Voice Hours by Month", 1)
+    layout.add_page(
+        _save_monthly_voice_gradient_page,
+        "Voice Hours by Month",
+        inputs.sessions,
+        top_user_ids,
+        inputs.display_names,
+        subtitle,
     )
-    canvas.add_toc_entry("Weekly Voice Timeline", 1)
-    _save_weekly_timeline_page(
-        canvas, "Weekly Voice Timeline (Top 8)", inputs.sessions, top_user_ids, inputs.display_names, subtitle
+    layout.add_toc_entry("Weekly Voice Timeline", 1)
+    layout.add_page(
+        _save_weekly_timeline_page,
+        "Weekly Voice Timeline (Top 8)",
+        inputs.sessions,
+        top_user_ids,
+        inputs.display_names,
+        subtitle,
     )
-    canvas.add_toc_entry("Monthly Voice Time", 1)
-    _save_total_monthly_voice_page(canvas, "Monthly Voice Time", inputs.sessions, subtitle)
-    canvas.add_toc_entry("Top Ranked Match Rows", 1)
-    _save_bar_page(
-        canvas,
+    layout.add_toc_entry("Monthly Voice Time", 1)
+    layout.add_page(_save_total_monthly_voice_page, "Monthly Voice Time", inputs.sessions, subtitle)
+    layout.add_toc_entry("Top Ranked Match Rows", 1)
+    layout.add_page(
+        _save_bar_page,
         f"Top {len(data.top_users)} Ranked Match Rows",
         [user.display_name for user in data.top_users],
         [float(user.ranked_matches) for user in data.top_users],
         "Ranked Match Rows",
         subtitle,
     )
-    canvas.add_toc_entry("Rate Playing Ranked In Server", 1)
-    _save_rate_playing_server_page(canvas, data, inputs.rate_rows)
-    canvas.add_toc_entry("Win Rate: In Server vs Outside", 1)
-    _save_win_rate_in_out_page(canvas, data, inputs.rate_rows)
-    canvas.add_toc_entry("Unique Users Per Day", 1)
-    _save_unique_users_page(canvas, data, inputs.unique_users_rows)
-    canvas.add_toc_entry("Ranked Matches: In Server vs Outside", 1)
-    _save_server_split_page(canvas, data)
-    canvas.add_toc_entry("Top Users", 1)
-    _save_table_page(
-        canvas,
+    layout.add_toc_entry("Rate Playing Ranked In Server", 1)
+    layout.add_page(_save_rate_playing_server_page, data, inputs.rate_rows)
+    layout.add_toc_entry("Win Rate: In Server vs Outside", 1)
+    layout.add_page(_save_win_rate_in_out_page, data, inputs.rate_rows)
+    layout.add_toc_entry("Unique Users Per Day", 1)
+    layout.add_page(_save_unique_users_page, data, inputs.unique_users_rows)
+    layout.add_toc_entry("Ranked Matches: In Server vs Outside", 1)
+    layout.add_page(_save_server_split_page, data)
+    layout.add_toc_entry("Top Users", 1)
+    layout.add_page(
+        _save_table_page,
         "Top Users",
         ["User", "Voice h", "Ranked", "In server", "Outside", "Outside %"],
         [
@@ -1500,92 +1404,154 @@ def _render_window_pages(canvas: _ReportCanvas, data: WindowReportData, inputs:
         subtitle,
     )
     if data.top_users:
-        canvas.add_toc_entry("Player Profiles", 1)
+        layout.add_toc_entry("Player Profiles", 1)
     for user in data.top_users:
-        _save_user_timeline_page(canvas, data, user, inputs.sessions)
-        _save_user_circular_page(canvas, data, user)
-        _save_user_detail_page(canvas, data, user)
+        # The three profile pages of a user share one job and only carry that user's sessions to the worker
+        user_sessions = inputs.sessions.take(inputs.sessions.user_id == user.user_id)
+        layout.add_job(
+            [
+                (_save_user_timeline_page, (data, user, user_sessions)),
+                (_save_user_circular_page, (data, user)),
+                (_save_user_detail_page, (data, user)),
+            ],
+            page_count=2 + _text_page_count(_user_detail_lines(user)),
+        )
 
 
-def _render_report_pages(
-    canvas: _ReportCanvas,
+def _plan_report_layout(
     report: MonthlyReportData,
     conclusion: str,
     window_inputs: dict[str, _WindowRenderInputs],
-) -> None:
-    """Emit every body page (everything after the cover and TOC) in order."""
+) -> tuple[_ReportLayout, int]:
+    """
+    Lay out every page and TOC entry from the data shape alone.
+    Return the layout, with the cover and TOC jobs first, and the total page count.
+    """
+    body = _ReportLayout(report.report_month)
     month_subtitle = f"Report month {report.report_month}"
-    canvas.begin_section("Overview")
-    canvas.add_toc_entry("Executive Summary", 0)
-    _save_executive_summary_page(canvas, report)
-    canvas.add_toc_entry("Deterministic Action Items", 0)
-    _save_text_page(canvas, "Deterministic Action Items", _deterministic_action_lines(report), month_subtitle)
-    canvas.add_toc_entry("Data Quality and Methodology", 0)
-    _save_text_page(canvas, "Data Quality and Methodology", _data_quality_lines(report), month_subtitle)
+    body.begin_section("Overview")
+    body.add_toc_entry("Executive Summary", 0)
+    body.add_page(_save_executive_summary_page, report)
+    action_lines = _deterministic_action_lines(report)
+    body.add_toc_entry("Deterministic Action Items", 0)
+    body.add_page(
+        _save_text_page,
+        "Deterministic Action Items",
+        action_lines,
+        month_subtitle,
+        page_count=_text_page_count(action_lines),
+    )
+    quality_lines = _data_quality_lines(report)
+    body.add_toc_entry("Data Quality and Methodology", 0)
+    body.add_page(
+        _save_text_page,
+        "Data Quality and Methodology",
+        quality_lines,
+        month_subtitle,
+        page_count=_text_page_count(quality_lines),
+    )
     for index, data in enumerate(report.windows, start=1):
-        canvas.begin_section(data.window.title)
-        canvas.add_toc_entry(f"Section {index:02d} — {data.window.title}", 0)
-        canvas.save_full_bleed_page(
-            style.draw_section_divider(
-                section_number=index,
-                title=data.window.title,
-                date_range=data.window.label(),
-                bullets=[
-                    "Window summary and data quality",
-                    "Community relationship networks",
-                    "Voice activity trends and heatmaps",
-                    "Ranked in-server vs outside analysis",
-                    "Win-rate comparisons",
-                    f"Player profiles for the top {len(data.top_users)} active members",
-                ],
-            )
+        body.begin_section(data.window.title)
+        body.add_toc_entry(f"Section {index:02d} — {data.window.title}", 0)
+        body.add_page(_save_section_divider_page, index, data)
+        _plan_window_pages(body, data, window_inputs[data.window.key])
+    body.begin_section("Conclusion")
+    conclusion_lines = conclusion.splitlines()
+    body.add_toc_entry("AI Conclusion and Action Items", 0)
+    body.add_page(
+        _save_text_page,
+        "AI Conclusion and Action Items",
+        conclusion_lines,
+        month_subtitle,
+        page_count=_text_page_count(conclusion_lines),
+    )
+
+    toc_pages = style.toc_page_count(len(body.toc_entries))
+    front_matter_pages = 1 + toc_pages
+    layout = _ReportLayout(report.report_month)
+    layout.toc_entries = [entry.shifted(front_matter_pages) for entry in body.toc_entries]
+    layout.add_page(_save_cover_page, report)
+    layout.begin_section("Contents")
+    layout.add_page(_save_toc_pages, layout.toc_entries, page_count=toc_pages)
+    for job in body.jobs:
+        layout.jobs.append(replace(job, first_page=job.first_page + front_matter_pages))
+    return layout, front_matter_pages + body.page_number
+
+
+def _render_report_fragment(job: _PageJob, report_month: str, total_pages: int) -> bytes:
+    """Render the pages of one job into a standalone PDF, run in the worker processes."""
+    buffer = io.BytesIO()
+    with PdfPages(buffer) as pdf:
+        canvas = _ReportCanvas(pdf, report_month, total_pages=total_pages)
+        canvas.page_number = job.first_page - 1
+        canvas.begin_section(job.section_title)
+        for render, args in job.renders:
+            render(canvas, *args)
+    rendered_pages = canvas.page_number - job.first_page + 1
+    if rendered_pages != job.page_count:
+        print_warning_log(
+            f"_render_report_fragment: Page {job.first_page} laid out {job.page_count} pages but rendered "
+            f"{rendered_pages}, the page numbers after it are off"
         )
-        _render_window_pages(canvas, data, window_inputs[data.window.key])
-    canvas.begin_section("Conclusion")
-    canvas.add_toc_entry("AI Conclusion and Action Items", 0)
-    _save_text_page(canvas, "AI Conclusion and Action Items", conclusion.splitlines(), month_subtitle)
+    return buffer.getvalue()
+
+
+def _stitch_report_fragments(fragments: Iterable[bytes], toc_entries: list[style.TocEntry], output_path: Path) -> Path:
+    """Concatenate the fragments in order and add the TOC entries as PDF bookmarks."""
+    writer = PdfWriter()
+    for fragment in fragments:
+        writer.append(io.BytesIO(fragment))
+    section_item = None
+    for entry in toc_entries:
+        parent = section_item if entry.level > 0 else None
+        item = writer.add_outline_item(entry.title, entry.page_number - 1, parent=parent)
+        if entry.level == 0:
+            section_item = item
+    writer.page_mode = "/UseOutlines"
+    # Each fragment embeds its own copy of the font glyphs: keep one
+    writer.compress_identical_objects()
+    with open(output_path, "wb") as file:
+        writer.write(file)
+    return output_path
+
+
+def _prepare_report_layout(
+    report: MonthlyReportData, conclusion: str, output_dir: Path | str, snapshot: Optional[AnalyticSnapshot] = None
+) -> tuple[_ReportLayout, int, Path]:
+    """Compute the render inputs and lay out the report. Return the layout, the page total and the output path."""
+    output_base = Path(output_dir) / report.report_month
+    output_base.mkdir(parents=True, exist_ok=True)
+    if snapshot is None:
+        snapshot = load_monthly_report_snapshot([data.window for data in report.windows])
+    window_inputs = {data.window.key: _collect_window_render_inputs(data, snapshot) for data in report.windows}
+    layout, total_pages = _plan_report_layout(report, conclusion, window_inputs)
+    return layout, total_pages, output_base / f"gametime_report_{report.report_month}.pdf"
 
 
 def render_monthly_report_pdf(
     report: MonthlyReportData,
     conclusion: str,
     output_dir: Path | str = "reports/monthly",
+    max_workers: Optional[int] = None,
+    snapshot: Optional[AnalyticSnapshot] = None,
 ) -> Path:
     """Render collected report data to a themed PDF and return the output path.
 
-    Rendering runs twice: a first pass into an in-memory buffer collects the table
-    of contents entries and page count, then the final pass writes the real file
-    with the cover, an accurate TOC, and page-total footers.
+    The page layout and the TOC are computed from the data first, so every page is drawn once,
+    knowing its page number and the page total. The pages are rendered into PDF fragments in
+    max_workers processes (default: one per core) and stitched in order. The chart data comes
+    from the snapshot the report data was collected from, loaded again when not given.
     """
-    output_base = Path(output_dir) / report.report_month
-    output_base.mkdir(parents=True, exist_ok=True)
-    output_path = output_base / f"gametime_report_{report.report_month}.pdf"
-    window_inputs = {data.window.key: _collect_window_render_inputs(data) for data in report.windows}
-
-    with PdfPages(io.BytesIO()) as probe_pdf:
-        probe = _ReportCanvas(probe_pdf, report.report_month)
-        _render_report_pages(probe, report, conclusion, window_inputs)
-    front_matter_pages = 1 + style.toc_page_count(len(probe.toc_entries))
-    toc_entries = [entry.shifted(front_matter_pages) for entry in probe.toc_entries]
-    total_pages = front_matter_pages + probe.page_number
-
-    with PdfPages(output_path) as pdf:
-        canvas = _ReportCanvas(pdf, report.report_month, total_pages=total_pages)
-        canvas.save_full_bleed_page(
-            style.draw_cover_page(
-                month_display=_month_display(report.report_month),
-                report_month=report.report_month,
-                generated_display=report.generated_at.strftime("%Y-%m-%d %H:%M UTC"),
-                stats=_executive_summary_cards(report)[:4],
-            )
-        )
-        canvas.begin_section("Contents")
-        for page_start in range(0, len(toc_entries), style.TOC_ROWS_PER_PAGE):
-            fig = style.new_page_figure()
-            style.draw_toc_entries(fig, toc_entries[page_start : page_start + style.TOC_ROWS_PER_PAGE])
-            canvas.save_content_page(fig, "Table of Contents", f"Report month {report.report_month}")
-        _render_report_pages(canvas, report, conclusion, window_inputs)
-    return output_path
+    layout, total_pages, output_path = _prepare_report_layout(report, conclusion, output_dir, snapshot)
+    render = partial(_render_report_fragment, report_month=report.report_month, total_pages=total_pages)
+    max_workers = min(max_workers or os.cpu_count() or 1, len(layout.jobs))
+    if max_workers <= 1:
+        fragments = [render(job) for job in layout.jobs]
+    else:
+        # spawn: forking would copy the caller's threads and open SQLite connections
+        with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            fragments = list(pool.map(render, layout.jobs))
+    return _stitch_report_fragments(fragments, layout.toc_entries, output_path)
 
 
 def generate_monthly_report(
@@ -1594,11 +1560,13 @@ def generate_monthly_report(
     top_n: int = REPORT_TOP_USERS,
     include_ai: bool = True,
     window_keys: Optional[Iterable[str]] = None,
+    max_workers: Optional[int] = None,
 ) -> Path:
     """Collect data, optionally generate AI conclusion, and render the monthly report PDF."""
-    report = collect_monthly_report_data(reference_day, top_n, window_keys)
+    snapshot = load_monthly_report_snapshot(_report_windows(reference_day, window_keys)[1])
+    report = collect_monthly_report_data(reference_day, top_n, window_keys, snapshot)
     conclusion = generate_ai_conclusion(report) if include_ai else "AI conclusion disabled for this run."
-    return render_monthly_report_pdf(report, conclusion, output_dir)
+    return render_monthly_report_pdf(report, conclusion, output_dir, max_workers, snapshot)
 
 
 async def generate_monthly_report_async(
@@ -1608,34 +1576,28 @@ async def generate_monthly_report_async(
     window_keys: Optional[Iterable[str]] = None,
 ) -> Path:
     """Async report generation for bot tasks."""
-    report = await asyncio.to_thread(collect_monthly_report_data, reference_day, top_n, window_keys)
+    _, windows = _report_windows(reference_day, window_keys)
+    snapshot = await asyncio.to_thread(load_monthly_report_snapshot, windows)
+    report = await asyncio.to_thread(collect_monthly_report_data, reference_day, top_n, window_keys, snapshot)
     conclusion = await generate_ai_conclusion_async(report)
-    return await asyncio.to_thread(render_monthly_report_pdf, report, conclusion, output_dir)
+    layout, total_pages, output_path = await asyncio.to_thread(
+        _prepare_report_layout, report, conclusion, output_dir, snapshot
+    )
+    # The pages render in the bot's warm render workers instead of a pool started for the report. At most one
+    # fragment per worker is submitted at a time: the render timeout counts the time queued, and the interactive
+    # charts submitted meanwhile only wait for the fragments already running
+    worker_slots = asyncio.Semaphore(render_service.max_workers)
+
+    async def render_fragment(job: _PageJob) -> bytes:
+        async with worker_slots:
+            return await render_service.submit(
+                _render_report_fragment,
+                job,
+                report.report_month,
+                total_pages,
+                timeout_seconds=REPORT_FRAGMENT_TIMEOUT_SECONDS,
+            )
 
+    fragments = await asyncio.gather(*(render_fragment(job) for job in layout.jobs))
+    return await asyncio.to_thread(_stitch_report_fragments, fragments, layout.toc_entries, output_path)
 
-async def send_monthly_analytics_report_guild(guild: discord.Guild, reference_day: Optional[date] = None) -> None:
-    """Generate and send the monthly analytics report for one guild when due."""
-    if reference_day is None:
-        reference_day = datetime.now(timezone.utc).date()
-    if reference_day.day != 1:
-        return
-    report_month, _ = get_monthly_report_windows(reference_day)
-    if await data_access_get_monthly_analytics_report_sent(guild.id, report_month):
-        print_log(f"send_monthly_analytics_report_guild: Report {report_month} already sent for {guild.name}")
-        return
-    channel_id = await data_access_get_analytics_report_text_channel_id(guild.id)
-    if channel_id is None:
-        print_warning_log(
-            f"send_monthly_analytics_report_guild: Analytics report channel not set for {guild.name}. Skipping."
-        )
-        return
-    channel = await data_access_get_channel(channel_id)
-    if channel is None:
-        print_error_log(f"send_monthly_analytics_report_guild: Channel {channel_id} not found for {guild.name}")
-        return
-    output_path = await generate_monthly_report_async(reference_day)
-    await channel.send(
-        content=f"Monthly analytics report for {report_month}",
-        file=discord.File(str(output_path), filename=output_path.name),
-    )
-    data_access_set_monthly_analytics_report_sent(guild.id, report_month)
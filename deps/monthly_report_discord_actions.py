@@ -0,0 +1,48 @@
+"""
+Send the monthly analytics report to the guilds.
+
+Kept apart from deps.monthly_report, which the render workers import to render the report pages: the Discord
+and data access imports of the bot stay out of the workers.
+"""
+
+from datetime import date, datetime, timezone
+from typing import Optional
+
+import discord
+
+from deps.data_access import (
+    data_access_get_analytics_report_text_channel_id,
+    data_access_get_channel,
+    data_access_get_monthly_analytics_report_sent,
+    data_access_set_monthly_analytics_report_sent,
+)
+from deps.log import print_error_log, print_log, print_warning_log
+from deps.monthly_report import generate_monthly_report_async, get_monthly_report_windows
+
+
+async def send_monthly_analytics_report_guild(guild: discord.Guild, reference_day: Optional[date] = None) -> None:
+    """Generate and send the monthly analytics report for one guild when due."""
+    if reference_day is None:
+        reference_day = datetime.now(timezone.utc).date()
+    if reference_day.day != 1:
+        return
+    report_month, _ = get_monthly_report_windows(reference_day)
+    if await data_access_get_monthly_analytics_report_sent(guild.id, report_month):
+        print_log(f"send_monthly_analytics_report_guild: Report {report_month} already sent for {guild.name}")
+        return
+    channel_id = await data_access_get_analytics_report_text_channel_id(guild.id)
+    if channel_id is None:
+        print_warning_log(
+            f"send_monthly_analytics_report_guild: Analytics report channel not set for {guild.name}. Skipping."
+        )
+        return
+    channel = await data_access_get_channel(channel_id)
+    if channel is None:
+        print_error_log(f"send_monthly_analytics_report_guild: Channel {channel_id} not found for {guild.name}")
+        return
+    output_path = await generate_monthly_report_async(reference_day)
+    await channel.send(
+        content=f"Monthly analytics report for {report_month}",
+        file=discord.File(str(output_path), filename=output_path.name),
+    )
+    data_access_set_monthly_analytics_report_sent(guild.id, report_month)
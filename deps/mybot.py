@@ -1,10 +1,20 @@
 """Custom bot class for Discord bot"""
 
 import os
+import asyncio
 import logging
 import discord
 from discord.ext import commands
+from deps.cache_write_behind import (
+    DEFAULT_FLUSH_INTERVAL_MS,
+    DEFAULT_MAX_PENDING_KEYS,
+    persistent_cache_write_behind,
+)
+from deps.database_gateway import database_gateway
+from deps.http_clients import http_clients
 from deps.log import print_log, print_error_log
+from deps.render_service import render_service
+from deps.scraper_rate_limiter import scraper_rate_limiter
 from deps.tribemarkets import TribeMarketsClient
 
 
@@ -26,6 +36,21 @@ class MyBot(commands.Bot):
 
     async def setup_hook(self) -> None:
         """Load bot extensions during discord.py startup."""
+        if os.getenv("CACHE_WRITE_BEHIND_ENABLED", "false").lower() == "true":
+            persistent_cache_write_behind.start(
+                flush_interval_ms=int(os.getenv("CACHE_WRITE_BEHIND_FLUSH_MS", str(DEFAULT_FLUSH_INTERVAL_MS))),
+                max_pending_keys=int(os.getenv("CACHE_WRITE_BEHIND_MAX_KEYS", str(DEFAULT_MAX_PENDING_KEYS))),
+            )
+        try:
+            # Spawn the chart workers now so the first chart does not wait for matplotlib to import
+            render_service.start()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print_error_log(f"MyBot.setup_hook: Failed to start the render workers: {e}")
+        try:
+            # Resume the scraping pace learned by the previous run instead of starting cold
+            await database_gateway.read(scraper_rate_limiter.load)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print_error_log(f"MyBot.setup_hook: Failed to load the scraper rate limiter: {e}")
         await self.load_cogs()
         try:
             await TribeMarketsClient().check_access()
@@ -50,6 +75,32 @@ class MyBot(commands.Bot):
                 await events_cog.handle_bot_shutdown()
             except Exception as e:  # pylint: disable=broad-exception-caught
                 print_error_log(f"MyBot.close: Failed bot shutdown cleanup: {e}")
+        render_service.stop()
+        try:
+            # Imported here: the browser modules import the bot singleton through deps.siege
+            from deps.browser_pool import browser_pool  # pylint: disable=import-outside-toplevel
+            from deps.scrape_scheduler import scrape_scheduler  # pylint: disable=import-outside-toplevel
+
+            # The queued scrapes fail now instead of waiting on a browser being closed
+            await scrape_scheduler.stop()
+            await asyncio.to_thread(browser_pool.shutdown)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print_error_log(f"MyBot.close: Failed to close the pooled browsers: {e}")
+        try:
+            # Write the persistent cache values still waiting in the write-behind buffer
+            await asyncio.to_thread(persistent_cache_write_behind.stop)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print_error_log(f"MyBot.close: Failed to flush the persistent cache: {e}")
+        try:
+            # Close the keep-alive connections of the AI providers, TribeMarkets and the avatar downloads
+            await http_clients.aclose()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print_error_log(f"MyBot.close: Failed to close the HTTP clients: {e}")
+        try:
+            # Flush the writes queued by the shutdown cleanup before the process exits
+            await asyncio.to_thread(database_gateway.stop)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print_error_log(f"MyBot.close: Failed to stop the database gateway: {e}")
         await super().close()
 
 
@@ -15,6 +15,7 @@ def upsert_operator_stats(operator_stats: List[Dict[str, Any]]) -> None:
 
     Uses UPSERT (INSERT OR REPLACE) to handle both new and existing records.
     The unique constraint is on (user_id, operator_name, session_type, gamemode).
+    All the rows go through a single executemany, the stats of many users can be passed at once.
 
     Args:
         operator_stats: List of operator stat dictionaries
@@ -24,58 +25,55 @@ def upsert_operator_stats(operator_stats: List[Dict[str, Any]]) -> None:
         return
 
     try:
-        with database_manager.data_access_transaction():
-            cursor = database_manager.get_cursor()
-
-            for stat in operator_stats:
-                cursor.execute(
-                    """
-                    INSERT OR REPLACE INTO operator_stats (
-                        user_id,
-                        operator_name,
-                        session_type,
-                        side,
-                        gamemode,
-                        matches_played,
-                        matches_won,
-                        matches_lost,
-                        win_percentage,
-                        time_played,
-                        rounds_played,
-                        rounds_won,
-                        rounds_lost,
-                        round_win_pct,
-                        kills,
-                        deaths,
-                        kd_ratio,
-                        kills_per_game,
-                        kills_per_round,
-                        last_updated
-                    ) VALUES (
-                        :user_id,
-                        :operator_name,
-                        :session_type,
-                        :side,
-                        :gamemode,
-                        :matches_played,
-                        :matches_won,
-                        :matches_lost,
-                        :win_percentage,
-                        :time_played,
-                        :rounds_played,
-                        :rounds_won,
-                        :rounds_lost,
-                        :round_win_pct,
-                        :kills,
-                        :deaths,
-                        :kd_ratio,
-                        :kills_per_game,
-                        :kills_per_round,
-                        CURRENT_TIMESTAMP
-                    )
-                    """,
-                    stat,
+        with database_manager.data_access_transaction() as cursor:
+            cursor.executemany(
+                """
+                INSERT OR REPLACE INTO operator_stats (
+                    user_id,
+                    operator_name,
+                    session_type,
+                    side,
+                    gamemode,
+                    matches_played,
+                    matches_won,
+                    matches_lost,
+                    win_percentage,
+                    time_played,
+                    rounds_played,
+                    rounds_won,
+                    rounds_lost,
+                    round_win_pct,
+                    kills,
+                    deaths,
+                    kd_ratio,
+                    kills_per_game,
+                    kills_per_round,
+                    last_updated
+                ) VALUES (
+                    :user_id,
+                    :operator_name,
+                    :session_type,
+                    :side,
+                    :gamemode,
+                    :matches_played,
+                    :matches_won,
+                    :matches_lost,
+                    :win_percentage,
+                    :time_played,
+                    :rounds_played,
+                    :rounds_won,
+                    :rounds_lost,
+                    :round_win_pct,
+                    :kills,
+                    :deaths,
+                    :kd_ratio,
+                    :kills_per_game,
+                    :kills_per_round,
+                    CURRENT_TIMESTAMP
                 )
+                """,
+                operator_stats,
+            )
 
             print_log(f"upsert_operator_stats: Successfully upserted {len(operator_stats)} operator stats")
 
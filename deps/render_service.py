@@ -0,0 +1,137 @@
+"""
+Render charts and images in a pool of worker processes.
+
+The matplotlib/networkx charts (community graph, operator matrix) and the tournament bracket take
+seconds of CPU. Run on the event loop, they starve the Discord gateway heartbeat. The RenderService
+sends them to a warm ProcessPoolExecutor: the workers import the heavy libraries once when they
+start, and charts requested together render in parallel on the available cores.
+
+The submitted function must be importable by the workers (module level) and return picklable data,
+usually the PNG bytes. The workers open their own connection to the bot database.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from importlib import import_module
+from typing import Any, Callable, Optional, Sequence
+
+from deps.log import print_error_log, print_log
+from deps.system_database import database_manager
+
+DEFAULT_RENDER_TIMEOUT_SECONDS = 120
+# Modules imported by each worker when it starts, so the first chart does not pay for them
+DEFAULT_WARM_MODULES = (
+    "matplotlib",
+    "networkx",
+    "deps.analytic_visualizer",
+    "deps.tournaments.tournament_visualizer",
+)
+
+
+def _init_render_worker(database_name: str, warm_modules: Sequence[str]) -> None:
+    """Run once in each worker process"""
+    if "matplotlib" in warm_modules:
+        import matplotlib  # pylint: disable=import-outside-toplevel
+
+        matplotlib.use("Agg")  # No display in the workers
+    for module_name in warm_modules:
+        try:
+            import_module(module_name)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            print_error_log(f"_init_render_worker: Failed to preload {module_name}: {e}")
+    if database_manager.get_database_name() != database_name:
+        database_manager.set_database_name(database_name)
+
+
+def _warm_up() -> int:
+    """Trivial job forcing a worker to start"""
+    return os.getpid()
+
+
+class RenderService:
+    """Async front of a process pool for the CPU heavy renders"""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        default_timeout_seconds: float = DEFAULT_RENDER_TIMEOUT_SECONDS,
+        warm_modules: Sequence[str] = DEFAULT_WARM_MODULES,
+    ) -> None:
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.default_timeout_seconds = default_timeout_seconds
+        self.warm_modules = tuple(warm_modules)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending_jobs = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking the bot would copy its threads and open SQLite connections
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_render_worker,
+                    initargs=(database_manager.get_database_name(), self.warm_modules),
+                )
+            return self._executor
+
+    def start(self) -> None:
+        """Start every worker now instead of on the first render"""
+        executor = self._get_executor()
+        for _ in range(self.max_workers):
+            executor.submit(_warm_up)
+        print_log(f"RenderService: Started {self.max_workers} render workers")
+
+    def queue_depth(self) -> int:
+        """Number of renders submitted and not finished yet"""
+        return self._pending_jobs
+
+    async def submit(
+        self, function: Callable[..., Any], *args: Any, timeout_seconds: Optional[float] = None, **kwargs: Any
+    ) -> Any:
+        """
+        Run the function in a worker and await its result
+        Raises asyncio.TimeoutError after the timeout. A render already running keeps its worker until it
+        ends, a render still queued is cancelled.
+        Raises BrokenProcessPool when a worker died (OOM, crash), the next render starts new workers.
+        """
+        executor = self._get_executor()
+        self._pending_jobs += 1
+        try:
+            future = asyncio.wrap_future(executor.submit(function, *args, **kwargs))
+            return await asyncio.wait_for(
+                future, timeout_seconds if timeout_seconds is not None else self.default_timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            print_error_log(f"RenderService: {getattr(function, '__name__', function)} timed out")
+            raise
+        except BrokenProcessPool:
+            print_error_log(f"RenderService: A worker died during {getattr(function, '__name__', function)}")
+            self._drop_executor(executor)
+            raise
+        finally:
+            self._pending_jobs -= 1
+
+    def _drop_executor(self, executor: ProcessPoolExecutor) -> None:
+        """Forget a broken pool so the next render creates a new one, unless it was already replaced"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def stop(self) -> None:
+        """Stop the workers, cancelling the renders not started"""
+        with self._lock:
+            executor = self._executor
+            self._executor = None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+render_service = RenderService()
@@ -0,0 +1,200 @@
+"""
+Scrape Job Data Access
+
+The scrape_job table is the durable queue between the bot and scraper_worker.py. The bot enqueues a
+job per user visit and polls its row; the worker claims the most urgent queued job, runs it with its
+own browsers and writes the parsed result (match stats, profile JSON, operator stats) back in the row.
+
+Functions:
+- enqueue_scrape_job: Queue a job, return its id
+- claim_next_scrape_job: Take the most urgent queued job for a worker
+- finish_scrape_job: Store the result (or the error) of a job
+- fetch_scrape_job_result: Status and result of a finished job, None while it is pending
+- delete_scrape_job: Remove a job once the bot read its result
+- scrape_worker_id / is_scrape_worker_alive: Worker ids carrying the host and pid of the worker process
+- requeue_dead_worker_scrape_jobs: Give back the jobs of the dead workers of this host, whatever their age
+- requeue_stale_scrape_jobs: Give back the jobs of a worker that died while running them
+- purge_finished_scrape_jobs: Remove the results nobody came to read
+"""
+
+import os
+import socket
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from deps.cache_codec import decode_value, encode_value
+from deps.system_database import database_manager
+
+SCRAPE_JOB_QUEUED = "queued"
+SCRAPE_JOB_RUNNING = "running"
+SCRAPE_JOB_DONE = "done"
+SCRAPE_JOB_FAILED = "failed"
+
+# A job claimed this many times without finishing is failed instead of crashing the next worker
+MAX_SCRAPE_JOB_ATTEMPTS = 3
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def enqueue_scrape_job(priority: int, payload: Any) -> int:
+    """Queue a job, lower priorities are claimed first"""
+    cursor = database_manager.get_cursor()
+    cursor.execute(
+        "INSERT INTO scrape_job (priority, status, payload, created_at) VALUES (?, ?, ?, ?)",
+        (int(priority), SCRAPE_JOB_QUEUED, encode_value(payload), _now()),
+    )
+    database_manager.get_conn().commit()
+    return int(cursor.lastrowid)
+
+
+def claim_next_scrape_job(worker_id: str) -> Optional[tuple[int, Any]]:
+    """Mark the most urgent queued job as running for the worker and return its id and payload"""
+    conn = database_manager.get_conn()
+    cursor = database_manager.get_cursor()
+    # IMMEDIATE takes the write lock before the SELECT so two workers cannot claim the same job
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        row = cursor.execute(
+            """
+            SELECT id, payload
+            FROM scrape_job
+            WHERE status = ?
+            ORDER BY priority, id
+            LIMIT 1
+            """,
+            (SCRAPE_JOB_QUEUED,),
+        ).fetchone()
+        if row is not None:
+            cursor.execute(
+                """
+                UPDATE scrape_job
+                SET status = ?, worker_id = ?, started_at = ?, attempts = attempts + 1
+                WHERE id = ?
+                """,
+                (SCRAPE_JOB_RUNNING, worker_id, _now(), row[0]),
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    if row is None:
+        return None
+    return row[0], decode_value(row[1])
+
+
+def finish_scrape_job(job_id: int, result: Any, failed: bool = False) -> None:
+    """Store the result of a job, or the exception that failed it"""
+    database_manager.get_cursor().execute(
+        "UPDATE scrape_job SET status = ?, result = ?, finished_at = ? WHERE id = ?",
+        (SCRAPE_JOB_FAILED if failed else SCRAPE_JOB_DONE, encode_value(result), _now(), job_id),
+    )
+    database_manager.get_conn().commit()
+
+
+def fetch_scrape_job_result(job_id: int) -> Optional[tuple[str, Any]]:
+    """Status and result of a finished job, None while it is queued or running"""
+    row = (
+        database_manager.get_cursor()
+        .execute("SELECT status, result FROM scrape_job WHERE id = ?", (job_id,))
+        .fetchone()
+    )
+    if row is None:
+        return (SCRAPE_JOB_FAILED, None)  # Purged or never written
+    if row[0] not in (SCRAPE_JOB_DONE, SCRAPE_JOB_FAILED):
+        return None
+    return row[0], decode_value(row[1]) if row[1] is not None else None
+
+
+def delete_scrape_job(job_id: int) -> None:
+    """Remove a job once the bot read its result or gave up on it"""
+    database_manager.get_cursor().execute("DELETE FROM scrape_job WHERE id = ?", (job_id,))
+    database_manager.get_conn().commit()
+
+
+def scrape_worker_id(index: int) -> str:
+    """Id of a worker thread of this process: host:pid:thread index"""
+    return f"{socket.gethostname()}:{os.getpid()}:{index}"
+
+
+def is_scrape_worker_alive(worker_id: str) -> bool:
+    """
+    False when the worker process is known to be gone: same host and its pid is not running, or is the pid of
+    the calling process (a restarted container gets the same pid). The workers of other hosts cannot be checked.
+    """
+    parts = worker_id.rsplit(":", 2)
+    if len(parts) != 3 or parts[0] != socket.gethostname() or not parts[1].isdigit():
+        return True
+    pid = int(parts[1])
+    if pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # Running under another user
+    return True
+
+
+def _requeue_running_scrape_jobs(condition: str, params: tuple) -> int:
+    """
+    Queue again the running jobs matching the condition, their worker died. The jobs already claimed
+    MAX_SCRAPE_JOB_ATTEMPTS times are failed instead.
+    """
+    cursor = database_manager.get_cursor()
+    cursor.execute(
+        f"""
+        UPDATE scrape_job
+        SET status = ?, finished_at = ?
+        WHERE status = ? AND {condition} AND attempts >= ?
+        """,
+        (SCRAPE_JOB_FAILED, _now(), SCRAPE_JOB_RUNNING, *params, MAX_SCRAPE_JOB_ATTEMPTS),
+    )
+    cursor.execute(
+        f"UPDATE scrape_job SET status = ?, worker_id = NULL WHERE status = ? AND {condition}",
+        (SCRAPE_JOB_QUEUED, SCRAPE_JOB_RUNNING, *params),
+    )
+    requeued = cursor.rowcount
+    database_manager.get_conn().commit()
+    return requeued
+
+
+def requeue_dead_worker_scrape_jobs() -> int:
+    """
+    Queue again the jobs running on a worker process that is gone, however recently they started, so the bot
+    still gets their result when the worker restarts before the bot gives up on them.
+    """
+    worker_ids = [
+        row[0]
+        for row in database_manager.get_cursor()
+        .execute("SELECT DISTINCT worker_id FROM scrape_job WHERE status = ?", (SCRAPE_JOB_RUNNING,))
+        .fetchall()
+        if row[0] is not None
+    ]
+    dead_worker_ids = [worker_id for worker_id in worker_ids if not is_scrape_worker_alive(worker_id)]
+    if not dead_worker_ids:
+        return 0
+    placeholders = ", ".join("?" for _ in dead_worker_ids)
+    return _requeue_running_scrape_jobs(f"worker_id IN ({placeholders})", tuple(dead_worker_ids))
+
+
+def requeue_stale_scrape_jobs(started_before: datetime) -> int:
+    """
+    Queue again the jobs running since before the date: their worker died. The jobs already
+    claimed MAX_SCRAPE_JOB_ATTEMPTS times are failed instead.
+    """
+    return _requeue_running_scrape_jobs("started_at < ?", (started_before.astimezone(timezone.utc).isoformat(),))
+
+
+def purge_finished_scrape_jobs(finished_before: datetime) -> int:
+    """Remove the finished jobs whose result was never read (the bot restarted meanwhile)"""
+    cursor = database_manager.get_cursor()
+    cursor.execute(
+        "DELETE FROM scrape_job WHERE status IN (?, ?) AND finished_at < ?",
+        (SCRAPE_JOB_DONE, SCRAPE_JOB_FAILED, finished_before.astimezone(timezone.utc).isoformat()),
+    )
+    purged = cursor.rowcount
+    database_manager.get_conn().commit()
+    return purged
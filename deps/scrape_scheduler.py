@@ -0,0 +1,475 @@
+"""
+Priority scheduler of the R6 Tracker scraping
+
+Every scrape (post-session stats, periodic match and rank refresh, nightly user information and
+operator stats, slash commands) goes through one queue of per-user jobs instead of competing for the
+browser. The jobs run in priority order, so a bulk job yields the browser between two users when
+someone waits on a command or on their session stats. The requests about the same account are merged
+into one job and served with a single browser lease: the matches, the profile (ranks and full user
+information) and the operator stats of a user are fetched in the same visit.
+
+With SCRAPER_MODE=process, the visits are not run by the bot: they are queued in the scrape_job table
+and run by scraper_worker.py, so Chrome crashes, leaked file descriptors and memory stay out of the
+Discord gateway process. The priorities and the merging still happen here.
+"""
+
+import asyncio
+import itertools
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Optional
+
+from deps.browser_context_manager import BrowserContextManager
+from deps.browser_exceptions import BrowserException, BrowserTimeoutException
+from deps.browser_pool import BrowserPool, browser_pool
+from deps.data_access_data_class import UserInfo
+from deps.database_gateway import database_gateway
+from deps.functions_r6_tracker import parse_json_user_info
+from deps.log import print_error_log, print_log
+from deps.models import (
+    MatchHighWaterMark,
+    UserFullMatchStats,
+    UserInformation,
+    UserQueueForStats,
+    UserWithUserInformation,
+    UserWithUserMatchInfo,
+)
+from deps.scrape_job_data_access import (
+    SCRAPE_JOB_FAILED,
+    delete_scrape_job,
+    enqueue_scrape_job,
+    fetch_scrape_job_result,
+)
+
+SCRAPE_MATCHES = "matches"
+SCRAPE_PROFILE = "profile"
+SCRAPE_OPERATORS = "operators"
+
+SCRAPER_MODE_INLINE = "inline"  # The bot leases its own browsers
+SCRAPER_MODE_PROCESS = "process"  # scraper_worker.py runs the visits
+
+LATENCY_SAMPLES = 200  # Queue latencies kept per priority for the stats
+
+
+class ScrapePriority(IntEnum):
+    """Lower runs first"""
+
+    INTERACTIVE = 0  # Someone waits on a slash command
+    POST_SESSION = 1  # Stats posted after leaving voice
+    PERIODIC = 2  # Match persistence and rank roles refresh
+    BULK = 3  # Nightly user information and operator stats
+
+
+@dataclass
+class ScrapeRequest:
+    """One caller waiting on a part of a user job"""
+
+    kind: str
+    priority: ScrapePriority
+    enqueued_at: float
+    future: asyncio.Future
+    # Matches: (UserQueueForStats, high water mark), profile: parser of the JSON, operators: tracker id
+    payload: Any = None
+
+
+@dataclass
+class UserScrapeJob:
+    """Every pending request about one account, served in a single visit"""
+
+    user_key: str
+    ubisoft_user_name: str
+    priority: ScrapePriority
+    requests: List[ScrapeRequest] = field(default_factory=list)
+    taken: bool = False
+
+    def of_kind(self, kind: str) -> List[ScrapeRequest]:
+        """Requests of one kind"""
+        return [request for request in self.requests if request.kind == kind]
+
+    def to_work(self) -> "UserScrapeWork":
+        """The pages to download for every request of the job"""
+        matches = self.of_kind(SCRAPE_MATCHES)
+        operators = self.of_kind(SCRAPE_OPERATORS)
+        return UserScrapeWork(
+            self.ubisoft_user_name,
+            matches=(matches[0].payload[0], _widest_high_water_mark(matches)) if matches else None,
+            profile=len(self.of_kind(SCRAPE_PROFILE)) > 0,
+            operators=operators[0].payload if operators else None,
+        )
+
+
+@dataclass
+class UserScrapeWork:
+    """The pages of one visit, what the scraper worker process receives"""
+
+    ubisoft_user_name: str
+    matches: Optional[tuple[UserQueueForStats, Optional[MatchHighWaterMark]]] = None
+    profile: bool = False
+    operators: Optional[str] = None  # R6 Tracker id
+
+
+def run_user_scrape(context: BrowserContextManager, work: UserScrapeWork) -> Dict[str, Any]:
+    """
+    Download the pages of a visit with a leased browser, by kind. A failed page does not prevent
+    the other parts of the visit: its BrowserException is the outcome of its kind.
+    """
+    outcomes: Dict[str, Any] = {}
+    try:
+        if work.matches is not None:
+            outcomes[SCRAPE_MATCHES] = context.download_full_matches(*work.matches)
+    except BrowserException as e:
+        outcomes[SCRAPE_MATCHES] = e
+    try:
+        if work.profile:
+            outcomes[SCRAPE_PROFILE] = context.download_profile(work.ubisoft_user_name)
+    except BrowserException as e:
+        outcomes[SCRAPE_PROFILE] = e
+    try:
+        if work.operators is not None:
+            outcomes[SCRAPE_OPERATORS] = context.download_operator_stats(work.operators)
+    except BrowserException as e:
+        outcomes[SCRAPE_OPERATORS] = e
+    return outcomes
+
+
+def _user_key(ubisoft_user_name: str) -> str:
+    return ubisoft_user_name.strip().lower()
+
+
+def _widest_high_water_mark(requests: List[ScrapeRequest]) -> Optional[MatchHighWaterMark]:
+    """The mark that covers every request: none (the whole first page) if one of them has none, else the oldest"""
+    marks = [request.payload[1] for request in requests]
+    if any(mark is None for mark in marks):
+        return None
+    return min(marks, key=lambda mark: mark.match_timestamp)
+
+
+def _new_matches(matches: List[UserFullMatchStats], high_water_mark: Optional[MatchHighWaterMark]):
+    """Trim a merged download to the matches newer than the mark of one request"""
+    if high_water_mark is None:
+        return matches
+    for index, match in enumerate(matches):
+        if high_water_mark.is_known(match.match_uuid, match.match_timestamp):
+            return matches[:index]
+    return matches
+
+
+def _users_with_account(users_queued: List[UserQueueForStats], caller: str) -> List[tuple[UserQueueForStats, str]]:
+    """The users with their active Ubisoft account name, the users without one are logged and left out"""
+    users_with_account: List[tuple[UserQueueForStats, str]] = []
+    for user in users_queued:
+        ubisoft_user_name = user.user_info.ubisoft_username_active
+        if not ubisoft_user_name:
+            print_log(f"ScrapeScheduler.{caller}: {user.user_info.display_name} has no active Ubisoft account")
+            continue
+        users_with_account.append((user, ubisoft_user_name))
+    return users_with_account
+
+
+class ScrapeScheduler:
+    """Run the per-user scrape jobs in priority order with one worker per pooled browser"""
+
+    def __init__(
+        self,
+        pool: Optional[BrowserPool] = None,
+        worker_count: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+        mode: Optional[str] = None,
+    ) -> None:
+        self._pool = pool if pool is not None else browser_pool
+        self._worker_count = worker_count
+        self._clock = clock
+        # Read on first use: the singleton is created before bot.py loads the .env file
+        self._mode = mode
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._pending: Dict[str, UserScrapeJob] = {}
+        self._workers: List[asyncio.Task] = []
+        self._sequence = itertools.count()
+        self._latencies: Dict[ScrapePriority, deque] = {
+            priority: deque(maxlen=LATENCY_SAMPLES) for priority in ScrapePriority
+        }
+        self._served: Dict[ScrapePriority, int] = {priority: 0 for priority in ScrapePriority}
+
+    @property
+    def mode(self) -> str:
+        """inline or process, from SCRAPER_MODE"""
+        if self._mode is None:
+            self._mode = os.getenv("SCRAPER_MODE", SCRAPER_MODE_INLINE).lower()
+        return self._mode
+
+    @property
+    def poll_interval_seconds(self) -> float:
+        """Delay between two reads of a job queued for the worker process"""
+        return int(os.getenv("SCRAPER_POLL_INTERVAL_MS", "500")) / 1000
+
+    @property
+    def job_timeout_seconds(self) -> float:
+        """Time given to the worker process to finish a job before the requests fail"""
+        return float(os.getenv("SCRAPER_JOB_TIMEOUT", "900"))
+
+    def _ensure_workers(self) -> asyncio.AbstractEventLoop:
+        """Start the workers on the running loop, a new loop (restart, tests) gets a new queue"""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._queue = asyncio.PriorityQueue()
+            self._pending = {}
+            self._workers = []
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        worker_count = self._worker_count or self._pool.config.pool_size
+        while len(self._workers) < worker_count:
+            self._workers.append(loop.create_task(self._work(), name=f"scrape-worker-{len(self._workers)}"))
+        return loop
+
+    def _submit(self, ubisoft_user_name: str, kind: str, priority: ScrapePriority, payload: Any) -> asyncio.Future:
+        """Add a request to the job of the user, the job moves up if the request is more urgent"""
+        loop = self._ensure_workers()
+        assert self._queue is not None
+        request = ScrapeRequest(kind, priority, self._clock(), loop.create_future(), payload)
+        user_key = _user_key(ubisoft_user_name)
+        job = self._pending.get(user_key)
+        if job is None:
+            job = UserScrapeJob(user_key, ubisoft_user_name, priority)
+            self._pending[user_key] = job
+            self._queue.put_nowait((priority, next(self._sequence), job))
+        elif priority < job.priority:
+            # The older queue entry is skipped when it comes out since the job is taken by then
+            job.priority = priority
+            self._queue.put_nowait((priority, next(self._sequence), job))
+        job.requests.append(request)
+        return request.future
+
+    async def _work(self) -> None:
+        assert self._queue is not None
+        queue = self._queue
+        while True:
+            _, _, job = await queue.get()
+            if job.taken:
+                continue
+            job.taken = True
+            if self._pending.get(job.user_key) is job:
+                del self._pending[job.user_key]
+            now = self._clock()
+            for request in job.requests:
+                self._latencies[request.priority].append(now - request.enqueued_at)
+                self._served[request.priority] += 1
+            try:
+                if self.mode == SCRAPER_MODE_PROCESS:
+                    outcomes = await self._run_in_worker_process(job)
+                else:
+                    outcomes = await asyncio.to_thread(self._visit, job)
+            except asyncio.CancelledError:
+                self._resolve(job, {}, BrowserException("ScrapeScheduler: Scheduler stopped"))
+                raise
+            except Exception as e:
+                self._resolve(job, {}, e)
+            else:
+                self._resolve(job, outcomes, None)
+            if queue.empty():
+                self.log_stats()
+
+    def _visit(self, job: UserScrapeJob) -> Dict[str, Any]:
+        """Serve every request of the job with one leased browser, run in a worker thread"""
+        with self._pool.lease() as context:
+            return run_user_scrape(context, job.to_work())
+
+    async def _run_in_worker_process(self, job: UserScrapeJob) -> Dict[str, Any]:
+        """Queue the visit in the scrape_job table and poll until scraper_worker.py wrote its outcome"""
+        job_id = await database_gateway.write(enqueue_scrape_job, job.priority, job.to_work())
+        deadline = self._clock() + self.job_timeout_seconds
+        try:
+            while True:
+                await asyncio.sleep(self.poll_interval_seconds)
+                finished = await database_gateway.read(fetch_scrape_job_result, job_id)
+                if finished is not None:
+                    break
+                if self._clock() > deadline:
+                    raise BrowserTimeoutException(
+                        f"ScrapeScheduler: Scrape job {job_id} for {job.ubisoft_user_name} not done "
+                        f"after {self.job_timeout_seconds}s, is scraper_worker.py running?"
+                    )
+        finally:
+            # Done, timed out or stopped: the row is not needed anymore
+            await database_gateway.write(delete_scrape_job, job_id)
+        status, result = finished
+        if status == SCRAPE_JOB_FAILED:
+            if isinstance(result, BaseException):
+                raise result
+            raise BrowserException(f"ScrapeScheduler: Scrape job {job_id} for {job.ubisoft_user_name} failed")
+        return result
+
+    def _resolve(self, job: UserScrapeJob, outcomes: Dict[str, Any], error: Optional[BaseException]) -> None:
+        for request in job.requests:
+            if request.future.done():
+                continue  # The caller gave up
+            outcome = error if error is not None else outcomes.get(request.kind)
+            if isinstance(outcome, BaseException):
+                request.future.set_exception(outcome)
+                continue
+            try:
+                if request.kind == SCRAPE_MATCHES:
+                    if outcome is None:
+                        raise BrowserException(f"ScrapeScheduler: No matches downloaded for {job.ubisoft_user_name}")
+                    request.future.set_result(_new_matches(outcome, request.payload[1]))
+                elif request.kind == SCRAPE_PROFILE:
+                    request.future.set_result(request.payload(outcome))
+                else:
+                    request.future.set_result(outcome)
+            except Exception as e:
+                request.future.set_exception(e)
+
+    async def fetch_profile(
+        self, ubisoft_user_name: str, parser: Callable[[dict], Any], priority: ScrapePriority
+    ) -> Any:
+        """
+        Download the profile of one account and parse it
+
+        Raises:
+            BrowserException: If the profile could not be downloaded
+        """
+        return await self._submit(ubisoft_user_name, SCRAPE_PROFILE, priority, parser)
+
+    async def fetch_profiles(
+        self, ubisoft_user_names: List[str], parser: Callable[[dict], Any], priority: ScrapePriority
+    ) -> Dict[str, Any]:
+        """Download and parse the profile of many accounts, the failed ones are left out"""
+        futures = [self._submit(name, SCRAPE_PROFILE, priority, parser) for name in ubisoft_user_names]
+        results: Dict[str, Any] = {}
+        for ubisoft_user_name, result in zip(
+            ubisoft_user_names, await asyncio.gather(*futures, return_exceptions=True)
+        ):
+            if isinstance(result, BaseException):
+                print_error_log(
+                    f"ScrapeScheduler.fetch_profiles: Error getting the profile of {ubisoft_user_name}: {result}"
+                )
+                continue
+            results[ubisoft_user_name] = result
+        return results
+
+    async def fetch_matches(
+        self,
+        users_queued: List[UserQueueForStats],
+        priority: ScrapePriority,
+        high_water_marks: Optional[Dict[int, MatchHighWaterMark]] = None,
+    ) -> List[UserWithUserMatchInfo]:
+        """
+        Download the matches of many users, the failed ones are left out
+        With the high water marks (by user id), only the matches newer than the stored ones are returned.
+        """
+        high_water_marks = high_water_marks or {}
+        users_with_account = _users_with_account(users_queued, "fetch_matches")
+        futures = [
+            self._submit(
+                ubisoft_user_name,
+                SCRAPE_MATCHES,
+                priority,
+                (user, high_water_marks.get(user.user_info.id)),
+            )
+            for user, ubisoft_user_name in users_with_account
+        ]
+        all_users_matches: List[UserWithUserMatchInfo] = []
+        for (user, _), result in zip(users_with_account, await asyncio.gather(*futures, return_exceptions=True)):
+            if isinstance(result, BaseException):
+                print_error_log(
+                    f"ScrapeScheduler.fetch_matches: Error getting the user ({user.user_info.display_name}) matches: {result}"
+                )
+                continue
+            all_users_matches.append(UserWithUserMatchInfo(user, result))
+        return all_users_matches
+
+    async def fetch_user_information(
+        self, users_queued: List[UserQueueForStats], priority: ScrapePriority
+    ) -> List[UserWithUserInformation]:
+        """Download the full information of many users, the failed ones are left out"""
+        users_with_account = _users_with_account(users_queued, "fetch_user_information")
+        futures = [
+            self._submit(
+                ubisoft_user_name,
+                SCRAPE_PROFILE,
+                priority,
+                lambda data, user_id=user.user_info.id: parse_json_user_info(user_id, data),
+            )
+            for user, ubisoft_user_name in users_with_account
+        ]
+        all_user_stats: List[UserWithUserInformation] = []
+        for (user, _), result in zip(users_with_account, await asyncio.gather(*futures, return_exceptions=True)):
+            if isinstance(result, BaseException) or not isinstance(result, UserInformation):
+                print_error_log(
+                    f"ScrapeScheduler.fetch_user_information: No user info for {user.user_info.display_name}: {result}"
+                )
+                continue
+            all_user_stats.append(UserWithUserInformation(user, result))
+        return all_user_stats
+
+    async def fetch_operator_stats(
+        self, users: List[UserInfo], priority: ScrapePriority
+    ) -> List[tuple[UserInfo, dict[str, Any]]]:
+        """Download the operator stats of many users, the failed ones and the ones without stats are left out"""
+        users_with_tracker: List[tuple[UserInfo, str]] = []
+        for user in users:
+            if not user.r6_tracker_active_id:
+                print_log(f"ScrapeScheduler.fetch_operator_stats: {user.display_name} has no R6 Tracker id")
+                continue
+            users_with_tracker.append((user, user.r6_tracker_active_id))
+        futures = [
+            self._submit(
+                user.ubisoft_username_active or r6_tracker_id,
+                SCRAPE_OPERATORS,
+                priority,
+                r6_tracker_id,
+            )
+            for user, r6_tracker_id in users_with_tracker
+        ]
+        all_operator_stats: List[tuple[UserInfo, dict[str, Any]]] = []
+        for (user, _), result in zip(users_with_tracker, await asyncio.gather(*futures, return_exceptions=True)):
+            if isinstance(result, BaseException):
+                print_error_log(
+                    f"ScrapeScheduler.fetch_operator_stats: Error downloading stats for {user.display_name}: {result}"
+                )
+                continue
+            if result:
+                all_operator_stats.append((user, result))
+        return all_operator_stats
+
+    async def stop(self) -> None:
+        """Cancel the workers, the requests still queued fail with a BrowserException"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for job in self._pending.values():
+            self._resolve(job, {}, BrowserException("ScrapeScheduler: Scheduler stopped"))
+        self._pending = {}
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """Queue latency per priority"""
+        waiting: Dict[ScrapePriority, int] = {priority: 0 for priority in ScrapePriority}
+        for job in self._pending.values():
+            for request in job.requests:
+                waiting[request.priority] += 1
+        stats: Dict[str, Dict[str, float]] = {}
+        for priority in ScrapePriority:
+            latencies = self._latencies[priority]
+            stats[priority.name.lower()] = {
+                "served": self._served[priority],
+                "waiting": waiting[priority],
+                "avg_wait_seconds": round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+                "max_wait_seconds": round(max(latencies), 1) if latencies else 0.0,
+            }
+        return stats
+
+    def log_stats(self) -> None:
+        """Log the queue latency of the priorities used so far"""
+        for priority, stats in self.get_stats().items():
+            if stats["served"] > 0:
+                print_log(
+                    f"ScrapeScheduler: {priority} served {stats['served']}, waiting {stats['waiting']}, "
+                    f"queue latency avg {stats['avg_wait_seconds']}s max {stats['max_wait_seconds']}s"
+                )
+
+
+scrape_scheduler = ScrapeScheduler()
@@ -0,0 +1,208 @@
+"""
+Adaptive rate limiter for the R6 Tracker scraping
+
+Each endpoint class (matches, profile, operators) has a token bucket. The interval between two
+requests shrinks a little after every healthy response and doubles when the remote side throttles
+(HTTP 403/429 body or a Cloudflare challenge page), so the scraper runs as fast as the site allows
+without getting blocked. The learned intervals are saved in the persistent cache between runs.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from deps.cache_data_access import get_value, set_value
+from deps.log import print_log, print_warning_log
+
+ENDPOINT_MATCHES = "matches"
+ENDPOINT_PROFILE = "profile"
+ENDPOINT_OPERATORS = "operators"
+
+KEY_SCRAPER_RATE_LIMITER = "ScraperRateLimiter"
+
+# Lower-cased fragments of the pages served instead of the JSON when the site throttles
+THROTTLED_PAGE_MARKERS = (
+    "just a moment...",
+    "cf-chl-",
+    "challenge-platform",
+    "attention required! | cloudflare",
+    "429 too many requests",
+    "403 forbidden",
+    '"ratelimited"',
+    "rate limit exceeded",
+    "error code: 1020",  # Cloudflare access denied
+)
+
+
+def is_throttled_page(page_source: str) -> bool:
+    """True when the page is a throttling answer instead of the API JSON"""
+    lowered = page_source.lower()
+    return any(marker in lowered for marker in THROTTLED_PAGE_MARKERS)
+
+
+@dataclass
+class EndpointLimits:
+    """Interval bounds of an endpoint class, the interval starts at initial_interval_seconds"""
+
+    initial_interval_seconds: float
+    min_interval_seconds: float
+    max_interval_seconds: float
+    speed_up_factor: float = 0.95  # Applied to the interval after a healthy response
+    back_off_factor: float = 2.0  # Applied to the interval after a throttled response
+    jitter_factor: float = 0.2  # Requests are spaced by interval +/- jitter, not a fixed beat
+
+
+DEFAULT_ENDPOINT_LIMITS = {
+    # Start where the fixed random.uniform sleeps were on average
+    ENDPOINT_MATCHES: EndpointLimits(7.5, 2.0, 60.0),
+    ENDPOINT_PROFILE: EndpointLimits(7.5, 2.0, 60.0),
+    ENDPOINT_OPERATORS: EndpointLimits(10.0, 4.0, 90.0),
+}
+
+
+class AdaptiveTokenBucket:
+    """Token bucket of one endpoint class, its refill interval adapts to the answers of the site"""
+
+    def __init__(
+        self,
+        limits: EndpointLimits,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.limits = limits
+        self.interval_seconds = limits.initial_interval_seconds
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        # Start full: the first request of a run does not wait
+        self._tokens = 1.0
+        self._last_refill = clock()
+        self._recent_requests: deque[float] = deque()
+        self.total_requests = 0
+        self.throttled_count = 0
+        self.total_wait_seconds = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(1.0, self._tokens + (now - self._last_refill) / self.interval_seconds)
+        self._last_refill = now
+
+    def acquire(self) -> float:
+        """Block until the next request may go, return the seconds waited"""
+        with self._lock:  # Held while sleeping: concurrent callers queue one interval apart
+            now = self._clock()
+            self._refill(now)
+            waited = 0.0
+            if self._tokens < 1.0:
+                jitter = 1 + self.limits.jitter_factor * (2 * random.random() - 1)
+                waited = (1.0 - self._tokens) * self.interval_seconds * jitter
+                self._sleep(waited)
+                now = self._clock()
+                self._refill(now)
+            self._tokens = max(0.0, self._tokens - 1.0)
+            self.total_requests += 1
+            self.total_wait_seconds += waited
+            self._recent_requests.append(now)
+            return waited
+
+    def record_response(self, throttled: bool) -> None:
+        """Adapt the interval to the answer of the last request"""
+        with self._lock:
+            if throttled:
+                self.throttled_count += 1
+                self.interval_seconds = min(
+                    self.limits.max_interval_seconds, self.interval_seconds * self.limits.back_off_factor
+                )
+                self._tokens = 0.0  # Cool down a full interval before the next try
+                self._last_refill = self._clock()
+            else:
+                self.interval_seconds = max(
+                    self.limits.min_interval_seconds, self.interval_seconds * self.limits.speed_up_factor
+                )
+
+    def requests_per_minute(self) -> int:
+        """Requests sent during the last 60 seconds"""
+        with self._lock:
+            threshold = self._clock() - 60
+            while self._recent_requests and self._recent_requests[0] < threshold:
+                self._recent_requests.popleft()
+            return len(self._recent_requests)
+
+    def restore_interval(self, interval_seconds: float) -> None:
+        """Resume from an interval learned by a previous run"""
+        with self._lock:
+            self.interval_seconds = min(
+                self.limits.max_interval_seconds, max(self.limits.min_interval_seconds, float(interval_seconds))
+            )
+
+
+class ScraperRateLimiter:
+    """Token buckets of every endpoint class, shared by all the browsers"""
+
+    def __init__(self, endpoint_limits: Optional[dict[str, EndpointLimits]] = None, **bucket_kwargs) -> None:
+        self.buckets = {
+            endpoint: AdaptiveTokenBucket(limits, **bucket_kwargs)
+            for endpoint, limits in (endpoint_limits or DEFAULT_ENDPOINT_LIMITS).items()
+        }
+
+    def acquire(self, endpoint: str) -> float:
+        """Wait for the turn of a request to the endpoint class"""
+        return self.buckets[endpoint].acquire()
+
+    def record_response(self, endpoint: str, throttled: bool) -> None:
+        """Speed up after a healthy response, back off after a throttled one"""
+        bucket = self.buckets[endpoint]
+        bucket.record_response(throttled)
+        if throttled:
+            print_warning_log(
+                f"ScraperRateLimiter: {endpoint} throttled, next requests every {bucket.interval_seconds:.1f}s"
+            )
+
+    def get_stats(self) -> dict[str, dict[str, float]]:
+        """Throughput and waiting time per endpoint class, to tune the limits"""
+        return {
+            endpoint: {
+                "interval_seconds": round(bucket.interval_seconds, 2),
+                "requests_per_minute": bucket.requests_per_minute(),
+                "total_requests": bucket.total_requests,
+                "throttled_count": bucket.throttled_count,
+                "total_wait_seconds": round(bucket.total_wait_seconds, 1),
+            }
+            for endpoint, bucket in self.buckets.items()
+        }
+
+    def log_stats(self, caller: str) -> None:
+        """Log the stats of the endpoint classes used so far"""
+        for endpoint, stats in self.get_stats().items():
+            if stats["total_requests"] > 0:
+                print_log(
+                    f"{caller}: {endpoint} {stats['requests_per_minute']} req/min, interval "
+                    f"{stats['interval_seconds']}s, waited {stats['total_wait_seconds']}s over "
+                    f"{stats['total_requests']} requests, {stats['throttled_count']} throttled"
+                )
+
+    def has_requests(self) -> bool:
+        """True once this process sent a request, its intervals are then worth saving"""
+        return any(bucket.total_requests > 0 for bucket in self.buckets.values())
+
+    def save(self) -> None:
+        """Persist the learned intervals, run on the database writer"""
+        set_value(
+            KEY_SCRAPER_RATE_LIMITER,
+            {endpoint: bucket.interval_seconds for endpoint, bucket in self.buckets.items()},
+            None,
+        )
+
+    def load(self) -> None:
+        """Resume the intervals learned by the previous run"""
+        intervals = get_value(KEY_SCRAPER_RATE_LIMITER)
+        if not isinstance(intervals, dict):
+            return
+        for endpoint, interval_seconds in intervals.items():
+            if endpoint in self.buckets:
+                self.buckets[endpoint].restore_interval(interval_seconds)
+
+
+scraper_rate_limiter = ScraperRateLimiter()
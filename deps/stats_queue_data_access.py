@@ -0,0 +1,171 @@
+"""
+Stats Queue Data Access
+
+The stats_queue table holds the users who left a voice channel and wait for their session stats card.
+A request is due a few minutes after it is queued so R6 Tracker has the last match; post_queued_user_stats
+leases the due requests, deletes the ones it posted and releases the others for a later attempt.
+
+Functions:
+- enqueue_stats_request: Queue a user of a guild, ignored when already queued
+- claim_due_stats_requests: Lease the due requests
+- delete_stats_request: Remove a request once its stats are posted (or cannot be)
+- release_stats_requests: Count a failed attempt and delay the requests, drop the ones out of attempts
+- evict_stale_stats_requests: Remove the requests queued too long ago
+- fetch_next_stats_request_due_at: When the next request can be claimed
+- fetch_stats_requests: Every queued request
+"""
+
+from datetime import datetime
+from typing import List, Optional
+
+from deps.analytic_constants import USER_INFO_SELECT_FIELD
+from deps.data_access_data_class import UserInfo
+from deps.functions_date import convert_to_datetime
+from deps.models import UserQueueForStats
+from deps.system_database import database_manager
+
+_SELECT_STATS_REQUEST = f"""
+    SELECT {USER_INFO_SELECT_FIELD}, stats_queue.guild_id, stats_queue.enqueued_at, stats_queue.attempts
+    FROM stats_queue
+    JOIN user_info ON user_info.id = stats_queue.user_id
+"""
+
+# Requests leased by a run that never finished come back once the lease is over
+_NOT_LEASED = "(stats_queue.leased_until IS NULL OR stats_queue.leased_until <= :now)"
+
+
+def _to_stats_request(row) -> UserQueueForStats:
+    enqueued_at = convert_to_datetime(row[8])
+    assert enqueued_at is not None  # NOT NULL column
+    return UserQueueForStats(UserInfo(*row[:7]), row[7], enqueued_at, row[9])
+
+
+def enqueue_stats_request(user_id: int, guild_id: int, enqueued_at: datetime, due_at: datetime) -> bool:
+    """Queue the stats of a user for a guild, False when the user is already queued for it"""
+    cursor = database_manager.get_cursor()
+    cursor.execute(
+        """
+        INSERT INTO stats_queue (user_id, guild_id, enqueued_at, due_at)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(user_id, guild_id) DO NOTHING
+        """,
+        (user_id, guild_id, enqueued_at.isoformat(), due_at.isoformat()),
+    )
+    database_manager.get_conn().commit()
+    return cursor.rowcount > 0
+
+
+def claim_due_stats_requests(
+    now: datetime, lease_until: datetime, limit: int, due_only: bool = True
+) -> List[UserQueueForStats]:
+    """Lease the requests due at now (every request with due_only False), the oldest due first"""
+    conn = database_manager.get_conn()
+    cursor = database_manager.get_cursor()
+    params = {"now": now.isoformat(), "due_only": due_only, "limit": limit}
+    # IMMEDIATE takes the write lock before the SELECT so two runs cannot lease the same request
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        rows = cursor.execute(
+            f"""
+            {_SELECT_STATS_REQUEST}
+            WHERE (stats_queue.due_at <= :now OR NOT :due_only) AND {_NOT_LEASED}
+            ORDER BY stats_queue.due_at
+            LIMIT :limit
+            """,
+            params,
+        ).fetchall()
+        cursor.executemany(
+            "UPDATE stats_queue SET leased_until = ? WHERE user_id = ? AND guild_id = ?",
+            [(lease_until.isoformat(), row[0], row[7]) for row in rows],
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return [_to_stats_request(row) for row in rows]
+
+
+def delete_stats_request(user_id: int, guild_id: int) -> None:
+    """Remove a request once its stats are posted or cannot be"""
+    database_manager.get_cursor().execute(
+        "DELETE FROM stats_queue WHERE user_id = ? AND guild_id = ?", (user_id, guild_id)
+    )
+    database_manager.get_conn().commit()
+
+
+def release_stats_requests(
+    requests: List[UserQueueForStats], max_attempts: int, due_at: datetime
+) -> List[UserQueueForStats]:
+    """
+    Count a failed attempt for the requests still queued and make them due again at due_at.
+    The requests reaching max_attempts are removed and returned.
+    """
+    keys = [(request.user_info.id, request.guild_id) for request in requests]
+    with database_manager.data_access_transaction() as cursor:
+        cursor.executemany(
+            """
+            UPDATE stats_queue
+            SET attempts = attempts + 1, leased_until = NULL, due_at = ?
+            WHERE user_id = ? AND guild_id = ?
+            """,
+            [(due_at.isoformat(), user_id, guild_id) for user_id, guild_id in keys],
+        )
+        exhausted: dict[tuple[int, int], int] = {}
+        for user_id, guild_id in keys:
+            row = cursor.execute(
+                "SELECT attempts FROM stats_queue WHERE user_id = ? AND guild_id = ? AND attempts >= ?",
+                (user_id, guild_id, max_attempts),
+            ).fetchone()
+            if row is not None:
+                exhausted[(user_id, guild_id)] = row[0]
+        cursor.executemany("DELETE FROM stats_queue WHERE user_id = ? AND guild_id = ?", list(exhausted))
+    dropped = []
+    for request in requests:
+        key = (request.user_info.id, request.guild_id)
+        if key in exhausted:
+            request.attempts = exhausted[key]
+            dropped.append(request)
+    return dropped
+
+
+def evict_stale_stats_requests(enqueued_before: datetime, now: datetime) -> List[UserQueueForStats]:
+    """Remove and return the requests queued before the date, or whose user is unknown, unless leased"""
+    params = {"enqueued_before": enqueued_before.isoformat(), "now": now.isoformat()}
+    with database_manager.data_access_transaction() as cursor:
+        rows = cursor.execute(
+            f"{_SELECT_STATS_REQUEST} WHERE stats_queue.enqueued_at <= :enqueued_before AND {_NOT_LEASED}",
+            params,
+        ).fetchall()
+        cursor.execute(
+            f"""
+            DELETE FROM stats_queue
+            WHERE (
+                stats_queue.enqueued_at <= :enqueued_before
+                OR NOT EXISTS (SELECT 1 FROM user_info WHERE user_info.id = stats_queue.user_id)
+            )
+            AND {_NOT_LEASED}
+            """,
+            params,
+        )
+    return [_to_stats_request(row) for row in rows]
+
+
+def fetch_next_stats_request_due_at() -> Optional[datetime]:
+    """When the next request can be claimed (due and not leased), None when the queue is empty"""
+    row = (
+        database_manager.get_cursor()
+        .execute(
+            """
+            SELECT MIN(CASE WHEN leased_until > due_at THEN leased_until ELSE due_at END)
+            FROM stats_queue
+            """
+        )
+        .fetchone()
+    )
+    return convert_to_datetime(row[0]) if row is not None else None
+
+
+def fetch_stats_requests() -> List[UserQueueForStats]:
+    """Every queued request, the oldest due first"""
+    rows = database_manager.get_cursor().execute(f"{_SELECT_STATS_REQUEST} ORDER BY stats_queue.due_at").fetchall()
+    return [_to_stats_request(row) for row in rows]
@@ -1,13 +1,13 @@
 """
 Streak Data Access
 
-Functions to query user play days from the user_activity table.
-A "play day" is any UTC calendar date where a user had at least one voice
-'connect' event in a guild.
+Functions to query user play days from the voice_session table.
+A "play day" is any UTC calendar date where a user started at least one voice
+session in a guild.
 A "streak" is the number of consecutive play days ending on today or yesterday.
 """
 
-from datetime import date, timedelta
+from datetime import date, datetime, time, timedelta, timezone
 
 from deps.system_database import database_manager
 
@@ -24,9 +24,9 @@ def fetch_distinct_play_dates(user_id: int, guild_id: int) -> list[date]:
         database_manager.get_cursor()
         .execute(
             """
-            SELECT DISTINCT DATE(timestamp) AS play_date
-            FROM user_activity
-            WHERE user_id = ? AND guild_id = ? AND event = 'connect'
+            SELECT DISTINCT DATE(start_ts) AS play_date
+            FROM voice_session
+            WHERE user_id = ? AND guild_id = ?
             ORDER BY play_date DESC
             """,
             (user_id, guild_id),
@@ -76,10 +76,14 @@ def fetch_user_ids_active_on_date(guild_id: int, target_date: date) -> list[int]
         .execute(
             """
             SELECT DISTINCT user_id
-            FROM user_activity
-            WHERE guild_id = ? AND event = 'connect' AND DATE(timestamp) = ?
+            FROM voice_session
+            WHERE guild_id = ? AND start_ts >= ? AND start_ts < ?
             """,
-            (guild_id, target_date.isoformat()),
+            (
+                guild_id,
+                datetime.combine(target_date, time.min, tzinfo=timezone.utc).isoformat(),
+                datetime.combine(target_date + timedelta(days=1), time.min, tzinfo=timezone.utc).isoformat(),
+            ),
         )
         .fetchall()
     )
@@ -3,15 +3,21 @@ Common code for the gatherer and analyse
 """
 
 import datetime
+import multiprocessing
 import sqlite3
-from typing import Callable
+import threading
+from typing import Callable, Optional
 
+from deps.cache_codec import decode_value, encode_value
 from deps.log import print_error_log, print_log
 
 EVENT_CONNECT = "connect"
 EVENT_DISCONNECT = "disconnect"
 DATABASE_NAME = "user_activity.db"
 DATABASE_NAME_TEST = "user_activity_test.db"  # Can use DATABASE_NAME_TEST = ":memory:" to use an in-memory database
+# Several writers share the file (gateway writer, write-behind flush, scraper workers): wait for the lock instead of
+# failing with "database is locked"
+DATABASE_BUSY_TIMEOUT_SECONDS = 30
 
 
 # Adapter for datetime objects
@@ -26,6 +32,14 @@ def convert_datetime(s):
     return datetime.datetime.fromisoformat(s)
 
 
+def parse_activity_timestamp(raw: str) -> datetime.datetime:
+    """Parse the user_activity timestamps which were stored with and without timezone over time."""
+    parsed = datetime.datetime.fromisoformat(str(raw).replace(" ", "T"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed.astimezone(datetime.timezone.utc)
+
+
 class DatabaseManager:
     """Handle the database connection to the right file"""
 
@@ -35,6 +49,9 @@ class DatabaseManager:
         sqlite3.register_adapter(datetime.datetime, adapt_datetime)
         sqlite3.register_converter("datetime", convert_datetime)
         self._reset_hooks: list[Callable[[], None]] = []
+        # Worker threads (see deps.database_gateway) can bind their own connection; the data access
+        # functions keep calling get_conn()/get_cursor() and transparently use it on those threads.
+        self._thread_local = threading.local()
         self.set_database_name(name)
 
     def register_reset_hook(self, hook: Callable[[], None]) -> None:
@@ -61,10 +78,13 @@ class DatabaseManager:
             except sqlite3.Error:
                 pass
         self.name = name
-        self.conn = sqlite3.connect(name, check_same_thread=False)
+        self.conn = sqlite3.connect(name, timeout=DATABASE_BUSY_TIMEOUT_SECONDS, check_same_thread=False)
         self.conn.execute("PRAGMA journal_mode=WAL;")  # Performance gain on write
+        self.conn.execute(f"PRAGMA busy_timeout={DATABASE_BUSY_TIMEOUT_SECONDS * 1000};")
         self.cursor = self.conn.cursor()
-        self.init_database()
+        # Worker processes (render workers) use the schema of the process that started them, which already migrated
+        if multiprocessing.parent_process() is None:
+            self.init_database()
         self._run_reset_hooks()
 
     def get_database_name(self):
@@ -76,6 +96,7 @@ class DatabaseManager:
         self.get_cursor().execute("DROP TABLE IF EXISTS user_following")
         self.get_cursor().execute("DROP TABLE IF EXISTS cache")
         self.get_cursor().execute("DROP TABLE IF EXISTS user_activity")
+        self.get_cursor().execute("DROP TABLE IF EXISTS voice_session")
         self.get_cursor().execute("DROP TABLE IF EXISTS user_info")
         self.get_cursor().execute("DROP TABLE IF EXISTS user_weights")
         self.get_cursor().execute("DROP TABLE IF EXISTS tournament_team_members")
@@ -83,6 +104,11 @@ class DatabaseManager:
         self.get_cursor().execute("DROP TABLE IF EXISTS user_tournament")
         self.get_cursor().execute("DROP TABLE IF EXISTS tournament_game")
         self.get_cursor().execute("DROP TABLE IF EXISTS user_full_match_info")
+        self.get_cursor().execute("DROP TABLE IF EXISTS user_match_daily_rollup")
+        self.get_cursor().execute("DROP TABLE IF EXISTS match_party")
+        self.get_cursor().execute("DROP TABLE IF EXISTS match_party_member")
+        self.get_cursor().execute("DROP TABLE IF EXISTS match_party_pair")
+        self.get_cursor().execute("DROP TABLE IF EXISTS match_party_trio")
         self.get_cursor().execute("DROP TABLE IF EXISTS user_full_stats_info")
         self.get_cursor().execute("DROP TABLE IF EXISTS bet_user_tournament")
         self.get_cursor().execute("DROP TABLE IF EXISTS bet_game")
@@ -92,9 +118,12 @@ class DatabaseManager:
         self.get_cursor().execute("DROP TABLE IF EXISTS operator_stats")
         self.get_cursor().execute("DROP TABLE IF EXISTS tribemarkets_pending_match")
         self.get_cursor().execute("DROP TABLE IF EXISTS user_player_value")
+        self.get_cursor().execute("DROP TABLE IF EXISTS user_player_value_state")
         self.get_cursor().execute("DROP TABLE IF EXISTS archived_message_job_spool")
         self.get_cursor().execute("DROP TABLE IF EXISTS archived_message_event")
         self.get_cursor().execute("DROP TABLE IF EXISTS archived_message")
+        self.get_cursor().execute("DROP TABLE IF EXISTS scrape_job")
+        self.get_cursor().execute("DROP TABLE IF EXISTS stats_queue")
         self.get_conn().commit()
         self._run_reset_hooks()
 
@@ -512,6 +541,393 @@ class DatabaseManager:
         # Add bet odds generation option on tournament
         self._migrate_add_tournament_bet_odds_generation_column()
 
+        # Add materialized voice sessions built from user_activity
+        self._migrate_add_voice_session_table()
+
+        # Add per-user daily match rollup fed by the match inserts
+        self._migrate_add_user_match_daily_rollup_table()
+
+        # Re-encode the legacy base64 dill cache values with the binary codec
+        self._migrate_cache_values_to_binary_codec()
+
+        # Add the queue of the scrape jobs consumed by the scraper worker process
+        self._migrate_add_scrape_job_table()
+
+        # Add the parties of our users in each match with their duo and trio aggregates
+        self._migrate_add_match_party_tables()
+
+        # Add the per-user accumulators of the incremental player value computation
+        self._migrate_add_user_player_value_state_table()
+
+        # Add the durable queue of the post-session stats cards
+        self._migrate_add_stats_queue_table()
+
+    def _migrate_add_voice_session_table(self):
+        """
+        Create voice_session table: one row per connect, closed by the matching disconnect.
+        end_ts and duration_s stay NULL while the session is open (or if it never got a disconnect).
+        Filled from the user_activity history the first time, then kept up to date by insert_user_activity.
+        """
+        table_exists = self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'voice_session'"
+        ).fetchone()
+        if table_exists:
+            return
+        print_log("Running migration: Create voice_session table")
+        self.cursor.execute(
+            """
+            CREATE TABLE voice_session (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                guild_id INTEGER NOT NULL,
+                channel_id INTEGER NOT NULL,
+                start_ts DATETIME NOT NULL,
+                end_ts DATETIME NULL,
+                duration_s REAL NULL,
+                FOREIGN KEY(user_id) REFERENCES user_info(id)
+            )
+            """
+        )
+        self.cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_voice_session_user_channel
+            ON voice_session(user_id, guild_id, channel_id, start_ts DESC)
+            """
+        )
+        self.cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_voice_session_guild_start
+            ON voice_session(guild_id, start_ts)
+            """
+        )
+        self.cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_voice_session_start
+            ON voice_session(start_ts)
+            """
+        )
+        session_count = self.rebuild_voice_sessions(self.cursor)
+        self.conn.commit()
+        print_log(f"Migration complete: voice_session table created with {session_count} sessions")
+
+    def rebuild_voice_sessions(self, cursor: sqlite3.Cursor) -> int:
+        """
+        Replace the voice_session rows by the sessions paired from the whole user_activity history.
+        Runs with the cursor of the caller's transaction. Returns the number of sessions written (open and closed).
+        The pairing rules are the ones of deps.voice_session_data_access.apply_voice_session_event.
+        """
+        rows = cursor.execute(
+            """
+            SELECT user_id, guild_id, channel_id, event, timestamp
+            FROM user_activity
+            ORDER BY user_id, guild_id, channel_id, julianday(timestamp), id
+            """
+        ).fetchall()
+        # Each session is [user_id, guild_id, channel_id, start_ts, end_ts, duration_s]
+        sessions: list[list] = []
+        latest_by_key: dict[tuple[int, int, int], list] = {}
+        for user_id, guild_id, channel_id, event, timestamp_raw in rows:
+            key = (user_id, guild_id, channel_id)
+            timestamp = parse_activity_timestamp(timestamp_raw)
+            if event == EVENT_CONNECT:
+                session = [user_id, guild_id, channel_id, timestamp, None, None]
+                sessions.append(session)
+                latest_by_key[key] = session
+            elif event == EVENT_DISCONNECT:
+                latest = latest_by_key.get(key)
+                if latest is None or latest[4] is not None or timestamp < latest[3]:
+                    continue
+                latest[4] = timestamp
+                latest[5] = (timestamp - latest[3]).total_seconds()
+
+        cursor.execute("DELETE FROM voice_session")
+        cursor.executemany(
+            """
+            INSERT INTO voice_session (user_id, guild_id, channel_id, start_ts, end_ts, duration_s)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    session[0],
+                    session[1],
+                    session[2],
+                    session[3].isoformat(),
+                    session[4].isoformat() if session[4] is not None else None,
+                    session[5],
+                )
+                for session in sessions
+            ],
+        )
+        return len(sessions)
+
+    def _migrate_add_scrape_job_table(self):
+        """
+        Create scrape_job table: the R6 Tracker scrapes queued by the bot for scraper_worker.py.
+        payload and result are tagged BLOBs of deps.cache_codec; the bot deletes the row once it read the result.
+        """
+        print_log("Running migration: Create scrape_job table")
+        self.cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS scrape_job (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                priority INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued' CHECK(status IN ('queued', 'running', 'done', 'failed')),
+                payload BLOB NOT NULL,
+                result BLOB NULL,
+                worker_id TEXT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                started_at DATETIME NULL,
+                finished_at DATETIME NULL
+            )
+            """
+        )
+        self.cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_scrape_job_status_priority
+            ON scrape_job(status, priority, id)
+            """
+        )
+        self.conn.commit()
+        print_log("Migration complete: scrape_job table created")
+
+    def _migrate_add_stats_queue_table(self):
+        """
+        Create stats_queue table: the users who left voice and wait for their session stats card, one row
+        per user and guild. leased_until is set while post_queued_user_stats processes the row.
+        """
+        print_log("Running migration: Create stats_queue table")
+        self.cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS stats_queue (
+                user_id INTEGER NOT NULL,
+                guild_id INTEGER NOT NULL,
+                enqueued_at DATETIME NOT NULL,
+                due_at DATETIME NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                leased_until DATETIME NULL,
+                PRIMARY KEY (user_id, guild_id)
+            )
+            """
+        )
+        self.cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_stats_queue_due
+            ON stats_queue(due_at)
+            """
+        )
+        self.conn.commit()
+        print_log("Migration complete: stats_queue table created")
+
+    def _migrate_add_match_party_tables(self):
+        """
+        Create the match_party tables: the users of the community who played the same match in the same
+        team (same match_uuid and result), with a row per member and the duo and trio counts per UTC day.
+        Filled from the existing matches the first time, then kept up to date by
+        insert_if_nonexistant_full_match_info.
+        """
+        table_exists = self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'match_party'"
+        ).fetchone()
+        if table_exists:
+            return
+        print_log("Running migration: Create match_party tables")
+        self.cursor.execute(
+            """
+            CREATE TABLE match_party (
+                match_uuid TEXT NOT NULL,
+                has_win BOOLEAN NOT NULL,
+                match_timestamp DATETIME NOT NULL,
+                member_count INTEGER NOT NULL,
+                members TEXT NOT NULL,
+                PRIMARY KEY (match_uuid, has_win)
+            )
+            """
+        )
+        self.cursor.execute(
+            """
+            CREATE TABLE match_party_member (
+                user_id INTEGER NOT NULL,
+                match_uuid TEXT NOT NULL,
+                has_win BOOLEAN NOT NULL,
+                PRIMARY KEY (user_id, match_uuid, has_win),
+                FOREIGN KEY(user_id) REFERENCES user_info(id)
+            )
+            """
+        )
+        self.cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_match_party_member_match ON match_party_member(match_uuid, has_win)"
+        )
+        self.cursor.execute(
+            """
+            CREATE TABLE match_party_pair (
+                user_a INTEGER NOT NULL,
+                user_b INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                match_count INTEGER NOT NULL DEFAULT 0,
+                win_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_a, user_b, day)
+            )
+            """
+        )
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_match_party_pair_day ON match_party_pair(day)")
+        self.cursor.execute(
+            """
+            CREATE TABLE match_party_trio (
+                user_a INTEGER NOT NULL,
+                user_b INTEGER NOT NULL,
+                user_c INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                match_count INTEGER NOT NULL DEFAULT 0,
+                win_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_a, user_b, user_c, day)
+            )
+            """
+        )
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_match_party_trio_day ON match_party_trio(day)")
+        self.cursor.execute(
+            """
+            INSERT INTO match_party_member (user_id, match_uuid, has_win)
+            SELECT user_id, match_uuid, has_win
+            FROM user_full_match_info
+            WHERE (match_uuid, has_win) IN (
+                SELECT match_uuid, has_win
+                FROM user_full_match_info
+                GROUP BY match_uuid, has_win
+                HAVING COUNT(*) >= 2
+            )
+            """
+        )
+        self.cursor.execute(
+            """
+            INSERT INTO match_party (match_uuid, has_win, match_timestamp, member_count, members)
+            SELECT match_uuid, has_win, MIN(match_timestamp), COUNT(*), GROUP_CONCAT(user_id)
+            FROM (
+                SELECT user_full_match_info.match_uuid, user_full_match_info.has_win,
+                    user_full_match_info.match_timestamp, user_full_match_info.user_id
+                FROM user_full_match_info
+                JOIN match_party_member ON match_party_member.user_id = user_full_match_info.user_id
+                    AND match_party_member.match_uuid = user_full_match_info.match_uuid
+                    AND match_party_member.has_win = user_full_match_info.has_win
+                ORDER BY user_full_match_info.match_uuid, user_full_match_info.user_id
+            )
+            GROUP BY match_uuid, has_win
+            """
+        )
+        self.cursor.execute(
+            """
+            INSERT INTO match_party_pair (user_a, user_b, day, match_count, win_count)
+            SELECT m1.user_id, m2.user_id, DATE(match_party.match_timestamp), COUNT(*), SUM(match_party.has_win)
+            FROM match_party
+            JOIN match_party_member m1 ON m1.match_uuid = match_party.match_uuid AND m1.has_win = match_party.has_win
+            JOIN match_party_member m2 ON m2.match_uuid = match_party.match_uuid AND m2.has_win = match_party.has_win
+                AND m1.user_id < m2.user_id
+            GROUP BY m1.user_id, m2.user_id, DATE(match_party.match_timestamp)
+            """
+        )
+        self.cursor.execute(
+            """
+            INSERT INTO match_party_trio (user_a, user_b, user_c, day, match_count, win_count)
+            SELECT m1.user_id, m2.user_id, m3.user_id, DATE(match_party.match_timestamp),
+                COUNT(*), SUM(match_party.has_win)
+            FROM match_party
+            JOIN match_party_member m1 ON m1.match_uuid = match_party.match_uuid AND m1.has_win = match_party.has_win
+            JOIN match_party_member m2 ON m2.match_uuid = match_party.match_uuid AND m2.has_win = match_party.has_win
+                AND m1.user_id < m2.user_id
+            JOIN match_party_member m3 ON m3.match_uuid = match_party.match_uuid AND m3.has_win = match_party.has_win
+                AND m2.user_id < m3.user_id
+            WHERE match_party.member_count >= 3
+            GROUP BY m1.user_id, m2.user_id, m3.user_id, DATE(match_party.match_timestamp)
+            """
+        )
+        self.conn.commit()
+        print_log("Migration complete: match_party tables created")
+
+    def _migrate_add_user_match_daily_rollup_table(self):
+        """
+        Create user_match_daily_rollup table: match stats summed per user, UTC day, session type and
+        rollback flag. Filled from the existing matches the first time, then kept up to date by
+        insert_if_nonexistant_full_match_info.
+        """
+        table_exists = self.cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_match_daily_rollup'"
+        ).fetchone()
+        if table_exists:
+            return
+        print_log("Running migration: Create user_match_daily_rollup table")
+        self.cursor.execute(
+            """
+            CREATE TABLE user_match_daily_rollup (
+                user_id INTEGER NOT NULL,
+                day TEXT NOT NULL,
+                session_type TEXT NOT NULL,
+                is_rollback BOOLEAN NOT NULL,
+                match_count INTEGER NOT NULL DEFAULT 0,
+                win_count INTEGER NOT NULL DEFAULT 0,
+                round_played_count INTEGER NOT NULL DEFAULT 0,
+                kill_count INTEGER NOT NULL DEFAULT 0,
+                death_count INTEGER NOT NULL DEFAULT 0,
+                first_kill_count INTEGER NOT NULL DEFAULT 0,
+                first_death_count INTEGER NOT NULL DEFAULT 0,
+                clutches_win_count INTEGER NOT NULL DEFAULT 0,
+                clutches_loss_count INTEGER NOT NULL DEFAULT 0,
+                ace_count INTEGER NOT NULL DEFAULT 0,
+                kill_3_count INTEGER NOT NULL DEFAULT 0,
+                kill_4_count INTEGER NOT NULL DEFAULT 0,
+                kill_5_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, day, session_type, is_rollback),
+                FOREIGN KEY(user_id) REFERENCES user_info(id)
+            )
+            """
+        )
+        self.cursor.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_user_match_daily_rollup_day
+            ON user_match_daily_rollup(day, user_id)
+            """
+        )
+        self.cursor.execute(
+            """
+            INSERT INTO user_match_daily_rollup (
+                user_id, day, session_type, is_rollback,
+                match_count, win_count, round_played_count, kill_count, death_count,
+                first_kill_count, first_death_count, clutches_win_count, clutches_loss_count,
+                ace_count, kill_3_count, kill_4_count, kill_5_count
+            )
+            SELECT
+                user_id, DATE(match_timestamp), session_type, is_rollback,
+                COUNT(*), SUM(has_win), SUM(round_played_count), SUM(kill_count), SUM(death_count),
+                SUM(first_kill_count), SUM(first_death_count), SUM(clutches_win_count), SUM(clutches_loss_count),
+                SUM(ace_count), SUM(kill_3_count), SUM(kill_4_count), SUM(kill_5_count)
+            FROM user_full_match_info
+            GROUP BY user_id, DATE(match_timestamp), session_type, is_rollback
+            """
+        )
+        self.conn.commit()
+        print_log("Migration complete: user_match_daily_rollup table created")
+
+    def _migrate_cache_values_to_binary_codec(self):
+        """
+        Rewrite the cache rows stored as base64 TEXT of a dill pickle into the tagged BLOB of deps.cache_codec.
+        Rows that cannot be decoded anymore are dropped: the cache refills them from the source.
+        """
+        legacy_rows = self.cursor.execute("SELECT key, value FROM cache WHERE typeof(value) = 'text'").fetchall()
+        if not legacy_rows:
+            return
+        print_log(f"Running migration: Re-encode {len(legacy_rows)} cache values with the binary codec")
+        updated_rows = []
+        dropped_keys = []
+        for key, raw_value in legacy_rows:
+            try:
+                updated_rows.append((encode_value(decode_value(raw_value)), key))
+            except Exception as e:
+                print_error_log(f"_migrate_cache_values_to_binary_codec: Dropping cache key {key}: {e}")
+                dropped_keys.append((key,))
+        self.cursor.executemany("UPDATE cache SET value = ? WHERE key = ?", updated_rows)
+        self.cursor.executemany("DELETE FROM cache WHERE key = ?", dropped_keys)
+        self.conn.commit()
+        print_log("Migration complete: cache values re-encoded")
+
     def _migrate_add_tournament_bet_odds_generation_column(self):
         """Add the bet_odds_generation column storing how the betting odds are computed."""
         columns = [row[1] for row in self.cursor.execute("PRAGMA table_info(tournament)").fetchall()]
@@ -543,6 +959,35 @@ class DatabaseManager:
         self.conn.commit()
         print_log("Migration complete: user_player_value table created")
 
+    def _migrate_add_user_player_value_state_table(self):
+        """
+        Create user_player_value_state table: the Elo and time-decayed accumulators of each user with the
+        id of the last match applied, so the nightly computation only replays the matches inserted since.
+        """
+        print_log("Running migration: Create user_player_value_state table")
+        self.cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS user_player_value_state (
+                user_id INTEGER PRIMARY KEY,
+                last_match_id INTEGER NOT NULL DEFAULT 0,
+                last_match_timestamp DATETIME NULL,
+                match_count INTEGER NOT NULL DEFAULT 0,
+                peak_rank_points REAL NOT NULL DEFAULT 0,
+                elo_rating REAL NOT NULL,
+                elo_lobby_estimate REAL NOT NULL DEFAULT 0,
+                elo_match_index INTEGER NOT NULL DEFAULT 0,
+                decay_anchor_timestamp DATETIME NULL,
+                decayed_peak REAL NOT NULL DEFAULT 0,
+                decayed_kills REAL NOT NULL DEFAULT 0,
+                decayed_deaths REAL NOT NULL DEFAULT 0,
+                updated_at DATETIME NOT NULL,
+                FOREIGN KEY (user_id) REFERENCES user_info(id)
+            )
+            """
+        )
+        self.conn.commit()
+        print_log("Migration complete: user_player_value_state table created")
+
     def _migrate_add_message_archive_tables(self):
         """Create message archive tables for moderation investigations."""
         print_log("Running migration: Create message archive tables")
@@ -748,14 +1193,49 @@ class DatabaseManager:
         self.conn.commit()
         print_log("Migration complete: idx_user_activity_dedup created")
 
+    def open_thread_connection(self, read_only: bool = False) -> Optional[sqlite3.Connection]:
+        """
+        Open a connection owned by the calling thread and use it for every get_conn()/get_cursor()
+        made from this thread. Returns None for an in-memory database since a second connection
+        would not see the same data; the thread then keeps using the shared connection.
+        """
+        self.close_thread_connection()
+        if self.name == ":memory:":
+            return None
+        conn = sqlite3.connect(self.name, timeout=DATABASE_BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute(f"PRAGMA busy_timeout={DATABASE_BUSY_TIMEOUT_SECONDS * 1000};")
+        if read_only:
+            conn.execute("PRAGMA query_only=ON;")
+        self._thread_local.conn = conn
+        self._thread_local.cursor = conn.cursor()
+        return conn
+
+    def close_thread_connection(self) -> None:
+        """Close the connection bound to the calling thread, if any."""
+        conn = getattr(self._thread_local, "conn", None)
+        self._thread_local.conn = None
+        self._thread_local.cursor = None
+        if conn is not None:
+            try:
+                conn.close()
+            except sqlite3.Error as e:
+                print_error_log(f"DatabaseManager.close_thread_connection: {e}")
+
     def get_conn(self):
         """Access to the database connection"""
+        thread_conn = getattr(self._thread_local, "conn", None)
+        if thread_conn is not None:
+            return thread_conn
         if not hasattr(self, "conn") or self.conn is None:
             self.set_database_name(self.name)
         return self.conn
 
     def get_cursor(self):
         """Access to the database cursor"""
+        thread_cursor = getattr(self._thread_local, "cursor", None)
+        if thread_cursor is not None:
+            return thread_cursor
         if not hasattr(self, "cursor") or self.cursor is None:
             self.set_database_name(self.name)
         return self.cursor
@@ -772,15 +1252,15 @@ class DatabaseManager:
 
         def __enter__(self):
             """Begin a transaction"""
-            self.db_manager.conn.execute("BEGIN TRANSACTION")
+            self.db_manager.get_conn().execute("BEGIN TRANSACTION")
             return self.db_manager.get_cursor()  # Reuse the database manager's cursor
 
         def __exit__(self, exc_type, exc_val, exc_tb):
             """Commit or rollback the transaction"""
             if exc_type is None:
-                self.db_manager.conn.commit()  # Commit if no exception
+                self.db_manager.get_conn().commit()  # Commit if no exception
             else:
-                self.db_manager.conn.rollback()  # Rollback if an exception occurred
+                self.db_manager.get_conn().rollback()  # Rollback if an exception occurred
                 print_error_log(f"system_database:TransactionContext:__exit__: {exc_val}")
             return False
 
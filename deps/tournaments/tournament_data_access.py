@@ -6,7 +6,6 @@ from datetime import datetime, timezone
 import math
 from typing import List, Optional
 from cachetools import TTLCache, cached
-from deps.data_access import data_access_get_member
 from deps.analytic_data_access import USER_INFO_SELECT_FIELD, fetch_user_info
 from deps.data_access_data_class import UserInfo
 from deps.system_database import database_manager
@@ -604,6 +603,9 @@ async def get_teammate_mentions(teammates: List[int], guild_id: int) -> str:
     Fetches the mentions of the teammates from the guild.
     Return an empty string if not teammates
     """
+    # Imported here: deps.data_access pulls in the bot, and this module also runs in the render workers
+    from deps.data_access import data_access_get_member  # pylint: disable=import-outside-toplevel
+
     mentions = []
     for teammate in teammates:
         member = await data_access_get_member(guild_id, teammate)
@@ -613,6 +615,9 @@ async def get_teammate_mentions(teammates: List[int], guild_id: int) -> str:
 
 async def build_team_mentions(leader_partners: dict[int, list[int]], leader_id: int, guild_id: int) -> str:
     """Build a string of mentions for the team members of the leader."""
+    # Imported here: deps.data_access pulls in the bot, and this module also runs in the render workers
+    from deps.data_access import data_access_get_member  # pylint: disable=import-outside-toplevel
+
     leader_mention = ""
     # Leader mention
     m = await data_access_get_member(guild_id, leader_id)
@@ -4,7 +4,7 @@ The function might be used by several different Discord interactions.
 """
 
 import io
-from typing import List, Optional, Union
+from typing import List, Optional
 import discord
 from deps.data_access import (
     data_access_get_channel,
@@ -12,43 +12,37 @@ from deps.data_access import (
     data_access_get_member,
 )
 from deps.tournaments.tournament_data_class import Tournament, TournamentGame
-from deps.tournaments.tournament_functions import build_tournament_tree, start_tournament
+from deps.tournaments.tournament_functions import start_tournament
 from deps.log import print_error_log, print_log
 from deps.tournaments.tournament_data_access import (
     build_team_mentions,
     fetch_active_tournament_by_guild,
-    fetch_tournament_by_id,
     fetch_tournament_games_by_tournament_id,
     fetch_tournament_open_registration,
     fetch_tournament_start_today,
     fetch_tournament_team_members_by_leader,
 )
-from deps.tournaments.tournament_visualizer import plot_tournament_bracket
+from deps.tournaments.tournament_visualizer import render_tournament_bracket
 from deps.values import (
     COMMAND_TOURNAMENT_REGISTER_TOURNAMENT,
     COMMAND_TOURNAMENT_SEE_BRACKET_TOURNAMENT,
     COMMAND_TOURNAMENT_SEND_SCORE_TOURNAMENT,
 )
-from deps.tournaments.tournament_models import TournamentNode
+from deps.render_service import render_service
 
 
-def generate_bracket_file(tournament_id: int, file_name: str = "tournament_bracket.png") -> Optional[discord.File]:
+async def generate_bracket_file(
+    tournament_id: int, file_name: str = "tournament_bracket.png"
+) -> Optional[discord.File]:
     """
     Generate the image to share in a Discord message
     """
-    tournament: Union[Tournament, None] = fetch_tournament_by_id(tournament_id)
-    if tournament is None:
-        print_error_log(f"generate_braket_file: Tournament {tournament_id} not found. Skipping.")
+    try:
+        img_bytes = await render_service.submit(render_tournament_bracket, tournament_id)
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        # Timeout, dead render worker or error in the render: the callers handle the missing file
+        print_error_log(f"generate_braket_file: Failed to render the bracket of tournament {tournament_id}: {e}")
         return None
-    tournament_games: List[TournamentGame] = fetch_tournament_games_by_tournament_id(tournament_id)
-    tournament_tree: Optional[TournamentNode] = build_tournament_tree(tournament_games)
-    if tournament_tree is None:
-        print_error_log(
-            f"generate_braket_file: Failed to build tournament tree for tournament {tournament_id}. Skipping."
-        )
-        return None
-    # Generate the tournament bracket image
-    img_bytes = plot_tournament_bracket(tournament, tournament_tree, False)
     if img_bytes is None:
         print_error_log(
             f"generate_braket_file: Failed to generate tournament bracket image for tournament {tournament_id}. Skipping."
@@ -82,7 +76,7 @@ async def send_tournament_bracket_to_a_guild(guild: discord.Guild) -> None:
         if tournament.id is None:
             print_error_log("send_daily_tournament_bracket_message: Tournament id is None. Skipping.")
             continue
-        file = generate_bracket_file(tournament.id)
+        file = await generate_bracket_file(tournament.id)
         if file is None:
             print_error_log(
                 f"\t⚠️ send_daily_tournament_bracket_message: Failed to generate tournament bracket image for tournament {tournament.id}. Skipping."
@@ -180,7 +174,7 @@ async def send_tournament_starting_to_a_guild(guild: discord.Guild) -> None:
             if tournament.id is None:
                 print_error_log("send_tournament_starting_to_a_guild: Tournament id is None. Skipping.")
                 continue
-            file = generate_bracket_file(tournament.id)
+            file = await generate_bracket_file(tournament.id)
             if file is None:
                 print_error_log(
                     f"\t⚠️ send_tournament_starting_to_a_guild: Failed to generate tournament bracket image for tournament {tournament.id}. Skipping."
@@ -38,7 +38,7 @@ async def post_end_tournament_messages(interaction: discord.Interaction, tournam
         )
         return
     final_score = get_tournament_final_result_positions(tournament_tree)
-    file = generate_bracket_file(tournament_id)
+    file = await generate_bracket_file(tournament_id)
     if file is None:
         # Should never go here
         print_error_log(
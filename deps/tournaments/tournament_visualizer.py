@@ -2,15 +2,20 @@
 
 import io
 import os
-from typing import Optional
+from typing import List, Optional, Union
 from PIL import Image, ImageDraw, ImageFont
 from deps.analytic_data_access import fetch_user_info
 from deps.tournaments.tournament_models import TournamentNode
-from deps.tournaments.tournament_data_class import Tournament
+from deps.tournaments.tournament_data_class import Tournament, TournamentGame
 from deps.values import COMMAND_TOURNAMENT_SEND_SCORE_TOURNAMENT
-from deps.tournaments.tournament_functions import get_node_by_levels
-from deps.tournaments.tournament_data_access import fetch_tournament_team_members_by_leader
+from deps.tournaments.tournament_functions import build_tournament_tree, get_node_by_levels
+from deps.tournaments.tournament_data_access import (
+    fetch_tournament_by_id,
+    fetch_tournament_games_by_tournament_id,
+    fetch_tournament_team_members_by_leader,
+)
 from deps.functions import get_name
+from deps.log import print_error_log
 
 font_path = os.path.abspath("./fonts/Minecraft.ttf")
 font1 = ImageFont.truetype(font_path, 16)
@@ -192,3 +197,22 @@ def plot_tournament_bracket(
     # Set axis limits based on positions
 
     return _image_return(im, show, file_name)
+
+
+def render_tournament_bracket(tournament_id: int) -> Optional[bytes]:
+    """
+    Render the bracket PNG of a tournament, run in a render worker process
+    """
+    tournament: Union[Tournament, None] = fetch_tournament_by_id(tournament_id)
+    if tournament is None:
+        print_error_log(f"generate_braket_file: Tournament {tournament_id} not found. Skipping.")
+        return None
+    tournament_games: List[TournamentGame] = fetch_tournament_games_by_tournament_id(tournament_id)
+    tournament_tree: Optional[TournamentNode] = build_tournament_tree(tournament_games)
+    if tournament_tree is None:
+        print_error_log(
+            f"generate_braket_file: Failed to build tournament tree for tournament {tournament_id}. Skipping."
+        )
+        return None
+    # Generate the tournament bracket image
+    return plot_tournament_bracket(tournament, tournament_tree, False)
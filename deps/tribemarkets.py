@@ -21,6 +21,7 @@ from urllib.parse import quote
 
 import httpx
 
+from deps.http_clients import http_clients, new_httpx_async_client
 from deps.log import print_error_log, print_log, print_warning_log
 
 
@@ -421,16 +422,18 @@ class TribeMarketsClient:
     ) -> dict[str, Any]:
         if not self.settings.enabled:
             raise TribeMarketsIntegrationError("TribeMarkets integration is not configured")
-        request_headers = {"X-API-Key": self.settings.api_key}
-        if headers:
-            request_headers.update(headers)
-        try:
-            async with httpx.AsyncClient(
+        # Shared keep-alive client, built again when the API URL or key changes
+        client = http_clients.get_async_client(
+            "tribemarkets",
+            lambda: new_httpx_async_client(
                 base_url=self.settings.api_url,
-                headers=request_headers,
+                headers={"X-API-Key": self.settings.api_key},
                 timeout=httpx.Timeout(15.0),
-            ) as client:
-                response = await client.request(method, path, json=json_body)
+            ),
+            config=(self.settings.api_url, self.settings.api_key),
+        )
+        try:
+            response = await client.request(method, path, json=json_body, headers=headers)
         except httpx.HTTPError as exc:
             raise TribeMarketsIntegrationError(f"TribeMarkets request failed: {exc}") from exc
         if response.status_code >= 400:
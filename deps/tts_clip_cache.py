@@ -0,0 +1,222 @@
+"""
+Text-to-speech clips for the voice announcements, synthesized once and kept on disk pre-encoded as Ogg Opus.
+
+The announcements are built from reusable fragments (greeting, scheduled players, channel hint) so a repeated
+fragment is played from the cache: no synthesis call and, since the clips are already Opus, no transcoding
+when discord.FFmpegOpusAudio streams them. When a new clip is written, the least recently played clips are
+evicted past a file count, except the clips held for a playback (hold_tts_clips).
+
+The synthesis backend is chosen with TTS_BACKEND: "gtts" (Google Translate, default) or "espeak" (local,
+offline espeak-ng). Other engines can be added with register_tts_backend.
+"""
+
+import asyncio
+import hashlib
+import os
+import subprocess
+import tempfile
+import weakref
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Callable, Dict, List, Optional, Union
+
+import discord
+from gtts import gTTS  # type: ignore
+
+from deps.log import print_error_log, print_log, print_warning_log
+
+DEFAULT_TTS_BACKEND = "gtts"
+DEFAULT_TTS_CLIP_CACHE_MAX_FILES = 300
+TTS_LANGUAGE = "en"
+
+
+class GoogleTtsBackend:
+    """Synthesis with Google Translate's TTS endpoint (outbound call), MP3 output"""
+
+    name = "gtts"
+
+    def synthesize(self, text: str, output_path: str) -> None:
+        """Write the speech of the text in output_path"""
+        gTTS(text, lang=TTS_LANGUAGE).save(output_path)
+
+
+class EspeakTtsBackend:
+    """Local synthesis with espeak-ng, WAV output, no network"""
+
+    name = "espeak"
+
+    def synthesize(self, text: str, output_path: str) -> None:
+        """Write the speech of the text in output_path"""
+        subprocess.run(["espeak-ng", "-v", TTS_LANGUAGE, "-w", output_path, text], check=True, capture_output=True)
+
+
+TtsBackend = Union[GoogleTtsBackend, EspeakTtsBackend]
+_TTS_BACKENDS: Dict[str, Callable[[], TtsBackend]] = {
+    GoogleTtsBackend.name: GoogleTtsBackend,
+    EspeakTtsBackend.name: EspeakTtsBackend,
+}
+# A lock lives while a request of its clip holds it, the map does not keep one per text ever spoken
+_clip_locks: "weakref.WeakValueDictionary[Path, asyncio.Lock]" = weakref.WeakValueDictionary()
+# Clip -> number of holders waiting to play it, never evicted
+_clips_in_use: Dict[Path, int] = {}
+
+
+def register_tts_backend(name: str, factory: Callable[[], TtsBackend]) -> None:
+    """Make a synthesis backend selectable with TTS_BACKEND=name"""
+    _TTS_BACKENDS[name] = factory
+
+
+def get_tts_backend() -> TtsBackend:
+    """The backend selected by TTS_BACKEND, the default one when unknown"""
+    name = os.getenv("TTS_BACKEND", DEFAULT_TTS_BACKEND).lower()
+    if name not in _TTS_BACKENDS:
+        print_warning_log(f"get_tts_backend: Unknown TTS backend {name}, using {DEFAULT_TTS_BACKEND}")
+        name = DEFAULT_TTS_BACKEND
+    return _TTS_BACKENDS[name]()
+
+
+def get_tts_clip_cache_dir() -> Path:
+    """Folder of the cached clips, TTS_CLIP_CACHE_DIR or a folder in the temp directory"""
+    directory = Path(os.getenv("TTS_CLIP_CACHE_DIR", os.path.join(tempfile.gettempdir(), "gametimescheduler_tts")))
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def normalize_tts_text(text: str) -> str:
+    """The cache key text: the case and the spacing do not change the speech"""
+    return " ".join(text.split()).casefold()
+
+
+def get_tts_clip_path(text: str, backend_name: str) -> Path:
+    """Where the clip of the text synthesized by the backend is cached"""
+    digest = hashlib.sha256(normalize_tts_text(text).encode("utf-8")).hexdigest()[:32]
+    return get_tts_clip_cache_dir() / f"{backend_name}-{digest}.ogg"
+
+
+async def encode_opus(input_path: str, output_path: str) -> None:
+    """Transcode the synthesized audio once to the Ogg Opus format Discord streams without transcoding"""
+    process = await asyncio.create_subprocess_exec(
+        "ffmpeg",
+        "-y",
+        "-loglevel",
+        "error",
+        "-i",
+        input_path,
+        "-c:a",
+        "libopus",
+        "-b:a",
+        "64k",
+        "-ar",
+        "48000",
+        "-ac",
+        "2",
+        "-f",
+        "ogg",
+        output_path,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await process.communicate()
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed with code {process.returncode}: {stderr.decode(errors='replace')}")
+
+
+def evict_tts_clips(max_files: int) -> None:
+    """Remove the least recently played clips past max_files, except the clips held for a playback"""
+    clips = []
+    for clip in get_tts_clip_cache_dir().glob("*.ogg"):
+        try:
+            clips.append((clip.stat().st_mtime, clip))
+        except FileNotFoundError:
+            continue
+    clips.sort(reverse=True)
+    for _, clip in clips[max_files:]:
+        if clip not in _clips_in_use:
+            clip.unlink(missing_ok=True)
+
+
+def _hold_tts_clip(path: Path) -> None:
+    """Keep the clip from the eviction until release_tts_clips"""
+    _clips_in_use[path] = _clips_in_use.get(path, 0) + 1
+
+
+def release_tts_clips(clips: List[Path]) -> None:
+    """The clips were played (or will not be), the eviction can remove them again"""
+    for clip in clips:
+        holders = _clips_in_use.get(clip, 0) - 1
+        if holders > 0:
+            _clips_in_use[clip] = holders
+        else:
+            _clips_in_use.pop(clip, None)
+
+
+async def get_tts_clip(text: str) -> Path:
+    """
+    The Opus clip of the text, synthesized and encoded on the first request only
+    The clip is held until release_tts_clips so the eviction does not remove it before it is played
+    """
+    backend = get_tts_backend()
+    path = get_tts_clip_path(text, backend.name)
+    lock = _clip_locks.get(path)
+    if lock is None:
+        lock = asyncio.Lock()
+        _clip_locks[path] = lock
+    async with lock:
+        _hold_tts_clip(path)
+        try:
+            os.utime(path)  # Most recently played for the eviction
+            return path
+        except FileNotFoundError:
+            pass
+        print_log(f"get_tts_clip: Synthesizing with {backend.name}: {text}")
+        fd, raw_path = tempfile.mkstemp(dir=path.parent, suffix=".raw")
+        os.close(fd)
+        encoded_path = f"{path}.tmp"
+        try:
+            await asyncio.to_thread(backend.synthesize, text.strip(), raw_path)
+            await encode_opus(raw_path, encoded_path)
+            os.replace(encoded_path, path)
+        except BaseException:
+            release_tts_clips([path])
+            raise
+        finally:
+            for temporary_path in (raw_path, encoded_path):
+                if os.path.exists(temporary_path):
+                    os.remove(temporary_path)
+    # Only a new clip can bring the folder past the maximum, the eviction runs off the event loop
+    try:
+        await asyncio.to_thread(
+            evict_tts_clips, int(os.getenv("TTS_CLIP_CACHE_MAX_FILES", str(DEFAULT_TTS_CLIP_CACHE_MAX_FILES)))
+        )
+    except OSError as e:
+        print_error_log(f"get_tts_clip: Failed to evict the old clips: {e}")
+    return path
+
+
+@asynccontextmanager
+async def hold_tts_clips(texts: List[str]) -> AsyncIterator[List[Path]]:
+    """The clips of the texts, in order, kept from the eviction until the end of the block"""
+    results = await asyncio.gather(*[get_tts_clip(text) for text in texts], return_exceptions=True)
+    clips = [result for result in results if isinstance(result, Path)]
+    try:
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        yield clips
+    finally:
+        release_tts_clips(clips)
+
+
+async def play_tts_clips(voice_client: discord.VoiceClient, clips: List[Path]) -> None:
+    """Play the clips one after the other, the Opus packets are passed through without transcoding"""
+    loop = asyncio.get_running_loop()
+    for clip in clips:
+        finished = asyncio.Event()
+
+        def after(error: Optional[Exception], event: asyncio.Event = finished, clip_name: str = clip.name) -> None:
+            # Called from the audio thread
+            if error is not None:
+                print_warning_log(f"play_tts_clips: Error playing {clip_name}: {error}")
+            loop.call_soon_threadsafe(event.set)
+
+        voice_client.play(discord.FFmpegOpusAudio(str(clip), codec="copy"), after=after)
+        await finished.wait()
@@ -9,6 +9,15 @@ STATS_HOURS_WINDOW_IN_PAST = 12
 # from the gaming session stats queue
 MAX_STATS_QUEUE_ATTEMPTS = 5
 
+# Minutes after leaving voice before the stats are fetched, so R6 Tracker has the last match
+STATS_QUEUE_DELAY_MINUTES = 2
+# Minutes before a user whose stats could not be posted is attempted again
+STATS_QUEUE_RETRY_MINUTES = 3
+# Minutes a processing run holds its users before another run can take them
+STATS_QUEUE_LEASE_MINUTES = 15
+# Maximum users processed by one run (one browser session)
+STATS_QUEUE_CLAIM_LIMIT = 50
+
 """ Timezone options for the bot. """
 valid_time_zone_options = [
     "US/Pacific",
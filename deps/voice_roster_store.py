@@ -0,0 +1,123 @@
+"""
+In-memory roster of the members of each voice channel with their Siege activity transition.
+
+Every mutation is synchronous and runs on the event loop thread, so it cannot interleave with
+another one: no lock is needed and updates of different channels never wait on each other.
+Each (guild, channel) roster has a version bumped only when its content changes, which lets the
+debounced tasks skip an evaluation when nothing changed since their last one.
+"""
+
+from typing import Optional, Union
+
+from deps.models import ActivityTransition
+
+
+def _same_transition(a: ActivityTransition, b: ActivityTransition) -> bool:
+    # ActivityTransition is a dataclass without fields: compare the attributes, not the instances
+    return a.before == b.before and a.after == b.after
+
+
+class VoiceRosterStore:
+    """Members and activity per (guild, channel), with the channel of each member for O(1) moves"""
+
+    def __init__(self) -> None:
+        self._rosters: dict[tuple[int, int], dict[int, ActivityTransition]] = {}
+        self._versions: dict[tuple[int, int], int] = {}
+        # (guild_id, user_id) -> channel_id where the member is in the roster
+        self._member_channels: dict[tuple[int, int], int] = {}
+
+    def _bump(self, key: tuple[int, int]) -> None:
+        self._versions[key] = self._versions.get(key, 0) + 1
+
+    def get(self, guild_id: int, channel_id: int) -> dict[int, ActivityTransition]:
+        """Copy of the roster of the channel, empty if nobody is tracked"""
+        return dict(self._rosters.get((guild_id, channel_id), {}))
+
+    def version(self, guild_id: int, channel_id: int) -> int:
+        """Number of changes of the roster of the channel since the bot started"""
+        return self._versions.get((guild_id, channel_id), 0)
+
+    def replace(self, guild_id: int, channel_id: int, user_map: dict[int, ActivityTransition]) -> None:
+        """Replace the whole roster of the channel"""
+        key = (guild_id, channel_id)
+        for user_id in self._rosters.pop(key, {}):
+            self._member_channels.pop((guild_id, user_id), None)
+        for user_id in user_map:
+            self._detach(guild_id, user_id)
+            self._member_channels[(guild_id, user_id)] = channel_id
+        if user_map:
+            self._rosters[key] = dict(user_map)
+        self._bump(key)
+
+    def _detach(self, guild_id: int, user_id: int) -> Optional[ActivityTransition]:
+        """Remove the member from the roster they are in, returning their transition"""
+        channel_id = self._member_channels.pop((guild_id, user_id), None)
+        if channel_id is None:
+            return None
+        key = (guild_id, channel_id)
+        roster = self._rosters.get(key)
+        if roster is None:
+            return None
+        transition = roster.pop(user_id, None)
+        if not roster:
+            del self._rosters[key]
+        self._bump(key)
+        return transition
+
+    def remove(self, guild_id: int, channel_id: int, user_id: int) -> None:
+        """Remove the member from the roster of the channel"""
+        if self._member_channels.get((guild_id, user_id)) == channel_id:
+            self._detach(guild_id, user_id)
+
+    def update(
+        self,
+        guild_id: int,
+        channel_id: int,
+        user_id: int,
+        activity_detail: Optional[Union[ActivityTransition, str]],
+    ) -> ActivityTransition:
+        """
+        Set the member activity in the channel, moving the member there if tracked in another channel
+        activity_detail is a string or an Activity
+            If a string, we need to take the current after, set to before and use the string as the after
+            If an activity, we just set the activity
+        """
+        key = (guild_id, channel_id)
+        if self._member_channels.get((guild_id, user_id)) != channel_id:
+            self._detach(guild_id, user_id)
+        roster = self._rosters.get(key, {})
+        current_activity = roster.get(user_id)
+
+        if isinstance(activity_detail, str):
+            # Only the current detail (e.g. status change offline to online): the previous after becomes the before
+            to_save = ActivityTransition(
+                current_activity.after if current_activity is not None else None, activity_detail
+            )
+        elif activity_detail is None:
+            to_save = ActivityTransition(None, None)
+        else:
+            to_save = activity_detail
+
+        if current_activity is not None and _same_transition(current_activity, to_save):
+            return current_activity
+        roster[user_id] = to_save
+        self._rosters[key] = roster
+        self._member_channels[(guild_id, user_id)] = channel_id
+        self._bump(key)
+        return to_save
+
+    def move(
+        self,
+        guild_id: int,
+        from_channel_id: int,
+        to_channel_id: int,
+        user_id: int,
+        activity_detail: Optional[Union[ActivityTransition, str]],
+    ) -> ActivityTransition:
+        """Move the member between two channels; the activity starts over in the new channel"""
+        self.remove(guild_id, from_channel_id, user_id)
+        self._detach(guild_id, user_id)
+        return self.update(guild_id, to_channel_id, user_id, activity_detail)
+
+
+voice_roster_store = VoiceRosterStore()
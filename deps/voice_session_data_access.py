@@ -0,0 +1,113 @@
+"""
+Voice Session Data Access
+
+The voice_session table materializes the user_activity connect/disconnect event log into one row
+per session so analytics, profile, streak and report queries do not re-pair events on every call.
+
+Pairing rules (same as the historical event replay):
+- A connect opens a new session for (user, guild, channel). A previous session still open for that
+  key is left open forever (the disconnect was never recorded) and never counts toward durations.
+- A disconnect closes the latest session of the key if it is still open; otherwise it is ignored.
+
+Functions:
+- apply_voice_session_event: Update the sessions for a new event (inside the event transaction)
+- backfill_voice_sessions: Rebuild the whole table from the user_activity history (repair only, the
+  migration fills the table when it creates it)
+- fetch_voice_sessions: Closed sessions overlapping a time range
+"""
+
+import sqlite3
+from datetime import datetime
+from typing import Optional
+
+from deps.data_access_data_class import UserVoiceSession
+from deps.functions_date import ensure_utc
+from deps.system_database import EVENT_CONNECT, EVENT_DISCONNECT, database_manager, parse_activity_timestamp
+
+VOICE_SESSION_SELECT_FIELD = "user_id, guild_id, channel_id, start_ts, end_ts, duration_s"
+
+
+def apply_voice_session_event(
+    cursor: sqlite3.Cursor, user_id: int, guild_id: int, channel_id: int, event: str, time: datetime
+) -> None:
+    """
+    Open or close the voice session matching a user_activity event.
+    Must run with the cursor of the transaction inserting the event.
+    """
+    time = ensure_utc(time)
+    if event == EVENT_CONNECT:
+        cursor.execute(
+            """
+            INSERT INTO voice_session (user_id, guild_id, channel_id, start_ts)
+            VALUES (:user_id, :guild_id, :channel_id, :start_ts)
+            """,
+            {"user_id": user_id, "guild_id": guild_id, "channel_id": channel_id, "start_ts": time.isoformat()},
+        )
+        return
+    if event != EVENT_DISCONNECT:
+        return
+
+    latest = cursor.execute(
+        """
+        SELECT id, start_ts, end_ts
+        FROM voice_session
+        WHERE user_id = ? AND guild_id = ? AND channel_id = ?
+        ORDER BY start_ts DESC, id DESC
+        LIMIT 1
+        """,
+        (user_id, guild_id, channel_id),
+    ).fetchone()
+    if latest is None or latest[2] is not None:
+        return  # Disconnect without a matching connect
+    start = parse_activity_timestamp(latest[1])
+    if time < start:
+        return
+    cursor.execute(
+        "UPDATE voice_session SET end_ts = ?, duration_s = ? WHERE id = ?",
+        (time.isoformat(), (time - start).total_seconds(), latest[0]),
+    )
+
+
+def backfill_voice_sessions() -> int:
+    """
+    Rebuild the voice_session table from the full user_activity history.
+    Returns the number of sessions written (open and closed).
+    The history is read and the sessions written in one IMMEDIATE transaction: a voice event written
+    by the bot meanwhile waits for the rebuild instead of landing between the read and the DELETE.
+    """
+    conn = database_manager.get_conn()
+    cursor = database_manager.get_cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        count = database_manager.rebuild_voice_sessions(cursor)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return count
+
+
+def fetch_voice_sessions(
+    from_utc: datetime, to_utc: datetime, guild_id: Optional[int] = None
+) -> list[UserVoiceSession]:
+    """
+    Fetch the closed sessions overlapping [from_utc, to_utc), ordered by start time.
+    Sessions are not clipped to the range.
+    """
+    query = f"""
+        SELECT {VOICE_SESSION_SELECT_FIELD}
+        FROM voice_session
+        WHERE end_ts IS NOT NULL
+        AND start_ts < :to_utc
+        AND end_ts > :from_utc
+        """
+    params: dict[str, str | int] = {
+        "from_utc": ensure_utc(from_utc).isoformat(),
+        "to_utc": ensure_utc(to_utc).isoformat(),
+    }
+    if guild_id is not None:
+        query += " AND guild_id = :guild_id"
+        params["guild_id"] = guild_id
+    query += " ORDER BY start_ts ASC, id ASC"
+    database_manager.get_cursor().execute(query, params)
+    return [UserVoiceSession(*row) for row in database_manager.get_cursor().fetchall()]
@@ -0,0 +1,122 @@
+#!uv run
+"""
+Entry file for the scraper worker process
+
+Runs the R6 Tracker visits queued by the bot in the scrape_job table (bot started with
+SCRAPER_MODE=process) with this process' own pool of Chrome browsers, and writes the parsed
+matches, profile and operator stats back in the job row. One thread per pooled browser.
+"""
+
+import os
+import signal
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+from dotenv import load_dotenv
+from deps.browser_pool import browser_pool
+from deps.log import print_error_log, print_log, print_warning_log
+from deps.scrape_job_data_access import (
+    claim_next_scrape_job,
+    finish_scrape_job,
+    purge_finished_scrape_jobs,
+    requeue_dead_worker_scrape_jobs,
+    requeue_stale_scrape_jobs,
+    scrape_worker_id,
+)
+from deps.scrape_scheduler import UserScrapeWork, run_user_scrape
+from deps.scraper_rate_limiter import scraper_rate_limiter
+from deps.system_database import database_manager
+
+# Load .env file first
+load_dotenv()
+
+POLL_INTERVAL_SECONDS = int(os.getenv("SCRAPER_POLL_INTERVAL_MS", "500")) / 1000
+# A job still running after this long belongs to a worker that died
+STALE_JOB_SECONDS = int(os.getenv("SCRAPER_JOB_TIMEOUT", "900"))
+FINISHED_JOB_RETENTION_SECONDS = 3600
+
+stop_event = threading.Event()
+rate_limiter_lock = threading.Lock()
+
+
+def run_job(job_id: int, work: UserScrapeWork) -> None:
+    """Run one visit and store its outcome, a browser failure fails the whole job"""
+    try:
+        with browser_pool.lease() as context:
+            outcomes = run_user_scrape(context, work)
+    except Exception as e:
+        print_error_log(f"scraper_worker: Job {job_id} for {work.ubisoft_user_name} failed: {e}")
+        finish_scrape_job(job_id, e, failed=True)
+        return
+    finish_scrape_job(job_id, outcomes)
+
+
+def save_rate_limiter() -> None:
+    """Keep the learned intervals for the next run"""
+    with rate_limiter_lock:
+        scraper_rate_limiter.log_stats("scraper_worker")
+        try:
+            scraper_rate_limiter.save()
+        except sqlite3.Error as e:
+            print_warning_log(f"scraper_worker: Unable to save the scraper rate limiter: {e}")
+
+
+def worker_loop(worker_id: str) -> None:
+    """Claim and run the jobs until the process is asked to stop"""
+    database_manager.open_thread_connection()
+    jobs_since_save = 0
+    try:
+        while not stop_event.is_set():
+            try:
+                claimed = claim_next_scrape_job(worker_id)
+            except sqlite3.Error as e:
+                print_error_log(f"scraper_worker: Unable to claim a job: {e}")
+                stop_event.wait(POLL_INTERVAL_SECONDS)
+                continue
+            if claimed is None:
+                if jobs_since_save > 0:
+                    save_rate_limiter()
+                    jobs_since_save = 0
+                stop_event.wait(POLL_INTERVAL_SECONDS)
+                continue
+            run_job(*claimed)
+            jobs_since_save += 1
+    finally:
+        database_manager.close_thread_connection()
+
+
+def stop(signum, _frame) -> None:
+    """Finish the running jobs and exit"""
+    print_log(f"scraper_worker: Signal {signum} received, stopping")
+    stop_event.set()
+
+
+def main() -> None:
+    """Start one worker thread per pooled browser"""
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    now = datetime.now(timezone.utc)
+    # The jobs of a dead worker of this host go back first, the workers of other hosts only once stale
+    requeued = requeue_dead_worker_scrape_jobs()
+    requeued += requeue_stale_scrape_jobs(now - timedelta(seconds=STALE_JOB_SECONDS))
+    purged = purge_finished_scrape_jobs(now - timedelta(seconds=FINISHED_JOB_RETENTION_SECONDS))
+    print_log(f"scraper_worker: {requeued} stale job(s) queued again, {purged} unread result(s) removed")
+    scraper_rate_limiter.load()
+
+    worker_count = browser_pool.config.pool_size
+    threads = [
+        threading.Thread(target=worker_loop, args=(scrape_worker_id(index),), name=f"scraper-{index}")
+        for index in range(worker_count)
+    ]
+    for thread in threads:
+        thread.start()
+    print_log(f"scraper_worker: {worker_count} worker(s) waiting for jobs on {database_manager.get_database_name()}")
+    for thread in threads:
+        thread.join()
+    browser_pool.shutdown()
+    save_rate_limiter()
+
+
+if __name__ == "__main__":
+    main()
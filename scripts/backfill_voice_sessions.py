@@ -0,0 +1,46 @@
+#! /usr/bin/env python3
+"""
+Rebuild the voice_session table from the user_activity event history.
+
+The migration already fills the table when it creates it, this script repairs it. Safe while the bot runs:
+the rebuild holds the write lock, the bot's voice events wait for it.
+"""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import sys
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from deps.system_database import database_manager
+from deps.voice_session_data_access import backfill_voice_sessions
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse CLI arguments."""
+    parser = argparse.ArgumentParser(description="Rebuild the voice_session table from user_activity.")
+    parser.add_argument(
+        "--database",
+        type=str,
+        default=None,
+        help="SQLite database file to rebuild. Defaults to the bot database.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run the backfill and print the number of sessions written."""
+    args = parse_args()
+    if args.database is not None:
+        database_manager.set_database_name(args.database)
+    database_manager.init_database()
+    count = backfill_voice_sessions()
+    print(f"{count} voice sessions written")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#! /usr/bin/env python3
+"""Compare the persistent cache binary codec with the former base64 dill encoding."""
+
+from __future__ import annotations
+
+import argparse
+import base64
+from pathlib import Path
+import sys
+import timeit
+
+import dill  # type: ignore
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from deps.cache_codec import decode_value, encode_value
+from deps.models import SimpleUser, SimpleUserHour
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse CLI arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark the persistent cache value encodings.")
+    parser.add_argument("--number", type=int, default=10_000, help="Iterations per measure.")
+    return parser.parse_args()
+
+
+def _legacy_encode(value):
+    return base64.b64encode(dill.dumps(value)).decode("utf-8")
+
+
+def _legacy_decode(raw):
+    return dill.loads(base64.b64decode(raw))
+
+
+def main() -> None:
+    """Print the encode/decode time per value and the encoded size for both encodings."""
+    args = parse_args()
+    users = [SimpleUser(100_000_000_000_000_000 + i, f"user_{i}", "<:gold:123>") for i in range(8)]
+    samples = {
+        "int": 123456789,
+        "str": "Rainbow Six Siege",
+        "int list (50)": list(range(1_000_000, 1_000_050)),
+        "SimpleUserHour": SimpleUserHour(users[0], "9pm"),
+        "reaction votes": {hour: users for hour in ("3pm", "4pm", "5pm", "6pm", "7pm", "8pm")},
+    }
+    print(f"{'value':<16} {'encoding':<8} {'encode us':>10} {'decode us':>10} {'bytes':>7}")
+    for name, value in samples.items():
+        for label, encode, decode in (("dill", _legacy_encode, _legacy_decode), ("codec", encode_value, decode_value)):
+            raw = encode(value)
+            encode_us = timeit.timeit(lambda: encode(value), number=args.number) / args.number * 1e6
+            decode_us = timeit.timeit(lambda: decode(raw), number=args.number) / args.number * 1e6
+            print(f"{name:<16} {label:<8} {encode_us:>10.2f} {decode_us:>10.2f} {len(raw):>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#! /usr/bin/env python3
+"""Compare the co-presence sweep with the former pairwise overlap computations on synthetic voice activity."""
+
+from __future__ import annotations
+
+import argparse
+from collections import defaultdict
+from pathlib import Path
+import random
+import sys
+import time
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from deps.analytic_functions import compute_pair_overlap_arrays, compute_pair_overlap_seconds
+
+Interval = tuple[int, int, float, float]
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse CLI arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark the pair overlap computations.")
+    parser.add_argument("--days", type=int, default=800, help="Days of activity.")
+    parser.add_argument("--users", type=int, default=40, help="Users of the guild.")
+    parser.add_argument("--channels", type=int, default=4, help="Voice channels.")
+    parser.add_argument("--skip-pairwise", action="store_true", help="Skip the slowest former computation.")
+    return parser.parse_args()
+
+
+def _synthetic_sessions(args: argparse.Namespace) -> list[Interval]:
+    """Evening sessions: each user plays most days, one to three sessions of 10 minutes to 4 hours"""
+    rng = random.Random(42)
+    intervals = []
+    for day in range(args.days):
+        evening = day * 86_400 + 18 * 3_600
+        for user_id in range(1, args.users + 1):
+            if rng.random() < 0.4:
+                continue
+            for _ in range(rng.randint(1, 3)):
+                start = evening + rng.randint(-3 * 3_600, 4 * 3_600)
+                intervals.append((rng.randint(1, args.channels), user_id, start, start + rng.randint(600, 4 * 3_600)))
+    return intervals
+
+
+def _former_pairwise(intervals: list[Interval]) -> dict[tuple[int, int, int], float]:
+    """compute_users_weights_from_connections before the sweep: every session of every pair of users"""
+    by_channel: dict[int, dict[int, list[tuple[float, float]]]] = defaultdict(lambda: defaultdict(list))
+    for channel_id, user_id, start, end in intervals:
+        by_channel[channel_id][user_id].append((start, end))
+    weights: dict[tuple[int, int, int], float] = {}
+    for channel_id, users in by_channel.items():
+        user_ids = sorted(users)
+        for index, user_a in enumerate(user_ids):
+            for user_b in user_ids[index + 1 :]:
+                total = 0.0
+                for start_a, end_a in users[user_a]:
+                    for start_b, end_b in users[user_b]:
+                        total += max(0.0, min(end_a, end_b) - max(start_a, start_b))
+                if total > 0:
+                    weights[(user_a, user_b, channel_id)] = total
+    return weights
+
+
+def _former_sorted_scan(intervals: list[Interval]) -> dict[tuple[int, int, int], float]:
+    """monthly_report._compute_pair_overlap_hours before the sweep: sorted sessions, scan until no overlap"""
+    by_channel: dict[int, list[Interval]] = defaultdict(list)
+    for interval in intervals:
+        by_channel[interval[0]].append(interval)
+    weights: dict[tuple[int, int, int], float] = defaultdict(float)
+    for channel_id, sessions in by_channel.items():
+        sessions.sort(key=lambda item: item[2])
+        for index, left in enumerate(sessions):
+            for right in sessions[index + 1 :]:
+                if right[2] >= left[3]:
+                    break
+                if left[1] == right[1]:
+                    continue
+                overlap = min(left[3], right[3]) - max(left[2], right[2])
+                if overlap > 0:
+                    weights[(min(left[1], right[1]), max(left[1], right[1]), channel_id)] += overlap
+    return dict(weights)
+
+
+def _measure(label: str, compute, intervals: list[Interval]):
+    start = time.perf_counter()
+    result = compute(intervals)
+    print(f"{label:<14} {(time.perf_counter() - start) * 1000:>12.1f}")
+    return result
+
+
+def main() -> None:
+    """Print the time of each computation on the same sessions and check they agree."""
+    args = parse_args()
+    intervals = _synthetic_sessions(args)
+    print(f"{len(intervals)} sessions over {args.days} days, {args.users} users, {args.channels} channels")
+    print(f"{'computation':<14} {'total ms':>12}")
+    sweep = _measure("sweep", compute_pair_overlap_seconds, intervals)
+    _measure("sweep arrays", compute_pair_overlap_arrays, intervals)
+    formers = [("sorted scan", _former_sorted_scan)]
+    if not args.skip_pairwise:
+        formers.append(("pairwise", _former_pairwise))
+    for label, compute in formers:
+        former = _measure(label, compute, intervals)
+        assert former.keys() == sweep.keys()
+        assert all(abs(former[key] - seconds) < 1e-6 for key, seconds in sweep.items())
+
+
+if __name__ == "__main__":
+    main()
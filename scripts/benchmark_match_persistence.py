@@ -0,0 +1,100 @@
+#! /usr/bin/env python3
+"""Compare the match persistence of a scrape run: per-row inserts against the executemany bulk path."""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+from pathlib import Path
+import sys
+import tempfile
+import time
+import uuid
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from deps.analytic_match_data_access import (
+    _ADD_NEW_MATCHES_TO_DAILY_ROLLUP,
+    _INSERT_FULL_MATCH_INFO,
+    _full_match_info_params,
+    insert_if_nonexistant_full_match_info_for_users,
+)
+from deps.analytic_settings_data_access import upsert_user_info
+from deps.data_access_data_class import UserInfo
+from deps.functions_r6_tracker import parse_json_from_full_matches
+from deps.models import UserFullMatchStats
+from deps.system_database import database_manager
+
+SAMPLE_FILE = ROOT_DIR / "tests" / "tests_assets" / "player_rank_history.json"
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse CLI arguments."""
+    parser = argparse.ArgumentParser(description="Benchmark the match persistence of a scrape run.")
+    parser.add_argument("--users", type=int, default=20, help="Users in the scrape run.")
+    parser.add_argument("--matches", type=int, default=100, help="Matches downloaded per user.")
+    parser.add_argument("--stored", type=float, default=0.5, help="Share of the matches already stored.")
+    return parser.parse_args()
+
+
+def _legacy_insert(user_info: UserInfo, list_matches: list[UserFullMatchStats]) -> None:
+    """The former path: OR-chain pre-check, then one INSERT and one rollup upsert per match"""
+    cursor = database_manager.get_cursor()
+    conditions = " OR ".join(["(match_uuid = ? AND user_id = ?)" for _ in list_matches])
+    params = [item for match in list_matches for item in (match.match_uuid, user_info.id)]
+    existing = set(cursor.execute(f"SELECT match_uuid, user_id FROM user_full_match_info WHERE {conditions}", params))
+    with database_manager.data_access_transaction() as cursor:
+        for match in list_matches:
+            if (match.match_uuid, user_info.id) in existing:
+                continue
+            cursor.execute(_INSERT_FULL_MATCH_INFO, _full_match_info_params(user_info.id, match))
+            cursor.execute(_ADD_NEW_MATCHES_TO_DAILY_ROLLUP, {"last_id": cursor.lastrowid - 1})
+
+
+def _scrape_run(args: argparse.Namespace) -> list[tuple[UserInfo, list[UserFullMatchStats]]]:
+    """Every user gets the sample matches, with their own match ids"""
+    with open(SAMPLE_FILE, "r", encoding="utf8") as file:
+        data = json.loads(file.read())
+    run = []
+    for index in range(args.users):
+        user_info = UserInfo(index + 1, f"user_{index}", None, f"ubi_{index}", None, "US/Eastern", 0)
+        sample = parse_json_from_full_matches(data, user_info)
+        matches = []
+        for i in range(args.matches):
+            match = copy.copy(sample[i % len(sample)])
+            match.match_uuid = str(uuid.uuid4())
+            match.user_id = user_info.id
+            matches.append(match)
+        run.append((user_info, matches))
+    return run
+
+
+def _measure(label: str, run, persist, stored_count: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        database_manager.set_database_name(str(Path(directory) / "benchmark.db"))
+        for user_info, matches in run:
+            upsert_user_info(user_info.id, user_info.display_name, None, None, None, user_info.time_zone, 0)
+            insert_if_nonexistant_full_match_info_for_users([(user_info, matches[:stored_count])])
+        rows = sum(len(matches) for _, matches in run) - stored_count * len(run)
+        start = time.perf_counter()
+        persist(run)
+        elapsed = time.perf_counter() - start
+        database_manager.get_conn().close()
+    print(f"{label:<12} {rows:>8} {elapsed * 1000:>10.1f} {rows / elapsed:>12.0f}")
+
+
+def main() -> None:
+    """Print the time and the inserted rows per second of both paths on the same scrape run."""
+    args = parse_args()
+    run = _scrape_run(args)
+    stored_count = int(args.matches * args.stored)
+    print(f"{'path':<12} {'new rows':>8} {'total ms':>10} {'rows/s':>12}")
+    _measure("per-row", run, lambda run: [_legacy_insert(*user_matches) for user_matches in run], stored_count)
+    _measure("executemany", run, insert_if_nonexistant_full_match_info_for_users, stored_count)
+
+
+if __name__ == "__main__":
+    main()
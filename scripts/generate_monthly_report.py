@@ -41,6 +41,12 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Skip AI conclusion generation.",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processes rendering the pages in parallel. Defaults to one per core.",
+    )
     parser.add_argument(
         "--window",
         action="append",
@@ -60,6 +66,7 @@ def main() -> None:
         top_n=args.top,
         include_ai=not args.no_ai,
         window_keys=args.window,
+        max_workers=args.workers,
     )
     print(path)
 
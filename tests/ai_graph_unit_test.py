@@ -3,10 +3,12 @@
 from datetime import datetime, timedelta, timezone
 from unittest.mock import patch
 
+import numpy as np
 import pytest
 
 from deps.ai.graph_functions import _voice_time_by_month, render_graph, validate_graph_plan
-from deps.data_access_data_class import UserActivity, UserInfo
+from deps.analytic_snapshot import ActivityColumns, AnalyticSnapshot, MatchColumns, VoiceColumns
+from deps.data_access_data_class import UserInfo
 
 
 def _user() -> UserInfo:
@@ -21,12 +23,20 @@ def _user() -> UserInfo:
     )
 
 
-def _activities() -> list[UserActivity]:
-    now = datetime.now(timezone.utc).replace(day=15, hour=12, minute=0, second=0, microsecond=0)
-    return [
-        UserActivity(42, 100, "connect", (now - timedelta(hours=2)).isoformat(), 7),
-        UserActivity(42, 100, "disconnect", now.isoformat(), 7),
-    ]
+def _voice(*sessions: tuple[int, datetime, datetime]) -> VoiceColumns:
+    return VoiceColumns(
+        user_id=np.array([session[0] for session in sessions], dtype=np.int64),
+        guild_id=np.full(len(sessions), 7),
+        channel_id=np.full(len(sessions), 100),
+        start=np.array([session[1].timestamp() for session in sessions]),
+        end=np.array([session[2].timestamp() for session in sessions]),
+    )
+
+
+def _snapshot(voice: VoiceColumns, matches: MatchColumns | None = None) -> AnalyticSnapshot:
+    now = datetime.now(timezone.utc)
+    matches = matches if matches is not None else MatchColumns.empty()
+    return AnalyticSnapshot(now, now, matches, voice, ActivityColumns.empty(), {})
 
 
 def test_graph_plan_defaults_to_requester_and_validates_explicit_user():
@@ -52,17 +62,18 @@ def test_graph_plan_does_not_trust_model_selected_user_ids():
     assert mentioned_plan["user_ids"] == [42]
 
 
-def test_voice_time_pairs_events_by_channel_and_normalizes_naive_timestamps():
-    activities = [
-        UserActivity(42, 1, "connect", "2026-01-01T10:00:00", 7),
-        UserActivity(42, 2, "connect", "2026-01-01T11:00:00", 7),
-        UserActivity(42, 1, "disconnect", "2026-01-01T12:00:00", 7),
-        UserActivity(42, 2, "disconnect", "2026-01-01T13:00:00", 7),
-    ]
+def test_voice_time_splits_sessions_across_months():
+    voice = _voice(
+        (42, datetime(2026, 1, 1, 10, tzinfo=timezone.utc), datetime(2026, 1, 1, 12, tzinfo=timezone.utc)),
+        (42, datetime(2026, 1, 31, 23, tzinfo=timezone.utc), datetime(2026, 2, 1, 2, tzinfo=timezone.utc)),
+        (43, datetime(2025, 12, 31, 23, tzinfo=timezone.utc), datetime(2026, 1, 1, 1, tzinfo=timezone.utc)),
+    )
+    month_starts = [datetime(2026, month, 1, tzinfo=timezone.utc) for month in (1, 2, 3)]
 
-    totals = _voice_time_by_month(activities)
+    totals = _voice_time_by_month(voice, month_starts)
 
-    assert totals["2026-01"][42] == 4 * 60 * 60
+    assert totals[42].tolist() == [3 * 60 * 60, 2 * 60 * 60]
+    assert totals[43].tolist() == [60 * 60, 0]
 
 
 @pytest.mark.parametrize("chart_type", ["line", "bar", "stacked_bar", "area", "scatter"])
@@ -78,8 +89,10 @@ def test_voice_graph_renders_supported_chart_types(chart_type):
         42,
         [42],
     )
+    end = datetime.now(timezone.utc).replace(day=15, hour=12, minute=0, second=0, microsecond=0)
+    start = end - timedelta(hours=2)
     with (
-        patch("deps.ai.graph_functions.fetch_all_user_activities", return_value=_activities()),
+        patch("deps.ai.graph_functions.load_analytic_snapshot", return_value=_snapshot(_voice((42, start, end)))),
         patch("deps.ai.graph_functions.fetch_user_info", return_value={42: _user()}),
     ):
         result = render_graph(plan, guild_id=7)
@@ -96,14 +109,16 @@ def test_graph_plan_rejects_unsupported_metric():
 
 
 def test_kd_graph_renders_weekly_totals():
-    from types import SimpleNamespace
-
     now = datetime.now(timezone.utc)
-    match = SimpleNamespace(
-        user_id=42,
-        match_timestamp=now - timedelta(days=2),
-        kill_count=12,
-        death_count=6,
+    matches = MatchColumns(
+        user_id=np.array([42]),
+        timestamp=np.array([(now - timedelta(days=2)).timestamp()]),
+        match_index=np.array([0]),
+        has_win=np.array([True]),
+        is_ranked=np.array([True]),
+        is_rollback=np.array([False]),
+        kill_count=np.array([12]),
+        death_count=np.array([6]),
     )
     plan = validate_graph_plan(
         {
@@ -118,7 +133,7 @@ def test_kd_graph_renders_weekly_totals():
         [42],
     )
     with (
-        patch("deps.ai.graph_functions.data_access_fetch_user_matches_in_time_range", return_value={42: [match]}),
+        patch("deps.ai.graph_functions.load_analytic_snapshot", return_value=_snapshot(_voice(), matches)),
         patch("deps.ai.graph_functions.fetch_user_info", return_value={42: _user()}),
     ):
         result = render_graph(plan, guild_id=7)
@@ -1,20 +1,24 @@
 """Test that touch the bet and the database"""
 
 import json
-from datetime import datetime, timezone
-from unittest.mock import call, patch
+from datetime import date, datetime, timezone
+from unittest.mock import patch
 import pytest
 
 from deps.analytic_functions import compute_users_weights
 from deps.data_access_data_class import UserInfo
 from deps.analytic_data_access import (
+    data_access_fetch_match_high_water_marks,
+    data_access_fetch_time_duo_partners,
     data_access_fetch_tk_count_by_user,
     data_access_fetch_user_full_match_info,
     data_access_fetch_user_full_user_info,
     fetch_all_user_activities,
+    fetch_all_user_activities2,
     fetch_user_info_by_user_id_list,
     get_active_user_info,
     insert_if_nonexistant_full_match_info,
+    insert_if_nonexistant_full_match_info_for_users,
     insert_if_nonexistant_full_user_info,
     insert_user_activity,
     upsert_user_info,
@@ -357,7 +361,7 @@ def test_insert_if_nonexistant_with_duplicate(mock_log):
     mock_log.reset_mock()
     insert_if_nonexistant_full_match_info(user_info, matches_1)
     mock_log.assert_called_once_with(
-        "insert_if_nonexistant_full_match_info: Found 0 new matches to insert out of 1 for DiscordName1"
+        "insert_if_nonexistant_full_match_info: Inserted 0 new matches out of 1 for DiscordName1"
     )
 
 
@@ -391,13 +395,8 @@ def test_insert_if_nonexistant_with_no_duplicate(mock_log):
     matches_1 = parse_json_from_full_matches(data_1, user_info)
     insert_if_nonexistant_full_match_info(user_info, matches_1)
 
-    mock_log.assert_has_calls(
-        [
-            call("insert_if_nonexistant_full_match_info: Found 1 new matches to insert out of 1 for DiscordName1"),
-            call(
-                "insert_if_nonexistant_full_match_info: Inserted match 1 for DiscordName1. Match id 9681f59e-80db-4b2e-b54b-3631af76b074 and user id 1"
-            ),
-        ]
+    mock_log.assert_called_once_with(
+        "insert_if_nonexistant_full_match_info: Inserted 1 new matches out of 1 for DiscordName1"
     )
 
 
@@ -424,9 +423,7 @@ def test_insert_if_nonexistant_with_no_match(mock_log):
 
     matches_1 = parse_json_from_full_matches(data_1, user_info)
     insert_if_nonexistant_full_match_info(user_info, matches_1)
-    mock_log.assert_called_once_with(
-        "insert_if_nonexistant_full_match_info: No user-match pair to insert, leaving the function early"
-    )
+    mock_log.assert_called_once_with("insert_if_nonexistant_full_match_info: No match to insert for DiscordName1")
 
 
 def test_two_users_same_channels():
@@ -531,6 +528,22 @@ def test_many_users_same_channel():
     assert user_weights == {(2, 3, 100): 540.0, (3, 4, 100): 60.0}
 
 
+def test_duo_partners_count_time_in_the_same_channel_only():
+    """Two users of the guild in different channels are not playing together"""
+    day = datetime(2024, 9, 20, tzinfo=timezone.utc)
+    sessions = [
+        (1, "user_1", CHANNEL1_ID, day.replace(hour=13), day.replace(hour=16)),
+        (2, "user_2", CHANNEL1_ID, day.replace(hour=13), day.replace(hour=15)),
+        (3, "user_3", CHANNEL2_ID, day.replace(hour=13), day.replace(hour=16)),
+    ]
+    for user_id, name, channel_id, connect_time, disconnect_time in sessions:
+        insert_user_activity(user_id, name, channel_id, GUILD_ID, EVENT_CONNECT, connect_time)
+        insert_user_activity(user_id, name, channel_id, GUILD_ID, EVENT_DISCONNECT, disconnect_time)
+
+    assert data_access_fetch_time_duo_partners(date(2024, 9, 1), 10) == [("user_1", "user_2", 2)]
+    assert fetch_all_user_activities2(date(2024, 9, 1)) == [("user_1", "user_2", 7200)]
+
+
 def test_analytic_insert_and_fetch_full_match_info_for_user() -> None:
     """
     Create a stats and fetch it
@@ -669,3 +682,99 @@ def test_fetch_tk() -> None:
     # Assert
     assert result is not None
     assert len(result) == 1
+
+
+@patch.object(analytic_match_data_access, analytic_match_data_access.print_log.__name__)
+def test_insert_full_match_info_updates_daily_rollup(mock_log):
+    """
+    The daily rollup holds the same sums as the match rows, without double counting duplicates
+    """
+    mock_log.side_effect = None
+    data_1 = get_test_data()[0]
+    user_info = UserInfo(1, "DiscordName1", "ubi_1_max", "ubi_1_active", None, "US/Eastern", 0)
+    upsert_user_info(user_info.id, user_info.display_name, None, None, None, user_info.time_zone, 0)
+    matches_1 = parse_json_from_full_matches(data_1, user_info)
+
+    insert_if_nonexistant_full_match_info(user_info, matches_1)
+    insert_if_nonexistant_full_match_info(user_info, matches_1)
+
+    expected = (
+        database_manager.get_cursor()
+        .execute(
+            """
+            SELECT DATE(match_timestamp), is_rollback, COUNT(*), SUM(kill_count), SUM(death_count), SUM(has_win)
+            FROM user_full_match_info
+            GROUP BY DATE(match_timestamp), is_rollback
+            ORDER BY 1, 2
+            """
+        )
+        .fetchall()
+    )
+    rollup = (
+        database_manager.get_cursor()
+        .execute(
+            """
+            SELECT day, is_rollback, SUM(match_count), SUM(kill_count), SUM(death_count), SUM(win_count)
+            FROM user_match_daily_rollup
+            GROUP BY day, is_rollback
+            ORDER BY 1, 2
+            """
+        )
+        .fetchall()
+    )
+    assert len(expected) > 0
+    assert rollup == expected
+
+
+@patch.object(analytic_match_data_access, analytic_match_data_access.print_log.__name__)
+def test_insert_full_match_info_for_users_skips_stored_matches(mock_log):
+    """
+    The matches of many users go in together, the ones already stored are skipped and not counted twice in the rollup
+    """
+    mock_log.side_effect = None
+    data_1, data_3 = get_test_data()[:2]
+    user_info = UserInfo(1, "DiscordName1", "ubi_1_max", "ubi_1_active", None, "US/Eastern", 0)
+    user_info2 = UserInfo(2, "DiscordName2", "ubi_2_max", "ubi_2_active", None, "US/Eastern", 0)
+    upsert_user_info(user_info.id, user_info.display_name, None, None, None, user_info.time_zone, 0)
+    upsert_user_info(user_info2.id, user_info2.display_name, None, None, None, user_info2.time_zone, 0)
+    matches_1 = parse_json_from_full_matches(data_1, user_info)
+    matches_3 = parse_json_from_full_matches(data_3, user_info2)
+    insert_if_nonexistant_full_match_info(user_info, matches_1[:3])
+
+    inserted = insert_if_nonexistant_full_match_info_for_users(
+        [(user_info, matches_1), (user_info2, matches_3), (user_info2, [])]
+    )
+
+    assert inserted == len(matches_1) - 3 + len(matches_3)
+    rollup_counts = dict(
+        database_manager.get_cursor()
+        .execute("SELECT user_id, SUM(match_count) FROM user_match_daily_rollup GROUP BY user_id")
+        .fetchall()
+    )
+    assert rollup_counts == {user_info.id: len(matches_1), user_info2.id: len(matches_3)}
+
+
+@patch.object(analytic_match_data_access, analytic_match_data_access.print_log.__name__)
+def test_high_water_mark_parses_only_new_matches(mock_log):
+    """The newest stored match stops the parse: only the matches played after it are returned"""
+    mock_log.side_effect = None
+    data_1 = get_test_data()[0]
+    user_info = UserInfo(1, "DiscordName1", "ubi_1_max", "ubi_1_active", None, "US/Eastern", 0)
+    upsert_user_info(user_info.id, user_info.display_name, None, user_info.ubisoft_username_active, None, "", 0)
+    all_matches = parse_json_from_full_matches(data_1, user_info)
+    assert data_access_fetch_match_high_water_marks([user_info.id]) == {}
+
+    # Store everything but the 3 newest matches
+    insert_if_nonexistant_full_match_info(user_info, all_matches[3:])
+    high_water_marks = data_access_fetch_match_high_water_marks([user_info.id, 999])
+    assert list(high_water_marks) == [user_info.id]
+    assert high_water_marks[user_info.id].match_uuid == all_matches[3].match_uuid
+    assert high_water_marks[user_info.id].match_timestamp == all_matches[3].match_timestamp
+
+    new_matches = parse_json_from_full_matches(data_1, user_info, high_water_marks[user_info.id])
+    assert [match.match_uuid for match in new_matches] == [match.match_uuid for match in all_matches[:3]]
+
+    insert_if_nonexistant_full_match_info(user_info, new_matches)
+    high_water_mark = data_access_fetch_match_high_water_marks([user_info.id])[user_info.id]
+    assert high_water_mark.match_uuid == all_matches[0].match_uuid
+    assert parse_json_from_full_matches(data_1, user_info, high_water_mark) == []
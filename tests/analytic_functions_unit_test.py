@@ -1,6 +1,8 @@
 """Unit tests for the analytic_gatherer module"""
 
 from datetime import datetime
+from itertools import combinations
+import random
 from typing import Dict, List, Tuple, Union
 from unittest.mock import patch
 from pandas import Index, Series
@@ -12,6 +14,8 @@ from deps.data_access_data_class import UserActivity, UserInfo
 from deps.analytic_functions import (
     calculate_overlap,
     calculate_user_connections,
+    compute_pair_overlap_arrays,
+    compute_pair_overlap_seconds,
     compute_users_weights,
     computer_users_voice_in_out,
     compute_users_voice_channel_time_sec,
@@ -193,6 +197,50 @@ def test_compute_users_weights(activity_data_weight, expected_result_weight) ->
     assert result == expected_result_weight
 
 
+def _pairwise_overlap_seconds(intervals: List[Tuple[int, int, float, float]]) -> Dict[Tuple[int, int, int], float]:
+    """Reference: compare every session with every session of another user of the channel"""
+    expected: Dict[Tuple[int, int, int], float] = {}
+    for left, right in combinations(intervals, 2):
+        if left[0] != right[0] or left[1] == right[1]:
+            continue
+        overlap = min(left[3], right[3]) - max(left[2], right[2])
+        if overlap > 0:
+            key = (min(left[1], right[1]), max(left[1], right[1]), left[0])
+            expected[key] = expected.get(key, 0) + overlap
+    return expected
+
+
+def test_pair_overlap_sweep_matches_pairwise_comparison() -> None:
+    """The sweep gives the same totals as comparing every pair of sessions, overlapping sessions included"""
+    rng = random.Random(7)
+    intervals = []
+    for _ in range(400):
+        start = rng.randint(0, 20_000)
+        intervals.append(
+            (rng.choice([100, 200]), rng.randint(1, 12), float(start), float(start + rng.randint(0, 3_000)))
+        )
+    result = compute_pair_overlap_seconds(intervals)
+    expected = _pairwise_overlap_seconds(intervals)
+    assert result.keys() == expected.keys()
+    for key, seconds in expected.items():
+        assert result[key] == pytest.approx(seconds)
+
+
+def test_pair_overlap_touching_sessions_do_not_overlap() -> None:
+    """A user joining when the other leaves, or alone in the channel, has no time together"""
+    intervals = [(100, 1, 0.0, 60.0), (100, 2, 60.0, 120.0), (100, 3, 0.0, 30.0), (200, 1, 0.0, 500.0)]
+    assert compute_pair_overlap_seconds(intervals) == {(1, 3, 100): 30.0}
+
+
+def test_pair_overlap_arrays() -> None:
+    """The columns hold the same pairs as the dictionary"""
+    intervals = [(100, 2, 0.0, 60.0), (100, 1, 30.0, 90.0), (200, 3, 0.0, 10.0)]
+    user_a, user_b, channel_id, seconds = compute_pair_overlap_arrays(intervals)
+    assert user_a.tolist() == [1] and user_b.tolist() == [2] and channel_id.tolist() == [100]
+    assert seconds.tolist() == [30.0]
+    assert compute_pair_overlap_arrays([])[3].size == 0
+
+
 @pytest.mark.parametrize(
     "activity_data, expected_result",
     [
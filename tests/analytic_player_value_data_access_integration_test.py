@@ -8,9 +8,12 @@ from deps.analytic_data_access import insert_if_nonexistant_full_match_info, ups
 from deps.analytic_player_value_data_access import (
     data_access_fetch_all_user_ids_with_matches,
     data_access_fetch_player_value,
+    data_access_fetch_player_value_states,
     data_access_fetch_player_values_by_algorithm,
+    data_access_fetch_recent_usable_matches,
     data_access_upsert_player_value,
 )
+from deps.analytic_player_value_functions import compute_all_player_values, compute_and_store_player_values
 from deps.data_access_data_class import UserInfo
 from deps.models import PlayerValueAlgorithm, PlayerValueResult
 from deps.system_database import DATABASE_NAME, DATABASE_NAME_TEST, database_manager
@@ -35,6 +38,13 @@ def setup_and_teardown():
 
 def insert_user_with_match(user_id: int, match_timestamp: datetime) -> None:
     """Insert a user and one ranked match at the given time"""
+    insert_user_with_matches(
+        user_id, [make_match(user_id=user_id, match_uuid=f"match-{user_id}", match_timestamp=match_timestamp)]
+    )
+
+
+def insert_user_with_matches(user_id: int, matches: list) -> None:
+    """Insert a user and its matches"""
     user_info = UserInfo(user_id, f"user{user_id}", f"ubi{user_id}", f"ubi{user_id}", f"uuid{user_id}", "US/Eastern", 0)
     assert user_info.ubisoft_username_max is not None
     assert user_info.ubisoft_username_active is not None
@@ -47,8 +57,22 @@ def insert_user_with_match(user_id: int, match_timestamp: datetime) -> None:
         "US/Eastern",
         0,
     )
-    match = make_match(user_id=user_id, match_uuid=f"match-{user_id}", match_timestamp=match_timestamp)
-    insert_if_nonexistant_full_match_info(user_info, [match])
+    insert_if_nonexistant_full_match_info(user_info, matches)
+
+
+def history(user_id: int, first_day: int, count: int) -> list:
+    """One match a day, oldest first, starting first_day days before NOW"""
+    return [
+        make_match(
+            user_id=user_id,
+            match_uuid=f"u{user_id}-d{first_day - i}",
+            match_timestamp=NOW - timedelta(days=first_day - i),
+            kill_count=5 + (user_id + i) % 7,
+            has_win=(user_id + i) % 2 == 0,
+            rank_points=2500 + 100 * user_id + 5 * i,
+        )
+        for i in range(count)
+    ]
 
 
 def test_upsert_then_fetch_player_value():
@@ -85,3 +109,55 @@ def test_fetch_all_user_ids_with_matches():
     insert_user_with_match(2, NOW - timedelta(days=5))
 
     assert sorted(data_access_fetch_all_user_ids_with_matches()) == [1, 2]
+
+
+def test_fetch_recent_usable_matches_extends_to_min_count():
+    insert_user_with_matches(1, history(1, 400, 30))
+    insert_user_with_matches(2, history(2, 30, 30))
+
+    recent = data_access_fetch_recent_usable_matches([1, 2], NOW - timedelta(days=180), 20)
+
+    assert len(recent[1]) == 20
+    assert len(recent[2]) == 30
+    assert recent[1][0].match_timestamp > recent[1][-1].match_timestamp
+
+
+def test_compute_and_store_only_applies_the_new_matches():
+    for user_id in (1, 2, 3):
+        insert_user_with_matches(user_id, history(user_id, 300, 150))
+    compute_and_store_player_values(now=NOW - timedelta(days=150))
+    assert data_access_fetch_player_value_states([1])[1].match_count == 150
+
+    for user_id in (1, 2):
+        insert_user_with_matches(user_id, history(user_id, 150, 150))
+    results = compute_and_store_player_values(now=NOW)
+
+    states = data_access_fetch_player_value_states([1, 2, 3])
+    assert [states[user_id].match_count for user_id in (1, 2, 3)] == [300, 300, 150]
+    matches_by_user = {user_id: history(user_id, 300, 150) for user_id in (1, 2, 3)}
+    for user_id in (1, 2):
+        matches_by_user[user_id] += history(user_id, 150, 150)
+    expected = compute_all_player_values(matches_by_user, NOW)
+    for user_id, user_results in expected.items():
+        for algorithm, result in user_results.items():
+            assert results[user_id][algorithm].value == pytest.approx(result.value)
+            assert data_access_fetch_player_value(user_id, algorithm) == pytest.approx(result.value)
+
+    rebuilt = compute_and_store_player_values(now=NOW, full_rebuild=True)
+    assert rebuilt[1][PlayerValueAlgorithm.PERFORMANCE_ELO].value == pytest.approx(
+        results[1][PlayerValueAlgorithm.PERFORMANCE_ELO].value
+    )
+
+
+def test_late_match_rebuilds_the_state():
+    insert_user_with_matches(1, history(1, 100, 50))
+    compute_and_store_player_values(now=NOW)
+
+    insert_user_with_matches(1, history(1, 200, 50))
+    results = compute_and_store_player_values(now=NOW)
+
+    expected = compute_all_player_values({1: history(1, 200, 50) + history(1, 100, 50)}, NOW)
+    assert results[1][PlayerValueAlgorithm.PERFORMANCE_ELO].value == pytest.approx(
+        expected[1][PlayerValueAlgorithm.PERFORMANCE_ELO].value
+    )
+    assert data_access_fetch_player_value_states([1])[1].match_count == 100
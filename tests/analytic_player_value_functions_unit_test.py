@@ -6,6 +6,8 @@ from typing import Any, cast
 import pytest
 
 from deps.analytic_player_value_functions import (
+    advance_player_value_state,
+    build_player_value_state,
     compute_all_player_values,
     compute_match_performance_score,
     compute_performance_metrics,
@@ -333,6 +335,51 @@ class TestComputeValueTimeDecayed:
         assert result_strong.value > result_weak.value
 
 
+class TestPlayerValueState:
+    def _history(self, count: int, **overrides):
+        return [
+            make_match(
+                id=i + 1,
+                match_uuid=f"m{i}",
+                match_timestamp=NOW - timedelta(days=count - i),
+                kill_count=4 + i % 9,
+                has_win=i % 3 != 0,
+                rank_points=2800 + 10 * i,
+                **overrides,
+            )
+            for i in range(count)
+        ]
+
+    def test_appending_matches_gives_the_rebuilt_state(self):
+        history = self._history(60)
+        state = build_player_value_state(history[:25])
+        assert advance_player_value_state(state, history[25:])
+        rebuilt = build_player_value_state(history)
+        assert state.elo.rating == pytest.approx(rebuilt.elo.rating)
+        assert state.time_decayed.decayed_peak == pytest.approx(rebuilt.time_decayed.decayed_peak)
+        assert state.time_decayed.weighted_kills == pytest.approx(rebuilt.time_decayed.weighted_kills)
+        assert (state.match_count, state.last_match_id, state.peak_rank_points) == (60, 60, 3390.0)
+
+    def test_match_older_than_the_state_is_rejected(self):
+        history = self._history(10)
+        state = build_player_value_state(history[5:])
+        assert not advance_player_value_state(state, history[:5])
+        assert state == build_player_value_state(history[5:])
+
+    def test_first_ranked_match_after_unranked_seed_is_rejected(self):
+        unranked = [make_match(id=1, match_uuid="u1", rank_points=0, match_timestamp=NOW - timedelta(days=3))]
+        ranked = [make_match(id=2, match_uuid="r1", rank_points=4000, match_timestamp=NOW - timedelta(days=2))]
+        state = build_player_value_state(unranked)
+        assert not advance_player_value_state(state, ranked)
+        assert build_player_value_state(unranked + ranked).elo.rating > 3900.0
+
+    def test_rollbacks_only_move_the_watermark(self):
+        state = build_player_value_state(self._history(5))
+        rollback = make_match(id=9, match_uuid="rb", is_rollback=True, match_timestamp=NOW - timedelta(days=30))
+        assert advance_player_value_state(state, [rollback])
+        assert (state.match_count, state.last_match_id) == (5, 9)
+
+
 class TestComputeAllPlayerValues:
     def test_returns_all_four_algorithms(self):
         matches_by_user = {
@@ -0,0 +1,134 @@
+"""Integration tests for the columnar snapshot shared by the report and analytics builders"""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from deps.analytic_data_access import insert_if_nonexistant_full_match_info, insert_user_activity, upsert_user_info
+from deps.analytic_leaderboard_data_access import (
+    data_access_fetch_user_outside_ranked_match_partners,
+    data_access_fetch_user_ranked_match_server_split_by_week,
+)
+from deps.analytic_snapshot import (
+    in_voice_mask,
+    iso_week_labels,
+    load_analytic_snapshot,
+    outside_ranked_match_partners,
+    ranked_server_split_by_week,
+)
+from deps.data_access_data_class import UserInfo
+from deps.system_database import DATABASE_NAME, DATABASE_NAME_TEST, EVENT_CONNECT, EVENT_DISCONNECT, database_manager
+from tests.analytic_player_value_functions_unit_test import make_match
+
+GUILD_ID = 9001
+CHANNEL_ID = 100
+START = datetime(2025, 3, 1, 20, 0, 0, tzinfo=timezone.utc)
+USERS = [UserInfo(user_id, f"user_{user_id}", None, f"ubi_{user_id}", None, "UTC", 0) for user_id in range(1, 5)]
+
+
+@pytest.fixture(autouse=True)
+def setup_and_teardown():
+    """Setup and Teardown for the test"""
+    database_manager.set_database_name(DATABASE_NAME_TEST)
+    database_manager.drop_all_tables()
+    database_manager.init_database()
+    for user in USERS:
+        upsert_user_info(user.id, user.display_name, None, None, None, user.time_zone, 0)
+
+    yield
+
+    database_manager.set_database_name(DATABASE_NAME)
+
+
+def _voice(user_id: int, start: datetime, end: datetime, guild_id: int = GUILD_ID) -> None:
+    insert_user_activity(user_id, f"user_{user_id}", CHANNEL_ID, guild_id, EVENT_CONNECT, start)
+    insert_user_activity(user_id, f"user_{user_id}", CHANNEL_ID, guild_id, EVENT_DISCONNECT, end)
+
+
+def _play(match_uuid: str, timestamp: datetime, winners: list[int], losers: list[int], **overrides) -> None:
+    for user_id, has_win in [(user_id, True) for user_id in winners] + [(user_id, False) for user_id in losers]:
+        match = make_match(match_uuid=match_uuid, user_id=user_id, match_timestamp=timestamp, has_win=has_win)
+        for name, value in overrides.items():
+            setattr(match, name, value)
+        insert_if_nonexistant_full_match_info(USERS[user_id - 1], [match])
+
+
+def _seed_history() -> None:
+    _voice(1, START, START + timedelta(hours=2))
+    _voice(2, START + timedelta(days=10), START + timedelta(days=10, hours=1), guild_id=GUILD_ID + 1)
+    _play("in-voice", START + timedelta(hours=1), [1, 2], [])
+    _play("at-session-end", START + timedelta(hours=2), [1], [4])
+    _play("outside-win", START + timedelta(days=1), [1, 2], [3])
+    _play("outside-loss", START + timedelta(days=8), [], [1, 3])
+    _play("outside-loss-2", START + timedelta(days=9), [], [1, 3, 2])
+    _play("casual", START + timedelta(days=1, hours=2), [1, 2], [], session_type="Standard")
+    _play("rollback", START + timedelta(days=2), [1, 4], [], is_rollback=True)
+
+
+def test_snapshot_columns_are_time_ordered_and_sliced_half_open():
+    """Rows come sorted by time, between() keeps [start, end) and ranked() drops casual and rollback rows"""
+    _seed_history()
+
+    snapshot = load_analytic_snapshot(START - timedelta(days=1), START + timedelta(days=30))
+    matches = snapshot.matches
+
+    assert np.all(np.diff(matches.timestamp) >= 0)
+    assert len(matches) == 16
+    assert len(matches.ranked()) == 12
+    assert len(np.unique(matches.match_index)) == 7
+    assert len(matches.between(START + timedelta(hours=2), START + timedelta(days=8))) == 9
+    assert snapshot.display_names[3] == "user_3"
+    assert len(snapshot.voice) == 2
+    assert snapshot.voice.seconds.tolist() == [7200.0, 3600.0]
+    assert len(snapshot.activity) == 0
+
+
+def test_snapshot_filters_guild_and_users():
+    """The voice sessions of another guild and the rows of unrequested users are not loaded"""
+    _seed_history()
+
+    snapshot = load_analytic_snapshot(
+        START - timedelta(days=1), START + timedelta(days=30), guild_id=GUILD_ID, user_ids=[2, 3]
+    )
+
+    assert len(snapshot.voice) == 0
+    assert set(snapshot.matches.user_id.tolist()) == {2, 3}
+
+
+def test_in_voice_mask_includes_the_session_bounds():
+    """A match at the exact end of a voice session is in server voice"""
+    _seed_history()
+    snapshot = load_analytic_snapshot(START - timedelta(days=1), START + timedelta(days=30))
+    ranked = snapshot.matches.ranked()
+
+    in_voice = in_voice_mask(ranked, snapshot.voice)
+
+    assert list(zip(ranked.user_id[in_voice].tolist(), ranked.timestamp[in_voice].tolist())) == [
+        (1, (START + timedelta(hours=1)).timestamp()),
+        (1, (START + timedelta(hours=2)).timestamp()),
+    ]
+
+
+def test_ranked_aggregates_match_the_sql_queries():
+    """The week split and the outside partners computed on the snapshot equal the per-user SQL queries"""
+    _seed_history()
+    from_date, to_date = START - timedelta(days=1), START + timedelta(days=30)
+    snapshot = load_analytic_snapshot(from_date, to_date)
+    ranked = snapshot.matches.ranked()
+    in_voice = in_voice_mask(ranked, snapshot.voice)
+
+    for user in USERS:
+        assert ranked_server_split_by_week(ranked, in_voice, user.id) == [
+            tuple(row) for row in data_access_fetch_user_ranked_match_server_split_by_week(user.id, from_date, to_date)
+        ]
+        assert outside_ranked_match_partners(ranked, in_voice, user.id, 5, snapshot.display_names) == [
+            tuple(row) for row in data_access_fetch_user_outside_ranked_match_partners(user.id, from_date, to_date, 5)
+        ]
+
+
+def test_iso_week_labels_use_the_iso_year():
+    """The last days of December can belong to the first ISO week of the next year"""
+    days = [datetime(2024, 12, 30, tzinfo=timezone.utc), datetime(2027, 1, 2, 23, 59, tzinfo=timezone.utc)]
+
+    assert iso_week_labels(np.array([day.timestamp() for day in days])).tolist() == ["2025-W01", "2026-W53"]
@@ -0,0 +1,79 @@
+"""Unit tests for the incremental match fetch of the browser"""
+
+import copy
+import json
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from deps.browser_config import BrowserConfig
+from deps.browser_context_manager import BrowserContextManager
+from deps.functions_r6_tracker import parse_json_from_full_matches
+from deps.models import MatchHighWaterMark, UserQueueForStats
+from tests.mock_model import mock_user1
+
+
+def _pages() -> tuple[dict, dict]:
+    """Split the 20 matches of the asset in two pages of 10 linked by the next cursor"""
+    with open("./tests/tests_assets/player_rank_history.json", "r", encoding="utf8") as file:
+        data = json.loads(file.read())
+    first_page = copy.deepcopy(data)
+    first_page["data"]["matches"] = data["data"]["matches"][:10]
+    first_page["data"]["metadata"] = {"next": 1}
+    second_page = copy.deepcopy(data)
+    second_page["data"]["matches"] = data["data"]["matches"][10:]
+    second_page["data"]["metadata"] = {"next": None}
+    return first_page, second_page
+
+
+def _high_water_mark(match: dict) -> MatchHighWaterMark:
+    return MatchHighWaterMark(
+        mock_user1.id,
+        match["attributes"]["id"],
+        datetime.fromisoformat(match["metadata"]["timestamp"]),
+    )
+
+
+def _download(pages: tuple[dict, ...], high_water_mark, max_pages: int = 3):
+    manager = BrowserContextManager(config=BrowserConfig(match_fetch_max_pages=max_pages))
+    user_queue = UserQueueForStats(mock_user1, 100, datetime.now(timezone.utc))
+    with patch.object(manager, "_download_matches_page", side_effect=list(pages)) as mock_page:
+        matches = manager.download_full_matches(user_queue, high_water_mark)
+    return matches, mock_page
+
+
+def test_stops_on_the_first_page_when_a_known_match_is_reached():
+    """The next page is not downloaded when the first page already reaches the stored matches"""
+    first_page, second_page = _pages()
+    matches, mock_page = _download((first_page, second_page), _high_water_mark(first_page["data"]["matches"][4]))
+    assert mock_page.call_count == 1
+    expected = parse_json_from_full_matches(first_page, mock_user1)[:4]
+    assert [match.match_uuid for match in matches] == [match.match_uuid for match in expected]
+
+
+def test_follows_the_next_page_while_every_match_is_new():
+    """A page of new matches only leads to the next page, which is trimmed at the stored match"""
+    first_page, second_page = _pages()
+    matches, mock_page = _download((first_page, second_page), _high_water_mark(second_page["data"]["matches"][2]))
+    assert mock_page.call_count == 2
+    assert mock_page.call_args_list[1].args[0].endswith("&next=1")
+    expected_first = parse_json_from_full_matches(first_page, mock_user1)
+    expected_second = parse_json_from_full_matches(second_page, mock_user1)[:2]
+    assert [match.match_uuid for match in matches] == [match.match_uuid for match in expected_first + expected_second]
+
+
+def test_page_limit_bounds_the_download():
+    """The number of pages followed is capped by the configuration"""
+    first_page, second_page = _pages()
+    matches, mock_page = _download(
+        (first_page, second_page), _high_water_mark(second_page["data"]["matches"][2]), max_pages=1
+    )
+    assert mock_page.call_count == 1
+    assert len(matches) == len(parse_json_from_full_matches(first_page, mock_user1))
+
+
+def test_without_high_water_mark_only_the_first_page_is_parsed():
+    """The historical behavior: one page, every match parsed"""
+    first_page, second_page = _pages()
+    matches, mock_page = _download((first_page, second_page), None)
+    assert mock_page.call_count == 1
+    assert len(matches) == len(parse_json_from_full_matches(first_page, mock_user1))
@@ -39,7 +39,7 @@ def test_lock_timeout_raises_contention_without_circuit_breaker_failure():
 def test_download_full_matches_returns_empty_on_lock_contention():
     """Lock contention aborts the batch quietly so the users stay queued for the next cycle"""
     user_queue = UserQueueForStats(mock_user1, 100, datetime.now(timezone.utc))
-    with patch("deps.browser.BrowserContextManager") as mock_cm:
-        mock_cm.return_value.__enter__.side_effect = BrowserLockContentionException("busy")
+    with patch("deps.browser.browser_pool.lease") as mock_lease:
+        mock_lease.return_value.__enter__.side_effect = BrowserLockContentionException("busy")
         result = download_full_matches([user_queue])
     assert result == []
@@ -0,0 +1,170 @@
+"""Unit tests for the warm browser pool"""
+
+import os
+import subprocess
+import sys
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from deps.browser_circuit_breaker import BrowserCircuitBreaker
+from deps.browser_config import BrowserConfig
+from deps.browser_context_manager import kill_orphaned_browsers
+from deps.browser_exceptions import BrowserException, BrowserLockContentionException, CircuitBreakerOpenException
+from deps.browser_pool import BrowserPool
+
+
+def _fake_context(_config):
+    context = MagicMock()
+    context.counter = 0
+    context.started_at = None
+    context.is_alive.return_value = True
+    return context
+
+
+@pytest.fixture(name="breaker")
+def fixture_breaker():
+    """A fresh breaker so the tests do not share the failures of the module singleton"""
+    breaker = BrowserCircuitBreaker(failure_threshold=2, timeout_seconds=300)
+    with patch("deps.browser_pool.get_shared_circuit_breaker", return_value=breaker):
+        yield breaker
+
+
+def _pool(**config_values) -> BrowserPool:
+    return BrowserPool(config=BrowserConfig(**config_values), context_factory=_fake_context)
+
+
+def test_lease_reuses_the_warm_browser(breaker):
+    """The second lease gets the browser started by the first one"""
+    pool = _pool()
+    with pool.lease() as first:
+        pass
+    with pool.lease() as second:
+        pass
+    assert first is second
+    first.__enter__.assert_called_once()
+    first.__exit__.assert_not_called()
+    assert pool.live_count() == 1
+    assert breaker.get_stats()["total_successes"] == 2
+
+
+def test_browser_recycled_after_max_requests(breaker):
+    """A browser that served its quota of requests is closed and replaced"""
+    pool = _pool(pool_max_requests_per_browser=3)
+    with pool.lease() as first:
+        first.counter = 3
+    first.__exit__.assert_called_once()
+    with pool.lease() as second:
+        pass
+    assert second is not first
+    assert pool.live_count() == 1
+
+
+def test_failed_health_check_replaces_the_browser(breaker):
+    """An idle browser that no longer answers is not leased again"""
+    pool = _pool()
+    with pool.lease() as first:
+        pass
+    first.is_alive.return_value = False
+    with pool.lease() as second:
+        pass
+    assert second is not first
+    first.__exit__.assert_called_once()
+
+
+def test_driver_failure_evicts_and_records_circuit_failure(breaker):
+    """An unexpected error in the lease closes the browser and counts as a circuit breaker failure"""
+    pool = _pool()
+    with pytest.raises(RuntimeError):
+        with pool.lease() as context:
+            raise RuntimeError("invalid session id")
+    context.__exit__.assert_called_once()
+    assert pool.live_count() == 0
+    assert breaker.get_stats()["consecutive_failures"] == 1
+
+
+def test_job_error_keeps_the_browser(breaker):
+    """A BrowserException of one page (missing JSON) keeps the browser warm"""
+    pool = _pool()
+    with pytest.raises(BrowserException):
+        with pool.lease() as first:
+            raise BrowserException("JSON data not found")
+    with pool.lease() as second:
+        pass
+    assert first is second
+    assert breaker.get_stats()["total_failures"] == 0
+
+
+def test_open_circuit_evicts_idle_browsers(breaker):
+    """Once the circuit opens, the idle browsers are closed and no lease is given"""
+    pool = _pool()
+    with pool.lease() as context:
+        pass
+    breaker.record_failure(Exception("boom"))
+    breaker.record_failure(Exception("boom"))
+    with pytest.raises(CircuitBreakerOpenException):
+        with pool.lease():
+            pass
+    context.__exit__.assert_called_once()
+    assert pool.live_count() == 0
+
+
+def test_lease_times_out_when_every_browser_is_busy(breaker):
+    """A caller waiting longer than the lease timeout gets a contention error"""
+    pool = _pool(pool_size=1)
+    leased = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with pool.lease():
+            leased.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    leased.wait(5)
+    with pytest.raises(BrowserLockContentionException):
+        with pool.lease(timeout_seconds=0.05):
+            pass
+    release.set()
+    holder.join()
+    assert pool.live_count() == 1
+
+
+def test_reap_idle_closes_idle_browsers(breaker):
+    """Browsers idle past the idle timeout are closed by the reaper"""
+    pool = _pool(pool_idle_timeout_seconds=600)
+    with patch("deps.browser_pool.time.monotonic", return_value=1000):
+        with pool.lease() as context:
+            pass
+    with patch("deps.browser_pool.time.monotonic", return_value=1500):
+        assert pool.reap_idle() == 0
+    with patch("deps.browser_pool.time.monotonic", return_value=1601):
+        assert pool.reap_idle() == 1
+    context.__exit__.assert_called_once()
+    assert pool.live_count() == 0
+
+
+def test_orphan_cleanup_only_kills_the_browsers_of_dead_processes(tmp_path):
+    """The browsers of another running scraping process are kept, the ones of a crashed process are killed"""
+    dead_owner = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead_owner.wait()
+    orphan_profile = tmp_path / f"chrome_profile_{dead_owner.pid}_orphan"
+    live_profile = tmp_path / f"chrome_profile_{os.getpid()}_live"
+    orphan_profile.mkdir()
+    live_profile.mkdir()
+    sleeper = [sys.executable, "-c", "import time; time.sleep(30)"]
+    orphan = subprocess.Popen(sleeper + [f"--user-data-dir={orphan_profile}"])
+    live = subprocess.Popen(sleeper + [f"--user-data-dir={live_profile}"])
+    try:
+        assert kill_orphaned_browsers(str(tmp_path)) == 1
+        assert orphan.wait(timeout=5) != 0
+        assert live.poll() is None
+        assert not orphan_profile.exists()
+        assert live_profile.exists()
+    finally:
+        orphan.kill()
+        live.kill()
+        orphan.wait()
+        live.wait()
@@ -0,0 +1,83 @@
+"""Unit tests for the persistent cache binary codec"""
+
+import base64
+from datetime import datetime, timezone
+import dill  # type: ignore
+import pytest
+from deps.cache_codec import (
+    TAG_INT_LIST,
+    TAG_PICKLE,
+    TAG_REACTION_VOTES,
+    TAG_SIMPLE_USER_HOUR,
+    decode_value,
+    encode_value,
+)
+from deps.models import SimpleUser, SimpleUserHour
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        None,
+        True,
+        False,
+        0,
+        -42,
+        2**63 - 1,
+        2**70,
+        1.5,
+        "",
+        "héllo",
+        [],
+        [1, 2, 3],
+        datetime(2025, 3, 1, 20, 0, tzinfo=timezone.utc),
+        (1, "a"),
+        {"a": 1},
+    ],
+)
+def test_round_trip_scalars_and_containers(value):
+    """Values decode back to an equal value of the same type"""
+    decoded = decode_value(encode_value(value))
+    assert decoded == value
+    assert type(decoded) is type(value)  # pylint: disable=unidiomatic-typecheck
+
+
+def test_int_list_uses_struct_encoding():
+    """A list of ids is stored as packed 64-bit integers"""
+    encoded = encode_value([10, 20, 30])
+    assert encoded[0] == TAG_INT_LIST
+    assert len(encoded) == 1 + 3 * 8
+
+
+def test_reaction_votes_round_trip():
+    """The schedule votes keep their hours, users order and user fields"""
+    votes = {"3pm": [SimpleUser(1, "one", "gold"), SimpleUser(2, "two", "")], "4pm": []}
+    encoded = encode_value(votes)
+    decoded = decode_value(encoded)
+    assert encoded[0] == TAG_REACTION_VOTES
+    assert list(decoded.keys()) == ["3pm", "4pm"]
+    assert [(u.user_id, u.display_name, u.rank_emoji) for u in decoded["3pm"]] == [(1, "one", "gold"), (2, "two", "")]
+    assert decoded["4pm"] == []
+
+
+def test_simple_user_hour_round_trip():
+    """SimpleUserHour is encoded with its nested user"""
+    encoded = encode_value(SimpleUserHour(SimpleUser(5, "five", "diamond"), "9pm"))
+    decoded = decode_value(encoded)
+    assert encoded[0] == TAG_SIMPLE_USER_HOUR
+    assert decoded.simple_user.user_id == 5
+    assert decoded.hour == "9pm"
+
+
+def test_unknown_object_falls_back_to_pickle():
+    """Objects without a dedicated codec are pickled"""
+    value = {"a": [SimpleUser(1, "one", "gold")], "b": 3}
+    encoded = encode_value(value)
+    assert encoded[0] == TAG_PICKLE
+    assert decode_value(encoded)["b"] == 3
+
+
+def test_legacy_base64_dill_value_is_decoded():
+    """Rows written before the codec are still readable"""
+    legacy = base64.b64encode(dill.dumps({"x": [1, 2]})).decode("utf-8")
+    assert decode_value(legacy) == {"x": [1, 2]}
@@ -1,8 +1,15 @@
 """Integration tests about the cache"""
 
+import base64
+import threading
 import time
+from unittest.mock import patch
+import dill  # type: ignore
 import pytest
-from deps.cache import set_cache
+from deps.cache import get_cache, get_persistent_cache_with_presence, remove_cache, set_cache
+from deps.cache_data_access import get_value, set_values
+from deps.cache_write_behind import persistent_cache_write_behind
+from deps.models import SimpleUser
 from deps.system_database import DATABASE_NAME, DATABASE_NAME_TEST, database_manager
 
 
@@ -41,3 +48,80 @@ def test_set_cache_performance_memory():
     end = time.perf_counter()
     elapsed = (end - start) * 1000
     assert elapsed < 5
+
+
+def test_legacy_cache_rows_are_migrated_to_binary():
+    """Rows written as base64 dill TEXT are re-encoded as BLOB and keep their value"""
+    legacy_value = base64.b64encode(dill.dumps([SimpleUser(1, "user_1", "gold")])).decode("utf-8")
+    database_manager.get_cursor().execute(
+        "INSERT INTO cache(key, value, expiration) VALUES (?, ?, NULL)", ("legacy_key", legacy_value)
+    )
+    database_manager.get_conn().commit()
+    assert get_value("legacy_key")[0].display_name == "user_1"
+
+    database_manager.init_database()
+
+    row = database_manager.get_cursor().execute("SELECT typeof(value) FROM cache WHERE key = 'legacy_key'").fetchone()
+    assert row[0] == "blob"
+    assert get_value("legacy_key")[0].display_name == "user_1"
+
+
+def test_write_behind_batches_persistent_sets_in_one_flush():
+    """With write-behind on, values are read from the overlay then written by a single flush"""
+    persistent_cache_write_behind.start(flush_interval_ms=60_000, max_pending_keys=10_000)
+    try:
+        flush_count = persistent_cache_write_behind.flush_count
+        for i in range(50):
+            set_cache(False, f"write_behind_{i}", i, 60)
+        assert get_value("write_behind_7") is None
+        assert get_persistent_cache_with_presence("write_behind_7") == (True, 7)
+
+        remove_cache(False, "write_behind_8")
+        persistent_cache_write_behind.stop()
+
+        assert persistent_cache_write_behind.flush_count == flush_count + 1
+        assert get_value("write_behind_7") == 7
+        assert get_persistent_cache_with_presence("write_behind_8") == (False, None)
+    finally:
+        persistent_cache_write_behind.stop()
+
+
+def test_write_behind_remove_during_flush_is_not_written_back():
+    """A key removed while its flush is writing waits for the flush, the row does not come back"""
+    persistent_cache_write_behind.start(flush_interval_ms=60_000, max_pending_keys=10_000)
+    writing = threading.Event()
+    release = threading.Event()
+
+    def slow_set_values(values):
+        writing.set()
+        release.wait(timeout=5)
+        return set_values(values)
+
+    try:
+        set_cache(False, "write_behind_removed", "stale", 60)
+        with patch("deps.cache_write_behind.set_values", side_effect=slow_set_values):
+            flush_thread = threading.Thread(target=persistent_cache_write_behind.flush)
+            flush_thread.start()
+            assert writing.wait(timeout=5)
+            remove_thread = threading.Thread(target=remove_cache, args=(False, "write_behind_removed"))
+            remove_thread.start()
+            remove_thread.join(timeout=0.5)
+            release.set()
+            flush_thread.join()
+            remove_thread.join()
+        assert get_value("write_behind_removed") is None
+    finally:
+        release.set()
+        persistent_cache_write_behind.stop()
+
+
+async def test_write_behind_get_cache_reads_pending_value():
+    """get_cache does not read the older database value of a key waiting to be flushed"""
+    set_cache(False, "write_behind_key", "old", 60)
+    persistent_cache_write_behind.start(flush_interval_ms=60_000, max_pending_keys=10_000)
+    try:
+        set_cache(False, "write_behind_key", "new", 60)
+        assert await get_cache(False, "write_behind_key") == "new"
+    finally:
+        persistent_cache_write_behind.stop()
+    assert get_value("write_behind_key") == "new"
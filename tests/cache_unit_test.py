@@ -0,0 +1,205 @@
+"""Unit tests for the bounded in-memory cache"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+import pytest
+from deps.cache import ABSENT, TTLCache, get_cache, memoryCache, remove_negative_cache, set_cache
+
+
+def test_get_returns_value_before_expiry():
+    """A value is available until its TTL elapses"""
+    cache = TTLCache()
+    with patch("deps.cache.time.time", return_value=1000):
+        cache.set("Message:1", "value", 10)
+    with patch("deps.cache.time.time", return_value=1009):
+        assert cache.get("Message:1") == "value"
+    with patch("deps.cache.time.time", return_value=1011):
+        assert cache.get("Message:1") is None
+    assert len(cache) == 0
+
+
+def test_expired_entries_are_purged_without_being_read():
+    """Expired entries leave the cache when any other key is accessed"""
+    cache = TTLCache()
+    with patch("deps.cache.time.time", return_value=1000):
+        cache.set("Message:1", "short", 5)
+        cache.set("Message:2", "long", 500)
+    with patch("deps.cache.time.time", return_value=1010):
+        assert cache.get("Message:2") == "long"
+    assert "Message:1" not in cache.cache
+
+
+def test_overwritten_key_keeps_latest_expiry():
+    """Setting a key again replaces its expiry instead of expiring with the old one"""
+    cache = TTLCache()
+    with patch("deps.cache.time.time", return_value=1000):
+        cache.set("User:1", "old", 5)
+        cache.set("User:1", "new", 100)
+    with patch("deps.cache.time.time", return_value=1010):
+        assert cache.get("User:1") == "new"
+
+
+def test_max_entries_evicts_least_recently_used():
+    """The least recently read key is evicted first"""
+    cache = TTLCache(max_entries=2)
+    cache.set("A:1", 1)
+    cache.set("A:2", 2)
+    cache.get("A:1")
+    cache.set("A:3", 3)
+    assert cache.get("A:1") == 1
+    assert cache.get("A:2") is None
+    assert cache.get("A:3") == 3
+
+
+def test_byte_budget_evicts_entries():
+    """The approximate byte budget bounds the cache"""
+    cache = TTLCache(max_bytes=2000)
+    for i in range(10):
+        cache.set(f"Blob:{i}", "x" * 500)
+    assert cache.current_bytes <= 2000
+    assert cache.get("Blob:9") is not None
+    assert cache.get("Blob:0") is None
+
+
+def test_namespace_limit_only_evicts_its_namespace():
+    """A namespace limit evicts within the namespace and leaves the other keys alone"""
+    cache = TTLCache()
+    cache.set_namespace_limit("Message", 2)
+    cache.set("Member:1:1", "member")
+    for i in range(5):
+        cache.set(f"Message:1:1:{i}", i)
+    assert [key for key in cache.cache if key.startswith("Message:")] == ["Message:1:1:3", "Message:1:1:4"]
+    assert cache.get("Member:1:1") == "member"
+
+
+def test_delete_by_prefix_updates_accounting():
+    """Deleting by prefix removes the entries and their byte accounting"""
+    cache = TTLCache()
+    cache.set("Guild:1", "a")
+    cache.set("Guild:2", "b")
+    cache.set("Member:1:1", "c")
+    assert cache.delete_by_prefix("Guild:") == 2
+    assert len(cache) == 1
+    cache.delete("Member:1:1")
+    assert cache.current_bytes == 0
+
+
+async def test_get_cache_concurrent_misses_share_one_fetch():
+    """Concurrent misses on the same key await a single fetch"""
+    memoryCache.delete("SingleFlight:1")
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "value"
+
+    results = await asyncio.gather(*[get_cache(True, "SingleFlight:1", fetch) for _ in range(10)])
+    assert results == ["value"] * 10
+    assert calls == 1
+    memoryCache.delete("SingleFlight:1")
+
+
+async def test_get_cache_fetch_exception_reaches_every_waiter():
+    """A failing fetch raises on every coalesced caller and is retried on the next miss"""
+    memoryCache.delete("SingleFlight:2")
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    results = await asyncio.gather(
+        *[get_cache(True, "SingleFlight:2", fetch) for _ in range(3)], return_exceptions=True
+    )
+    assert all(isinstance(result, ValueError) for result in results)
+    assert await get_cache(True, "SingleFlight:2", AsyncMock(return_value="ok")) == "ok"
+    memoryCache.delete("SingleFlight:2")
+
+
+async def test_get_cache_cancelled_first_caller_does_not_cancel_the_waiters():
+    """The caller that started the fetch is cancelled, the other callers still get the value"""
+    memoryCache.delete("SingleFlight:5")
+    release = asyncio.Event()
+
+    async def fetch():
+        await release.wait()
+        return "value"
+
+    leader = asyncio.create_task(get_cache(True, "SingleFlight:5", fetch))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(get_cache(True, "SingleFlight:5", fetch))
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await waiter == "value"
+    assert leader.cancelled()
+    assert memoryCache.get("SingleFlight:5") == "value"
+    memoryCache.delete("SingleFlight:5")
+
+
+async def test_get_cache_sync_fetch_runs_on_database_reader():
+    """Sync fetchers are offloaded to the database gateway reader pool"""
+    memoryCache.delete("SingleFlight:3")
+    with patch("deps.cache.database_gateway.read", new_callable=AsyncMock, return_value="db") as mock_read:
+        assert await get_cache(True, "SingleFlight:3", lambda: "db") == "db"
+    mock_read.assert_awaited_once()
+    memoryCache.delete("SingleFlight:3")
+
+
+@pytest.mark.parametrize("random_value, expect_refresh", [(1e-9, True), (1.0, False)])
+async def test_get_cache_early_refresh(random_value, expect_refresh):
+    """A hit close to the expiry of a slow key refreshes it in the background"""
+    memoryCache.set("SingleFlight:4", "old", 10, fetch_seconds=1.0)
+    fetch = AsyncMock(return_value="new")
+    with patch("deps.cache.random.random", return_value=random_value):
+        assert await get_cache(True, "SingleFlight:4", fetch, early_refresh_beta=1.0) == "old"
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    assert fetch.await_count == (1 if expect_refresh else 0)
+    assert memoryCache.get("SingleFlight:4") == ("new" if expect_refresh else "old")
+    memoryCache.delete("SingleFlight:4")
+
+
+@pytest.mark.parametrize("empty_value", [None, False, 0, []])
+async def test_get_cache_negative_entry_skips_fetch(empty_value):
+    """An empty result is remembered with the negative TTL instead of being fetched again"""
+    memoryCache.delete("Negative:1")
+    fetch = AsyncMock(return_value=empty_value)
+    for _ in range(3):
+        assert await get_cache(True, "Negative:1", fetch, negative_ttl_in_seconds=30) == empty_value
+    assert fetch.await_count == 1
+    memoryCache.delete("Negative:1")
+
+
+async def test_get_cache_without_negative_ttl_refetches_empty_values():
+    """Without a negative TTL, empty results are not cached (historical behavior)"""
+    memoryCache.delete("Negative:2")
+    fetch = AsyncMock(return_value=None)
+    await get_cache(True, "Negative:2", fetch)
+    await get_cache(True, "Negative:2", fetch)
+    assert fetch.await_count == 2
+
+
+async def test_remove_negative_cache_keeps_positive_values():
+    """Only ABSENT markers are dropped by remove_negative_cache"""
+    memoryCache.set("Negative:3", ABSENT, 30)
+    remove_negative_cache(True, "Negative:3")
+    assert memoryCache.get("Negative:3") is None
+    memoryCache.set("Negative:3", "value", 30)
+    remove_negative_cache(True, "Negative:3")
+    assert memoryCache.get("Negative:3") == "value"
+    memoryCache.delete("Negative:3")
+
+
+async def test_persistent_absent_key_is_not_read_again_until_set():
+    """A missing persistent key is remembered in memory until set_cache writes it"""
+    with patch("deps.cache.get_value", return_value=None) as mock_get_value, patch("deps.cache.set_value"):
+        assert await get_cache(False, "NegativePersistent:1", negative_ttl_in_seconds=30) is None
+        assert await get_cache(False, "NegativePersistent:1", negative_ttl_in_seconds=30) is None
+        assert mock_get_value.call_count == 1
+        set_cache(False, "NegativePersistent:1", "configured")
+        mock_get_value.return_value = "configured"
+        assert await get_cache(False, "NegativePersistent:1", negative_ttl_in_seconds=30) == "configured"
@@ -4,23 +4,33 @@ Data Access Unit Tests using pytest
 
 from unittest.mock import patch
 import asyncio
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import pytest
-from deps.cache import remove_cache, set_cache
+from deps.analytic_data_access import upsert_user_info
+from deps.cache import set_cache
 from deps.data_access import (
-    KEY_QUEUE_USER_STATS,
+    KEY_GUILD_MAIN_TEXT_CHANNEL,
     data_access_add_list_member_stats,
+    data_access_claim_due_member_stats,
+    data_access_get_guild_active_private_channels,
+    data_access_get_guild_config,
+    data_access_get_guild_voice_channel_ids,
     data_access_get_list_member_stats,
+    data_access_get_main_text_channel_id,
     data_access_get_r6tracker_max_rank,
     data_access_increment_member_stats_attempts,
+    data_access_reset_guild_cache,
+    data_access_set_guild_voice_channel_ids,
+    data_access_set_main_text_channel_id,
+    data_access_wait_for_due_member_stats,
     data_acess_remove_list_member_stats,
 )
 from deps.browser_exceptions import BrowserStartupException, CircuitBreakerOpenException
 from deps.models import UserQueueForStats
+from deps.scrape_scheduler import scrape_scheduler
 from deps.system_database import DATABASE_NAME, DATABASE_NAME_TEST, database_manager
 from tests.mock_model import mock_user1, mock_user2
 
-lock = asyncio.Lock()
 DELAY_SECOND = 5  # Delay to avoid rate limiting
 
 
@@ -30,6 +40,9 @@ async def get_r6tracker_max_rank_or_skip(ubisoft_user_name: str) -> tuple[str, i
         return await data_access_get_r6tracker_max_rank(ubisoft_user_name, True)
     except (BrowserStartupException, CircuitBreakerOpenException) as e:
         pytest.skip(f"Live R6 Tracker browser integration unavailable: {e}")
+    finally:
+        # The scrape workers belong to the loop of this test
+        await scrape_scheduler.stop()
 
 
 @pytest.fixture(autouse=True)
@@ -49,8 +62,17 @@ def setup_and_teardown():
 
 @pytest.fixture(scope="function", autouse=True)
 def setup_function():
-    """Setup function"""
-    remove_cache(True, KEY_QUEUE_USER_STATS)
+    """Setup function: the queued users must exist in user_info"""
+    for user in (mock_user1, mock_user2):
+        upsert_user_info(
+            user.id,
+            user.display_name,
+            user.ubisoft_username_max,
+            user.ubisoft_username_active,
+            user.r6_tracker_active_id,
+            user.time_zone,
+            user.max_mmr,
+        )
 
 
 @pytest.mark.no_parallel
@@ -58,21 +80,32 @@ def setup_function():
 @patch("deps.data_access.datetime")
 async def test_adding_two_members_stat_within_a_minute(mock_datetime):
     """Test adding two members stats within a minute"""
-    async with lock:
-        remove_cache(False, KEY_QUEUE_USER_STATS)
-        time1 = datetime(2024, 11, 25, 11, 30, 0, tzinfo=timezone.utc)
-        mock_datetime.now.return_value = time1
-        user1 = UserQueueForStats(mock_user1, "Diamond", time1)
-        await data_access_add_list_member_stats(user1)
+    time1 = datetime(2024, 11, 25, 11, 30, 0, tzinfo=timezone.utc)
+    mock_datetime.now.return_value = time1
+    user1 = UserQueueForStats(mock_user1, 100, time1)
+    await data_access_add_list_member_stats(user1)
 
-        time2 = datetime(2024, 11, 25, 11, 31, 0, tzinfo=timezone.utc)
-        mock_datetime.now.return_value = time2
-        user2 = UserQueueForStats(mock_user2, "Diamond", time2)
-        await data_access_add_list_member_stats(user2)
+    time2 = datetime(2024, 11, 25, 11, 31, 0, tzinfo=timezone.utc)
+    mock_datetime.now.return_value = time2
+    user2 = UserQueueForStats(mock_user2, 100, time2)
+    await data_access_add_list_member_stats(user2)
 
-        list_users = await data_access_get_list_member_stats()
-        mock_datetime.now.assert_called()
-        assert len(list_users) == 2
+    list_users = await data_access_get_list_member_stats()
+    mock_datetime.now.assert_called()
+    assert list_users == [user1, user2]
+
+
+@pytest.mark.no_parallel
+@pytest.mark.asyncio
+async def test_adding_same_member_twice_keeps_first_entry():
+    """A user already queued for the guild keeps its place, another guild gets its own entry"""
+    time1 = datetime.now(timezone.utc)
+    await data_access_add_list_member_stats(UserQueueForStats(mock_user1, 100, time1))
+    await data_access_add_list_member_stats(UserQueueForStats(mock_user1, 100, time1 + timedelta(seconds=30)))
+    await data_access_add_list_member_stats(UserQueueForStats(mock_user1, 200, time1))
+
+    list_users = await data_access_get_list_member_stats()
+    assert [(user.guild_id, user.time_queue) for user in list_users] == [(100, time1), (200, time1)]
 
 
 @pytest.mark.no_parallel
@@ -80,43 +113,35 @@ async def test_adding_two_members_stat_within_a_minute(mock_datetime):
 @patch("deps.data_access.datetime")
 async def test_adding_two_members_stat_with_first_one_expired(mock_datetime):
     """Test adding two members stats with the first one expired"""
-    async with lock:
-        remove_cache(False, KEY_QUEUE_USER_STATS)
-        time1 = datetime(2024, 11, 25, 10, 0, 0, tzinfo=timezone.utc)
-        mock_datetime.now.return_value = time1
-        user1 = UserQueueForStats(mock_user1, "Diamond", time1)
-        await data_access_add_list_member_stats(user1)
+    time1 = datetime(2024, 11, 25, 10, 0, 0, tzinfo=timezone.utc)
+    mock_datetime.now.return_value = time1
+    user1 = UserQueueForStats(mock_user1, 100, time1)
+    await data_access_add_list_member_stats(user1)
 
-        time2 = datetime(2024, 11, 25, 11, 31, 0, tzinfo=timezone.utc)
-        mock_datetime.now.return_value = time2
-        user2 = UserQueueForStats(mock_user2, "Diamond", time2)
-        await data_access_add_list_member_stats(user2)
+    time2 = datetime(2024, 11, 25, 11, 31, 0, tzinfo=timezone.utc)
+    mock_datetime.now.return_value = time2
+    user2 = UserQueueForStats(mock_user2, 100, time2)
+    await data_access_add_list_member_stats(user2)
 
-        list_users = await data_access_get_list_member_stats()
-        mock_datetime.now.assert_called()
-        assert len(list_users) == 1
+    list_users = await data_access_get_list_member_stats()
+    mock_datetime.now.assert_called()
+    assert list_users == [user2]
 
 
 @pytest.mark.no_parallel
 @pytest.mark.asyncio
-@patch("deps.data_access.datetime")
-async def test_remove_expired_user(mock_datetime):
-    """Test removing an expired user"""
-    async with lock:
-        remove_cache(False, KEY_QUEUE_USER_STATS)
-        time1 = datetime(2024, 11, 25, 10, 0, 0, tzinfo=timezone.utc)
-        mock_datetime.now.return_value = time1
-        user1 = UserQueueForStats(mock_user1, "Diamond", time1)
-
-        time2 = datetime(2024, 11, 25, 10, 1, 0, tzinfo=timezone.utc)
-        mock_datetime.now.return_value = time2
-        user2 = UserQueueForStats(mock_user2, "Diamond", time2)
+async def test_remove_user():
+    """Test removing a user once the stats are sent"""
+    time1 = datetime.now(timezone.utc)
+    user1 = UserQueueForStats(mock_user1, 100, time1)
+    user2 = UserQueueForStats(mock_user2, 100, time1)
+    await data_access_add_list_member_stats(user1)
+    await data_access_add_list_member_stats(user2)
 
-        set_cache(True, KEY_QUEUE_USER_STATS, [user1, user2])
-        await data_acess_remove_list_member_stats(user1)  # Remove one user (we sent the stats)
+    await data_acess_remove_list_member_stats(user1)  # Remove one user (we sent the stats)
 
-        list_users = await data_access_get_list_member_stats()
-        assert len(list_users) == 1
+    list_users = await data_access_get_list_member_stats()
+    assert list_users == [user2]
 
 
 @pytest.mark.no_parallel
@@ -125,75 +150,106 @@ async def test_remove_expired_user(mock_datetime):
 @patch("deps.data_access.datetime")
 async def test_adding_member_stat_logs_warning_for_evicted_stale_entry(mock_datetime, mock_warning):
     """A stale entry (>1 hour) evicted on add is logged loudly since its stats were never posted"""
-    async with lock:
-        remove_cache(False, KEY_QUEUE_USER_STATS)
-        time1 = datetime(2024, 11, 25, 10, 0, 0, tzinfo=timezone.utc)
-        mock_datetime.now.return_value = time1
-        user1 = UserQueueForStats(mock_user1, "Diamond", time1)
-        await data_access_add_list_member_stats(user1)
+    time1 = datetime(2024, 11, 25, 10, 0, 0, tzinfo=timezone.utc)
+    mock_datetime.now.return_value = time1
+    user1 = UserQueueForStats(mock_user1, 100, time1)
+    await data_access_add_list_member_stats(user1)
+
+    time2 = datetime(2024, 11, 25, 11, 31, 0, tzinfo=timezone.utc)
+    mock_datetime.now.return_value = time2
+    user2 = UserQueueForStats(mock_user2, 100, time2)
+    await data_access_add_list_member_stats(user2)
+
+    list_users = await data_access_get_list_member_stats()
+    assert len(list_users) == 1
+    mock_warning.assert_called_once()
+    assert mock_user1.display_name in mock_warning.call_args[0][0]
+
 
-        time2 = datetime(2024, 11, 25, 11, 31, 0, tzinfo=timezone.utc)
-        mock_datetime.now.return_value = time2
-        user2 = UserQueueForStats(mock_user2, "Diamond", time2)
-        await data_access_add_list_member_stats(user2)
+@pytest.mark.no_parallel
+@pytest.mark.asyncio
+async def test_claim_only_takes_due_members_once():
+    """Members are due 2 minutes after being queued, a claimed member is hidden from the next claim"""
+    now = datetime.now(timezone.utc)
+    await data_access_add_list_member_stats(UserQueueForStats(mock_user1, 100, now - timedelta(minutes=3)))
+    await data_access_add_list_member_stats(UserQueueForStats(mock_user2, 100, now))
+
+    claimed = await data_access_claim_due_member_stats()
+    assert [user.user_info.id for user in claimed] == [mock_user1.id]
+    assert not await data_access_claim_due_member_stats()
 
-        list_users = await data_access_get_list_member_stats()
-        assert len(list_users) == 1
-        mock_warning.assert_called_once()
-        assert mock_user1.display_name in mock_warning.call_args[0][0]
+    # A direct request takes the members not due yet, but not the ones another run holds
+    claimed = await data_access_claim_due_member_stats(due_only=False)
+    assert [user.user_info.id for user in claimed] == [mock_user2.id]
+    assert len(await data_access_get_list_member_stats()) == 2
 
 
 @pytest.mark.no_parallel
 @pytest.mark.asyncio
 async def test_increment_attempts_only_touches_attempted_users():
     """Only the users that were attempted this cycle get their failure counter incremented"""
-    async with lock:
-        remove_cache(False, KEY_QUEUE_USER_STATS)
-        time1 = datetime.now(timezone.utc)
-        user1 = UserQueueForStats(mock_user1, 100, time1)
-        user2 = UserQueueForStats(mock_user2, 100, time1)
-        set_cache(True, KEY_QUEUE_USER_STATS, [user1, user2])
+    time1 = datetime.now(timezone.utc) - timedelta(minutes=5)
+    user1 = UserQueueForStats(mock_user1, 100, time1)
+    user2 = UserQueueForStats(mock_user2, 100, time1)
+    await data_access_add_list_member_stats(user1)
+    await data_access_add_list_member_stats(user2)
+    claimed = await data_access_claim_due_member_stats()
 
-        await data_access_increment_member_stats_attempts([user1], 5)
+    await data_access_increment_member_stats_attempts([user1], 5)
 
-        list_users = await data_access_get_list_member_stats()
-        assert len(list_users) == 2
-        attempts_by_id = {user.user_info.id: user.attempts for user in list_users}
-        assert attempts_by_id[mock_user1.id] == 1
-        assert attempts_by_id[mock_user2.id] == 0
+    list_users = await data_access_get_list_member_stats()
+    assert len(claimed) == 2 and len(list_users) == 2
+    attempts_by_id = {user.user_info.id: user.attempts for user in list_users}
+    assert attempts_by_id[mock_user1.id] == 1
+    assert attempts_by_id[mock_user2.id] == 0
+    # The failed user is retried a few minutes later, the other one is still held by the run
+    assert not await data_access_claim_due_member_stats()
 
 
 @pytest.mark.no_parallel
 @pytest.mark.asyncio
 async def test_increment_attempts_drops_user_after_max_attempts():
     """A user failing max_attempts cycles is removed from the queue"""
-    async with lock:
-        remove_cache(False, KEY_QUEUE_USER_STATS)
-        time1 = datetime.now(timezone.utc)
-        user1 = UserQueueForStats(mock_user1, 100, time1)
-        user2 = UserQueueForStats(mock_user2, 100, time1)
-        set_cache(True, KEY_QUEUE_USER_STATS, [user1, user2])
+    time1 = datetime.now(timezone.utc)
+    user1 = UserQueueForStats(mock_user1, 100, time1)
+    user2 = UserQueueForStats(mock_user2, 100, time1)
+    await data_access_add_list_member_stats(user1)
+    await data_access_add_list_member_stats(user2)
 
-        await data_access_increment_member_stats_attempts([user1], 2)
-        list_users = await data_access_get_list_member_stats()
-        assert len(list_users) == 2  # First failure: still queued
+    await data_access_increment_member_stats_attempts([user1], 2)
+    list_users = await data_access_get_list_member_stats()
+    assert len(list_users) == 2  # First failure: still queued
 
-        await data_access_increment_member_stats_attempts([user1], 2)
-        list_users = await data_access_get_list_member_stats()
-        assert len(list_users) == 1  # Second failure: dropped
-        assert list_users[0].user_info.id == mock_user2.id
+    await data_access_increment_member_stats_attempts([user1], 2)
+    list_users = await data_access_get_list_member_stats()
+    assert len(list_users) == 1  # Second failure: dropped
+    assert list_users[0].user_info.id == mock_user2.id
 
 
 @pytest.mark.no_parallel
 @pytest.mark.asyncio
 async def test_increment_attempts_with_empty_queue_does_nothing():
     """Incrementing attempts on an empty queue is a no-op"""
-    async with lock:
-        remove_cache(True, KEY_QUEUE_USER_STATS)
-        user1 = UserQueueForStats(mock_user1, 100, datetime.now(timezone.utc))
-        await data_access_increment_member_stats_attempts([user1], 5)
-        list_users = await data_access_get_list_member_stats()
-        assert list_users is None or len(list_users) == 0
+    user1 = UserQueueForStats(mock_user1, 100, datetime.now(timezone.utc))
+    await data_access_increment_member_stats_attempts([user1], 5)
+    list_users = await data_access_get_list_member_stats()
+    assert len(list_users) == 0
+
+
+@pytest.mark.no_parallel
+@pytest.mark.asyncio
+async def test_wait_for_due_members_wakes_up_when_a_member_is_queued():
+    """The stats loop sleeps on an empty queue until a member is queued, then until the member is due"""
+    waiter = asyncio.create_task(data_access_wait_for_due_member_stats(30))
+    await asyncio.sleep(0.05)
+    assert not waiter.done()
+
+    await data_access_add_list_member_stats(
+        UserQueueForStats(mock_user1, 100, datetime.now(timezone.utc) - timedelta(minutes=2))
+    )
+    await asyncio.wait_for(waiter, 1)
+    # Already due: no sleep
+    await asyncio.wait_for(data_access_wait_for_due_member_stats(30), 1)
 
 
 async def test_data_access_get_r6tracker_max_rank_test_diamond() -> None:
@@ -260,3 +316,28 @@ async def test_data_access_get_r6tracker_max_rank_test_gold() -> None:
     # Add a delay between each individual test of 5 seconds to avoid spamming the TRN API
     await asyncio.sleep(DELAY_SECOND)
     assert result == ("Gold", 0)
+
+
+async def test_guild_config_snapshot_is_read_once_and_kept_in_sync() -> None:
+    """The guild settings come from the database once, then from the snapshot updated by the setters"""
+    guild_id = 4242
+    data_access_set_main_text_channel_id(guild_id, 10)
+    data_access_set_guild_voice_channel_ids(guild_id, [20, 21])
+
+    config = await data_access_get_guild_config(guild_id)
+    assert config.main_text_channel_id == 10
+    assert config.voice_channel_ids == [20, 21]
+
+    with patch("deps.data_access.get_cache") as mock_get_cache:
+        data_access_set_main_text_channel_id(guild_id, 11)
+        data_access_set_guild_voice_channel_ids(guild_id, None)
+        assert await data_access_get_main_text_channel_id(guild_id) == 11
+        assert await data_access_get_guild_voice_channel_ids(guild_id) is None
+        assert await data_access_get_guild_active_private_channels(guild_id) == {}
+    mock_get_cache.assert_not_called()
+
+    # Written behind the snapshot back: only visible once the guild cache is reset
+    set_cache(False, f"{KEY_GUILD_MAIN_TEXT_CHANNEL}:{guild_id}", 12)
+    assert await data_access_get_main_text_channel_id(guild_id) == 11
+    data_access_reset_guild_cache(guild_id)
+    assert await data_access_get_main_text_channel_id(guild_id) == 12
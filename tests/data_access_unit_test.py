@@ -10,7 +10,7 @@ async def test_current_season_rank_uses_persistent_cache() -> None:
     with (
         patch("deps.data_access.remove_cache") as mock_remove_cache,
         patch("deps.data_access.get_cache", new_callable=AsyncMock, return_value=("Gold", 3123)) as mock_get_cache,
-        patch("deps.data_access._download_current_season_rank_sync") as mock_download,
+        patch("deps.data_access._download_current_season_rank", new_callable=AsyncMock) as mock_download,
     ):
         result = await data_access_get_r6tracker_current_season_rank(" Player.Name ", force_fetch=False)
 
@@ -0,0 +1,91 @@
+"""Integration tests for the async database gateway"""
+
+import threading
+from datetime import datetime, timezone
+import pytest
+from deps.analytic_activity_data_access import insert_user_activity
+from deps.database_gateway import DatabaseGateway
+from deps.system_database import (
+    DATABASE_BUSY_TIMEOUT_SECONDS,
+    DATABASE_NAME,
+    DATABASE_NAME_TEST,
+    EVENT_CONNECT,
+    database_manager,
+)
+
+
+@pytest.fixture(autouse=True)
+def setup_and_teardown():
+    """Setup and Teardown for the test"""
+    database_manager.set_database_name(DATABASE_NAME_TEST)
+    database_manager.drop_all_tables()
+    database_manager.init_database()
+
+    yield
+
+    database_manager.set_database_name(DATABASE_NAME)
+
+
+def _fetch_activity_channel_ids(user_id: int) -> list[int]:
+    database_manager.get_cursor().execute("SELECT channel_id FROM user_activity WHERE user_id = ?", (user_id,))
+    return [row[0] for row in database_manager.get_cursor().fetchall()]
+
+
+async def test_write_then_read_through_gateway():
+    """A write from the writer thread is visible to the reader connections"""
+    gateway = DatabaseGateway(reader_count=2)
+    try:
+        await gateway.write(insert_user_activity, 1, "user_1", 10, 100, EVENT_CONNECT, datetime.now(timezone.utc))
+        channel_ids = await gateway.read(_fetch_activity_channel_ids, 1)
+    finally:
+        gateway.stop()
+    assert channel_ids == [10]
+
+
+async def test_writes_run_on_a_single_thread():
+    """All writes are serialized on the dedicated writer thread"""
+    gateway = DatabaseGateway()
+    try:
+        thread_names = [await gateway.write(lambda: threading.current_thread().name) for _ in range(5)]
+    finally:
+        gateway.stop()
+    assert set(thread_names) == {"db-writer"}
+
+
+async def test_write_exception_is_raised_to_the_caller():
+    """An exception in the writer thread surfaces on the awaiting coroutine"""
+    gateway = DatabaseGateway()
+
+    def failing_write():
+        raise ValueError("boom")
+
+    try:
+        with pytest.raises(ValueError):
+            await gateway.write(failing_write)
+        # The writer thread keeps serving after a failure
+        assert await gateway.write(lambda: 42) == 42
+    finally:
+        gateway.stop()
+
+
+async def test_reader_connection_is_read_only():
+    """Reader connections refuse writes"""
+    gateway = DatabaseGateway()
+    try:
+        with pytest.raises(Exception):
+            await gateway.read(insert_user_activity, 1, "user_1", 10, 100, EVENT_CONNECT, datetime.now(timezone.utc))
+    finally:
+        gateway.stop()
+
+
+async def test_shared_and_gateway_connections_wait_on_a_locked_database():
+    """The shared connection waits for the other writers as long as the gateway connections"""
+    gateway = DatabaseGateway()
+    try:
+        shared_timeout = database_manager.get_cursor().execute("PRAGMA busy_timeout").fetchone()[0]
+        gateway_timeout = await gateway.write(
+            lambda: database_manager.get_cursor().execute("PRAGMA busy_timeout").fetchone()[0]
+        )
+    finally:
+        gateway.stop()
+    assert shared_timeout == gateway_timeout == DATABASE_BUSY_TIMEOUT_SECONDS * 1000
@@ -16,7 +16,8 @@ from deps.functions import (
     get_url_api_ranked_matches,
     most_common,
 )
-from deps.models import TimeLabel
+from deps.models import TimeLabel, UserQueueForStats, UserWithUserMatchInfo
+from deps.scrape_scheduler import ScrapePriority
 from deps.data_access_data_class import UserInfo
 import deps.functions
 import deps.bot_common_actions
@@ -344,7 +345,7 @@ async def test_sync_member_current_rank_role_uses_current_rank():
         result = await deps.bot_common_actions.sync_member_current_rank_role(guild, member, "active_ubi")
 
     assert result == ("Unranked", 0)
-    mock_fetch.assert_awaited_once_with("active_ubi", True)
+    mock_fetch.assert_awaited_once_with("active_ubi", True, ScrapePriority.INTERACTIVE)
     mock_set_role.assert_awaited_once_with(guild, member, "Unranked")
 
 
@@ -398,13 +399,13 @@ async def test_refresh_current_rank_roles_guild_scope_only_updates_target_guild(
             include_connected_voice=False,
         )
 
-    mock_prefetch.assert_awaited_once_with(["ubi"])
+    mock_prefetch.assert_awaited_once_with(["ubi"], priority=ScrapePriority.PERIODIC)
 
     assert summary.candidates == 1
     assert summary.updated == 1
     target_guild.get_member.assert_called_once_with(123)
     other_guild.get_member.assert_not_called()
-    mock_fetch_rank.assert_awaited_once_with("ubi", force_fetch=False)
+    mock_fetch_rank.assert_awaited_once_with("ubi", force_fetch=False, priority=ScrapePriority.PERIODIC)
     mock_set_role.assert_awaited_once_with(target_guild, member, "Gold")
     mock_notify.assert_awaited_once_with(bot, summary)
 
@@ -461,7 +462,7 @@ async def test_refresh_current_rank_roles_db_only_excludes_connected_voice_users
     assert summary.updated == 1
     mock_connected.assert_not_called()
     mock_fetch_user.assert_not_called()
-    mock_fetch_rank.assert_awaited_once_with("ubi", force_fetch=False)
+    mock_fetch_rank.assert_awaited_once_with("ubi", force_fetch=False, priority=ScrapePriority.PERIODIC)
     mock_set_role.assert_awaited_once_with(guild, db_member, "Gold")
     mock_notify.assert_awaited_once_with(bot, summary)
 
@@ -496,3 +497,28 @@ async def test_post_rank_change_notifications_posts_to_main_siege_channel():
     message = channel.send.await_args.args[0]
     assert "Rank changes from active player refresh" in message
     assert "<@456>: <:Silver:111> Silver -> <:Gold:222> Gold" in message
+
+
+async def test_save_full_matches_of_users_falls_back_to_one_transaction_per_user():
+    """A failing bulk save saves each user alone, only the failing user is skipped"""
+    users_matches = [
+        UserWithUserMatchInfo(UserQueueForStats(_user_info(user_id, name), 0, datetime.now(timezone.utc)), [])
+        for user_id, name in ((1, "Good"), (2, "Bad"), (3, "Other"))
+    ]
+
+    def insert_one_user(user_info, _matches):
+        if user_info.display_name == "Bad":
+            raise ValueError("bad row")
+
+    with (
+        patch(
+            "deps.bot_common_actions.insert_if_nonexistant_full_match_info_for_users", side_effect=ValueError("bad row")
+        ),
+        patch(
+            "deps.bot_common_actions.insert_if_nonexistant_full_match_info", side_effect=insert_one_user
+        ) as mock_insert_one,
+    ):
+        saved = await deps.bot_common_actions.save_full_matches_of_users(users_matches, "test")
+
+    assert mock_insert_one.call_count == 3
+    assert [user.user_request_stats.user_info.display_name for user in saved] == ["Good", "Other"]
@@ -0,0 +1,77 @@
+"""Unit tests for the registry of the shared HTTP clients"""
+
+import asyncio
+import pytest
+from deps.http_clients import HttpClientRegistry, new_aiohttp_session, new_httpx_async_client
+
+
+class FakeClient:
+    """Blocking client recording its close"""
+
+    def __init__(self) -> None:
+        self.closed = False
+
+    def close(self) -> None:
+        """Close the connection pool"""
+        self.closed = True
+
+
+@pytest.fixture(name="registry")
+def fixture_registry():
+    """An empty registry"""
+    return HttpClientRegistry()
+
+
+def test_get_client_reuses_the_client(registry):
+    """The factory runs once, the next calls return the same client"""
+    first = registry.get_client("provider", FakeClient, config="key")
+
+    assert registry.get_client("provider", FakeClient, config="key") is first
+    assert registry.client_count() == 1
+
+
+def test_get_client_rebuilds_on_config_change_and_closes_the_old_one(registry):
+    """A new API key builds a new client, the replaced one is closed at shutdown"""
+    first = registry.get_client("provider", FakeClient, config="old key")
+    second = registry.get_client("provider", FakeClient, config="new key")
+
+    assert second is not first
+    assert not first.closed
+    asyncio.run(registry.aclose())
+    assert first.closed and second.closed
+    assert registry.client_count() == 0
+
+
+def test_get_client_rebuilds_a_closed_client(registry):
+    """A client closed elsewhere is not returned again"""
+    first = registry.get_client("provider", FakeClient)
+    first.close()
+
+    assert registry.get_client("provider", FakeClient) is not first
+
+
+async def test_async_clients_are_shared_and_closed(registry):
+    """httpx and aiohttp clients are reused on the same loop and closed by aclose"""
+    httpx_client = registry.get_async_client("api", lambda: new_httpx_async_client(base_url="https://example.com"))
+    session = registry.get_async_client("cdn", new_aiohttp_session)
+
+    assert registry.get_async_client("api", new_httpx_async_client) is httpx_client
+    assert registry.get_async_client("cdn", new_aiohttp_session) is session
+    await registry.aclose()
+    assert httpx_client.is_closed
+    assert session.closed
+
+
+def test_async_client_is_rebuilt_on_another_loop(registry):
+    """A client bound to a finished event loop is replaced on the next loop"""
+
+    async def get_session():
+        return registry.get_async_client("cdn", FakeClient)
+
+    first = asyncio.run(get_session())
+    second = asyncio.run(get_session())
+
+    assert second is not first
+    asyncio.run(registry.aclose())
+    assert not first.closed and not second.closed  # Their loops are gone, they are dropped
+    assert registry.client_count() == 0
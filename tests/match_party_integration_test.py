@@ -0,0 +1,136 @@
+"""Integration tests for the match_party tables behind the duo, trio and team stats"""
+
+import copy
+import json
+from datetime import date, datetime, timezone
+from unittest.mock import patch
+
+import pytest
+
+from deps import analytic_match_data_access
+from deps.analytic_data_access import (
+    insert_if_nonexistant_full_match_info,
+    insert_user_activity,
+    upsert_user_info,
+)
+from deps.analytic_leaderboard_data_access import (
+    data_access_fetch_best_duo,
+    data_access_fetch_best_trio,
+    data_access_fetch_team_stats,
+)
+from deps.data_access_data_class import UserInfo
+from deps.functions_r6_tracker import parse_json_from_full_matches
+from deps.system_database import DATABASE_NAME, DATABASE_NAME_TEST, EVENT_CONNECT, database_manager
+
+USERS = [UserInfo(user_id, f"user_{user_id}", None, f"ubi_{user_id}", None, "US/Eastern", 0) for user_id in range(1, 6)]
+
+
+@pytest.fixture(autouse=True)
+def setup_and_teardown():
+    """Setup and Teardown for the test"""
+    database_manager.set_database_name(DATABASE_NAME_TEST)
+    database_manager.drop_all_tables()
+    database_manager.init_database()
+    for user in USERS:
+        upsert_user_info(user.id, user.display_name, None, None, None, user.time_zone, 0)
+        insert_user_activity(user.id, user.display_name, 100, 1000, EVENT_CONNECT, datetime.now(timezone.utc))
+    with patch.object(analytic_match_data_access, analytic_match_data_access.print_log.__name__):
+        yield
+    database_manager.set_database_name(DATABASE_NAME)
+
+
+@pytest.fixture(name="matches", scope="module")
+def fixture_matches():
+    """The matches of the sample history, moved to today so the leaderboards include them"""
+    with open("./tests/tests_assets/player_rank_history.json", "r", encoding="utf8") as file:
+        data = json.loads(file.read())
+    matches = parse_json_from_full_matches(data, USERS[0])
+    matches = list({match.match_uuid: match for match in matches}.values())
+    today = datetime.now(timezone.utc).replace(hour=1, minute=0, second=0, microsecond=0)
+    for match in matches:
+        match.match_timestamp = today
+    return matches
+
+
+def _matches_of(user: UserInfo, matches, has_win=None):
+    """The same matches played by another user, optionally in the other team"""
+    copies = []
+    for match in matches:
+        match_copy = copy.copy(match)
+        match_copy.user_id = user.id
+        if has_win is not None:
+            match_copy.has_win = has_win
+        copies.append(match_copy)
+    return copies
+
+
+def _party_counts() -> tuple:
+    cursor = database_manager.get_cursor()
+    return (
+        cursor.execute(
+            "SELECT user_a, user_b, SUM(match_count), SUM(win_count) FROM match_party_pair GROUP BY 1, 2"
+        ).fetchall(),
+        cursor.execute(
+            "SELECT user_a, user_b, user_c, SUM(match_count) FROM match_party_trio GROUP BY 1, 2, 3"
+        ).fetchall(),
+        cursor.execute("SELECT members, COUNT(*) FROM match_party GROUP BY members").fetchall(),
+    )
+
+
+def test_parties_grow_as_each_user_matches_are_inserted(matches):
+    """A match inserted for a second user creates the party, a third user adds its duos and the trio"""
+    insert_if_nonexistant_full_match_info(USERS[0], matches)
+    assert _party_counts() == ([], [], [])
+
+    insert_if_nonexistant_full_match_info(USERS[1], _matches_of(USERS[1], matches))
+    insert_if_nonexistant_full_match_info(USERS[2], _matches_of(USERS[2], matches[:12]))
+    # Inserting the same matches again changes nothing
+    insert_if_nonexistant_full_match_info(USERS[2], _matches_of(USERS[2], matches[:12]))
+
+    wins = sum(1 for match in matches if match.has_win)
+    wins_12 = sum(1 for match in matches[:12] if match.has_win)
+    pairs, trios, parties = _party_counts()
+    assert pairs == [(1, 2, len(matches), wins), (1, 3, 12, wins_12), (2, 3, 12, wins_12)]
+    assert trios == [(1, 2, 3, 12)]
+    assert parties == [("1,2", len(matches) - 12), ("1,2,3", 12)]
+
+
+def test_opponents_are_not_a_party(matches):
+    """Two users of the same match with a different result played against each other"""
+    insert_if_nonexistant_full_match_info(USERS[0], matches)
+    insert_if_nonexistant_full_match_info(USERS[1], _matches_of(USERS[1], matches))
+    opponent_matches = [match for match in matches if match.has_win]
+    insert_if_nonexistant_full_match_info(USERS[2], _matches_of(USERS[2], opponent_matches, has_win=False))
+    pairs, trios, _ = _party_counts()
+    assert [pair[:2] for pair in pairs] == [(1, 2)]
+    assert trios == []
+
+
+def test_leaderboards_and_team_stats_read_the_parties(matches):
+    """The duo and trio leaderboards and the team lookups agree with the inserted matches"""
+    for user in USERS:
+        insert_if_nonexistant_full_match_info(user, _matches_of(user, matches[:15]))
+    wins = sum(1 for match in matches[:15] if match.has_win)
+    since = date.today()
+
+    duos = data_access_fetch_best_duo(since)
+    trios = data_access_fetch_best_trio(since)
+
+    assert len(duos) == 10 and len(trios) == 10
+    assert duos[0][2:] == (15, wins, pytest.approx(wins / 15))
+    assert trios[0][3:] == (15, wins, pytest.approx(wins / 15))
+    for team in ([2, 1], [3, 1, 2], [4, 2, 1, 3], [5, 4, 3, 2, 1]):
+        assert data_access_fetch_team_stats(team) == (15, pytest.approx(wins / 15))
+    assert data_access_fetch_team_stats([1, 99]) is None
+
+
+def test_migration_builds_the_same_parties(matches):
+    """The backfill of an existing database gives the same aggregates as the inserts"""
+    for index, user in enumerate(USERS[:4]):
+        insert_if_nonexistant_full_match_info(user, _matches_of(user, matches[: 20 - 4 * index]))
+    expected = _party_counts()
+    cursor = database_manager.get_cursor()
+    for table in ("match_party", "match_party_member", "match_party_pair", "match_party_trio"):
+        cursor.execute(f"DROP TABLE {table}")
+    database_manager.init_database()
+    assert _party_counts() == expected
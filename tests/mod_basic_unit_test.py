@@ -7,6 +7,7 @@ import discord
 
 from cogs.mod_basic import ModBasic
 from deps.bot_common_actions import RankRefreshSummary
+from deps.scrape_scheduler import ScrapePriority
 
 
 def _role(name: str, position: int, *, managed: bool = False) -> Mock:
@@ -271,6 +272,7 @@ async def test_refresh_active_rank_roles_defaults_to_24_hours_and_current_guild(
     assert args[2] is bot
     assert kwargs["guild"] is guild
     assert kwargs["include_connected_voice"] is False
+    assert kwargs["priority"] == ScrapePriority.INTERACTIVE
     assert 23.9 <= (args[1] - args[0]).total_seconds() / 3600 <= 24.1
     followup_message = interaction.followup.send.await_args.args[0]
     assert "last 24 hour(s)" in followup_message
@@ -1,9 +1,13 @@
 """Unit tests for monthly analytics report helpers."""
 
-from datetime import date
+import asyncio
+from datetime import date, datetime, timezone
+from unittest.mock import patch
 
 import pytest
+from pypdf import PdfReader
 
+from deps.analytic_data_access import insert_if_nonexistant_full_match_info, insert_user_activity, upsert_user_info
 from deps.data_access import (
     data_access_get_analytics_report_text_channel_id,
     data_access_get_monthly_analytics_report_sent,
@@ -11,9 +15,20 @@ from deps.data_access import (
     data_access_set_monthly_analytics_report_sent,
 )
 from deps.monthly_report import get_monthly_report_windows
-from deps.monthly_report import UserWindowMetrics, collect_monthly_report_data, render_monthly_report_pdf
+from deps.monthly_report import (
+    REPORT_FRAGMENT_TIMEOUT_SECONDS,
+    MonthlyReportData,
+    UserWindowMetrics,
+    WindowReportData,
+    _text_page_count,
+    collect_monthly_report_data,
+    generate_monthly_report_async,
+    render_monthly_report_pdf,
+)
 from deps.monthly_report_style import TOC_ROWS_PER_PAGE, TocEntry, toc_page_count
-from deps.system_database import DATABASE_NAME, DATABASE_NAME_TEST, database_manager
+from deps.data_access_data_class import UserInfo
+from deps.system_database import DATABASE_NAME, DATABASE_NAME_TEST, EVENT_CONNECT, EVENT_DISCONNECT, database_manager
+from tests.analytic_player_value_functions_unit_test import make_match
 
 
 @pytest.fixture(autouse=True)
@@ -74,6 +89,51 @@ def test_collect_monthly_report_data_can_filter_windows():
     assert [data.window.key for data in report.windows] == ["previous_month"]
 
 
+def test_collect_monthly_report_data_counts_the_window_rows():
+    """Voice, ranked and data quality counts of a window, all sliced from the same snapshot."""
+    users = [UserInfo(user_id, f"user_{user_id}", None, None, None, "UTC", 0) for user_id in (1, 2)]
+    for user in users:
+        upsert_user_info(user.id, user.display_name, None, None, None, user.time_zone, 0)
+    events = [
+        (1, EVENT_CONNECT, datetime(2026, 6, 10, 20, tzinfo=timezone.utc)),
+        (1, EVENT_DISCONNECT, datetime(2026, 6, 10, 22, tzinfo=timezone.utc)),
+        (1, EVENT_DISCONNECT, datetime(2026, 6, 11, 10, tzinfo=timezone.utc)),  # Unmatched
+        (2, EVENT_CONNECT, datetime(2026, 6, 30, 23, tzinfo=timezone.utc)),  # Still open at the window end
+    ]
+    for user_id, event, timestamp in events:
+        insert_user_activity(user_id, f"user_{user_id}", 100, 1000, event, timestamp)
+    matches = [
+        ("in-voice", datetime(2026, 6, 10, 21, tzinfo=timezone.utc), True, False),
+        ("outside", datetime(2026, 6, 12, 21, tzinfo=timezone.utc), False, False),
+        ("rollback", datetime(2026, 6, 13, 21, tzinfo=timezone.utc), True, True),
+    ]
+    for match_uuid, timestamp, has_win, is_rollback in matches:
+        for user in users:
+            match = make_match(
+                match_uuid=match_uuid,
+                user_id=user.id,
+                match_timestamp=timestamp,
+                has_win=has_win,
+                is_rollback=is_rollback,
+            )
+            insert_if_nonexistant_full_match_info(user, [match])
+
+    report = collect_monthly_report_data(date(2026, 7, 1), window_keys=["previous_month"])
+    data = report.windows[0]
+
+    assert data.active_users == 2
+    assert data.total_voice_hours == pytest.approx(2.0)
+    assert (data.ranked_match_rows, data.distinct_ranked_matches) == (4, 2)
+    assert data.data_quality.voice_sessions == 1
+    assert data.data_quality.unmatched_disconnects == 1
+    assert data.data_quality.open_sessions_at_window_end == 1
+    assert data.data_quality.ranked_rows_without_voice_context == 3
+    assert data.data_quality.rollback_ranked_rows_excluded == 2
+    assert [user.user_id for user in data.top_users] == [1]
+    assert (data.top_users[0].in_server_matches, data.top_users[0].outside_server_matches) == (1, 1)
+    assert data.top_users[0].outside_partners == [("user_2", 1, 0, 0.0)]
+
+
 def test_render_monthly_report_pdf_smoke(tmp_path):
     """Rendering succeeds without AI or production data."""
     report = collect_monthly_report_data(date(2026, 7, 1), top_n=3, window_keys=["previous_month"])
@@ -94,6 +154,110 @@ def test_render_monthly_report_pdf_multi_window_smoke(tmp_path):
     assert output_path.stat().st_size > 0
 
 
+def _report_with_users(report: MonthlyReportData) -> MonthlyReportData:
+    """The report with top users in each window, so the player profile pages are rendered"""
+    users = [
+        UserWindowMetrics(
+            user_id,
+            f"Player {user_id}",
+            voice_hours=12.5 * user_id,
+            ranked_matches=10 * user_id,
+            in_server_matches=4 * user_id,
+            outside_server_matches=6 * user_id,
+            outside_partners=[(f"Partner {index}", 3, 2, 66.0) for index in range(user_id * 20)],
+        )
+        for user_id in (1, 2)
+    ]
+    windows = [
+        WindowReportData(
+            window=data.window,
+            total_voice_hours=37.5,
+            active_users=2,
+            ranked_match_rows=30,
+            distinct_ranked_matches=25,
+            data_quality=data.data_quality,
+            top_users=users,
+        )
+        for data in report.windows
+    ]
+    return MonthlyReportData(report_month=report.report_month, generated_at=report.generated_at, windows=windows)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_render_monthly_report_pdf_lays_out_every_page_once(tmp_path, max_workers):
+    """The page numbers, totals and bookmarks computed before rendering match the stitched PDF."""
+    report = _report_with_users(
+        collect_monthly_report_data(date(2026, 7, 1), top_n=2, window_keys=["previous_month", "year_to_date"])
+    )
+    conclusion = "\n".join(f"- Action item number {index} for the moderators." for index in range(60))
+    assert _text_page_count(conclusion.splitlines()) == 3
+
+    output_path = render_monthly_report_pdf(report, conclusion, tmp_path, max_workers=max_workers)
+
+    reader = PdfReader(output_path)
+    total_pages = len(reader.pages)
+    footers = [f"PAGE {index + 1} / {total_pages}" in page.extract_text() for index, page in enumerate(reader.pages)]
+    assert footers[0] is False  # Cover
+    assert footers.count(False) == 1 + len(report.windows)  # Cover and section dividers have no footer
+    assert "AI Conclusion and Action Items (continued)" in reader.pages[-1].extract_text()
+
+    sections = reader.outline
+    titles = [item.title for item in sections if not isinstance(item, list)]
+    assert titles == [
+        "Executive Summary",
+        "Deterministic Action Items",
+        "Data Quality and Methodology",
+        "Section 01 — Previous Month",
+        "Section 02 — Year to Date",
+        "AI Conclusion and Action Items",
+    ]
+    conclusion_page = reader.get_destination_page_number(sections[-1])
+    assert conclusion_page == total_pages - 3
+    assert "AI Conclusion and Action Items" in reader.pages[conclusion_page].extract_text()
+    window_items = sections[4]
+    profile_item = next(item for item in window_items if item.title == "Player Profiles")
+    profile_page_text = reader.pages[reader.get_destination_page_number(profile_item)].extract_text()
+    assert "Player 1" in profile_page_text and "Weekly Voice Timeline" in profile_page_text
+
+
+class FakeRenderService:
+    """Render the fragments in the test process and record how many were submitted at once"""
+
+    max_workers = 2
+
+    def __init__(self) -> None:
+        self.running = 0
+        self.max_running = 0
+        self.timeouts: set = set()
+
+    async def submit(self, function, *args, timeout_seconds=None):
+        """Run the function after yielding to the other submissions"""
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        self.timeouts.add(timeout_seconds)
+        try:
+            await asyncio.sleep(0.01)
+            return function(*args)
+        finally:
+            self.running -= 1
+
+
+async def test_generate_monthly_report_async_bounds_the_fragments_in_flight(tmp_path):
+    """The report never queues more fragments than there are render workers, each with the report timeout"""
+    service = FakeRenderService()
+    with (
+        patch("deps.monthly_report.render_service", service),
+        patch("deps.monthly_report.generate_ai_conclusion_async", return_value="AI conclusion disabled."),
+    ):
+        output_path = await generate_monthly_report_async(
+            date(2026, 7, 1), tmp_path, window_keys=["previous_month", "year_to_date"]
+        )
+
+    assert output_path.exists()
+    assert service.max_running == FakeRenderService.max_workers
+    assert service.timeouts == {REPORT_FRAGMENT_TIMEOUT_SECONDS}
+
+
 def test_toc_page_count_uses_rows_per_page():
     """TOC pagination is one page minimum and grows with the row capacity."""
     assert toc_page_count(0) == 1
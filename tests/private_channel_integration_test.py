@@ -11,6 +11,7 @@ from deps.data_access import (
     KEY_GUILD_PRIVATE_CHANNEL_CATEGORY,
     data_access_get_guild_active_private_channels,
     data_access_get_guild_private_channel_category_id,
+    data_access_invalidate_guild_config,
     data_access_remove_guild_active_private_channel,
     data_access_set_guild_active_private_channel,
     data_access_set_guild_private_channel_category_id,
@@ -31,10 +32,12 @@ def clean_cache():
     for guild_id in [GUILD_A, GUILD_B]:
         remove_cache(False, f"{KEY_GUILD_PRIVATE_CHANNEL_CATEGORY}:{guild_id}")
         remove_cache(False, f"{KEY_GUILD_ACTIVE_PRIVATE_CHANNEL}:{guild_id}")
+        data_access_invalidate_guild_config(guild_id)
     yield
     for guild_id in [GUILD_A, GUILD_B]:
         remove_cache(False, f"{KEY_GUILD_PRIVATE_CHANNEL_CATEGORY}:{guild_id}")
         remove_cache(False, f"{KEY_GUILD_ACTIVE_PRIVATE_CHANNEL}:{guild_id}")
+        data_access_invalidate_guild_config(guild_id)
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,64 @@
+"""Unit tests for the process pool render service"""
+
+import asyncio
+import math
+import os
+import sys
+import time
+from concurrent.futures.process import BrokenProcessPool
+from importlib import import_module
+import pytest
+from deps.render_service import RenderService
+
+
+RENDER_MODULES = ("deps.analytic_visualizer", "deps.monthly_report", "deps.tournaments.tournament_visualizer")
+
+
+def loaded_bot_modules() -> list[str]:
+    """Import the modules of the renders in the worker, return the bot modules they pulled in"""
+    for module_name in RENDER_MODULES:
+        import_module(module_name)
+    return [name for name in ("deps.bot_singleton", "deps.data_access") if name in sys.modules]
+
+
+@pytest.fixture(name="service")
+def fixture_service():
+    """A single worker pool without the heavy warm modules"""
+    service = RenderService(max_workers=1, default_timeout_seconds=30, warm_modules=())
+    yield service
+    service.stop()
+
+
+async def test_submit_returns_worker_result(service):
+    """The function runs in the worker and its result comes back to the event loop"""
+    results = await asyncio.gather(*[service.submit(math.sqrt, value) for value in (4, 9, 16)])
+    assert results == [2, 3, 4]
+    assert service.queue_depth() == 0
+
+
+async def test_submit_timeout_raises_and_releases_queue_depth(service):
+    """A render slower than its timeout raises and no longer counts as pending"""
+    with pytest.raises(asyncio.TimeoutError):
+        await service.submit(time.sleep, 2, timeout_seconds=0.1)
+    assert service.queue_depth() == 0
+
+
+async def test_queue_depth_counts_pending_renders(service):
+    """Renders waiting for the single worker are visible in the queue depth"""
+    tasks = [asyncio.create_task(service.submit(time.sleep, 0.2)) for _ in range(3)]
+    await asyncio.sleep(0)
+    assert service.queue_depth() == 3
+    await asyncio.gather(*tasks)
+    assert service.queue_depth() == 0
+
+
+async def test_render_modules_do_not_import_the_bot(service):
+    """The workers import the renders without building the bot"""
+    assert await service.submit(loaded_bot_modules) == []
+
+
+async def test_dead_worker_is_replaced_on_the_next_render(service):
+    """A worker dying breaks the pool once, the next render runs in a new pool"""
+    with pytest.raises(BrokenProcessPool):
+        await service.submit(os._exit, 1)  # pylint: disable=protected-access
+    assert await service.submit(math.sqrt, 4) == 2
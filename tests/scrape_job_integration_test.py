@@ -0,0 +1,176 @@
+"""Integration tests for the scrape job queue shared with the scraper worker process"""
+
+import asyncio
+import threading
+from dataclasses import replace
+from datetime import datetime, timedelta, timezone
+from typing import cast
+
+import pytest
+
+from deps.browser_context_manager import BrowserContextManager
+from deps.browser_exceptions import BrowserException
+from deps.scrape_job_data_access import (
+    SCRAPE_JOB_DONE,
+    SCRAPE_JOB_FAILED,
+    claim_next_scrape_job,
+    delete_scrape_job,
+    enqueue_scrape_job,
+    fetch_scrape_job_result,
+    finish_scrape_job,
+    purge_finished_scrape_jobs,
+    requeue_dead_worker_scrape_jobs,
+    requeue_stale_scrape_jobs,
+    scrape_worker_id,
+)
+from deps.scrape_scheduler import (
+    SCRAPER_MODE_PROCESS,
+    ScrapePriority,
+    ScrapeScheduler,
+    UserScrapeWork,
+    run_user_scrape,
+)
+from deps.system_database import DATABASE_NAME, DATABASE_NAME_TEST, database_manager
+from tests.mock_model import mock_user1
+
+
+@pytest.fixture(autouse=True)
+def setup_and_teardown():
+    """Setup and Teardown for the test"""
+    database_manager.set_database_name(DATABASE_NAME_TEST)
+    database_manager.drop_all_tables()
+    database_manager.init_database()
+
+    yield
+
+    database_manager.set_database_name(DATABASE_NAME)
+
+
+def test_jobs_are_claimed_by_priority_then_age():
+    """The most urgent job goes first, jobs of the same priority in queue order"""
+    bulk_id = enqueue_scrape_job(ScrapePriority.BULK, "bulk")
+    periodic_id = enqueue_scrape_job(ScrapePriority.PERIODIC, "periodic")
+    interactive_id = enqueue_scrape_job(ScrapePriority.INTERACTIVE, "interactive")
+    second_periodic_id = enqueue_scrape_job(ScrapePriority.PERIODIC, "periodic 2")
+
+    claimed = [claim_next_scrape_job("worker") for _ in range(5)]
+
+    assert claimed == [
+        (interactive_id, "interactive"),
+        (periodic_id, "periodic"),
+        (second_periodic_id, "periodic 2"),
+        (bulk_id, "bulk"),
+        None,
+    ]
+
+
+def test_result_is_visible_once_finished():
+    """The bot sees nothing while the job runs, then the result, then the row is gone"""
+    job_id = enqueue_scrape_job(ScrapePriority.PERIODIC, {"user": "user_1"})
+    claim_next_scrape_job("worker")
+    assert fetch_scrape_job_result(job_id) is None
+
+    finish_scrape_job(job_id, {"matches": [1, 2, 3]})
+    assert fetch_scrape_job_result(job_id) == (SCRAPE_JOB_DONE, {"matches": [1, 2, 3]})
+
+    delete_scrape_job(job_id)
+    assert fetch_scrape_job_result(job_id) == (SCRAPE_JOB_FAILED, None)
+
+
+def test_failed_job_keeps_its_exception():
+    """The exception raised in the worker is raised again on the bot side"""
+    job_id = enqueue_scrape_job(ScrapePriority.PERIODIC, "payload")
+    claim_next_scrape_job("worker")
+    finish_scrape_job(job_id, BrowserException("Chrome crashed"), failed=True)
+    status, result = fetch_scrape_job_result(job_id)
+    assert status == SCRAPE_JOB_FAILED
+    assert isinstance(result, BrowserException) and str(result) == "Chrome crashed"
+
+
+def test_stale_jobs_are_queued_again_and_old_results_purged():
+    """A job left running by a dead worker goes back to the queue, unread results are removed"""
+    running_id = enqueue_scrape_job(ScrapePriority.PERIODIC, "running")
+    claim_next_scrape_job("dead worker")
+    finished_id = enqueue_scrape_job(ScrapePriority.PERIODIC, "finished")
+    claim_next_scrape_job("worker")
+    finish_scrape_job(finished_id, "result")
+
+    later = datetime.now(timezone.utc) + timedelta(seconds=5)
+    assert requeue_stale_scrape_jobs(later) == 1
+    assert purge_finished_scrape_jobs(later) == 1
+    assert claim_next_scrape_job("new worker") == (running_id, "running")
+
+
+def test_jobs_of_a_dead_worker_are_queued_again_right_away():
+    """A worker restarted quickly gets back the jobs of its previous process, not the ones of a live worker"""
+    dead_id = enqueue_scrape_job(ScrapePriority.PERIODIC, "dead")
+    claim_next_scrape_job(scrape_worker_id(0))  # Same pid as this process: a restarted container
+    enqueue_scrape_job(ScrapePriority.PERIODIC, "other host")
+    claim_next_scrape_job("other-host:1:0")
+
+    assert requeue_dead_worker_scrape_jobs() == 1
+    assert claim_next_scrape_job("new worker") == (dead_id, "dead")
+    assert claim_next_scrape_job("new worker") is None
+
+
+class FakeContext:
+    """Answer the pages of a visit"""
+
+    def download_full_matches(self, user_queue, high_water_mark):  # pylint: disable=unused-argument
+        """No match"""
+        return []
+
+    def download_profile(self, ubisoft_user_name):
+        """A profile carrying the account name"""
+        return {"rank": f"rank of {ubisoft_user_name}"}
+
+    def download_operator_stats(self, r6_tracker_user_uuid):
+        """Operators always fail"""
+        raise BrowserException(f"no operators for {r6_tracker_user_uuid}")
+
+
+def _fake_scraper_worker(stop_event: threading.Event) -> None:
+    """What scraper_worker.py does, with a fake browser"""
+    database_manager.open_thread_connection()
+    try:
+        while not stop_event.is_set():
+            claimed = claim_next_scrape_job("test worker")
+            if claimed is None:
+                stop_event.wait(0.01)
+                continue
+            job_id, work = claimed
+            finish_scrape_job(job_id, run_user_scrape(cast(BrowserContextManager, FakeContext()), work))
+    finally:
+        database_manager.close_thread_connection()
+
+
+async def test_process_mode_runs_the_visits_in_the_worker(monkeypatch):
+    """In process mode, the bot queues the visit and reads the outcome written by the worker"""
+    monkeypatch.setenv("SCRAPER_POLL_INTERVAL_MS", "10")
+    scheduler = ScrapeScheduler(worker_count=1, mode=SCRAPER_MODE_PROCESS)
+    stop_event = threading.Event()
+    worker = threading.Thread(target=_fake_scraper_worker, args=(stop_event,))
+    worker.start()
+    try:
+        rank = await asyncio.wait_for(
+            scheduler.fetch_profile("user_1", lambda data: data["rank"], ScrapePriority.INTERACTIVE), timeout=10
+        )
+        operators = await asyncio.wait_for(
+            scheduler.fetch_operator_stats([replace(mock_user1, r6_tracker_active_id="uuid-1")], ScrapePriority.BULK),
+            timeout=10,
+        )
+    finally:
+        stop_event.set()
+        worker.join()
+        await scheduler.stop()
+    assert rank == "rank of user_1"
+    assert operators == []  # The BrowserException of the worker failed the request
+    # The bot removed the rows it read
+    assert database_manager.get_cursor().execute("SELECT COUNT(*) FROM scrape_job").fetchone()[0] == 0
+
+
+def test_work_of_a_visit_survives_the_queue():
+    """The work written by the bot is read back intact by the worker"""
+    work = UserScrapeWork("user_1", profile=True, operators="uuid-1")
+    job_id = enqueue_scrape_job(ScrapePriority.PERIODIC, work)
+    assert claim_next_scrape_job("worker") == (job_id, work)
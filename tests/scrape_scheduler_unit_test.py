@@ -0,0 +1,178 @@
+"""Unit tests for the priority scheduler of the scraping"""
+
+import asyncio
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from deps.browser_config import BrowserConfig
+from deps.browser_exceptions import BrowserException
+from deps.models import MatchHighWaterMark, UserQueueForStats
+from deps.scrape_scheduler import ScrapePriority, ScrapeScheduler
+from tests.mock_model import mock_user1, mock_user2, mock_user3
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+MATCHES = [SimpleNamespace(match_uuid=f"m{i}", match_timestamp=NOW - timedelta(hours=i)) for i in range(5)]
+
+
+class FakeContext:
+    """Record the pages visited, the first visit can be held to fill the queue behind it"""
+
+    def __init__(self) -> None:
+        self.visits: list[tuple[str, str]] = []
+        self.hold = threading.Event()
+        self.hold.set()
+        self.failing_profiles: set[str] = set()
+        self.high_water_marks: list = []
+
+    def download_full_matches(self, user_queue, high_water_mark):
+        self.hold.wait(5)
+        self.visits.append(("matches", user_queue.user_info.ubisoft_username_active))
+        self.high_water_marks.append(high_water_mark)
+        return list(MATCHES)
+
+    def download_profile(self, ubisoft_user_name):
+        self.hold.wait(5)
+        self.visits.append(("profile", ubisoft_user_name))
+        if ubisoft_user_name in self.failing_profiles:
+            raise BrowserException("profile not found")
+        return {"rank": f"rank of {ubisoft_user_name}"}
+
+    def download_operator_stats(self, r6_tracker_user_uuid):
+        self.visits.append(("operators", r6_tracker_user_uuid))
+        return {"operators": r6_tracker_user_uuid}
+
+
+class FakePool:
+    """Lease the same fake browser every time"""
+
+    def __init__(self, context: FakeContext) -> None:
+        self.context = context
+        self.config = BrowserConfig()
+        self.lease_count = 0
+
+    @contextmanager
+    def lease(self, timeout_seconds=None):  # pylint: disable=unused-argument
+        """Count the leases"""
+        self.lease_count += 1
+        yield self.context
+
+
+@pytest.fixture(name="parts")
+async def fixture_parts():
+    """A scheduler with one worker on a fake pool, stopped with the test loop"""
+    context = FakeContext()
+    pool = FakePool(context)
+    scheduler = ScrapeScheduler(pool=pool, worker_count=1)
+    yield scheduler, context, pool
+    await scheduler.stop()
+
+
+def _rank(data: dict) -> str:
+    return data["rank"]
+
+
+def _queued(user) -> UserQueueForStats:
+    return UserQueueForStats(user, 0, NOW)
+
+
+async def _let_the_worker_start() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_more_urgent_jobs_run_first(parts):
+    """A post-session job queued after bulk jobs runs before them"""
+    scheduler, context, _ = parts
+    context.hold.clear()
+    first = asyncio.create_task(scheduler.fetch_profiles(["user_1"], _rank, ScrapePriority.BULK))
+    await _let_the_worker_start()  # The worker is busy with user_1, the next jobs wait in the queue
+    bulk = asyncio.create_task(scheduler.fetch_profiles(["user_2"], _rank, ScrapePriority.BULK))
+    urgent = asyncio.create_task(scheduler.fetch_matches([_queued(mock_user3)], ScrapePriority.POST_SESSION))
+    await _let_the_worker_start()
+    context.hold.set()
+    await asyncio.gather(first, bulk, urgent)
+    assert context.visits == [("profile", "user_1"), ("matches", "user_3"), ("profile", "user_2")]
+
+
+async def test_requests_about_the_same_user_share_one_visit(parts):
+    """The matches and the rank of a user are fetched with a single lease"""
+    scheduler, context, pool = parts
+    context.hold.clear()
+    blocker = asyncio.create_task(scheduler.fetch_profiles(["user_3"], _rank, ScrapePriority.BULK))
+    await _let_the_worker_start()
+    matches_task = asyncio.create_task(scheduler.fetch_matches([_queued(mock_user1)], ScrapePriority.PERIODIC))
+    ranks_task = asyncio.create_task(scheduler.fetch_profiles(["User_1"], _rank, ScrapePriority.PERIODIC))
+    await _let_the_worker_start()
+    context.hold.set()
+    await blocker
+    matches, ranks = await asyncio.gather(matches_task, ranks_task)
+    assert pool.lease_count == 2
+    assert context.visits == [("profile", "user_3"), ("matches", "user_1"), ("profile", "user_1")]
+    assert len(matches) == 1 and len(matches[0].match_stats) == len(MATCHES)
+    assert ranks == {"User_1": "rank of user_1"}
+
+
+async def test_urgent_request_raises_the_pending_job_of_the_user(parts):
+    """An interactive request about a user already queued in bulk moves the whole job up"""
+    scheduler, context, _ = parts
+    context.hold.clear()
+    blocker = asyncio.create_task(scheduler.fetch_profiles(["user_3"], _rank, ScrapePriority.BULK))
+    await _let_the_worker_start()
+    bulk = asyncio.create_task(scheduler.fetch_profiles(["user_1", "user_2"], _rank, ScrapePriority.BULK))
+    await _let_the_worker_start()
+    interactive = asyncio.create_task(scheduler.fetch_profile("user_2", _rank, ScrapePriority.INTERACTIVE))
+    await _let_the_worker_start()
+    context.hold.set()
+    await asyncio.gather(blocker, bulk)
+    assert await interactive == "rank of user_2"
+    assert context.visits == [("profile", "user_3"), ("profile", "user_2"), ("profile", "user_1")]
+
+
+async def test_merged_matches_are_trimmed_to_each_high_water_mark(parts):
+    """A full download serves the post-session request and the incremental one"""
+    scheduler, context, _ = parts
+    context.hold.clear()
+    blocker = asyncio.create_task(scheduler.fetch_profiles(["user_3"], _rank, ScrapePriority.BULK))
+    await _let_the_worker_start()
+    high_water_mark = MatchHighWaterMark(mock_user1.id, "m2", MATCHES[2].match_timestamp)
+    incremental = asyncio.create_task(
+        scheduler.fetch_matches([_queued(mock_user1)], ScrapePriority.PERIODIC, {mock_user1.id: high_water_mark})
+    )
+    full = asyncio.create_task(scheduler.fetch_matches([_queued(mock_user1)], ScrapePriority.POST_SESSION))
+    await _let_the_worker_start()
+    context.hold.set()
+    await blocker
+    incremental_matches, full_matches = await asyncio.gather(incremental, full)
+    assert context.high_water_marks == [None]
+    assert [match.match_uuid for match in incremental_matches[0].match_stats] == ["m0", "m1"]
+    assert len(full_matches[0].match_stats) == len(MATCHES)
+
+
+async def test_failed_page_only_fails_its_requests(parts):
+    """A profile error leaves the user out of the ranks without affecting the others"""
+    scheduler, context, _ = parts
+    context.failing_profiles.add("user_2")
+    ranks = await scheduler.fetch_profiles(["user_1", "user_2"], _rank, ScrapePriority.PERIODIC)
+    operators = await scheduler.fetch_operator_stats(
+        [mock_user1, SimpleNamespace(**{**vars(mock_user2), "r6_tracker_active_id": "uuid-2"})],
+        ScrapePriority.BULK,
+    )
+    assert ranks == {"user_1": "rank of user_1"}
+    assert [stats for _, stats in operators] == [{"operators": "uuid-2"}]
+
+
+async def test_stats_report_queue_latency_per_priority(parts):
+    """Each priority keeps its own served count and latency"""
+    scheduler, _, _ = parts
+    await scheduler.fetch_profiles(["user_1"], _rank, ScrapePriority.PERIODIC)
+    await scheduler.fetch_matches([_queued(mock_user2)], ScrapePriority.INTERACTIVE)
+    stats = scheduler.get_stats()
+    assert stats["periodic"]["served"] == 1
+    assert stats["interactive"]["served"] == 1
+    assert stats["bulk"]["served"] == 0
+    assert stats["periodic"]["waiting"] == 0
+    assert stats["periodic"]["max_wait_seconds"] >= 0
@@ -0,0 +1,134 @@
+"""Unit tests for the adaptive rate limiter of the scraper"""
+
+from unittest.mock import patch
+
+import pytest
+
+from deps.scraper_rate_limiter import (
+    ENDPOINT_MATCHES,
+    ENDPOINT_OPERATORS,
+    AdaptiveTokenBucket,
+    EndpointLimits,
+    ScraperRateLimiter,
+    is_throttled_page,
+)
+
+
+class FakeClock:
+    """Time that only moves when the limiter sleeps or the test advances it"""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        """Record the wait and move the time forward"""
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture(name="clock")
+def fixture_clock():
+    """A clock without jitter so the waits are exact"""
+    with patch("deps.scraper_rate_limiter.random.random", return_value=0.5):
+        yield FakeClock()
+
+
+def _bucket(clock: FakeClock, initial: float = 10.0) -> AdaptiveTokenBucket:
+    return AdaptiveTokenBucket(EndpointLimits(initial, 2.0, 60.0), clock=clock, sleep=clock.sleep)
+
+
+def test_first_request_does_not_wait(clock):
+    """The bucket starts full"""
+    bucket = _bucket(clock)
+    assert bucket.acquire() == 0.0
+    assert not clock.sleeps
+
+
+def test_next_request_waits_one_interval(clock):
+    """Back to back requests are spaced by the interval"""
+    bucket = _bucket(clock)
+    bucket.acquire()
+    assert bucket.acquire() == pytest.approx(10.0)
+
+
+def test_time_spent_elsewhere_counts_toward_the_wait(clock):
+    """The time spent parsing the previous answer is not waited again"""
+    bucket = _bucket(clock)
+    bucket.acquire()
+    clock.now += 4
+    assert bucket.acquire() == pytest.approx(6.0)
+
+
+def test_throttled_response_doubles_the_interval(clock):
+    """A throttled answer backs off and empties the bucket"""
+    bucket = _bucket(clock)
+    bucket.acquire()
+    clock.now += 30
+    bucket.record_response(True)
+    assert bucket.interval_seconds == pytest.approx(20.0)
+    assert bucket.acquire() == pytest.approx(20.0)
+    assert bucket.throttled_count == 1
+
+
+def test_healthy_responses_speed_up_down_to_the_minimum(clock):
+    """Every healthy answer shrinks the interval, never below the minimum"""
+    bucket = _bucket(clock)
+    bucket.record_response(False)
+    assert bucket.interval_seconds == pytest.approx(9.5)
+    for _ in range(100):
+        bucket.record_response(False)
+    assert bucket.interval_seconds == pytest.approx(2.0)
+
+
+def test_back_off_is_capped(clock):
+    """The interval never grows past the maximum"""
+    bucket = _bucket(clock, initial=50.0)
+    bucket.record_response(True)
+    assert bucket.interval_seconds == pytest.approx(60.0)
+
+
+def test_requests_per_minute_counts_the_last_minute(clock):
+    """Requests older than a minute are not counted"""
+    bucket = _bucket(clock, initial=2.0)
+    for _ in range(5):
+        bucket.acquire()
+    assert bucket.requests_per_minute() == 5
+    clock.now += 61
+    assert bucket.requests_per_minute() == 0
+
+
+def test_endpoint_classes_have_independent_buckets(clock):
+    """Waiting on the match history does not slow down the operator stats"""
+    limiter = ScraperRateLimiter(clock=clock, sleep=clock.sleep)
+    limiter.acquire(ENDPOINT_MATCHES)
+    limiter.acquire(ENDPOINT_OPERATORS)
+    assert not clock.sleeps
+    limiter.record_response(ENDPOINT_MATCHES, True)
+    stats = limiter.get_stats()
+    assert stats[ENDPOINT_MATCHES]["throttled_count"] == 1
+    assert stats[ENDPOINT_OPERATORS]["throttled_count"] == 0
+
+
+def test_learned_intervals_survive_a_restart(clock):
+    """The intervals saved by a run are the starting point of the next one"""
+    stored = {}
+    with patch("deps.scraper_rate_limiter.set_value", side_effect=lambda key, value, _ttl: stored.update({key: value})):
+        limiter = ScraperRateLimiter(clock=clock, sleep=clock.sleep)
+        limiter.record_response(ENDPOINT_MATCHES, True)
+        limiter.save()
+    with patch("deps.scraper_rate_limiter.get_value", side_effect=stored.get):
+        restarted = ScraperRateLimiter(clock=clock, sleep=clock.sleep)
+        restarted.load()
+    assert restarted.buckets[ENDPOINT_MATCHES].interval_seconds == pytest.approx(15.0)
+    assert restarted.buckets[ENDPOINT_OPERATORS].interval_seconds == pytest.approx(10.0)
+
+
+def test_is_throttled_page():
+    """Challenge and rate limit pages are detected, the JSON is not"""
+    assert is_throttled_page("<html><title>Just a moment...</title></html>")
+    assert is_throttled_page("<html><body><h1>429 Too Many Requests</h1></body></html>")
+    assert not is_throttled_page('<html><body><pre>{"data": {"matches": []}}</pre></body></html>')
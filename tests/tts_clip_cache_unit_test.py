@@ -0,0 +1,123 @@
+"""Unit tests for the cached TTS clips of the voice announcements"""
+
+import os
+import shutil
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from deps import tts_clip_cache
+from deps.tts_clip_cache import (
+    EspeakTtsBackend,
+    GoogleTtsBackend,
+    get_tts_backend,
+    get_tts_clip,
+    hold_tts_clips,
+    normalize_tts_text,
+    play_tts_clips,
+    register_tts_backend,
+    release_tts_clips,
+)
+
+
+class FakeTtsBackend:
+    """Writes the text as the audio and counts the synthesis calls"""
+
+    name = "fake"
+    calls: list = []
+
+    def synthesize(self, text: str, output_path: str) -> None:
+        """Write the text in output_path"""
+        FakeTtsBackend.calls.append(text)
+        with open(output_path, "w", encoding="utf8") as file:
+            file.write(text)
+
+
+async def fake_encode_opus(input_path: str, output_path: str) -> None:
+    """Copy instead of running ffmpeg"""
+    shutil.copyfile(input_path, output_path)
+
+
+@pytest.fixture(autouse=True)
+def fake_backend(tmp_path, monkeypatch):
+    """Every test synthesizes with the fake backend in its own cache folder"""
+    register_tts_backend(FakeTtsBackend.name, FakeTtsBackend)
+    FakeTtsBackend.calls = []
+    monkeypatch.setenv("TTS_BACKEND", FakeTtsBackend.name)
+    monkeypatch.setenv("TTS_CLIP_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(tts_clip_cache, "_clips_in_use", {})
+    with patch.object(tts_clip_cache, tts_clip_cache.encode_opus.__name__, fake_encode_opus):
+        yield
+
+
+def test_backend_selection(monkeypatch):
+    """TTS_BACKEND picks the engine, an unknown one falls back on gTTS"""
+    monkeypatch.setenv("TTS_BACKEND", "espeak")
+    assert isinstance(get_tts_backend(), EspeakTtsBackend)
+    monkeypatch.setenv("TTS_BACKEND", "unknown")
+    assert isinstance(get_tts_backend(), GoogleTtsBackend)
+
+
+def test_normalize_tts_text():
+    """Case and spacing do not create another clip"""
+    assert normalize_tts_text("  Hello   Pat!\n") == normalize_tts_text("hello pat!")
+
+
+@pytest.mark.asyncio
+async def test_clip_is_synthesized_once():
+    """The second request of the same text is served from the disk"""
+    first = await get_tts_clip("Hello Pat!")
+    second = await get_tts_clip("hello  pat!")
+
+    assert first == second
+    assert FakeTtsBackend.calls == ["Hello Pat!"]
+    assert first.read_text(encoding="utf8") == "Hello Pat!"
+    assert sorted(path.name for path in first.parent.iterdir()) == [first.name]
+
+
+@pytest.mark.asyncio
+async def test_least_recently_played_clips_are_evicted(monkeypatch):
+    """Past the maximum file count, the clip played the longest ago is removed"""
+    monkeypatch.setenv("TTS_CLIP_CACHE_MAX_FILES", "2")
+    oldest = await get_tts_clip("one")
+    replayed = await get_tts_clip("two")
+    release_tts_clips([oldest, replayed])
+    os.utime(oldest, (1, 1))
+    os.utime(replayed, (2, 2))
+    release_tts_clips([await get_tts_clip("two")])  # Played again: now the most recent
+
+    newest = await get_tts_clip("three")
+
+    assert not oldest.exists()
+    assert replayed.exists() and newest.exists()
+
+
+@pytest.mark.asyncio
+async def test_held_clips_are_not_evicted(monkeypatch):
+    """A clip waiting for its playback stays on disk, it can be evicted once released"""
+    monkeypatch.setenv("TTS_CLIP_CACHE_MAX_FILES", "1")
+    async with hold_tts_clips(["one", "two"]) as clips:
+        assert all(clip.exists() for clip in clips)
+        os.utime(clips[0], (1, 1))
+        release_tts_clips([await get_tts_clip("three")])
+        assert all(clip.exists() for clip in clips)
+
+    release_tts_clips([await get_tts_clip("four")])
+
+    assert not any(clip.exists() for clip in clips)
+    assert tts_clip_cache._clips_in_use == {}  # pylint: disable=protected-access
+
+
+@pytest.mark.asyncio
+async def test_play_tts_clips_plays_each_clip_after_the_previous_one(tmp_path):
+    """Each clip starts when the audio thread reports the previous one finished"""
+    clips = [tmp_path / "a.ogg", tmp_path / "b.ogg"]
+    voice_client = MagicMock()
+    voice_client.play.side_effect = lambda source, after: after(None)
+
+    with patch.object(tts_clip_cache.discord, "FFmpegOpusAudio") as mock_opus_audio:
+        await play_tts_clips(voice_client, clips)
+
+    assert voice_client.play.call_count == 2
+    assert [call.args for call in mock_opus_audio.call_args_list] == [(str(clips[0]),), (str(clips[1]),)]
+    assert all(call.kwargs == {"codec": "copy"} for call in mock_opus_audio.call_args_list)
@@ -0,0 +1,63 @@
+"""Unit tests for the per-channel voice roster store"""
+
+from deps.models import ActivityTransition
+from deps.voice_roster_store import VoiceRosterStore
+
+GUILD_ID = 1
+CHANNEL_1 = 10
+CHANNEL_2 = 20
+
+
+def test_string_detail_shifts_after_to_before():
+    """A detail string keeps the previous after as the new before"""
+    store = VoiceRosterStore()
+    store.update(GUILD_ID, CHANNEL_1, 100, "In MENU")
+    store.update(GUILD_ID, CHANNEL_1, 100, "RANKED match")
+    transition = store.get(GUILD_ID, CHANNEL_1)[100]
+    assert (transition.before, transition.after) == ("In MENU", "RANKED match")
+
+
+def test_version_changes_only_when_roster_changes():
+    """Updating a member with the same transition does not bump the version"""
+    store = VoiceRosterStore()
+    store.update(GUILD_ID, CHANNEL_1, 100, ActivityTransition("In MENU", "RANKED match"))
+    version = store.version(GUILD_ID, CHANNEL_1)
+    store.update(GUILD_ID, CHANNEL_1, 100, ActivityTransition("In MENU", "RANKED match"))
+    assert store.version(GUILD_ID, CHANNEL_1) == version
+    store.update(GUILD_ID, CHANNEL_1, 100, ActivityTransition("RANKED match", "In MENU"))
+    assert store.version(GUILD_ID, CHANNEL_1) == version + 1
+
+
+def test_move_changes_both_channels():
+    """A move removes the member from the old channel and bumps both versions"""
+    store = VoiceRosterStore()
+    store.update(GUILD_ID, CHANNEL_1, 100, "In MENU")
+    store.update(GUILD_ID, CHANNEL_1, 200, "In MENU")
+    version_1 = store.version(GUILD_ID, CHANNEL_1)
+    version_2 = store.version(GUILD_ID, CHANNEL_2)
+
+    store.move(GUILD_ID, CHANNEL_1, CHANNEL_2, 100, "In MENU")
+
+    assert list(store.get(GUILD_ID, CHANNEL_1)) == [200]
+    assert list(store.get(GUILD_ID, CHANNEL_2)) == [100]
+    assert store.version(GUILD_ID, CHANNEL_1) > version_1
+    assert store.version(GUILD_ID, CHANNEL_2) > version_2
+
+
+def test_update_in_new_channel_detaches_member_from_old_one():
+    """A member is only in one roster per guild, even if their disconnect was missed"""
+    store = VoiceRosterStore()
+    store.update(GUILD_ID, CHANNEL_1, 100, "In MENU")
+    store.update(GUILD_ID, CHANNEL_2, 100, "In MENU")
+    assert store.get(GUILD_ID, CHANNEL_1) == {}
+    assert list(store.get(GUILD_ID, CHANNEL_2)) == [100]
+
+
+def test_remove_ignores_member_of_another_channel():
+    """Removing from the wrong channel leaves the member where they are"""
+    store = VoiceRosterStore()
+    store.update(GUILD_ID, CHANNEL_2, 100, "In MENU")
+    store.remove(GUILD_ID, CHANNEL_1, 100)
+    assert list(store.get(GUILD_ID, CHANNEL_2)) == [100]
+    store.remove(GUILD_ID, CHANNEL_2, 100)
+    assert store.get(GUILD_ID, CHANNEL_2) == {}
@@ -0,0 +1,105 @@
+"""Integration tests for the materialized voice_session table"""
+
+from datetime import datetime, timedelta, timezone
+import pytest
+from deps.analytic_activity_data_access import insert_user_activity
+from deps.analytic_profile_data_access import data_access_fetch_total_hours
+from deps.system_database import DATABASE_NAME, DATABASE_NAME_TEST, EVENT_CONNECT, EVENT_DISCONNECT, database_manager
+from deps.voice_session_data_access import backfill_voice_sessions, fetch_voice_sessions
+
+GUILD_ID = 9001
+CHANNEL_1 = 100
+CHANNEL_2 = 200
+START = datetime(2025, 3, 1, 20, 0, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def setup_and_teardown():
+    """Setup and Teardown for the test"""
+    database_manager.set_database_name(DATABASE_NAME_TEST)
+    database_manager.drop_all_tables()
+    database_manager.init_database()
+
+    yield
+
+    database_manager.set_database_name(DATABASE_NAME)
+
+
+def _log(user_id: int, channel_id: int, event: str, time: datetime) -> None:
+    insert_user_activity(user_id, f"user_{user_id}", channel_id, GUILD_ID, event, time)
+
+
+def _fetch_all_session_rows() -> list[tuple]:
+    database_manager.get_cursor().execute(
+        "SELECT user_id, guild_id, channel_id, start_ts, end_ts, duration_s FROM voice_session ORDER BY id"
+    )
+    return database_manager.get_cursor().fetchall()
+
+
+def test_connect_then_disconnect_closes_the_session():
+    """A disconnect closes the open session and stores its duration"""
+    _log(1, CHANNEL_1, EVENT_CONNECT, START)
+    _log(1, CHANNEL_1, EVENT_DISCONNECT, START + timedelta(hours=2))
+
+    sessions = fetch_voice_sessions(START - timedelta(days=1), START + timedelta(days=1))
+    assert len(sessions) == 1
+    assert sessions[0].user_id == 1
+    assert sessions[0].channel_id == CHANNEL_1
+    assert sessions[0].duration_s == 7200
+
+
+def test_open_session_is_not_returned():
+    """A session without disconnect stays open and is excluded from closed sessions"""
+    _log(1, CHANNEL_1, EVENT_CONNECT, START)
+
+    assert fetch_voice_sessions(START - timedelta(days=1), START + timedelta(days=1)) == []
+    assert len(_fetch_all_session_rows()) == 1
+
+
+def test_disconnect_without_connect_is_ignored():
+    """An unmatched disconnect does not create or close anything"""
+    _log(1, CHANNEL_1, EVENT_CONNECT, START)
+    _log(1, CHANNEL_1, EVENT_DISCONNECT, START + timedelta(hours=1))
+    _log(1, CHANNEL_1, EVENT_DISCONNECT, START + timedelta(hours=3))
+
+    sessions = fetch_voice_sessions(START - timedelta(days=1), START + timedelta(days=1))
+    assert [session.duration_s for session in sessions] == [3600]
+
+
+def test_backfill_matches_incremental_maintenance():
+    """Rebuilding from the event history gives the same sessions as the live updates"""
+    _log(1, CHANNEL_1, EVENT_CONNECT, START)
+    _log(2, CHANNEL_1, EVENT_CONNECT, START + timedelta(minutes=10))
+    _log(1, CHANNEL_1, EVENT_DISCONNECT, START + timedelta(hours=1))
+    _log(1, CHANNEL_2, EVENT_CONNECT, START + timedelta(hours=1))
+    _log(2, CHANNEL_1, EVENT_DISCONNECT, START + timedelta(hours=2))
+    live_rows = sorted(_fetch_all_session_rows())
+
+    count = backfill_voice_sessions()
+
+    assert count == 3
+    assert sorted(_fetch_all_session_rows()) == live_rows
+
+
+def test_total_hours_reads_sessions():
+    """The profile total hours sums the closed session durations"""
+    _log(1, CHANNEL_1, EVENT_CONNECT, START)
+    _log(1, CHANNEL_1, EVENT_DISCONNECT, START + timedelta(hours=2))
+    _log(1, CHANNEL_2, EVENT_CONNECT, START + timedelta(days=1))
+    _log(1, CHANNEL_2, EVENT_DISCONNECT, START + timedelta(days=1, hours=1))
+
+    assert data_access_fetch_total_hours(1) == 3
+
+
+def test_migration_fills_the_sessions_from_the_history():
+    """A database upgraded with events already logged gets its sessions when the table is created"""
+    _log(1, CHANNEL_1, EVENT_CONNECT, START)
+    _log(1, CHANNEL_1, EVENT_DISCONNECT, START + timedelta(hours=2))
+    _log(2, CHANNEL_1, EVENT_CONNECT, START + timedelta(hours=1))  # Connected during the deploy
+    database_manager.get_cursor().execute("DROP TABLE voice_session")
+
+    database_manager.init_database()
+    _log(2, CHANNEL_1, EVENT_DISCONNECT, START + timedelta(hours=3))
+
+    sessions = fetch_voice_sessions(START - timedelta(days=1), START + timedelta(days=1))
+    assert [(session.user_id, session.duration_s) for session in sessions] == [(1, 7200), (2, 7200)]
@@ -30,7 +30,7 @@ class TournamentSeeBracket(View):
                 # Defer the response immediately to prevent timeout errors
                 await interaction.response.defer()
 
-                file = generate_bracket_file(tournament_id)
+                file = await generate_bracket_file(tournament_id)
                 await interaction.followup.send(file=file, ephemeral=False)
             except Exception as e:
                 print_error_log(f"TournamentSeeBracket: (user id {interaction.user.id}) create_button_callback: {e}")